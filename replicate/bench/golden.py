@@ -0,0 +1,227 @@
+"""
+Golden-output equivalence harness.
+
+Runs the frozen row-by-row reference models (reference.py) and the optimized
+per-day engines in src/model_*.py on the same data and checks that
+  - every per-day probability agrees within --atol (same days, same labels),
+  - every table cell (11 metrics x model x class x lead) is identical,
+  - on the real processed data, every optimized table cell equals
+    replicate/results.json and re-running auto_compare against
+    understand/targets.json reproduces replicate/comparison.json
+    (summary counts and every MATCH/CLOSE/DISCREPANT status).
+Reference/optimized wall-time ratios are reported per model.
+
+A report is written to replicate/bench/results/golden_<commit>.json and the
+exit status is non-zero if any check fails, so performance work can be
+validated without re-checking the paper targets by hand.
+
+Usage:
+  bash tools/run.sh replicate/bench/golden.py [--data real,synthetic]
+      [--models Climatology,Naive_Bayes] [--synthetic-days 3000] [--seed 0]
+      [--atol 1e-9] [--no-reference]
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import contextlib
+import numpy as np
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+BASE = os.path.dirname(BENCH)
+sys.path.insert(0, BENCH)
+sys.path.insert(0, os.path.join(BASE, "src"))
+
+import reference
+from synthetic import generate_merged_dataset, split_eval
+from run_benchmarks import git_info, RESULTS_DIR
+from metrics import evaluate_forecasts
+from model_swpc import swpc_probabilities
+from model_persistence import persistence_probabilities
+from model_climatology import climatology_probabilities
+from model_naive_bayes import naive_bayes_probabilities
+from model_logistic_regression import logistic_regression_probabilities
+from run_all import load_data, auto_compare
+
+TABLE_MAP = {
+    "M_24h": "table_2", "M_48h": "table_3", "M_72h": "table_4",
+    "X_24h": "table_5", "X_48h": "table_6", "X_72h": "table_7",
+}
+
+# Optimized engines, keyed like reference.MODELS; fit cache off so timings compare compute
+OPTIMIZED = {
+    "SWPC": lambda e, m: swpc_probabilities(e),
+    "Persistence": persistence_probabilities,
+    "Climatology": lambda e, m: climatology_probabilities(e, m, use_cache=False),
+    "Naive_Bayes": lambda e, m: naive_bayes_probabilities(e, m, use_cache=False),
+    "Logistic_Reg": lambda e, m: logistic_regression_probabilities(e, m, use_cache=False),
+}
+
+
+def timed(func, *args):
+    """Run func(*args) with stdout suppressed; return (result, seconds)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        out = func(*args)
+    return out, time.perf_counter() - t0
+
+
+def compare_forecasts(ref, opt, atol):
+    """
+    Day-by-day diff of two per-day forecast tables for one class/lead.
+
+    Returns a dict of counts; `ok` is False if the day sets differ, any label
+    differs, or any probability differs by more than atol.
+    """
+    both = ref.merge(opt, on="date", how="outer", suffixes=("_ref", "_opt"), indicator=True)
+    matched = both[both["_merge"] == "both"]
+    diff = np.abs(matched["y_prob_ref"].to_numpy() - matched["y_prob_opt"].to_numpy())
+    out = {
+        "days_ref": len(ref),
+        "days_opt": len(opt),
+        "only_ref": int((both["_merge"] == "left_only").sum()),
+        "only_opt": int((both["_merge"] == "right_only").sum()),
+        "label_mismatch": int((matched["y_true_ref"] != matched["y_true_opt"]).sum()),
+        "max_abs_diff": float(diff.max()) if len(diff) else 0.0,
+        "over_tol": int((diff > atol).sum()),
+    }
+    out["ok"] = out["only_ref"] == out["only_opt"] == out["label_mismatch"] == out["over_tol"] == 0
+    return out
+
+
+def compare_cells(expected, actual):
+    """Table cells (metric -> value) that differ between two metric dicts."""
+    return {m: [expected[m], actual.get(m)] for m in expected if actual.get(m) != expected[m]}
+
+
+def check_dataset(name, eval_df, merged_df, models, atol, run_reference):
+    """Run reference and optimized engines for each model on one dataset."""
+    print(f"\n=== {name}: {len(eval_df):,} evaluation days ===")
+    report = {"models": {}, "tables": {}}
+
+    for model in models:
+        opt, t_opt = timed(OPTIMIZED[model], eval_df, merged_df)
+        report["tables"][model] = {key: evaluate_forecasts(frame) for key, frame in opt.items()}
+        entry = {"optimized_s": round(t_opt, 4)}
+
+        if run_reference:
+            ref, t_ref = timed(reference.MODELS[model], eval_df, merged_df)
+            entry["reference_s"] = round(t_ref, 4)
+            entry["speedup"] = round(t_ref / t_opt, 1) if t_opt > 0 else None
+            entry["forecasts"] = {key: compare_forecasts(ref[key], opt[key], atol) for key in ref}
+            entry["cell_diffs"] = {}
+            for key in ref:
+                diffs = compare_cells(reference.metrics(ref[key]), report["tables"][model][key])
+                if diffs:
+                    entry["cell_diffs"][key] = diffs
+            entry["ok"] = (set(ref) == set(opt) and not entry["cell_diffs"]
+                           and all(f["ok"] for f in entry["forecasts"].values()))
+            worst = max(f["max_abs_diff"] for f in entry["forecasts"].values())
+            print(f"  {model:<14} ref={t_ref:8.2f}s  opt={t_opt:7.3f}s  "
+                  f"x{entry['speedup']:<8} max|dp|={worst:.1e}  "
+                  f"cells differing={sum(len(d) for d in entry['cell_diffs'].values())}  "
+                  f"{'PASS' if entry['ok'] else 'FAIL'}")
+        else:
+            print(f"  {model:<14} opt={t_opt:7.3f}s")
+        report["models"][model] = entry
+
+    return report
+
+
+def check_contract(tables, results_path, comparison_path, targets):
+    """Optimized tables vs the published results.json / comparison.json."""
+    with open(results_path) as f:
+        published = json.load(f)
+    with open(comparison_path) as f:
+        published_comparison = json.load(f)
+
+    cell_diffs = {}
+    n_cells = 0
+    for model, by_key in tables.items():
+        for key, cells in by_key.items():
+            expected = published["tables"][TABLE_MAP[key]]["data"].get(model)
+            if expected is None:
+                continue
+            n_cells += len(expected)
+            diffs = compare_cells(expected, cells)
+            if diffs:
+                cell_diffs[f"{TABLE_MAP[key]}/{model}"] = diffs
+
+    # Re-run auto_compare on the published results with the optimized cells substituted
+    candidate = json.loads(json.dumps(published))
+    for model, by_key in tables.items():
+        for key, cells in by_key.items():
+            candidate["tables"][TABLE_MAP[key]]["data"][model] = cells
+    comparison = auto_compare(candidate, targets)
+    status_diffs = {}
+    for table_name in TABLE_MAP.values():
+        for model, by_metric in comparison["tables"][table_name].items():
+            for metric, entry in by_metric.items():
+                expected = published_comparison["tables"][table_name][model][metric]["status"]
+                if entry["status"] != expected:
+                    status_diffs[f"{table_name}/{model}/{metric}"] = [expected, entry["status"]]
+    summary_ok = comparison["summary"] == published_comparison["summary"]
+
+    ok = not cell_diffs and not status_diffs and summary_ok
+    print(f"\n  Contract: {n_cells} published cells, {len(cell_diffs)} rows differ, "
+          f"{len(status_diffs)} comparison statuses differ, "
+          f"summary {'matches' if summary_ok else 'DIFFERS'}  {'PASS' if ok else 'FAIL'}")
+    return {"ok": ok, "cells_checked": n_cells, "cell_diffs": cell_diffs,
+            "status_diffs": status_diffs, "summary": comparison["summary"],
+            "summary_ok": summary_ok}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reference vs optimized equivalence checks")
+    parser.add_argument("--data", default="real,synthetic", help="comma-separated: real, synthetic")
+    parser.add_argument("--models", help=f"comma-separated subset of {','.join(OPTIMIZED)}")
+    parser.add_argument("--synthetic-days", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--atol", type=float, default=1e-9, help="per-day probability tolerance")
+    parser.add_argument("--no-reference", action="store_true",
+                        help="skip the slow reference runs (real data: contract checks only)")
+    parser.add_argument("--out", help="output JSON path (default results/golden_<commit>.json)")
+    args = parser.parse_args()
+
+    models = args.models.split(",") if args.models else list(OPTIMIZED)
+    unknown = set(models) - set(OPTIMIZED)
+    if unknown:
+        parser.error(f"unknown models: {', '.join(sorted(unknown))}")
+    datasets = args.data.split(",")
+
+    commit, dirty = git_info()
+    report = {"meta": {"commit": commit, "dirty": dirty, "atol": args.atol,
+                       "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}}
+    ok = True
+
+    if "synthetic" in datasets:
+        merged_df = generate_merged_dataset(args.synthetic_days, seed=args.seed)
+        rep = check_dataset(f"synthetic ({args.synthetic_days} days, seed {args.seed})",
+                            split_eval(merged_df), merged_df, models, args.atol,
+                            run_reference=not args.no_reference)
+        report["synthetic"] = rep
+        ok &= all(m.get("ok", True) for m in rep["models"].values())
+
+    if "real" in datasets:
+        eval_df, merged_df, targets = load_data()
+        rep = check_dataset("real processed data", eval_df, merged_df, models, args.atol,
+                            run_reference=not args.no_reference)
+        rep["contract"] = check_contract(rep["tables"], os.path.join(BASE, "results.json"),
+                                         os.path.join(BASE, "comparison.json"), targets)
+        report["real"] = rep
+        ok &= rep["contract"]["ok"] and all(m.get("ok", True) for m in rep["models"].values())
+
+    report["ok"] = bool(ok)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"golden_{commit}{'-dirty' if dirty else ''}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n{'ALL CHECKS PASSED' if ok else 'EQUIVALENCE CHECK FAILED'}  (report: {out})")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
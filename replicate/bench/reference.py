@@ -0,0 +1,223 @@
+"""
+Reference (row-by-row) implementations of the baseline models.
+
+These are frozen copies of the original per-day loops from src/model_*.py,
+kept only as the ground truth for golden.py. They return per-day forecasts
+instead of metrics so every probability can be compared, and fit models
+directly (no fit cache). Do not optimize this file: its value is that it
+stays the code that produced replicate/results.json.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.naive_bayes import GaussianNB
+from sklearn.linear_model import LogisticRegression
+
+LEADS = [(1, "24h"), (2, "48h"), (3, "72h")]
+
+
+def _frame(dates, y_true, y_prob):
+    return pd.DataFrame({
+        "date": pd.to_datetime(pd.Series(dates, dtype=object)),
+        "y_true": np.asarray(y_true, dtype=int),
+        "y_prob": np.asarray(y_prob, dtype=float),
+    })
+
+
+def _prepare(eval_df, merged_df):
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    merged_df["date"] = pd.to_datetime(merged_df["date"])
+    eval_df = eval_df.copy()
+    eval_df["date"] = pd.to_datetime(eval_df["date"])
+    return eval_df, merged_df
+
+
+def swpc(eval_df, merged_df=None):
+    probs = {}
+    for flare_class in ["m", "x"]:
+        label_col = f"{flare_class}_label"
+        for lead_name in ["24h", "48h", "72h"]:
+            prob_col = f"{flare_class}_{lead_name}"
+            valid = eval_df[eval_df[prob_col].notna()].copy()
+            probs[f"{flare_class.upper()}_{lead_name}"] = _frame(
+                valid["date"], valid[label_col].values.astype(int), valid[prob_col].values / 100.0)
+    return probs
+
+
+def persistence(eval_df, merged_df):
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    merged_df["date"] = pd.to_datetime(merged_df["date"])
+    date_to_idx = {d: i for i, d in enumerate(merged_df["date"])}
+
+    probs = {}
+    for flare_class in ["m", "x"]:
+        label_col = f"{flare_class}_label"
+        for lead_days, lead_name in LEADS:
+            dates, y_true_list, y_pred_list = [], [], []
+            for _, row in eval_df.iterrows():
+                target_date = pd.Timestamp(row["date"])
+                source_date = target_date - pd.Timedelta(days=lead_days)
+                if source_date in date_to_idx:
+                    pred = int(merged_df.iloc[date_to_idx[source_date]][label_col])
+                else:
+                    continue
+                dates.append(target_date)
+                y_true_list.append(int(row[label_col]))
+                y_pred_list.append(pred)
+            probs[f"{flare_class.upper()}_{lead_name}"] = _frame(
+                dates, y_true_list, np.array(y_pred_list).astype(float))
+    return probs
+
+
+def _bin_consec_free(x1):
+    if x1 > 20:
+        return 21
+    return int(x1)
+
+
+def _bin_sunspot(x2):
+    if x2 > 200:
+        return 210
+    return int(x2 // 10) * 10
+
+
+def _climatology_table(train_data, label_col, consec_col):
+    flare_counts = {}
+    total_counts = {}
+    for _, row in train_data.iterrows():
+        key = (_bin_consec_free(row[consec_col]), _bin_sunspot(row["sunspot_number"]))
+        total_counts[key] = total_counts.get(key, 0) + 1
+        if row[label_col] == 1:
+            flare_counts[key] = flare_counts.get(key, 0) + 1
+    return {key: flare_counts.get(key, 0) / total_counts[key] for key in total_counts}
+
+
+def climatology(eval_df, merged_df):
+    eval_df, merged_df = _prepare(eval_df, merged_df)
+    eval_months = sorted(eval_df["date"].dt.to_period("M").unique())
+
+    probs = {}
+    for flare_class in ["m", "x"]:
+        label_col = f"{flare_class}_label"
+        consec_col = f"{flare_class}_consec_free"
+        tables = {}
+        for lead_days, lead_name in LEADS:
+            dates, y_true_list, y_prob_list = [], [], []
+            for month in eval_months:
+                month_start = month.start_time
+                month_end = month.end_time
+                train_data = merged_df[merged_df["date"] < month_start]
+                if len(train_data) == 0:
+                    continue
+                # The table does not depend on the lead time; count it once
+                if month not in tables:
+                    tables[month] = _climatology_table(train_data, label_col, consec_col)
+                table = tables[month]
+
+                month_eval = eval_df[(eval_df["date"] >= month_start) & (eval_df["date"] <= month_end)]
+                for _, row in month_eval.iterrows():
+                    target_date = pd.Timestamp(row["date"])
+                    feature_date = target_date - pd.Timedelta(days=lead_days)
+                    feature_row = merged_df[merged_df["date"] == feature_date]
+                    if len(feature_row) == 0:
+                        feature_row = pd.DataFrame([row])
+                    feature_row = feature_row.iloc[0]
+                    key = (_bin_consec_free(feature_row[consec_col]),
+                           _bin_sunspot(feature_row["sunspot_number"]))
+                    dates.append(target_date)
+                    y_true_list.append(int(row[label_col]))
+                    y_prob_list.append(table.get(key, 0.0))
+            probs[f"{flare_class.upper()}_{lead_name}"] = _frame(dates, y_true_list, y_prob_list)
+    return probs
+
+
+def _expanding_window(eval_df, merged_df, make_model):
+    eval_df, merged_df = _prepare(eval_df, merged_df)
+    eval_months = sorted(eval_df["date"].dt.to_period("M").unique())
+
+    probs = {}
+    for flare_class in ["m", "x"]:
+        label_col = f"{flare_class}_label"
+        consec_col = f"{flare_class}_consec_free"
+        models = {}
+        for lead_days, lead_name in LEADS:
+            dates, y_true_list, y_prob_list = [], [], []
+            for month in eval_months:
+                month_start = month.start_time
+                month_end = month.end_time
+                train_data = merged_df[merged_df["date"] < month_start].dropna(
+                    subset=[consec_col, "sunspot_number"])
+                if len(train_data) == 0 or train_data[label_col].nunique() < 2:
+                    continue
+                # The fit does not depend on the lead time; fit it once
+                if month not in models:
+                    model = make_model()
+                    model.fit(train_data[[consec_col, "sunspot_number"]].values,
+                              train_data[label_col].values.astype(int))
+                    models[month] = model
+                model = models[month]
+
+                month_eval = eval_df[(eval_df["date"] >= month_start) & (eval_df["date"] <= month_end)]
+                for _, row in month_eval.iterrows():
+                    target_date = pd.Timestamp(row["date"])
+                    feature_date = target_date - pd.Timedelta(days=lead_days)
+                    fr = merged_df[merged_df["date"] == feature_date]
+                    if len(fr) == 0:
+                        continue
+                    feature_row = fr.iloc[0]
+                    X = np.array([[feature_row[consec_col], feature_row["sunspot_number"]]])
+                    dates.append(target_date)
+                    y_true_list.append(int(row[label_col]))
+                    y_prob_list.append(model.predict_proba(X)[0, 1])
+            probs[f"{flare_class.upper()}_{lead_name}"] = _frame(dates, y_true_list, y_prob_list)
+    return probs
+
+
+def naive_bayes(eval_df, merged_df):
+    return _expanding_window(eval_df, merged_df, GaussianNB)
+
+
+def logistic_regression(eval_df, merged_df):
+    return _expanding_window(eval_df, merged_df, lambda: LogisticRegression(max_iter=1000))
+
+
+def metrics(frame, theta=0.5):
+    """The 11 table metrics for one per-day forecast table, as in metrics.compute_all_metrics."""
+    y_true = frame["y_true"].to_numpy().astype(int)
+    y_prob = frame["y_prob"].to_numpy().astype(float)
+    y_pred = (y_prob >= theta).astype(int)
+    TP = int(np.sum((y_true == 1) & (y_pred == 1)))
+    FP = int(np.sum((y_true == 0) & (y_pred == 1)))
+    TN = int(np.sum((y_true == 0) & (y_pred == 0)))
+    FN = int(np.sum((y_true == 1) & (y_pred == 0)))
+
+    def ratio(a, b):
+        return a / b if b > 0 else 0.0
+
+    total = TP + FP + TN + FN
+    recall = ratio(TP, TP + FN)
+    hss_denom = (TP + FN) * (FN + TN) + (TP + FP) * (FP + TN)
+    auc = float(roc_auc_score(y_true, y_prob)) if len(np.unique(y_true)) >= 2 else 0.5
+    return {
+        "Accuracy": round(ratio(TP + TN, total), 2),
+        "Precision": round(ratio(TP, TP + FP), 2),
+        "Recall": round(recall, 2),
+        "F1": round(ratio(2 * TP, 2 * TP + FP + FN), 2),
+        "Brier": round(float(np.mean((y_prob - y_true) ** 2)), 2),
+        "AUC": round(auc, 2),
+        "CSI": round(ratio(TP, TP + FP + FN), 2),
+        "POD": round(recall, 2),
+        "FAR": round(ratio(FP, TP + FP), 2),
+        "TSS": round(recall - ratio(FP, FP + TN), 2),
+        "HSS": round(ratio(2 * (TP * TN - FN * FP), hss_denom), 2),
+    }
+
+
+MODELS = {
+    "SWPC": swpc,
+    "Persistence": persistence,
+    "Climatology": climatology,
+    "Naive_Bayes": naive_bayes,
+    "Logistic_Reg": logistic_regression,
+}
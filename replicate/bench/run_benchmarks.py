@@ -0,0 +1,293 @@
+"""
+Benchmark suite for the replication pipeline on synthetic solar histories.
+
+Times each pipeline stage at increasing history lengths (10^3-10^7 days) and
+records best/median wall time, throughput (days/s) and peak traced memory.
+Every stage has a size cap so slow stages (row-by-row parsers, one sklearn
+fit per month) are not asked to process millions of days; raise it with
+--max-days. Equivalence with the original row-by-row model code is checked
+separately by golden.py.
+
+Stages:
+  parse.*              parse_data parsers on synthetic raw files
+  features             add_derived_features (consecutive flare-free days)
+  model.*              each run_* model (fit cache disabled)
+  retrain.*            climatology + NB + LR forecasts retrained daily / weekly
+  metrics.compute_all  compute_all_metrics on one probability series
+  metrics.histogram    the same 11 metrics via ForecastHistogram
+  threshold.optimize   find_optimal_threshold (100-step TSS sweep)
+  special_analyses     storm-after-calm + all-clear
+  conditioning.cube    full condition cube (61 quiet x 10 after-flare x 100 thresholds)
+  windows.sweep        event-window evaluation, window lengths 1-27 (SWPC + Persistence)
+
+Results are written to replicate/bench/results/bench_<commit>.json together
+with the git commit, library versions and seed, so runs from different
+commits can be compared:
+
+Usage:
+  bash tools/run.sh replicate/bench/run_benchmarks.py [--quick] [--stages model,metrics]
+      [--sizes 1e3,1e4,1e5] [--repeat 3] [--max-days N] [--seed 0]
+  bash tools/run.sh replicate/bench/run_benchmarks.py --compare OLD.json NEW.json
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+import sklearn
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(os.path.dirname(BENCH), "src")
+sys.path.insert(0, BENCH)
+sys.path.insert(0, SRC)
+
+from synthetic import generate_merged_dataset, split_eval, write_raw_files
+import parse_data
+from metrics import compute_all_metrics, threshold_predictions
+from perf import PERF
+from model_swpc import run_swpc
+from model_persistence import run_persistence
+from model_climatology import run_climatology
+from model_naive_bayes import run_naive_bayes
+from model_logistic_regression import run_logistic_regression
+from model_analog import run_analog
+from model_markov import run_markov
+from run_all import find_optimal_threshold, run_special_analyses
+from conditioning import condition_cube
+from histogram import ForecastHistogram
+from retraining import cadence_forecasts
+from event_windows import window_evaluation
+from model_swpc import swpc_probabilities
+from model_persistence import persistence_probabilities
+
+RESULTS_DIR = os.path.join(BENCH, "results")
+DEFAULT_SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]
+
+
+# --------------------------------------------------------------------------
+# Stage definitions: name -> (setup kind, size cap, callable(ctx))
+# --------------------------------------------------------------------------
+
+def _swpc_series(ctx):
+    df = ctx["eval_df"]
+    return df["m_label"].values.astype(int), df["m_24h"].values / 100.0
+
+
+def _metrics(ctx):
+    y_true, y_prob = _swpc_series(ctx)
+    compute_all_metrics(y_true, threshold_predictions(y_prob, 0.5), y_prob)
+
+
+def _histogram_metrics(ctx):
+    y_true, y_prob = _swpc_series(ctx)
+    ForecastHistogram.from_arrays(y_true, y_prob).metrics(0.5)
+
+
+def _threshold(ctx):
+    y_true, y_prob = _swpc_series(ctx)
+    find_optimal_threshold(y_true, y_prob)
+
+
+def _cube(ctx):
+    forecasts = {"SWPC": swpc_probabilities(ctx["eval_df"]),
+                 "Persistence": persistence_probabilities(ctx["eval_df"], ctx["merged_df"])}
+    condition_cube(forecasts, ctx["merged_df"])
+
+
+def _windows(ctx):
+    forecasts = {"SWPC": swpc_probabilities(ctx["eval_df"]),
+                 "Persistence": persistence_probabilities(ctx["eval_df"], ctx["merged_df"])}
+    window_evaluation(forecasts, ctx["merged_df"], lengths=range(1, 28))
+
+
+STAGES = {
+    "parse.rsga": ("raw", 10**4, lambda c: parse_data.parse_rsga_files(c["raw_dir"], c["years"])),
+    "parse.noaa_events": ("raw", 10**4, lambda c: parse_data.parse_noaa_events(
+        c["years"][0], c["years"][-1], raw_dir=c["raw_dir"])),
+    "parse.dsd": ("raw", 10**4, lambda c: parse_data.parse_dsd_flare_counts(c["raw_dir"], c["years"])),
+    "parse.sunspot": ("raw", 10**4, lambda c: parse_data.parse_sunspot_numbers(
+        c["raw_dir"], start="1900-01-01", end="2300-12-31")),
+    "features": ("frame", 10**7, lambda c: parse_data.add_derived_features(
+        c["merged_df"].drop(columns=["m_consec_free", "x_consec_free"]))),
+    "model.swpc": ("frame", 10**6, lambda c: run_swpc(c["eval_df"])),
+    "model.persistence": ("frame", 10**7, lambda c: run_persistence(c["eval_df"], c["merged_df"])),
+    "model.climatology": ("frame", 10**6, lambda c: run_climatology(
+        c["eval_df"], c["merged_df"], use_cache=False)),
+    "model.naive_bayes": ("frame", 10**5, lambda c: run_naive_bayes(
+        c["eval_df"], c["merged_df"], use_cache=False)),
+    "model.logistic_regression": ("frame", 10**5, lambda c: run_logistic_regression(
+        c["eval_df"], c["merged_df"], use_cache=False)),
+    "model.analog": ("frame", 10**5, lambda c: run_analog(c["eval_df"], c["merged_df"])),
+    "model.markov": ("frame", 10**7, lambda c: run_markov(c["eval_df"], c["merged_df"])),
+    "retrain.daily": ("frame", 10**5, lambda c: cadence_forecasts(c["eval_df"], c["merged_df"], "daily")),
+    "retrain.weekly": ("frame", 10**5, lambda c: cadence_forecasts(c["eval_df"], c["merged_df"], "weekly")),
+    "metrics.compute_all": ("frame", 10**7, _metrics),
+    "metrics.histogram": ("frame", 10**7, _histogram_metrics),
+    "threshold.optimize": ("frame", 10**7, _threshold),
+    "special_analyses": ("frame", 10**6, lambda c: run_special_analyses(c["eval_df"], c["merged_df"])),
+    "conditioning.cube": ("frame", 10**6, _cube),
+    "windows.sweep": ("frame", 10**6, _windows),
+}
+
+
+# --------------------------------------------------------------------------
+# Measurement
+# --------------------------------------------------------------------------
+
+def measure(func, ctx, repeat):
+    """Run `func(ctx)` `repeat` times for timing, plus once under tracemalloc for peak memory."""
+    times = []
+    sink = io.StringIO()
+    for _ in range(repeat):
+        PERF.reset()
+        with contextlib.redirect_stdout(sink):
+            t0 = time.perf_counter()
+            func(ctx)
+            times.append(time.perf_counter() - t0)
+        sink.seek(0)
+        sink.truncate()
+
+    PERF.reset()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    with contextlib.redirect_stdout(sink):
+        func(ctx)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return times, peak
+
+
+def git_info():
+    """Short commit hash and whether the working tree has uncommitted changes."""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                         cwd=BENCH, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--", os.path.dirname(BENCH)],
+                                             cwd=BENCH, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = "unknown", False
+    return commit, dirty
+
+
+def run_suite(sizes, stage_filter, repeat, max_days, seed):
+    selected = [name for name in STAGES
+                if not stage_filter or any(name.startswith(f) for f in stage_filter)]
+    records = []
+
+    for n in sizes:
+        stages = [s for s in selected if n <= (max_days or STAGES[s][1])]
+        if not stages:
+            continue
+        print(f"\n--- {n:,} days ---")
+        merged_df = generate_merged_dataset(n, seed=seed)
+        ctx = {"merged_df": merged_df, "eval_df": split_eval(merged_df)}
+        raw_dir = None
+        if any(STAGES[s][0] == "raw" for s in stages):
+            raw_dir = tempfile.mkdtemp(prefix="bench_raw_")
+            ctx["raw_dir"] = raw_dir
+            ctx["years"] = write_raw_files(merged_df, raw_dir)
+
+        try:
+            for name in stages:
+                times, peak = measure(STAGES[name][2], ctx, repeat)
+                best = min(times)
+                rec = {
+                    "stage": name,
+                    "n_days": n,
+                    "times_s": [round(t, 6) for t in times],
+                    "best_s": round(best, 6),
+                    "median_s": round(float(np.median(times)), 6),
+                    "days_per_s": round(n / best, 1) if best > 0 else None,
+                    "peak_mb": round(peak / 2**20, 2),
+                }
+                records.append(rec)
+                print(f"  {name:<28} best={best:9.4f}s  {rec['days_per_s']:>14,.0f} days/s  "
+                      f"peak={rec['peak_mb']:8.1f} MB")
+        finally:
+            if raw_dir:
+                shutil.rmtree(raw_dir, ignore_errors=True)
+
+    return records
+
+
+def compare(old_path, new_path):
+    """Print per-stage speedups between two benchmark result files."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_by_key = {(r["stage"], r["n_days"]): r for r in old["results"]}
+
+    print(f"Old: {old['meta']['commit']}  New: {new['meta']['commit']}")
+    print(f"  {'Stage':<28} {'Days':>10} {'Old s':>10} {'New s':>10} {'Speedup':>8} {'Mem ratio':>9}")
+    for r in new["results"]:
+        o = old_by_key.get((r["stage"], r["n_days"]))
+        if o is None:
+            continue
+        speedup = o["best_s"] / r["best_s"] if r["best_s"] > 0 else float("inf")
+        mem = r["peak_mb"] / o["peak_mb"] if o["peak_mb"] > 0 else float("nan")
+        print(f"  {r['stage']:<28} {r['n_days']:>10,} {o['best_s']:>10.4f} {r['best_s']:>10.4f} "
+              f"{speedup:>7.2f}x {mem:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic data")
+    parser.add_argument("--sizes", help="comma-separated day counts (default 1e3..1e7)")
+    parser.add_argument("--stages", help="comma-separated stage-name prefixes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-days", type=float, help="override every stage's size cap")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="sizes 1e3,1e4 and one repeat")
+    parser.add_argument("--out", help="output JSON path (default results/bench_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sizes = [int(float(s)) for s in args.sizes.split(",")] if args.sizes else DEFAULT_SIZES
+    repeat = args.repeat
+    if args.quick:
+        sizes = [s for s in sizes if s <= 10**4]
+        repeat = 1
+    stage_filter = args.stages.split(",") if args.stages else None
+    max_days = int(args.max_days) if args.max_days else None
+
+    commit, dirty = git_info()
+    records = run_suite(sizes, stage_filter, repeat, max_days, args.seed)
+
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+            "seed": args.seed,
+            "repeat": repeat,
+        },
+        "results": records,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"bench_{commit}{'-dirty' if dirty else ''}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Synthetic solar-history generator.
+
+Produces frames shaped like data/processed/merged_dataset.csv so every stage
+of the pipeline can be exercised at 10^3-10^7 days:
+  - sunspot number following an ~11-year cycle with AR(1) noise
+  - flare activity driven by a latent AR(1) log-intensity, giving
+    autocorrelated flare runs during solar maximum
+  - class imbalance matching the paper (M ~ 20.6%, X ~ 2.6% of days)
+  - SWPC-like forecasts rounded to the discrete percentages SWPC issues
+
+All generation is vectorized (scipy.signal.lfilter for the AR processes), so
+10^7 days take a few seconds. Dates beyond 2262 use second resolution.
+
+write_raw_files() renders a frame back into the raw text formats parse_data.py
+reads (RSGA archives, NOAA event reports, DSD, SILSO) for parsing benchmarks;
+write_xrs_files() renders its flare days as 1-minute GOES XRS flux.
+"""
+
+import os
+import sys
+import tarfile
+import io
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH), "src"))
+from parse_data import consecutive_free_days
+
+CYCLE_DAYS = 4018  # ~11 years
+M_RATE = 0.206
+X_RATE = 0.026
+M_VALUES = np.array([1, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80, 85, 90, 95])
+X_VALUES = np.array([1, 2, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75])
+BUFFER_MONTHS = 17
+
+
+def _ar1(rng, n, phi, sigma):
+    """Stationary AR(1) series of length n."""
+    noise = rng.normal(0.0, sigma, n)
+    noise[0] /= np.sqrt(1 - phi ** 2)
+    return lfilter([1.0], [1.0, -phi], noise)
+
+
+def _discretize(prob_pct, values):
+    """Round percentages to the nearest allowed forecast value."""
+    idx = np.searchsorted(values, prob_pct)
+    idx = np.clip(idx, 1, len(values) - 1)
+    lower = values[idx - 1]
+    upper = values[idx]
+    return np.where(prob_pct - lower < upper - prob_pct, lower, upper).astype(float)
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def generate_merged_dataset(n_days, start="1996-08-01", seed=0):
+    """
+    Generate a merged_dataset-shaped frame.
+
+    Parameters:
+    -----------
+    n_days : int
+        Number of consecutive days
+    start : str
+        First date (the first 17 months act as the training buffer)
+    seed : int
+        RNG seed; the same (n_days, start, seed) always gives the same frame
+
+    Returns:
+    --------
+    DataFrame with columns date, m_24h, x_24h, m_48h, x_48h, m_72h, x_72h,
+    m_label, x_label, sunspot_number, sunspot_dsd, m_consec_free, x_consec_free
+    """
+    n_days = int(n_days)
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_days)
+
+    # Sunspot number: squared-sine cycle (random phase) with multiplicative AR(1) noise
+    phase = rng.uniform(0, CYCLE_DAYS)
+    cycle = np.sin(np.pi * (t + phase) / CYCLE_DAYS) ** 2
+    ssn = 10 + 170 * cycle * np.exp(_ar1(rng, n_days, 0.97, 0.05))
+    ssn = np.maximum(0, np.round(ssn + rng.normal(0, 8, n_days)))
+
+    # Latent flare intensity: cycle-driven mean plus persistent AR(1) activity
+    # (lag-1 label autocorrelation close to 1996-2024: ~0.5 for M, ~0.2 for X)
+    activity = 2.5 * (ssn / 180.0) + _ar1(rng, n_days, 0.93, 0.35)
+    m_score = activity + rng.logistic(0, 0.42, n_days)
+    x_score = activity + rng.logistic(0, 0.5, n_days)
+    m_label = (m_score > np.quantile(m_score, 1 - M_RATE)).astype(int)
+    x_label = (x_score > np.quantile(x_score, 1 - X_RATE)).astype(int)
+
+    # Activity standardized so forecast probabilities land near the event rates
+    z = (activity - activity.mean()) / activity.std()
+
+    data = {}
+    if n_days <= 90_000:
+        data["date"] = pd.date_range(start, periods=n_days, freq="D")
+    else:
+        data["date"] = pd.date_range(start, periods=n_days, freq="D", unit="s")
+
+    # SWPC-like forecasts issued lead days ahead from the (noisier) activity known then
+    for lead in (1, 2, 3):
+        known = np.concatenate([np.full(lead, z[0]), z[:-lead]])
+        noise = rng.normal(0, 0.3 + 0.1 * lead, n_days)
+        m_pct = 100 * _sigmoid(-1.35 + 1.6 * known + noise)
+        x_pct = 100 * _sigmoid(-3.6 + 1.5 * known + noise)
+        data[f"m_{24 * lead}h"] = _discretize(m_pct, M_VALUES)
+        data[f"x_{24 * lead}h"] = _discretize(x_pct, X_VALUES)
+
+    df = pd.DataFrame(data)
+    df = df[["date", "m_24h", "x_24h", "m_48h", "x_48h", "m_72h", "x_72h"]]
+    df["m_label"] = m_label
+    df["x_label"] = x_label
+    df["sunspot_number"] = ssn
+    df["sunspot_dsd"] = np.round(ssn * 0.7)
+    df["m_consec_free"] = consecutive_free_days(m_label)
+    df["x_consec_free"] = consecutive_free_days(x_label)
+    return df
+
+
+def split_eval(merged_df):
+    """Evaluation frame: everything after the 17-month training buffer."""
+    eval_start = merged_df["date"].iloc[0] + pd.DateOffset(months=BUFFER_MONTHS)
+    return merged_df[merged_df["date"] >= eval_start].reset_index(drop=True)
+
+
+def write_raw_files(merged_df, raw_dir):
+    """
+    Write a synthetic frame in the raw formats read by parse_data.py.
+
+    Creates swpc_rsga/<year>_RSGA.tar.gz, noaa_events/<year>_events/,
+    swpc_forecasts/<year>_daypre.txt and silso_daily_sunspot.csv under raw_dir.
+    Returns the list of years written.
+    """
+    df = merged_df.reset_index(drop=True)
+    dates = pd.to_datetime(df["date"])
+    years = sorted(dates.dt.year.unique())
+    for sub in ("swpc_rsga", "noaa_events", "swpc_forecasts"):
+        os.makedirs(os.path.join(raw_dir, sub), exist_ok=True)
+
+    # RSGA issued on day D carries the forecasts for D+1, D+2, D+3
+    m = df[["m_24h", "m_48h", "m_72h"]].to_numpy()
+    x = df[["x_24h", "x_48h", "x_72h"]].to_numpy()
+    n = len(df)
+    for year in years:
+        archive = os.path.join(raw_dir, "swpc_rsga", f"{year}_RSGA.tar.gz")
+        with tarfile.open(archive, "w:gz") as tf:
+            for i in np.nonzero((dates.dt.year == year).values)[0]:
+                if i + 3 >= n:
+                    continue
+                m_probs = [int(m[i + 1, 0]), int(m[i + 2, 1]), int(m[i + 3, 2])]
+                x_probs = [int(x[i + 1, 0]), int(x[i + 2, 1]), int(x[i + 3, 2])]
+                stamp = dates.iloc[i].strftime("%Y%m%d")
+                text = (":Product: Report of Solar-Geophysical Activity\n"
+                        "III.  Event Probabilities\n"
+                        f"Class M    {m_probs[0]:02d}/{m_probs[1]:02d}/{m_probs[2]:02d}\n"
+                        f"Class X    {x_probs[0]:02d}/{x_probs[1]:02d}/{x_probs[2]:02d}\n"
+                        "Proton     01/01/01\n").encode()
+                info = tarfile.TarInfo(f"{year}_RSGA/{stamp}RSGA.txt")
+                info.size = len(text)
+                tf.addfile(info, io.BytesIO(text))
+
+    # NOAA event reports: one XRA line per flare day
+    for i in range(n):
+        d = dates.iloc[i]
+        year_dir = os.path.join(raw_dir, "noaa_events", f"{d.year}_events")
+        os.makedirs(year_dir, exist_ok=True)
+        lines = [":Product: Edited Events", "#Event    Begin    Max       End  Obs  Q  Type  Loc/Frq   Particulars"]
+        if df["x_label"].iloc[i]:
+            lines.append("5110      1200     1215      1230 G10  5   XRA  1-8A      X1.2    1.1E-01")
+        if df["m_label"].iloc[i]:
+            lines.append("5120      1400     1410      1425 G10  5   XRA  1-8A      M2.3    2.2E-02")
+        with open(os.path.join(year_dir, f"{d.strftime('%Y%m%d')}events.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    # DSD: Radio Sunspot Area NewReg Field Flux C M X S 1 2 3
+    for year in years:
+        rows = df[(dates.dt.year == year).values]
+        with open(os.path.join(raw_dir, "swpc_forecasts", f"{year}_daypre.txt"), "w") as f:
+            f.write(":Product: Daily Solar Data\n")
+            for d, r in zip(pd.to_datetime(rows["date"]), rows.itertuples()):
+                f.write(f"{d.year} {d.month:02d} {d.day:02d}  100 {int(r.sunspot_dsd):6d}      250      0    -999   B5.0"
+                        f"   3  {int(r.m_label)}  {int(r.x_label)}  0  0  0  0\n")
+
+    # SILSO: year;month;day;fraction;ssn;std;nobs;definitive
+    with open(os.path.join(raw_dir, "silso_daily_sunspot.csv"), "w") as f:
+        for d, ssn in zip(dates, df["sunspot_number"]):
+            f.write(f"{d.year};{d.month:02d};{d.day:02d};{d.year + d.dayofyear / 366:.3f};"
+                    f"{int(ssn):3d}; 5.0; 20;1\n")
+
+    return years
+
+
+def write_xrs_files(merged_df, raw_dir, seed=0, missing_days=()):
+    """
+    Write a synthetic frame's flares as 1-minute GOES XRS-B flux files
+    (goes_xrs/<year>_xrs.npy, xrs_labels.py format).
+
+    The background is ~3e-7 W/m^2 (B3) with 1% noise. Each flare rises over 10
+    minutes, holds its peak for 3 and decays with a 15-minute e-folding time:
+    X1.2 at 12:00 on x_label days and M2.3 at 14:00 on m_label days, as in
+    the event reports of write_raw_files(). 1% of the minutes outside
+    11:00-16:00 are dropped, and so are the whole `missing_days` (positions
+    in the frame). Returns the list of files written.
+    """
+    from xrs_labels import XRS_DIR, write_xrs_file
+
+    rng = np.random.default_rng(seed)
+    df = merged_df.reset_index(drop=True)
+    days = np.asarray(pd.to_datetime(df["date"]).values).astype("datetime64[D]")
+    minute = np.arange(1440)
+    flux = 3e-7 * np.exp(rng.normal(0, 0.01, size=(len(df), 1440)))
+
+    def profile(onset, peak):
+        k = minute - onset
+        rise = peak * np.clip(k / 10, 0, 1) ** 2
+        return np.where(k < 13, rise, peak * np.exp(-(k - 12) / 15.0)) * (k >= 0)
+
+    flux += df["x_label"].to_numpy()[:, None] * profile(12 * 60, 1.2e-4)[None, :]
+    flux += df["m_label"].to_numpy()[:, None] * profile(14 * 60, 2.3e-5)[None, :]
+    keep = (rng.random(flux.shape) > 0.01) | ((minute >= 11 * 60) & (minute < 16 * 60))[None, :]
+    keep[list(missing_days)] = False
+    times = days[:, None] + minute[None, :].astype("timedelta64[m]")
+
+    os.makedirs(os.path.join(raw_dir, XRS_DIR), exist_ok=True)
+    paths = []
+    years = days.astype("datetime64[Y]").astype(int) + 1970
+    for year in np.unique(years):
+        rows = keep & (years == year)[:, None]
+        path = os.path.join(raw_dir, XRS_DIR, f"{year}_xrs.npy")
+        write_xrs_file(path, times[rows], flux[rows])
+        paths.append(path)
+    return paths
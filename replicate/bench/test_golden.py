@@ -0,0 +1,56 @@
+"""
+Tests for the reference-vs-optimized equivalence harness.
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import generate_merged_dataset, split_eval
+from golden import OPTIMIZED, check_dataset, compare_forecasts
+import reference
+
+
+def test_engines_match_reference():
+    """Every optimized engine reproduces the row-by-row reference on synthetic data."""
+    merged_df = generate_merged_dataset(900, seed=3)
+    report = check_dataset("test", split_eval(merged_df), merged_df, list(OPTIMIZED),
+                           atol=1e-9, run_reference=True)
+    for model, entry in report["models"].items():
+        assert entry["ok"], f"{model}: {entry}"
+    print("  engines match reference: PASS")
+
+
+def test_missing_issue_days():
+    """Gaps in merged_df are skipped (NB/LR/persistence) or fall back (climatology) identically."""
+    merged_df = generate_merged_dataset(900, seed=4)
+    eval_df = split_eval(merged_df)
+    gappy = merged_df.drop(index=merged_df.index[[600, 601, 700]]).reset_index(drop=True)
+    for model in ["Persistence", "Climatology", "Naive_Bayes"]:
+        ref = reference.MODELS[model](eval_df, gappy)
+        opt = OPTIMIZED[model](eval_df, gappy)
+        for key in ref:
+            assert compare_forecasts(ref[key], opt[key], 1e-9)["ok"], f"{model} {key}"
+    print("  missing issue days: PASS")
+
+
+def test_compare_forecasts_detects_drift():
+    """A perturbed probability or dropped day is reported."""
+    merged_df = generate_merged_dataset(900, seed=5)
+    ref = OPTIMIZED["Climatology"](split_eval(merged_df), merged_df)["M_24h"]
+    drift = ref.copy()
+    drift.loc[10, "y_prob"] += 1e-6
+    result = compare_forecasts(ref, drift, 1e-9)
+    assert not result["ok"] and result["over_tol"] == 1
+    assert np.isclose(result["max_abs_diff"], 1e-6)
+    assert compare_forecasts(ref, ref.drop(index=5), 1e-9)["only_ref"] == 1
+    print("  drift detection: PASS")
+
+
+if __name__ == "__main__":
+    print("Running golden harness tests...")
+    test_engines_match_reference()
+    test_missing_issue_days()
+    test_compare_forecasts_detects_drift()
+    print("\nAll tests passed!")
@@ -0,0 +1,78 @@
+"""
+Tests for the synthetic solar-history generator.
+"""
+
+import os
+import sys
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import generate_merged_dataset, split_eval, write_raw_files, M_RATE, X_RATE
+import parse_data
+
+
+def test_shape_and_imbalance():
+    """Columns match merged_dataset.csv and class rates match the paper."""
+    df = generate_merged_dataset(5000, seed=1)
+    real_cols = pd.read_csv(os.path.join(parse_data.PROC, "merged_dataset.csv"), nrows=1).columns
+    real_cols = [c for c in real_cols if not c.startswith(parse_data.SOURCE_PREFIXES)]   # optional label sources
+    assert list(df.columns) == list(real_cols)
+    assert abs(df["m_label"].mean() - M_RATE) < 0.002
+    assert abs(df["x_label"].mean() - X_RATE) < 0.002
+    assert df["date"].is_monotonic_increasing
+    assert len(split_eval(df)) < len(df)
+    print("  shape/imbalance: PASS")
+
+
+def test_deterministic():
+    """Same seed gives an identical frame."""
+    a = generate_merged_dataset(2000, seed=7)
+    b = generate_merged_dataset(2000, seed=7)
+    pd.testing.assert_frame_equal(a, b)
+    print("  deterministic: PASS")
+
+
+def test_consecutive_free_days():
+    """Vectorized x1 matches the running-counter definition."""
+    labels = np.array([0, 0, 1, 0, 0, 0, 1, 1, 0])
+    expected = []
+    count = 0
+    for y in labels:
+        expected.append(count)
+        count = 0 if y == 1 else count + 1
+    assert list(parse_data.consecutive_free_days(labels)) == expected
+    print("  consecutive_free_days: PASS")
+
+
+def test_raw_roundtrip():
+    """Synthetic raw files parse back into the same forecasts and flare days."""
+    df = generate_merged_dataset(800, seed=2)
+    raw_dir = tempfile.mkdtemp()
+    try:
+        years = write_raw_files(df, raw_dir)
+        forecasts = parse_data.build_forecast_dataset(parse_data.parse_rsga_files(raw_dir, years))
+        both = forecasts.merge(df, on="date", suffixes=("", "_syn"))
+        for col in ["m_24h", "x_48h", "m_72h"]:
+            issued = both[both[col].notna()]
+            assert len(issued) > len(df) - 5
+            assert (issued[col] == issued[f"{col}_syn"]).all()
+        m_days, x_days, peak_flux = parse_data.parse_noaa_events(years[0], years[-1], raw_dir=raw_dir)
+        assert len(m_days) == df["m_label"].sum()
+        assert len(x_days) == df["x_label"].sum()
+        expected = np.where(df["x_label"], 1.2e-4, np.where(df["m_label"], 2.3e-5, 0.0))
+        assert np.allclose(peak_flux.reindex(pd.to_datetime(df["date"])).fillna(0.0), expected)
+    finally:
+        shutil.rmtree(raw_dir)
+    print("  raw roundtrip: PASS")
+
+
+if __name__ == "__main__":
+    print("Running synthetic generator tests...")
+    test_shape_and_imbalance()
+    test_deterministic()
+    test_consecutive_free_days()
+    test_raw_roundtrip()
+    print("\nAll tests passed!")
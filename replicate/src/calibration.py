@@ -0,0 +1,103 @@
+"""
+Reliability diagrams and Murphy (1973) Brier score decomposition.
+
+For forecasts binned by probability (K bins, n_k forecasts in bin k with mean
+forecast f_k and observed frequency o_k, N forecasts, base rate o):
+
+  Reliability  REL = (1/N) sum_k n_k (f_k - o_k)^2      (lower is better)
+  Resolution   RES = (1/N) sum_k n_k (o_k - o)^2        (higher is better)
+  Uncertainty  UNC = o (1 - o)
+
+  Brier = REL - RES + UNC + residual
+
+The residual is zero when every forecast in a bin has the same value (SWPC
+issues whole percentages, so it is zero for SWPC and persistence) and small
+otherwise; it is reported so the identity can be checked.
+
+All model x class x lead series are binned together: each forecast gets a
+flat index group * K + bin, and np.bincount produces every count and sum in a
+single pass over the concatenated probability data.
+"""
+
+import numpy as np
+
+# Bin edges 0, 0.05, ..., 1.0 computed as i/20 so that forecasts issued as
+# whole percentages (0.15 = 15/100) fall in the bin they start, not the one below
+RELIABILITY_EDGES = np.arange(21) / 20
+
+
+def bin_index(y_prob, edges=RELIABILITY_EDGES):
+    """Bin of each forecast: [e_i, e_i+1), with the last bin closed at 1.0."""
+    idx = np.digitize(y_prob, edges[1:-1], right=False)
+    return np.clip(idx, 0, len(edges) - 2)
+
+
+def reliability_stats(forecasts, edges=RELIABILITY_EDGES):
+    """
+    Reliability bins and Brier decomposition for many forecast series at once.
+
+    Parameters:
+    -----------
+    forecasts : dict
+        {model: {"M_24h": DataFrame(date, y_true, y_prob), ...}}
+    edges : array
+        Probability bin edges
+
+    Returns:
+    --------
+    dict : {model: {key: {...}}} with per-bin "count", "mean_forecast",
+    "observed_freq" (None for empty bins) and the scalars "n", "base_rate",
+    "brier", "reliability", "resolution", "uncertainty", "residual"
+    """
+    groups = [(model, key) for model, by_key in forecasts.items() for key in by_key]
+    if not groups:
+        return {}
+    frames = [forecasts[model][key] for model, key in groups]
+    y_true = np.concatenate([f["y_true"].to_numpy(dtype=float) for f in frames])
+    y_prob = np.concatenate([f["y_prob"].to_numpy(dtype=float) for f in frames])
+    group = np.repeat(np.arange(len(groups)), [len(f) for f in frames])
+
+    n_bins = len(edges) - 1
+    flat = group * n_bins + bin_index(y_prob, edges)
+    size = len(groups) * n_bins
+
+    count = np.bincount(flat, minlength=size).reshape(-1, n_bins)
+    sum_y = np.bincount(flat, weights=y_true, minlength=size).reshape(-1, n_bins)
+    sum_p = np.bincount(flat, weights=y_prob, minlength=size).reshape(-1, n_bins)
+    sum_sq = np.bincount(flat, weights=(y_prob - y_true) ** 2, minlength=size).reshape(-1, n_bins)
+
+    n = count.sum(axis=1)
+    safe_n = np.maximum(n, 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        obs = sum_y / count
+        mean_p = sum_p / count
+    base_rate = sum_y.sum(axis=1) / safe_n
+    brier = sum_sq.sum(axis=1) / safe_n
+    filled = count > 0
+    rel = np.where(filled, count * (mean_p - obs) ** 2, 0).sum(axis=1) / safe_n
+    res = np.where(filled, count * (obs - base_rate[:, None]) ** 2, 0).sum(axis=1) / safe_n
+    unc = base_rate * (1 - base_rate)
+
+    out = {}
+    for g, (model, key) in enumerate(groups):
+        out.setdefault(model, {})[key] = {
+            "count": count[g].tolist(),
+            "mean_forecast": [round(float(v), 4) if c else None for v, c in zip(mean_p[g], count[g])],
+            "observed_freq": [round(float(v), 4) if c else None for v, c in zip(obs[g], count[g])],
+            "n": int(n[g]),
+            "base_rate": round(float(base_rate[g]), 6),
+            "brier": round(float(brier[g]), 6),
+            "reliability": round(float(rel[g]), 6),
+            "resolution": round(float(res[g]), 6),
+            "uncertainty": round(float(unc[g]), 6),
+            "residual": round(float(brier[g] - (rel[g] - res[g] + unc[g])), 6),
+        }
+    return out
+
+
+def calibration_summary(forecasts, edges=RELIABILITY_EDGES):
+    """Calibration section for results.json: bin edges plus reliability_stats()."""
+    return {
+        "bin_edges": [round(float(e), 4) for e in edges],
+        "models": reliability_stats(forecasts, edges),
+    }
@@ -0,0 +1,240 @@
+"""
+Paper-vs-ours comparison over every target in understand/targets.json.
+
+targets.json and results.json are flattened once into aligned arrays, one
+entry per target value: path ("tables/table_2/data/SWPC/TSS"), paper value,
+our value. Every target then gets its MATCH / CLOSE / DISCREPANT status in
+one vectorized pass, under one of three tolerance schemes:
+
+  relative   |ours - paper| / |paper| <= 1% MATCH, <= 10% CLOSE (the original
+             auto_compare rule; a paper value of 0 matches only 0)
+  absolute   |ours - paper| <= 0.005 MATCH, <= 0.05 CLOSE
+  rounding   MATCH if ours lies within ±0.5 of the paper's last printed digit
+             (0.58 covers [0.575, 0.585], a count of 56 covers [55.5, 56.5];
+             floats count as printed with at least 2 decimals);
+             CLOSE as in relative
+
+(thresholds are parameters: classify(..., match=, close=)).
+
+Targets written as text are parsed: ">0.5" and "<x" are inequalities (MATCH
+if satisfied, CLOSE if within the close tolerance of the bound), "~0.60" is
+compared like "0.60", and non-numeric strings (dates, bin labels such as
+">20") must be equal. Captions, notes and descriptions are not targets.
+A target with no counterpart in results.json is "not produced" and left out
+of the rates.
+
+Our values may be a matrix (configurations x targets), so a whole parameter
+sweep is classified against all targets at once (summarize() counts per row).
+"""
+
+import re
+import numpy as np
+
+STATUSES = ["MATCH", "CLOSE", "DISCREPANT"]
+MISSING = -1
+
+TOLERANCES = {
+    "relative": {"match": 1.0, "close": 10.0},      # percent of the paper value
+    "absolute": {"match": 0.005, "close": 0.05},    # absolute difference
+    "rounding": {"match": 0.5, "close": 10.0},      # units of the last decimal; close in percent
+}
+
+# Leaf keys that describe a target rather than state one
+TEXT_KEYS = {"caption", "notes", "note", "description", "missed_rate_description"}
+
+# Target path prefix -> results path prefix, where results.json names a section differently
+ALIASES = {
+    "special_analyses/storm_after_the_calm": "special_analyses/storm_after_calm",
+    "special_analyses/all_clear/total_non_flaring_days": "special_analyses/all_clear/total_non_flaring",
+    "figure_key_values/figure_5_storm_after_calm_confusion": "special_analyses/storm_after_calm",
+    "figure_key_values/figure_6_all_clear_confusion": "special_analyses/all_clear",
+}
+
+_NUMBER = re.compile(r"^\s*([<>~]?)\s*(-?\d+(?:\.(\d+))?)\s*$")
+
+
+def flatten(obj, prefix=""):
+    """{path: leaf} for a nested dict/list structure; list items are indexed by position."""
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, list):
+        items = enumerate(obj)
+    else:
+        return {prefix: obj}
+    out = {}
+    for key, value in items:
+        out.update(flatten(value, f"{prefix}/{key}" if prefix else str(key)))
+    return out
+
+
+def parse_value(value):
+    """
+    (op, number, decimals) of a target or result leaf: op is "=", ">", "<"
+    or "~" for numbers and "text" for anything else (number NaN).
+    """
+    if isinstance(value, bool) or value is None:
+        return "text", np.nan, 0
+    if isinstance(value, (int, np.integer)):
+        return "=", float(value), 0
+    if isinstance(value, (float, np.floating)):
+        # JSON drops trailing zeros: 0.1 was printed 0.10 (the paper's floats have >= 2 decimals)
+        text = repr(float(value))
+        return "=", float(value), max(2, len(text.split(".")[1]) if "." in text and "e" not in text else 0)
+    m = _NUMBER.match(str(value))
+    if not m:
+        return "text", np.nan, 0
+    return m.group(1) or "=", float(m.group(2)), len(m.group(3) or "")
+
+
+def _resolve(path):
+    for prefix, target in ALIASES.items():
+        if path == prefix or path.startswith(prefix + "/"):
+            return target + path[len(prefix):]
+    return path
+
+
+class TargetSet:
+    """
+    Every comparable target of a targets.json, as aligned arrays.
+
+    paths    : target paths, shape (T,)
+    sources  : matching results.json paths (after ALIASES)
+    op       : "=", ">", "<", "~" or "text"
+    paper    : numeric paper values (NaN for text targets)
+    decimals : printed decimals of each paper value
+    text     : paper values as strings
+    """
+
+    def __init__(self, targets):
+        flat = {path: value for path, value in flatten(targets).items()
+                if path.rsplit("/", 1)[-1] not in TEXT_KEYS}
+        self.paths = np.array(list(flat), dtype=object)
+        self.sources = [_resolve(p) for p in self.paths]
+        parsed = [parse_value(v) for v in flat.values()]
+        self.op = np.array([p[0] for p in parsed])
+        self.paper = np.array([p[1] for p in parsed], dtype=float)
+        self.decimals = np.array([p[2] for p in parsed], dtype=int)
+        self.text = np.array([str(v) for v in flat.values()], dtype=object)
+        self.sections = np.array([p.split("/", 1)[0] for p in self.paths], dtype=object)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def align(self, results):
+        """
+        Our values for every target: (ours, ours_text), float array (NaN where
+        results.json has no numeric counterpart) and strings (None if absent).
+        """
+        flat = flatten(results)
+        leaves = [flat.get(source) for source in self.sources]
+        ours = np.array([parse_value(v)[1] if parse_value(v)[0] != "text" else np.nan for v in leaves])
+        ours_text = np.array([None if v is None else str(v) for v in leaves], dtype=object)
+        return ours, ours_text
+
+    def classify(self, ours, scheme="relative", match=None, close=None, ours_text=None):
+        """
+        Status code per target (0 MATCH, 1 CLOSE, 2 DISCREPANT, -1 not produced).
+
+        `ours` is (T,) or (configs, T); text targets are compared with
+        `ours_text` ((T,) or (configs, T)) and are MISSING when it is not given.
+        """
+        tol = dict(TOLERANCES[scheme])
+        tol.update({k: v for k, v in (("match", match), ("close", close)) if v is not None})
+        ours = np.asarray(ours, dtype=float)
+        paper = self.paper
+        diff = np.abs(ours - paper)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pct = np.where(paper != 0, diff / np.abs(paper) * 100, np.where(ours == 0, 0.0, 100.0))
+
+        if scheme == "absolute":
+            is_match, is_close = diff <= tol["match"], diff <= tol["close"]
+        elif scheme == "rounding":
+            half_unit = tol["match"] * 10.0 ** -self.decimals
+            is_match, is_close = diff <= half_unit * (1 + 1e-9), pct <= tol["close"]
+        else:
+            is_match, is_close = pct <= tol["match"], pct <= tol["close"]
+
+        # Inequality targets: satisfied is a match, near the bound is close
+        greater, less = self.op == ">", self.op == "<"
+        is_match = np.where(greater, ours > paper, np.where(less, ours < paper, is_match))
+
+        codes = np.where(is_match, 0, np.where(is_close, 1, 2))
+        codes = np.where(np.isnan(ours), MISSING, codes)
+
+        text = self.op == "text"
+        if ours_text is not None:
+            # Identical strings match whatever they parse as (bin labels such as ">20")
+            ours_text = np.asarray(ours_text, dtype=object)
+            present = np.not_equal(ours_text, None)
+            same = _same_text(ours_text, self.text).astype(bool)
+            text_codes = np.where(present, np.where(same, 0, 2), MISSING)
+            codes = np.where(text, text_codes, np.where(same, 0, codes))
+        else:
+            codes = np.where(text, MISSING, codes)
+        return codes
+
+    def compare(self, results, scheme="relative", match=None, close=None):
+        """
+        comparison.json for one results.json: tolerance, summary, per-section
+        counts, every compared value nested under its target path, and the
+        paths that were not produced.
+        """
+        ours, ours_text = self.align(results)
+        codes = self.classify(ours, scheme, match, close, ours_text)
+        tol = dict(TOLERANCES[scheme])
+        tol.update({k: v for k, v in (("match", match), ("close", close)) if v is not None})
+
+        comparison = {"tolerance": {"scheme": scheme, **tol}, "summary": summary_dict(codes), "sections": {}}
+        for section in dict.fromkeys(self.sections):
+            comparison["sections"][section] = summary_dict(codes[self.sections == section])
+
+        for i in np.flatnonzero(codes != MISSING):
+            if self.op[i] == "text":
+                entry = {"paper": self.text[i], "ours": ours_text[i]}
+            else:
+                d = ours[i] - self.paper[i]
+                pct = abs(d / self.paper[i] * 100) if self.paper[i] != 0 else (0 if ours[i] == 0 else 100)
+                entry = {"paper": _plain(self.text[i], self.op[i], self.paper[i]), "ours": _plain_number(ours[i]),
+                         "diff": round(d, 4), "pct": round(pct, 1)}
+            entry["status"] = STATUSES[codes[i]]
+            # Nested like the original comparison.json: tables/<table>/<model>/<metric>
+            _nest(comparison, re.sub(r"^tables/([^/]+)/data/", r"tables/\1/", self.paths[i]), entry)
+
+        comparison["not_produced"] = [str(p) for p in self.paths[codes == MISSING]]
+        return comparison
+
+
+def summarize(codes):
+    """Counts of MATCH / CLOSE / DISCREPANT / not produced along the last axis: (..., 4)."""
+    codes = np.asarray(codes)
+    return np.stack([(codes == c).sum(axis=-1) for c in (0, 1, 2, MISSING)], axis=-1)
+
+
+def summary_dict(codes):
+    """The comparison.json summary block for a vector of status codes."""
+    match, close, discrepant, missing = (int(v) for v in summarize(codes))
+    total = match + close + discrepant
+    out = {"total_values": total, "match": match, "close": close, "discrepant": discrepant,
+           "not_produced": missing}
+    if total > 0:
+        out["match_rate"] = round(match / total, 3)
+        out["match_or_close_rate"] = round((match + close) / total, 3)
+    return out
+
+
+_same_text = np.frompyfunc(lambda o, p: o is not None and o.strip().lower() == p.strip().lower(), 2, 1)
+
+
+def _plain_number(x):
+    return int(x) if float(x).is_integer() else float(x)
+
+
+def _plain(text, op, number):
+    return text if op in (">", "<", "~") else _plain_number(number)
+
+
+def _nest(tree, path, entry):
+    keys = path.split("/")
+    for key in keys[:-1]:
+        tree = tree.setdefault(key, {})
+    tree[keys[-1]] = entry
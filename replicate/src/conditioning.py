@@ -0,0 +1,217 @@
+"""
+Event-conditioned evaluation: confusion counts on subsets of days defined by
+the recent flare history.
+
+Two families of conditions, both evaluated against the same flare class as
+the forecast:
+  quiet q         the target day follows more than q consecutive flare-free
+                  days (x_consec_free > q); "storm after the calm" is quiet 30
+  after_flare w   a flare occurred on one of the w days before the target day
+                  (D-1 ... D-w); "all-clear" is after_flare 3
+plus "all" (every forecast day).
+
+condition_cube() evaluates every model x class/lead x condition x threshold
+in one call. Each forecast series is reduced to a histogram over
+(history bin, threshold index, label), and cumulative sums along the history
+and threshold axes give every count, so the cost is O(days + Q x T) per series
+rather than one filter per condition and threshold.
+
+Usage: bash tools/run.sh replicate/src/conditioning.py [--max-quiet 60]
+           [--max-window 10] [--out cube.npz]
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from features import as_days, lookup_dates
+from metrics import metrics_from_counts
+
+# Exact i/100 thresholds, so e.g. 0.05 equals the SWPC forecast 5/100
+THRESHOLDS = np.arange(1, 101) / 100
+COUNT_NAMES = ["TP", "FP", "TN", "FN"]
+
+
+def flare_history(merged_df, flare_class, days):
+    """
+    Recent-history features for each of `days` (datetime64[D]).
+
+    Returns:
+    --------
+    (consec_free, days_since): consecutive flare-free days before the day
+    (taken from merged_df, -1 where the day is missing) and the number of
+    days since the most recent earlier flare (a large value if none)
+    """
+    merged_days = as_days(merged_df["date"])
+    order = np.argsort(merged_days, kind="stable")
+    merged_days = merged_days[order]
+    labels = merged_df[f"{flare_class}_label"].to_numpy()[order]
+    consec = merged_df[f"{flare_class}_consec_free"].to_numpy()[order]
+
+    pos, found = lookup_dates(merged_days, days)
+    consec_free = np.where(found, consec[pos], -1)
+
+    flare_days = merged_days[labels == 1].astype(np.int64)
+    day_num = days.astype(np.int64)
+    last = np.searchsorted(flare_days, day_num, side="left") - 1
+    days_since = np.where(last >= 0, day_num - flare_days[np.maximum(last, 0)], np.iinfo(np.int64).max)
+    return consec_free, days_since
+
+
+def condition_labels(quiet, windows):
+    """Names of the condition axis: all, quiet_<q>..., after_flare_<w>..."""
+    return ["all"] + [f"quiet_{q}" for q in quiet] + [f"after_flare_{w}" for w in windows]
+
+
+def _series_counts(y_true, y_prob, consec_free, days_since, quiet, windows, thresholds):
+    """Counts (C, T, 4) for one forecast series; see module docstring."""
+    n_thr = len(thresholds)
+    # k = number of thresholds <= p, so the day is predicted positive for threshold index t < k
+    k = np.searchsorted(thresholds, y_prob, side="right")
+    y = y_true.astype(int)
+
+    def cumulative(bin_idx, n_bins, reverse_bins):
+        """hist[bin, k, y] -> counts[bin, t, y] of days with bin' >=/<= bin and k > t."""
+        flat = (bin_idx * (n_thr + 1) + k) * 2 + y
+        hist = np.bincount(flat, minlength=n_bins * (n_thr + 1) * 2).reshape(n_bins, n_thr + 1, 2)
+        hist = hist[::-1].cumsum(axis=0)[::-1] if reverse_bins else hist.cumsum(axis=0)
+        pos = hist[:, ::-1].cumsum(axis=1)[:, ::-1][:, 1:]     # k > t  (predicted 1)
+        total = hist.sum(axis=1, keepdims=True)
+        return pos, total - pos                                 # predicted 1 / predicted 0
+
+    def to_counts(pred1, pred0):
+        return np.stack([pred1[..., 1], pred1[..., 0], pred0[..., 0], pred0[..., 1]], axis=-1)
+
+    out = []
+    # all days
+    pred1, pred0 = cumulative(np.zeros(len(y), dtype=int), 1, False)
+    out.append(to_counts(pred1, pred0))
+
+    if len(quiet):
+        # bin b = consec_free clipped to [-1, max_q + 1], plus 1; consec > q  <=>  b >= q + 2
+        max_q = int(max(quiet))
+        bins = np.clip(consec_free, -1, max_q + 1) + 1     # -1 (missing day) -> 0
+        pred1, pred0 = cumulative(bins, max_q + 3, True)
+        idx = np.asarray(quiet, dtype=int) + 2
+        out.append(to_counts(pred1[idx], pred0[idx]))
+
+    if len(windows):
+        # bin b = days_since clipped to [0, max_w + 1]; condition days_since <= w
+        max_w = int(max(windows))
+        bins = np.clip(days_since, 0, max_w + 1)
+        pred1, pred0 = cumulative(bins, max_w + 2, False)
+        idx = np.asarray(windows, dtype=int)
+        out.append(to_counts(pred1[idx], pred0[idx]))
+
+    return np.concatenate(out, axis=0)
+
+
+def condition_cube(forecasts, merged_df, quiet=range(0, 61), windows=range(1, 11),
+                   thresholds=THRESHOLDS):
+    """
+    Confusion counts for every model, class/lead, condition and threshold.
+
+    Parameters:
+    -----------
+    forecasts : dict
+        {model: {"M_24h": DataFrame(date, y_true, y_prob), ...}} (run_all.compute_forecasts)
+    merged_df : DataFrame
+        Full merged dataset (flare history incl. the training buffer)
+    quiet : iterable of int
+        Quiet-run lengths q (condition: more than q flare-free days)
+    windows : iterable of int
+        After-flare windows w (condition: flare within the previous w days)
+    thresholds : array
+        Sorted decision thresholds (forecast is positive if p >= theta)
+
+    Returns:
+    --------
+    dict with "models", "keys", "conditions", "thresholds" and
+    "counts": int64 array (models, keys, conditions, thresholds, 4) of TP, FP, TN, FN.
+    Keys a model does not have are left at zero.
+    """
+    quiet = np.asarray(list(quiet), dtype=int)
+    windows = np.asarray(list(windows), dtype=int)
+    thresholds = np.asarray(thresholds, dtype=float)
+    models = list(forecasts)
+    keys = sorted({key for by_key in forecasts.values() for key in by_key})
+    conditions = condition_labels(quiet, windows)
+
+    counts = np.zeros((len(models), len(keys), len(conditions), len(thresholds), 4), dtype=np.int64)
+    for i, model in enumerate(models):
+        for key, frame in forecasts[model].items():
+            consec_free, days_since = flare_history(merged_df, key[0].lower(), as_days(frame["date"]))
+            counts[i, keys.index(key)] = _series_counts(
+                frame["y_true"].to_numpy(), frame["y_prob"].to_numpy(dtype=float),
+                consec_free, days_since, quiet, windows, thresholds)
+
+    return {
+        "models": models,
+        "keys": keys,
+        "conditions": conditions,
+        "thresholds": thresholds,
+        "counts": counts,
+    }
+
+
+def cube_counts(cube, model, key, condition, theta):
+    """TP, FP, TN, FN (ints) for one cell of a condition cube."""
+    t = int(np.flatnonzero(np.isclose(cube["thresholds"], theta))[0])
+    c = cube["counts"][cube["models"].index(model), cube["keys"].index(key),
+                       cube["conditions"].index(condition), t]
+    return dict(zip(COUNT_NAMES, (int(v) for v in c)))
+
+
+def cube_metrics(cube):
+    """Threshold metrics for every cell of the cube (arrays shaped like counts[..., 0])."""
+    c = cube["counts"]
+    return metrics_from_counts(c[..., 0], c[..., 1], c[..., 2], c[..., 3])
+
+
+def save_cube(cube, path):
+    """Write a cube to a compressed .npz file."""
+    np.savez_compressed(path, counts=cube["counts"], thresholds=cube["thresholds"],
+                        models=np.array(cube["models"]), keys=np.array(cube["keys"]),
+                        conditions=np.array(cube["conditions"]))
+
+
+def load_cube(path):
+    """Read a cube written by save_cube()."""
+    with np.load(path, allow_pickle=False) as f:
+        return {
+            "models": [str(m) for m in f["models"]],
+            "keys": [str(k) for k in f["keys"]],
+            "conditions": [str(c) for c in f["conditions"]],
+            "thresholds": f["thresholds"],
+            "counts": f["counts"],
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    from run_all import load_data, compute_forecasts
+
+    parser = argparse.ArgumentParser(description="Build the event-conditioned confusion-count cube")
+    parser.add_argument("--max-quiet", type=int, default=60)
+    parser.add_argument("--max-window", type=int, default=10)
+    parser.add_argument("--out", default=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cache", "conditioning_cube.npz"))
+    args = parser.parse_args()
+
+    eval_df, merged_df, _ = load_data()
+    forecasts = compute_forecasts(eval_df, merged_df)
+    cube = condition_cube(forecasts, merged_df, quiet=range(0, args.max_quiet + 1),
+                          windows=range(1, args.max_window + 1))
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    save_cube(cube, args.out)
+    print(f"Cube {cube['counts'].shape} saved to {args.out}")
+
+    tss = cube_metrics(cube)["TSS"]
+    print("\nBest TSS over thresholds, X_24h:")
+    k = cube["keys"].index("X_24h")
+    for condition in ["all", "quiet_30", "after_flare_3"]:
+        c = cube["conditions"].index(condition)
+        row = "  ".join(f"{m}={tss[i, k, c].max():.2f}@{cube['thresholds'][tss[i, k, c].argmax()]:.2f}"
+                        for i, m in enumerate(cube["models"]))
+        print(f"  {condition:<14} {row}")
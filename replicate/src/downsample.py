@@ -0,0 +1,64 @@
+"""
+Shape-preserving downsampling of long series before plotting.
+
+A line drawn across W pixel columns can show at most one vertical extent per
+column, so reducing each of W equal-width x buckets to its minimum and
+maximum point (in their original order) draws the same picture as the full
+series. That keeps at most 2W + 2 points, however many records there are, so
+rendering time depends on figure width, not on history length.
+"""
+
+import numpy as np
+
+
+def _as_float(x):
+    """Numeric view of an x array (datetimes become int64 ticks)."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def minmax_downsample(x, y, n_buckets):
+    """
+    Keep the minimum and maximum point of each x bucket, plus the series'
+    first and last points (at most 2 * n_buckets + 2 points).
+
+    Parameters:
+    -----------
+    x : array
+        Sorted x values (numeric or datetime64)
+    y : array
+        Values; NaNs are dropped
+    n_buckets : int
+        Number of equal-width x buckets, normally the axes width in pixels
+
+    Returns:
+    --------
+    (x, y) subsets, in the original order
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    keep = ~np.isnan(y)
+    x, y = x[keep], y[keep]
+    n = len(y)
+    if n <= 2 * n_buckets + 2:
+        return x, y
+
+    xf = _as_float(x)
+    edges = np.linspace(xf[0], xf[-1], n_buckets + 1)
+    bucket = np.clip(np.searchsorted(edges, xf, side="right") - 1, 0, n_buckets - 1)
+
+    # Within each bucket, sort by y: the first element is the min, the last the max
+    order = np.lexsort((y, bucket))
+    sorted_bucket = bucket[order]
+    first = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+
+    idx = np.unique(np.concatenate([[0, n - 1], order[first], order[last]]))
+    return x[idx], y[idx]
+
+
+def pixel_width(fig):
+    """Figure width in device pixels; an upper bound for any axes' width."""
+    return max(1, int(np.ceil(fig.get_figwidth() * fig.dpi)))
@@ -0,0 +1,107 @@
+"""
+Event-window evaluation: forecasts scored against "any flare within the
+next K days" instead of "flare on the target day".
+
+The published tables verify the forecast for target day D against the label
+of D alone. Operators read a 24h forecast as "a flare in the coming days";
+the windowed target for window (length K, offset o) is 1 if any day in
+[D + o, D + o + K - 1] has a flare. K = 1, o = 0 is the usual label.
+Windows reaching past the stored data (or over a missing day) are left out.
+
+Labels for every window come from features.window_labels (prefix sums over
+the calendar). Each forecast series is then reduced to one histogram per
+window with a single bincount over (window, forecast value, label)
+(histogram.ForecastHistogram.from_label_matrix), so a sweep over many
+windows costs a few vector operations per window, and every metric comes
+from the histograms.
+
+Usage: bash tools/run.sh replicate/src/event_windows.py [--lengths 1-7]
+           [--offsets 0] [--theta 0.5] [--out results/event_windows.csv]
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from features import as_days, window_labels
+from histogram import ForecastHistogram
+from perf import PERF
+
+
+def window_grid(lengths, offsets=(0,)):
+    """(lengths, offsets) arrays of every combination, one entry per window."""
+    lengths, offsets = np.meshgrid(np.asarray(list(lengths), dtype=int),
+                                   np.asarray(list(offsets), dtype=int), indexing="ij")
+    return lengths.ravel(), offsets.ravel()
+
+
+def window_histograms(frame, merged_days, merged_labels, lengths, offsets):
+    """
+    One ForecastHistogram per window for a forecast series, against the
+    windowed labels of merged_labels (sorted by merged_days).
+    """
+    y, complete = window_labels(merged_days, merged_labels, as_days(frame["date"]), lengths, offsets)
+    return ForecastHistogram.from_label_matrix(y, complete, frame["y_prob"].to_numpy(dtype=float))
+
+
+def window_evaluation(forecasts, merged_df, lengths=range(1, 8), offsets=(0,), theta=0.5):
+    """
+    Metrics of every model and class/lead against every event window.
+
+    Parameters:
+    -----------
+    forecasts : dict
+        {model: {"M_24h": DataFrame(date, y_true, y_prob), ...}} (run_all.compute_forecasts)
+    merged_df : DataFrame
+        Full merged dataset (labels of the days inside the windows)
+    lengths, offsets : iterables of int
+        Window lengths K (days) and offsets o; every combination is evaluated
+    theta : float
+        Decision threshold
+
+    Returns:
+    --------
+    DataFrame with one row per model, key and window: Model, Key, Length,
+    Offset, N, Events and the 11 table metrics
+    """
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    merged_days = as_days(merged_df["date"])
+    lengths, offsets = window_grid(lengths, offsets)
+
+    rows = []
+    for model, by_key in forecasts.items():
+        for key, frame in by_key.items():
+            with PERF.span("windows.evaluate", model=model, key=key) as span:
+                labels = merged_df[f"{key[0].lower()}_label"].to_numpy()
+                hists = window_histograms(frame, merged_days, labels, lengths, offsets)
+                for hist, length, offset in zip(hists, lengths, offsets):
+                    rows.append({"Model": model, "Key": key, "Length": int(length), "Offset": int(offset),
+                                 "N": hist.n, "Events": hist.events, **hist.metrics(theta)})
+                span.count("windows", len(lengths))
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+    from run_all import load_data, compute_forecasts, RESULTS
+    from features import parse_horizons
+
+    parser = argparse.ArgumentParser(description="Evaluate every model against 'any flare within K days' targets")
+    parser.add_argument("--lengths", default="1-7", help="window lengths in days, e.g. 1-7 or 1,3,27")
+    parser.add_argument("--offsets", default="0", help="comma-separated window offsets in days")
+    parser.add_argument("--theta", type=float, default=0.5)
+    parser.add_argument("--out", default=os.path.join(RESULTS, "event_windows.csv"))
+    args = parser.parse_args()
+
+    eval_df, merged_df, _ = load_data()
+    forecasts = compute_forecasts(eval_df, merged_df)
+    table = window_evaluation(forecasts, merged_df, parse_horizons(args.lengths),
+                              [int(o) for o in args.offsets.split(",")], args.theta)
+    table.to_csv(args.out, index=False)
+    print(f"Saved {args.out} ({len(table)} rows)")
+
+    print(f"\nTSS at theta={args.theta} by window length (offset {table['Offset'].iloc[0]}):")
+    first = table[table["Offset"] == table["Offset"].iloc[0]]
+    print(first.pivot_table(index=["Model", "Key"], columns="Length", values="TSS").to_string())
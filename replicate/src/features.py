@@ -0,0 +1,201 @@
+"""
+Shared helpers for building per-day model inputs and outputs.
+
+Models forecast target day D from features observed on the issue day
+D - lead_days. These helpers do that date arithmetic on whole arrays instead
+of looking rows up one at a time.
+
+Lead times are configured once, in HORIZONS (days ahead); the paper's
+tables use 1, 2 and 3 days (24h, 48h, 72h). Models accept any other set,
+e.g. horizons=range(1, 28), and look up the issue days of every horizon in
+one pass. issue_day_matrix finds those issue days and lagged_features reads
+the values stored on them. feature_rows picks the feature rows of a
+forecast, from the issue day or the target day. shifted_labels does the
+same shift from the issue day's side, to build training targets.
+window_labels turns daily labels into "any flare within K days" targets.
+ladder_labels turns daily peak fluxes into labels for several flare classes.
+"""
+
+import numpy as np
+import pandas as pd
+
+HORIZONS = (1, 2, 3)
+
+# Which day the features of a forecast are read from (feature_rows)
+FEATURE_TIMINGS = ("issue", "target")
+
+
+def lead_name(lead_days):
+    """Key suffix of a lead time: 1 -> "24h", 27 -> "648h"."""
+    return f"{24 * int(lead_days)}h"
+
+
+def leads(horizons=None):
+    """[(lead_days, lead_name), ...] for the given horizons (default HORIZONS)."""
+    return [(int(h), lead_name(h)) for h in (HORIZONS if horizons is None else horizons)]
+
+
+def parse_horizons(text):
+    """Parse a horizon list such as "1,2,3", "1-27" or "1-7,14,27" (days)."""
+    horizons = []
+    for part in str(text).split(","):
+        lo, _, hi = part.strip().partition("-")
+        horizons.extend(range(int(lo), int(hi or lo) + 1))
+    if not horizons or min(horizons) < 1:
+        raise ValueError(f"horizons must be positive days, got {text!r}")
+    return sorted(set(horizons))
+
+
+LEADS = leads(HORIZONS)
+
+
+def as_days(dates):
+    """Convert a date column/array to numpy datetime64[D]."""
+    values = np.asarray(getattr(dates, "values", dates))
+    if values.dtype.kind != "M":
+        values = np.asarray(pd.to_datetime(dates).values)
+    return values.astype("datetime64[D]")
+
+
+def lookup_dates(sorted_days, query_days):
+    """
+    Locate query dates in a sorted date array.
+
+    Returns:
+    --------
+    (pos, found): pos[i] is the index of query_days[i] in sorted_days (clipped
+    to a valid index when absent) and found[i] says whether it is present.
+    """
+    pos = np.searchsorted(sorted_days, query_days)
+    pos = np.minimum(pos, len(sorted_days) - 1)
+    found = sorted_days[pos] == query_days if len(sorted_days) else np.zeros(len(query_days), bool)
+    return pos, found
+
+
+def issue_day_rows(sorted_days, target_days, lead_days):
+    """Row positions of the issue day (target - lead) for each target day."""
+    return lookup_dates(sorted_days, target_days - np.timedelta64(lead_days, "D"))
+
+
+def issue_day_matrix(sorted_days, target_days, horizons=None):
+    """
+    Issue-day rows for every horizon at once.
+
+    Returns:
+    --------
+    (pos, found): arrays of shape (len(horizons), len(target_days)); row h
+    is issue_day_rows(sorted_days, target_days, horizons[h])
+    """
+    lags = np.array([h for h, _ in leads(horizons)], dtype="timedelta64[D]")
+    issue = np.asarray(target_days, dtype="datetime64[D]")[None, :] - lags[:, None]
+    pos, found = lookup_dates(sorted_days, issue.ravel())
+    return pos.reshape(issue.shape), found.reshape(issue.shape)
+
+
+def feature_rows(sorted_days, target_days, horizons=None, timing="issue"):
+    """
+    Rows the features of each target day are read from, shaped like
+    issue_day_matrix. timing="issue" is the issue day of every horizon;
+    timing="target" is the target day itself for every horizon (features
+    not yet known when the forecast is issued, the other reading of the
+    paper's setup).
+    """
+    if timing == "issue":
+        return issue_day_matrix(sorted_days, target_days, horizons)
+    if timing != "target":
+        raise ValueError(f"timing must be one of {FEATURE_TIMINGS}: {timing!r}")
+    pos, found = lookup_dates(sorted_days, np.asarray(target_days, dtype="datetime64[D]"))
+    shape = (len(leads(horizons)), len(pos))
+    return np.broadcast_to(pos, shape), np.broadcast_to(found, shape)
+
+
+def lagged_features(values, pos, found, fill=np.nan):
+    """
+    Gather per-row values (array of length len(sorted_days), or with
+    trailing feature axes) at issue-day positions from issue_day_matrix;
+    `fill` where the issue day is missing.
+    """
+    values = np.asarray(values)
+    out = values[pos]
+    if not found.all():
+        if np.issubdtype(out.dtype, np.integer) and not float(fill).is_integer():
+            out = out.astype(float)             # integer values with a NaN fill
+        out[~found] = fill
+    return out
+
+
+def shifted_labels(sorted_days, labels, horizons=None):
+    """
+    Targets for forecasts issued on each row: labels[h, i] is the label of
+    day sorted_days[i] + horizons[h] (NaN where that day is missing), so
+    row i with its own features and labels[h, i] is one training pair for
+    lead time horizons[h].
+    """
+    lags = np.array([h for h, _ in leads(horizons)], dtype="timedelta64[D]")
+    target = np.asarray(sorted_days, dtype="datetime64[D]")[None, :] + lags[:, None]
+    pos, found = lookup_dates(sorted_days, target.ravel())
+    return lagged_features(np.asarray(labels, dtype=float), pos, found).reshape(target.shape)
+
+
+def window_labels(sorted_days, labels, target_days, lengths, offsets=0):
+    """
+    "Any flare in the window" targets: y[w, i] = 1 if a day in
+    [target_days[i] + offsets[w], target_days[i] + offsets[w] + lengths[w] - 1]
+    has label 1. lengths and offsets broadcast (one row per window).
+
+    Uses cumulative sums of the labels over the calendar, so every window of
+    every target day is two gathers and a difference, whatever its length.
+
+    Returns:
+    --------
+    (y, complete): arrays (n_windows, len(target_days)); complete[w, i] is
+    False where a day of the window is missing from sorted_days
+    """
+    lengths, offsets = np.broadcast_arrays(np.atleast_1d(lengths), np.atleast_1d(offsets))
+    sorted_days = np.asarray(sorted_days, dtype="datetime64[D]")
+    target = np.asarray(target_days, dtype="datetime64[D]")
+    if len(sorted_days) == 0:
+        return np.zeros((len(lengths), len(target)), dtype=int), np.zeros((len(lengths), len(target)), bool)
+
+    # Prefix counts of stored days and flare days over the calendar
+    base = sorted_days[0]
+    slot = (sorted_days - base).astype(np.int64)
+    n_cal = int(slot[-1]) + 1
+    present = np.zeros(n_cal + 1, dtype=np.int64)
+    flares = np.zeros(n_cal + 1, dtype=np.int64)
+    present[slot + 1] = 1
+    flares[slot + 1] = np.asarray(labels) == 1
+    present, flares = present.cumsum(), flares.cumsum()
+
+    start = (target - base).astype(np.int64)[None, :] + offsets[:, None]
+    end = np.clip(start + lengths[:, None], 0, n_cal)
+    start = np.clip(start, 0, n_cal)
+    y = (flares[end] - flares[start] > 0).astype(int)
+    complete = present[end] - present[start] == lengths[:, None]
+    return y, complete
+
+
+def ladder_labels(peak_flux, thresholds):
+    """
+    Labels of a flare-class ladder from daily peak fluxes: y[t, i] = 1 if
+    peak_flux[i] >= thresholds[t], one row per threshold.
+
+    Returns:
+    --------
+    (y, known): arrays (len(thresholds), len(peak_flux)); known is False
+    where the peak flux is missing (NaN)
+    """
+    flux = np.asarray(peak_flux, dtype=float)
+    thresholds = np.asarray(thresholds, dtype=float)
+    known = np.broadcast_to(~np.isnan(flux), (len(thresholds), len(flux))).copy()
+    y = (np.where(known, flux, -np.inf) >= thresholds[:, None]).astype(int)
+    return y, known
+
+
+def forecast_frame(days, y_true, y_prob):
+    """Per-day forecast table used by every model: date, y_true, y_prob."""
+    return pd.DataFrame({
+        "date": pd.to_datetime(days),
+        "y_true": np.asarray(y_true, dtype=int),
+        "y_prob": np.asarray(y_prob, dtype=float),
+    })
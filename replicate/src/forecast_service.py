@@ -0,0 +1,437 @@
+"""
+Local forecast service for the baseline models.
+
+Loads the processed dataset and the monthly fitted parameters (climatology
+tables, naive Bayes and logistic regression coefficients, via the fit cache in
+data/cache/) into memory once. The forecasts for every target day up to
+the longest horizon (3 days by default, --horizons) past the last stored
+day are precomputed at load time, so a
+date query is an array gather and a state query a few numpy operations;
+nothing is refitted or read from disk per request.
+
+Two kinds of query:
+  dates    target days D (stored days, or up to the longest horizon past
+           the last one): each lead's forecast uses the issue day D - lead and the
+           model of D's month, exactly as in the backtests, so the service
+           reproduces run_all's per-day forecasts
+  states   explicit current conditions (m/x_consec_free, sunspot_number,
+           m/x_label): scored with the latest models, i.e. the ones for the
+           month after the last stored day; counts and sunspot numbers must
+           be finite and non-negative and labels 0 or 1 (else 400)
+
+Models: Persistence, Climatology, Naive_Bayes, Logistic_Reg and Baseline_Avg
+(mean of Climatology, Persistence, NB and, for M-class only, LR, as in
+model_baseline_avg.py). Forecasts that the backtests would skip (missing issue
+day, no training data) are returned as null.
+
+Hot reload: a watcher thread polls the modification times of
+merged_dataset.csv, the append state and the fit-cache files; when an append
+(parse_data.py append) or a retrain changes them, new tables are built in the
+background and swapped in atomically. POST /reload forces a rebuild. The
+climatology and naive Bayes models of the last stored day's month and later
+start from the append state's running statistics when it matches the store,
+so a reload after an append does not hash the whole store again for them.
+
+HTTP API (TCP on localhost, or a Unix socket with --unix):
+  GET  /health                              last day, load time, reload count
+  GET  /forecast?date=2024-06-01&date=...   forecasts for target days
+  POST /forecast  {"dates": [...]}          same, batched
+  POST /forecast  {"states": [{...}, ...]}  forecasts for explicit states
+  POST /reload
+
+Usage: bash tools/run.sh replicate/src/forecast_service.py [--port 8765]
+           [--host 127.0.0.1] [--unix /tmp/forecast.sock] [--reload-interval 5]
+           [--horizons 1-3]
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from features import leads, parse_horizons, as_days, lookup_dates
+from model_cache import FitCache, CACHE_DIR
+import model_climatology
+import model_naive_bayes
+import model_logistic_regression
+from parse_data import APPEND_STATE
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROC = os.path.join(BASE, "data", "processed")
+MODELS = ["Persistence", "Climatology", "Naive_Bayes", "Logistic_Reg", "Baseline_Avg"]
+STATE_FIELDS = ["m_consec_free", "x_consec_free", "sunspot_number", "m_label", "x_label"]
+
+
+class ForecastTables:
+    """
+    In-memory snapshot of everything a forecast needs.
+
+    Per flare class: the stored days' features and labels, and per month
+    (from the first stored month to the month of the last day + the longest
+    horizon) the climatology probability table, NB parameters and LR
+    coefficients; plus the forecasts of every model for every target day up
+    to the last day + the longest horizon.
+
+    append_state, the parse_data append state of the same store, gives the
+    climatology counts and NB moments of the last day's month and later.
+    """
+
+    def __init__(self, merged_df, cache_dir=CACHE_DIR, use_cache=True, horizons=None, append_state=None):
+        merged_df = merged_df.sort_values("date").reset_index(drop=True)
+        self.leads = leads(horizons)
+        self.max_lead = max(h for h, _ in self.leads)
+        self.days = as_days(merged_df["date"])
+        self.last_day = self.days[-1]
+        first = self.days[0].astype("datetime64[M]")
+        last = (self.last_day + self.max_lead).astype("datetime64[M]")
+        self.months = np.arange(first, last + 1)
+        self.sunspot = merged_df["sunspot_number"].to_numpy(dtype=float)
+        self.classes = {}
+
+        caches = {
+            "climatology": FitCache("climatology", model_climatology.CACHE_VERSION, cache_dir, use_cache),
+            "naive_bayes": FitCache("naive_bayes", model_naive_bayes.CACHE_VERSION, cache_dir, use_cache),
+            "logistic_regression": FitCache("logistic_regression", model_logistic_regression.CACHE_VERSION,
+                                            cache_dir, use_cache),
+        }
+        for flare_class in ["m", "x"]:
+            consec = merged_df[f"{flare_class}_consec_free"].to_numpy(dtype=float)
+            running = append_state[flare_class] if append_state is not None else None
+            counts = model_climatology.monthly_counts(
+                merged_df, self.months, flare_class, caches["climatology"],
+                totals=running["climatology"] if running else None)
+            total = counts[:, 1]
+            self.classes[flare_class] = {
+                "label": merged_df[f"{flare_class}_label"].to_numpy(dtype=float),
+                "X": np.column_stack([consec, self.sunspot]),
+                "cells": model_climatology.climatology_cells(consec, self.sunspot),
+                "clim": np.divide(counts[:, 0], total, out=np.zeros_like(total), where=total > 0),
+                "clim_ok": total.sum(axis=1) > 0,
+                "nb": model_naive_bayes.monthly_params(
+                    merged_df, self.months, flare_class, caches["naive_bayes"],
+                    moments=(running["nb_moments"], running["nb_moments_all"]) if running else None),
+                "lr": model_logistic_regression.monthly_params(
+                    merged_df, self.months, flare_class, caches["logistic_regression"]),
+            }
+        for cache in caches.values():
+            cache.save()
+
+        # Every answerable target day is precomputed, so date queries are a gather
+        self.calendar_start = self.days[0]
+        forecasts = self.compute_dates(np.arange(self.days[0], self.last_day + self.max_lead + 1))
+        self.keys = list(forecasts[MODELS[0]])
+        self.dense = np.stack([np.stack([forecasts[model][key] for key in self.keys]) for model in MODELS])
+
+    def _month_index(self, days):
+        idx = np.searchsorted(self.months, days.astype("datetime64[M]"))
+        return np.clip(idx, 0, len(self.months) - 1)
+
+    @staticmethod
+    def _combine(out, flare_class, key):
+        """Baseline average: Climatology, Persistence, NB (+ LR for M-class)."""
+        parts = ["Climatology", "Persistence", "Naive_Bayes"]
+        if flare_class == "m":
+            parts.append("Logistic_Reg")
+        return np.mean([out[model][key] for model in parts], axis=0)   # NaN if any part is missing
+
+    def forecast_dates(self, dates):
+        """
+        Forecasts for target days (datetime64[D] array), from the precomputed
+        calendar; dates outside it get NaN.
+
+        Returns:
+        --------
+        dict : {model: {"M_24h": array, ...}}
+        """
+        offset = (np.asarray(dates, dtype="datetime64[D]") - self.calendar_start).astype(np.int64)
+        inside = (offset >= 0) & (offset < self.dense.shape[2])
+        values = np.where(inside, self.dense[:, :, np.clip(offset, 0, self.dense.shape[2] - 1)], np.nan)
+        return {model: dict(zip(self.keys, values[i])) for i, model in enumerate(MODELS)}
+
+    def compute_dates(self, dates):
+        """
+        Forecasts for target days, computed from the per-month parameters.
+
+        Returns:
+        --------
+        dict : {model: {"M_24h": array, ...}} with one entry per date (NaN where
+        the backtest would have no forecast)
+        """
+        days = as_days(dates)
+        month = self._month_index(days)
+        own_pos, own_found = lookup_dates(self.days, days)
+        out = {model: {} for model in MODELS}
+
+        for flare_class, t in self.classes.items():
+            nb, lr = t["nb"][month], t["lr"][month]
+            for lead_days, lead_name in self.leads:
+                key = f"{flare_class.upper()}_{lead_name}"
+                pos, found = lookup_dates(self.days, days - np.timedelta64(lead_days, "D"))
+
+                out["Persistence"][key] = np.where(found, t["label"][pos], np.nan)
+
+                # Climatology falls back to the target day's own features when the issue day is missing
+                cell = np.where(found, t["cells"][pos], t["cells"][own_pos])
+                ok = (found | own_found) & t["clim_ok"][month]
+                out["Climatology"][key] = np.where(ok, t["clim"][month, cell], np.nan)
+
+                X = t["X"][pos]
+                out["Naive_Bayes"][key] = np.where(found, model_naive_bayes.nb_predict_proba(nb, X), np.nan)
+                out["Logistic_Reg"][key] = np.where(found, model_logistic_regression.lr_predict_proba(lr, X),
+                                                    np.nan)
+                out["Baseline_Avg"][key] = self._combine(out, flare_class, key)
+        return out
+
+    def forecast_states(self, states):
+        """
+        Forecasts for explicit states (dicts with STATE_FIELDS), scored with
+        the models for the month after the last stored day.
+        """
+        month = self._month_index(np.array([self.last_day + 1]))[0]
+        sunspot = np.array([float(s["sunspot_number"]) for s in states])
+        out = {model: {} for model in MODELS}
+
+        for flare_class, t in self.classes.items():
+            consec = np.array([float(s[f"{flare_class}_consec_free"]) for s in states])
+            label = np.array([float(s[f"{flare_class}_label"]) for s in states])
+            X = np.column_stack([consec, sunspot])
+            clim = (t["clim"][month, model_climatology.climatology_cells(consec, sunspot)]
+                    if t["clim_ok"][month] else np.full(len(states), np.nan))
+            nb = model_naive_bayes.nb_predict_proba(t["nb"][month], X)
+            lr = model_logistic_regression.lr_predict_proba(t["lr"][month], X)
+            for _, lead_name in self.leads:
+                key = f"{flare_class.upper()}_{lead_name}"
+                out["Persistence"][key] = label
+                out["Climatology"][key] = clim
+                out["Naive_Bayes"][key] = nb
+                out["Logistic_Reg"][key] = lr
+                out["Baseline_Avg"][key] = self._combine(out, flare_class, key)
+        return out
+
+
+def check_state(state, i=0):
+    """
+    Raise ValueError unless a state's counts and sunspot number are finite and
+    non-negative and its labels are 0 or 1 (anything else would index the
+    wrong climatology cell or pass through Persistence unchanged).
+    """
+    for field in STATE_FIELDS:
+        try:
+            value = float(state[field])
+        except (TypeError, ValueError):
+            raise ValueError(f"state {i}: {field} must be a number, got {state[field]!r}") from None
+        if field.endswith("_label"):
+            if value not in (0.0, 1.0):
+                raise ValueError(f"state {i}: {field} must be 0 or 1, got {state[field]!r}")
+        elif not (np.isfinite(value) and value >= 0):
+            raise ValueError(f"state {i}: {field} must be finite and non-negative, got {state[field]!r}")
+
+
+def to_records(labels, forecasts):
+    """[{"query": label, "forecasts": {model: {key: p or None}}}, ...] for JSON output."""
+    models = list(forecasts)
+    keys = list(forecasts[models[0]])
+    # (queries, models, keys) as nested Python lists in one conversion; NaN -> None
+    values = np.round(np.stack([np.stack([forecasts[m][k] for k in keys], axis=-1) for m in models],
+                               axis=-2), 6).tolist()
+    return [{"query": label, "forecasts": {
+                m: {k: (v if v == v else None) for k, v in zip(keys, row)} for m, row in zip(models, per_model)}}
+            for label, per_model in zip(labels, values)]
+
+
+class ForecastService:
+    """
+    Holds the current ForecastTables and rebuilds them when the processed
+    data or the fit cache changes on disk.
+    """
+
+    def __init__(self, proc_dir=PROC, cache_dir=CACHE_DIR, use_cache=True, horizons=None):
+        self.proc_dir = proc_dir
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self.horizons = horizons
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self.tables = None
+        self.reload()
+
+    def _watched(self):
+        paths = [os.path.join(self.proc_dir, "merged_dataset.csv"), os.path.join(self.proc_dir, APPEND_STATE)]
+        paths += [os.path.join(self.cache_dir, f"{m}.npz")
+                  for m in ("climatology", "naive_bayes", "logistic_regression")]
+        return paths
+
+    def append_state(self, merged_df):
+        """The append state of the store, if it has one matching merged_df (no unfinished append)."""
+        path = os.path.join(self.proc_dir, APPEND_STATE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            state = json.load(f)
+        if "in_flight" in state or state["last_date"] != merged_df["date"].max().strftime("%Y-%m-%d"):
+            return None
+        return state
+
+    def fingerprint(self):
+        """Modification time and size of every watched file (None if absent)."""
+        out = []
+        for path in self._watched():
+            try:
+                st = os.stat(path)
+                out.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                out.append(None)
+        return tuple(out)
+
+    def reload(self):
+        """Build new tables and swap them in; requests keep using the old ones meanwhile."""
+        with self._lock:
+            start = time.perf_counter()
+            merged_df = pd.read_csv(os.path.join(self.proc_dir, "merged_dataset.csv"), parse_dates=["date"])
+            tables = ForecastTables(merged_df, self.cache_dir, self.use_cache, self.horizons,
+                                    self.append_state(merged_df))
+            self._fingerprint = self.fingerprint()   # after the build, which may have saved new fits
+            self.tables = tables
+            self.loaded_at = time.time()
+            self.reloads += 1
+            print(f"  Forecast tables loaded: last day {tables.last_day}, {len(tables.months)} months "
+                  f"({time.perf_counter() - start:.2f}s)")
+
+    def maybe_reload(self):
+        """Reload if a watched file changed; returns True if it did."""
+        if self.fingerprint() == self._fingerprint:
+            return False
+        self.reload()
+        return True
+
+    def watch(self, interval):
+        """Start a daemon thread calling maybe_reload() every `interval` seconds."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.maybe_reload()
+                except Exception as exc:   # keep serving the old tables
+                    print(f"  WARNING: reload failed: {exc}")
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+    def health(self):
+        return {"last_day": str(self.tables.last_day), "loaded_at": self.loaded_at, "reloads": self.reloads}
+
+    def handle(self, payload):
+        """Answer a forecast request body ({"dates": [...]} or {"states": [...]})."""
+        tables = self.tables
+        if "dates" in payload:
+            dates = [str(d) for d in payload["dates"]]
+            return to_records(dates, tables.forecast_dates(np.array(dates, dtype="datetime64[D]")))
+        if "states" in payload:
+            states = payload["states"]
+            missing = [f for f in STATE_FIELDS if any(f not in s for s in states)]
+            if missing:
+                raise ValueError(f"states need fields {STATE_FIELDS}; missing {missing}")
+            for i, s in enumerate(states):
+                check_state(s, i)
+            return to_records(list(range(len(states))), tables.forecast_states(states))
+        raise ValueError('request body needs "dates" or "states"')
+
+
+def make_handler(service):
+    """Request handler class bound to a ForecastService."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, so clients can reuse one connection
+        disable_nagle_algorithm = True   # headers and body go out as separate writes
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _answer(self, fn):
+            try:
+                self._send(200, fn())
+            except (ValueError, KeyError, TypeError) as exc:
+                self._send(400, {"error": str(exc)})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                self._send(200, service.health())
+            elif url.path == "/forecast":
+                dates = parse_qs(url.query).get("date", [])
+                self._answer(lambda: service.handle({"dates": dates}))
+            else:
+                self._send(404, {"error": f"unknown path {url.path}"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+            if url.path == "/forecast":
+                self._answer(lambda: service.handle(json.loads(body or b"{}")))
+            elif url.path == "/reload":
+                service.reload()
+                self._send(200, service.health())
+            else:
+                self._send(404, {"error": f"unknown path {url.path}"})
+
+        def address_string(self):
+            # Unix-socket clients have no (host, port) address
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(service, host="127.0.0.1", port=8765, unix=None):
+    """Create (but do not start) the HTTP server; call serve_forever() on it."""
+    handler = make_handler(service)
+    if unix:
+        if os.path.exists(unix):
+            os.remove(unix)
+        return UnixHTTPServer(unix, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve baseline-model forecasts on localhost")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--reload-interval", type=float, default=5.0,
+                        help="seconds between checks for new data / parameters (0 disables)")
+    parser.add_argument("--no-cache", action="store_true", help="refit instead of reading data/cache/")
+    parser.add_argument("--horizons", default="1-3", help="lead times in days, e.g. 1-3 or 1-27")
+    args = parser.parse_args()
+
+    service = ForecastService(use_cache=not args.no_cache, horizons=parse_horizons(args.horizons))
+    if args.reload_interval > 0:
+        service.watch(args.reload_interval)
+    server = serve(service, args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{server.server_address[1]}"
+    print(f"Serving forecasts on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -8,11 +8,27 @@ Figure 4: Reliability diagrams (SWPC forecast probability vs observed frequency)
 Figure 5: Storm-after-calm confusion matrix
 Figure 6: All-clear confusion matrix
 
-Usage: bash tools/run.sh replicate/src/generate_figures.py
+Everything the figures plot is computed once by build_plot_data() (vectorized
+group-bys over the processed CSVs, plus the calibration and special-analysis
+sections of results.json) and cached in data/cache/plot_data.npz. The cache is
+rebuilt when any input file changes, so rendering a figure normally reads no CSV.
+
+Usage: bash tools/run.sh replicate/src/generate_figures.py [--only figure_4,figure_1]
+           [--jobs N] [--rebuild]
+
+  --only      comma-separated figures to render (figure_4 or just 4)
+  --jobs      render figures concurrently in N worker processes
+  --rebuild   recompute the plot data even if the cache is current
 """
 
 import os
 import sys
+import json
+import time
+import argparse
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 import matplotlib
@@ -20,18 +36,27 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from perf import PERF
+from features import LEADS
+from calibration import calibration_summary
+from downsample import minmax_downsample, pixel_width
+
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PROC = os.path.join(BASE, "data", "processed")
 FIGS = os.path.join(BASE, "results", "figures")
+PLOT_DATA_PATH = os.path.join(BASE, "data", "cache", "plot_data.npz")
+RESULTS_PATH = os.path.join(BASE, "results.json")
 os.makedirs(FIGS, exist_ok=True)
 
-# Load data
-eval_df = pd.read_csv(os.path.join(PROC, "evaluation_dataset.csv"))
-eval_df["date"] = pd.to_datetime(eval_df["date"])
-
-merged_df = pd.read_csv(os.path.join(PROC, "merged_dataset.csv"))
-merged_df["date"] = pd.to_datetime(merged_df["date"])
-merged_df = merged_df.sort_values("date").reset_index(drop=True)
+# Bump when build_plot_data changes (invalidates plot_data.npz)
+PLOT_DATA_VERSION = 1
+PLOT_INPUTS = [
+    os.path.join(PROC, "merged_dataset.csv"),
+    os.path.join(PROC, "evaluation_dataset.csv"),
+    RESULTS_PATH,
+]
+MAX_CONSEC = 50  # Figure 3 x-axis: n = 0..50
 
 # Shared style
 plt.rcParams.update({
@@ -42,27 +67,153 @@ plt.rcParams.update({
 })
 
 
-def figure_1():
-    """Long-term solar activity: 27-day rolling M/X flare days + sunspot number."""
+# --------------------------------------------------------------------------
+# Plot data
+# --------------------------------------------------------------------------
+
+def load_frames():
+    """Read the processed evaluation and merged datasets."""
+    with PERF.span("figure.load_data"):
+        eval_df = pd.read_csv(os.path.join(PROC, "evaluation_dataset.csv"))
+        eval_df["date"] = pd.to_datetime(eval_df["date"])
+
+        merged_df = pd.read_csv(os.path.join(PROC, "merged_dataset.csv"))
+        merged_df["date"] = pd.to_datetime(merged_df["date"])
+        merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    return eval_df, merged_df
+
+
+def plot_data_key():
+    """Cache key: plot-data version plus size and mtime of every input file."""
+    parts = [f"v{PLOT_DATA_VERSION}"]
+    for path in PLOT_INPUTS:
+        st = os.stat(path) if os.path.exists(path) else None
+        parts.append(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}" if st else "missing")
+    return "|".join(parts)
+
+
+def rolling_sum(values, window):
+    """Trailing rolling sum over `window` rows (min_periods=1) via cumulative sums."""
+    c = np.concatenate([[0.0], np.cumsum(values, dtype=float)])
+    start = np.maximum(np.arange(1, len(c)) - window, 0)
+    return c[1:] - c[start]
+
+
+def load_results_sections():
+    """Calibration and special-analysis sections of results.json (None if absent)."""
+    if not os.path.exists(RESULTS_PATH):
+        return None, None
+    with open(RESULTS_PATH) as f:
+        results = json.load(f)
+    calibration = results.get("calibration")
+    if calibration and "SWPC" not in calibration.get("models", {}):
+        calibration = None
+    return calibration, results.get("special_analyses")
+
+
+@PERF.timed("figure.build_plot_data")
+def build_plot_data():
+    """
+    Compute everything the six figures plot.
+
+    Returns:
+    --------
+    dict of numpy arrays (plus two JSON strings for the results.json sections)
+    """
+    eval_df, merged_df = load_frames()
+    data = {}
+
+    # Figure 1: 27-day rolling flare days and daily sunspot number
+    data["fig1_date"] = merged_df["date"].values.astype("datetime64[D]")
+    data["fig1_m_rolling"] = rolling_sum(merged_df["m_label"].to_numpy(), 27)
+    data["fig1_x_rolling"] = rolling_sum(merged_df["x_label"].to_numpy(), 27)
+    data["fig1_ssn"] = merged_df["sunspot_number"].to_numpy(dtype=float)
+
+    # Figure 2: flare days per calendar month
+    month = eval_df["date"].dt.month.to_numpy()
+    for flare_class in ["m", "x"]:
+        data[f"fig2_{flare_class}_by_month"] = np.bincount(
+            month, weights=eval_df[f"{flare_class}_label"].to_numpy(dtype=float), minlength=13)[1:]
+
+    # Figure 3: P(flare | n flare-free days), n = 0..MAX_CONSEC
+    for flare_class in ["m", "x"]:
+        consec = eval_df[f"{flare_class}_consec_free"].to_numpy()
+        label = eval_df[f"{flare_class}_label"].to_numpy(dtype=float)
+        keep = (consec >= 0) & (consec <= MAX_CONSEC)
+        n = consec[keep].astype(int)
+        counts = np.bincount(n, minlength=MAX_CONSEC + 1)
+        flares = np.bincount(n, weights=label[keep], minlength=MAX_CONSEC + 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            data[f"fig3_{flare_class}_prob"] = np.where(counts > 0, flares / counts, np.nan)
+        data[f"fig3_{flare_class}_count"] = counts
+        data[f"fig3_{flare_class}_base_rate"] = np.array(label.mean())
+
+    # Figures 4-6: run_all.py outputs, recomputed here only if results.json lacks them
+    calibration, special = load_results_sections()
+    if calibration is None:
+        from model_swpc import swpc_probabilities
+        calibration = calibration_summary({"SWPC": swpc_probabilities(eval_df)})
+    if special is None:
+        from run_all import run_special_analyses
+        with contextlib.redirect_stdout(io.StringIO()):
+            special = run_special_analyses(eval_df, merged_df)
+    data["calibration_json"] = np.array(json.dumps(calibration))
+    data["special_json"] = np.array(json.dumps(special))
+    return data
+
+
+def get_plot_data(rebuild=False):
+    """Cached plot data; rebuilt and saved when the inputs changed (or rebuild=True)."""
+    key = plot_data_key()
+    if not rebuild and os.path.exists(PLOT_DATA_PATH):
+        with np.load(PLOT_DATA_PATH, allow_pickle=False) as f:
+            if str(f["key"]) == key:
+                return {name: f[name] for name in f.files if name != "key"}
+
+    data = build_plot_data()
+    os.makedirs(os.path.dirname(PLOT_DATA_PATH), exist_ok=True)
+    tmp_path = PLOT_DATA_PATH + ".tmp.npz"
+    np.savez_compressed(tmp_path, key=np.array(key), **data)
+    os.replace(tmp_path, PLOT_DATA_PATH)
+    return data
+
+
+# --------------------------------------------------------------------------
+# Figures
+# --------------------------------------------------------------------------
+
+@PERF.timed("figure.figure_1")
+def figure_1(data):
+    """Long-term solar activity: 27-day rolling M/X flare days + sunspot number.
+
+    Series are downsampled to the figure's pixel width (downsample.py), so
+    render time does not grow with the length of the history.
+    """
     print("Generating Figure 1: Long-term solar activity...")
-    df = merged_df.copy()
-
-    # 27-day rolling sum of flare days
-    df = df.set_index("date").sort_index()
-    m_rolling = df["m_label"].rolling(27, min_periods=1).sum()
-    x_rolling = df["x_label"].rolling(27, min_periods=1).sum()
-    ssn = df["sunspot_number"]
+    dates = pd.to_datetime(data["fig1_date"])
+    m_rolling = data["fig1_m_rolling"]
+    x_rolling = data["fig1_x_rolling"]
+    ssn = data["fig1_ssn"]
 
     fig, ax1 = plt.subplots(figsize=(12, 5))
 
-    ax1.fill_between(m_rolling.index, m_rolling.values, alpha=0.4, color="tab:orange", label="M-class (27-day rolling)")
-    ax1.fill_between(x_rolling.index, x_rolling.values, alpha=0.6, color="tab:red", label="X-class (27-day rolling)")
+    # Reduce each series to min/max per pixel column before drawing
+    width = pixel_width(fig)
+    m_dates, m_rolling = minmax_downsample(dates, m_rolling, width)
+    x_dates, x_rolling = minmax_downsample(dates, x_rolling, width)
+    ssn_dates, ssn = minmax_downsample(dates, ssn, width)
+
+    ax1.fill_between(m_dates, m_rolling, alpha=0.4, color="tab:orange", label="M-class (27-day rolling)",
+                     rasterized=True)
+    ax1.fill_between(x_dates, x_rolling, alpha=0.6, color="tab:red", label="X-class (27-day rolling)",
+                     rasterized=True)
     ax1.set_ylabel("Flare days (27-day rolling sum)")
     ax1.set_xlabel("Year")
     ax1.set_ylim(0, None)
 
     ax2 = ax1.twinx()
-    ax2.plot(ssn.index, ssn.values, color="gray", alpha=0.5, linewidth=0.5, label="Sunspot number")
+    ax2.plot(ssn_dates, ssn, color="gray", alpha=0.5, linewidth=0.5, label="Sunspot number",
+             rasterized=True)
     ax2.set_ylabel("Daily sunspot number", color="gray")
     ax2.tick_params(axis="y", labelcolor="gray")
 
@@ -78,16 +229,12 @@ def figure_1():
     print("  Saved figure_1_solar_activity.png")
 
 
-def figure_2():
+@PERF.timed("figure.figure_2")
+def figure_2(data):
     """Seasonal distribution: flares by day of year."""
     print("Generating Figure 2: Seasonal distribution...")
-    df = eval_df.copy()
-    df["doy"] = df["date"].dt.dayofyear
-
-    # Bin by month for cleaner display
-    df["month"] = df["date"].dt.month
-    m_by_month = df.groupby("month")["m_label"].sum()
-    x_by_month = df.groupby("month")["x_label"].sum()
+    m_by_month = data["fig2_m_by_month"]
+    x_by_month = data["fig2_x_by_month"]
 
     months = np.arange(1, 13)
     month_labels = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
@@ -95,8 +242,8 @@ def figure_2():
 
     fig, ax = plt.subplots(figsize=(10, 5))
     width = 0.4
-    ax.bar(months - width/2, m_by_month.values, width, label="M-class", color="tab:orange", alpha=0.8)
-    ax.bar(months + width/2, x_by_month.values, width, label="X-class", color="tab:red", alpha=0.8)
+    ax.bar(months - width/2, m_by_month, width, label="M-class", color="tab:orange", alpha=0.8)
+    ax.bar(months + width/2, x_by_month, width, label="X-class", color="tab:red", alpha=0.8)
     ax.set_xticks(months)
     ax.set_xticklabels(month_labels)
     ax.set_xlabel("Month")
@@ -109,10 +256,10 @@ def figure_2():
     print("  Saved figure_2_seasonal_distribution.png")
 
 
-def figure_3():
+@PERF.timed("figure.figure_3")
+def figure_3(data):
     """Empirical conditional probability P(flare | n consecutive flare-free days)."""
     print("Generating Figure 3: Conditional probability...")
-    df = eval_df.copy()
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
 
@@ -120,28 +267,16 @@ def figure_3():
         (ax1, "m", "M-class", "tab:orange"),
         (ax2, "x", "X-class", "tab:red"),
     ]:
-        consec_col = f"{flare_class}_consec_free"
-        label_col = f"{flare_class}_label"
-
-        max_n = 50
-        ns = range(0, max_n + 1)
-        probs = []
-        counts = []
-        for n in ns:
-            subset = df[df[consec_col] == n]
-            if len(subset) > 0:
-                probs.append(subset[label_col].mean())
-                counts.append(len(subset))
-            else:
-                probs.append(np.nan)
-                counts.append(0)
-
-        ax.plot(list(ns), probs, color=color, linewidth=1.5, marker="o", markersize=3)
+        ns = np.arange(0, MAX_CONSEC + 1)
+        probs = data[f"fig3_{flare_class}_prob"]
+
+        ax.plot(ns, probs, color=color, linewidth=1.5, marker="o", markersize=3)
         ax.set_xlabel("Consecutive flare-free days (n)")
         ax.set_ylabel(f"P({label} flare | n free days)")
         ax.set_title(f"{label}")
-        ax.set_ylim(-0.02, max(0.6, max(p for p in probs if p is not None and not np.isnan(p)) * 1.1))
-        ax.axhline(y=df[label_col].mean(), color="gray", linestyle="--", alpha=0.5, label="Climatological rate")
+        ax.set_ylim(-0.02, max(0.6, np.nanmax(probs) * 1.1))
+        ax.axhline(y=float(data[f"fig3_{flare_class}_base_rate"]), color="gray", linestyle="--",
+                   alpha=0.5, label="Climatological rate")
         ax.legend(fontsize=8)
         ax.grid(True, alpha=0.3)
 
@@ -152,37 +287,33 @@ def figure_3():
     print("  Saved figure_3_conditional_probability.png")
 
 
-def figure_4():
-    """Reliability diagrams: SWPC forecast probability vs observed frequency."""
+@PERF.timed("figure.figure_4")
+def figure_4(data):
+    """Reliability diagrams: SWPC forecast probability vs observed frequency.
+
+    Bins come from the "calibration" section of results.json (written by
+    run_all.py); if it is missing they are computed from the evaluation data.
+    """
     print("Generating Figure 4: Reliability diagrams...")
-    df = eval_df.copy()
+    calibration = json.loads(str(data["calibration_json"]))
+    edges = np.asarray(calibration["bin_edges"])
+    centers = (edges[:-1] + edges[1:]) / 2
+    swpc = calibration["models"]["SWPC"]
 
-    fig, axes = plt.subplots(2, 3, figsize=(14, 9))
+    fig, axes = plt.subplots(2, len(LEADS), figsize=(14, 9), squeeze=False)
 
     for row, flare_class in enumerate(["m", "x"]):
-        label_col = f"{flare_class}_label"
-        for col, lead in enumerate(["24h", "48h", "72h"]):
+        for col, (_, lead) in enumerate(LEADS):
             ax = axes[row, col]
-            prob_col = f"{flare_class}_{lead}"
-            valid = df[df[prob_col].notna()].copy()
-            y_true = valid[label_col].values.astype(int)
-            y_prob = valid[prob_col].values / 100.0
-
-            # Bin forecasts into probability bins
-            bins = np.arange(0, 1.05, 0.05)
-            bin_centers = []
-            observed_freq = []
-            bin_counts = []
-
-            for i in range(len(bins) - 1):
-                mask = (y_prob >= bins[i]) & (y_prob < bins[i + 1])
-                if mask.sum() > 0:
-                    bin_centers.append((bins[i] + bins[i + 1]) / 2)
-                    observed_freq.append(y_true[mask].mean())
-                    bin_counts.append(mask.sum())
+            stats = swpc[f"{flare_class.upper()}_{lead}"]
+            counts = np.asarray(stats["count"])
+            filled = counts > 0
+            bin_centers = centers[filled]
+            observed_freq = np.array([f for f in stats["observed_freq"] if f is not None])
+            bin_counts = counts[filled]
 
             ax.plot([0, 1], [0, 1], "k--", alpha=0.5, linewidth=1, label="Perfect calibration")
-            ax.scatter(bin_centers, observed_freq, s=[min(c/5, 100) for c in bin_counts],
+            ax.scatter(bin_centers, observed_freq, s=np.minimum(bin_counts / 5, 100),
                       color="tab:blue", alpha=0.7, zorder=3)
             ax.plot(bin_centers, observed_freq, color="tab:blue", alpha=0.5, linewidth=1)
             ax.set_xlim(-0.02, 1.02)
@@ -201,26 +332,13 @@ def figure_4():
     print("  Saved figure_4_reliability_diagrams.png")
 
 
-def figure_5():
-    """Storm-after-calm confusion matrix (X-class, >30 quiet days, SWPC 24h, theta=0.05)."""
-    print("Generating Figure 5: Storm-after-calm confusion matrix...")
-    valid = eval_df[eval_df["x_24h"].notna()].copy()
-    calm_mask = valid["x_consec_free"] > 30
-    calm_data = valid[calm_mask]
-
-    y_true = calm_data["x_label"].values.astype(int)
-    y_prob = calm_data["x_24h"].values / 100.0
-    y_pred = (y_prob >= 0.05).astype(int)
-
-    TP = ((y_pred == 1) & (y_true == 1)).sum()
-    FP = ((y_pred == 1) & (y_true == 0)).sum()
-    FN = ((y_pred == 0) & (y_true == 1)).sum()
-    TN = ((y_pred == 0) & (y_true == 0)).sum()
-
+def confusion_figure(counts, cmap, title, path):
+    """2x2 confusion-matrix heatmap laid out [[TP, FP], [FN, TN]]."""
+    TP, FP, FN, TN = counts["TP"], counts["FP"], counts["FN"], counts["TN"]
     cm = np.array([[TP, FP], [FN, TN]])
 
     fig, ax = plt.subplots(figsize=(6, 5))
-    im = ax.imshow(cm, cmap="Blues", aspect="auto")
+    im = ax.imshow(cm, cmap=cmap, aspect="auto")
 
     for i in range(2):
         for j in range(2):
@@ -232,75 +350,98 @@ def figure_5():
     ax.set_yticks([0, 1])
     ax.set_xticklabels(["Flare (Observed)", "No Flare (Observed)"])
     ax.set_yticklabels(["Flare (Predicted)", "No Flare (Predicted)"])
-    ax.set_title(f"Figure 5: Storm After the Calm\n"
-                 f"X-class, >30 quiet days, SWPC 24h, θ=0.05\n"
-                 f"Miss rate: {FN/(TP+FN):.2f}, FAR: {FP/(TP+FP):.2f}",
-                 fontsize=11)
+    ax.set_title(title, fontsize=11)
     fig.colorbar(im, ax=ax, shrink=0.8)
     fig.tight_layout()
-    fig.savefig(os.path.join(FIGS, "figure_5_storm_after_calm.png"))
+    fig.savefig(os.path.join(FIGS, path))
     plt.close(fig)
     print(f"  TP={TP}, FN={FN}, FP={FP}, TN={TN}")
-    print("  Saved figure_5_storm_after_calm.png")
-
-
-def figure_6():
-    """All-clear confusion matrix (X-class +1/+2/+3 days, SWPC 24h, theta=0.05)."""
-    print("Generating Figure 6: All-clear confusion matrix...")
-    x_flare_dates = set(merged_df[merged_df["x_label"] == 1]["date"])
-
-    all_clear_dates = set()
-    for d in x_flare_dates:
-        for offset in [1, 2, 3]:
-            all_clear_dates.add(d + pd.Timedelta(days=offset))
-
-    ac_mask = eval_df["date"].isin(all_clear_dates) & eval_df["x_24h"].notna()
-    ac_data = eval_df[ac_mask]
-
-    y_true = ac_data["x_label"].values.astype(int)
-    y_prob = ac_data["x_24h"].values / 100.0
-    y_pred = (y_prob >= 0.05).astype(int)
+    print(f"  Saved {path}")
 
-    TP = ((y_pred == 1) & (y_true == 1)).sum()
-    FP = ((y_pred == 1) & (y_true == 0)).sum()
-    FN = ((y_pred == 0) & (y_true == 1)).sum()
-    TN = ((y_pred == 0) & (y_true == 0)).sum()
 
-    cm = np.array([[TP, FP], [FN, TN]])
+@PERF.timed("figure.figure_5")
+def figure_5(data):
+    """Storm-after-calm confusion matrix (X-class, >30 quiet days, SWPC 24h, theta=0.05)."""
+    print("Generating Figure 5: Storm-after-calm confusion matrix...")
+    c = json.loads(str(data["special_json"]))["storm_after_calm"]
+    TP, FP, FN = c["TP"], c["FP"], c["FN"]
+    confusion_figure(c, "Blues",
+                     f"Figure 5: Storm After the Calm\n"
+                     f"X-class, >30 quiet days, SWPC 24h, θ=0.05\n"
+                     f"Miss rate: {FN/(TP+FN):.2f}, FAR: {FP/(TP+FP):.2f}",
+                     "figure_5_storm_after_calm.png")
 
-    fig, ax = plt.subplots(figsize=(6, 5))
-    im = ax.imshow(cm, cmap="Oranges", aspect="auto")
-
-    for i in range(2):
-        for j in range(2):
-            color = "white" if cm[i, j] > cm.max() / 2 else "black"
-            ax.text(j, i, f"{cm[i, j]:,}", ha="center", va="center",
-                   fontsize=16, fontweight="bold", color=color)
-
-    ax.set_xticks([0, 1])
-    ax.set_yticks([0, 1])
-    ax.set_xticklabels(["Flare (Observed)", "No Flare (Observed)"])
-    ax.set_yticklabels(["Flare (Predicted)", "No Flare (Predicted)"])
 
+@PERF.timed("figure.figure_6")
+def figure_6(data):
+    """All-clear confusion matrix (X-class +1/+2/+3 days, SWPC 24h, theta=0.05)."""
+    print("Generating Figure 6: All-clear confusion matrix...")
+    c = json.loads(str(data["special_json"]))["all_clear"]
+    TP, FP, FN = c["TP"], c["FP"], c["FN"]
     recall = TP / (TP + FN) if (TP + FN) > 0 else 0
     far = FP / (TP + FP) if (TP + FP) > 0 else 0
-    ax.set_title(f"Figure 6: All-Clear Analysis\n"
-                 f"X-class +1/+2/+3 days, SWPC 24h, θ=0.05\n"
-                 f"Recall: {recall:.2f}, FAR: {far:.2f}",
-                 fontsize=11)
-    fig.colorbar(im, ax=ax, shrink=0.8)
-    fig.tight_layout()
-    fig.savefig(os.path.join(FIGS, "figure_6_all_clear.png"))
-    plt.close(fig)
-    print(f"  TP={TP}, FN={FN}, FP={FP}, TN={TN}")
-    print("  Saved figure_6_all_clear.png")
+    confusion_figure(c, "Oranges",
+                     f"Figure 6: All-Clear Analysis\n"
+                     f"X-class +1/+2/+3 days, SWPC 24h, θ=0.05\n"
+                     f"Recall: {recall:.2f}, FAR: {far:.2f}",
+                     "figure_6_all_clear.png")
+
+
+FIGURES = {
+    "figure_1": figure_1,
+    "figure_2": figure_2,
+    "figure_3": figure_3,
+    "figure_4": figure_4,
+    "figure_5": figure_5,
+    "figure_6": figure_6,
+}
+
+
+def _render_worker(name):
+    """Process-pool entry point: render one figure from the cached plot data."""
+    out = io.StringIO()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        FIGURES[name](get_plot_data())
+    return name, time.perf_counter() - t0, out.getvalue()
+
+
+def parse_only(only):
+    """'figure_4,1' -> ['figure_1', 'figure_4'] (in figure order)."""
+    if not only:
+        return list(FIGURES)
+    wanted = {s.strip() if s.strip().startswith("figure_") else f"figure_{s.strip()}"
+              for s in only.split(",") if s.strip()}
+    unknown = wanted - set(FIGURES)
+    if unknown:
+        raise SystemExit(f"Unknown figures: {', '.join(sorted(unknown))}")
+    return [name for name in FIGURES if name in wanted]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the paper figures")
+    parser.add_argument("--only", help="comma-separated figures, e.g. figure_4 or 1,4")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes for rendering")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the cached plot data")
+    args = parser.parse_args()
+
+    names = parse_only(args.only)
+    data = get_plot_data(rebuild=args.rebuild)
+
+    if args.jobs > 1 and len(names) > 1:
+        with PERF.span("figure.render_parallel", jobs=args.jobs) as span:
+            with ProcessPoolExecutor(max_workers=min(args.jobs, len(names))) as pool:
+                for name, seconds, output in pool.map(_render_worker, names):
+                    print(output, end="")
+                    print(f"  ({name}: {seconds:.2f}s)")
+                    span.count("figures")
+    else:
+        for name in names:
+            FIGURES[name](data)
+
+    print(f"\n{len(names)} figure(s) saved to {FIGS}/")
+    PERF.write_json(os.path.join(BASE, "perf_figures.json"))
 
 
 if __name__ == "__main__":
-    figure_1()
-    figure_2()
-    figure_3()
-    figure_4()
-    figure_5()
-    figure_6()
-    print(f"\nAll 6 figures saved to {FIGS}/")
+    main()
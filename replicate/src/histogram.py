@@ -0,0 +1,165 @@
+"""
+Forecast/observation histograms: the evaluation data of one forecast series
+reduced to counts per distinct forecast value.
+
+SWPC issues whole percentages and climatology reads a finite lookup table,
+so a series of N days has only K << N distinct probabilities. A 2 x K count
+table (label 0 / label 1 per forecast value) is all any verification metric
+needs:
+
+  confusion counts at theta   suffix sums over values >= theta
+  Brier                       sum_k n0_k v_k^2 + n1_k (1 - v_k)^2, over N
+  AUC                         Mann-Whitney: positives at v_k beat the
+                              negatives below v_k and tie with those at v_k
+  reliability bins            counts and value sums per probability bin
+
+so after one O(N) pass every metric, threshold sweep and ROC curve costs
+O(K). Histograms of different shards (years, processes, appended days) merge
+by adding counts on the union of their values, so evaluation can be split up
+and streamed. Continuous forecasts (naive Bayes, logistic regression) simply
+have K close to N.
+"""
+
+import numpy as np
+
+from metrics import metrics_from_counts
+
+
+class ForecastHistogram:
+    """
+    Counts of (forecast value, observed label) for one forecast series.
+
+    values : sorted unique forecast probabilities, shape (K,)
+    counts : int64 array (2, K); counts[y, k] = days with label y and forecast values[k]
+    """
+
+    def __init__(self, values=None, counts=None):
+        self.values = np.zeros(0) if values is None else np.asarray(values, dtype=float)
+        self.counts = (np.zeros((2, 0), dtype=np.int64) if counts is None
+                       else np.asarray(counts, dtype=np.int64).reshape(2, -1))
+
+    @classmethod
+    def from_arrays(cls, y_true, y_prob):
+        """Histogram of per-day labels and forecast probabilities."""
+        y = np.asarray(y_true).astype(int)
+        values, inverse = np.unique(np.asarray(y_prob, dtype=float), return_inverse=True)
+        counts = np.bincount(inverse * 2 + y, minlength=2 * len(values)).reshape(-1, 2).T
+        return cls(values, counts)
+
+    @classmethod
+    def from_label_matrix(cls, labels, valid, y_prob):
+        """
+        One histogram per row of an (L, N) label matrix against the same N
+        forecasts, from a single bincount over (row, forecast value, label);
+        days where `valid` (L, N) is False are left out of that row.
+        """
+        values, inverse = np.unique(np.asarray(y_prob, dtype=float), return_inverse=True)
+        labels = np.where(valid, labels, 0).astype(int)
+        n_rows, K = labels.shape[0], len(values)
+        idx = (np.arange(n_rows)[:, None] * K + inverse[None, :]) * 2 + labels
+        counts = np.bincount(idx[valid], minlength=n_rows * K * 2).reshape(n_rows, K, 2)
+        return [cls(values, counts[r].T) for r in range(n_rows)]
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Histogram of a per-day forecast table with y_true and y_prob columns."""
+        return cls.from_arrays(frame["y_true"].to_numpy(), frame["y_prob"].to_numpy(dtype=float))
+
+    @classmethod
+    def merge(cls, histograms):
+        """Sum of many histograms in one pass over their values."""
+        histograms = list(histograms)
+        if not histograms:
+            return cls()
+        values, inverse = np.unique(np.concatenate([h.values for h in histograms]), return_inverse=True)
+        counts = np.zeros((2, len(values)), dtype=np.int64)
+        for y in (0, 1):
+            counts[y] = np.bincount(inverse, weights=np.concatenate([h.counts[y] for h in histograms]),
+                                    minlength=len(values)).astype(np.int64)
+        return cls(values, counts)
+
+    def __add__(self, other):
+        return ForecastHistogram.merge([self, other])
+
+    def __eq__(self, other):
+        return (isinstance(other, ForecastHistogram) and np.array_equal(self.values, other.values)
+                and np.array_equal(self.counts, other.counts))
+
+    def __repr__(self):
+        return f"ForecastHistogram(K={len(self.values)}, n={self.n}, events={self.events})"
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    @property
+    def events(self):
+        return int(self.counts[1].sum())
+
+    def confusion(self, thresholds):
+        """TP, FP, TN, FN arrays (one entry per threshold); positive if p >= theta."""
+        thresholds = np.atleast_1d(np.asarray(thresholds, dtype=float))
+        # above[:, i] = days with values[k] >= thresholds[i]
+        suffix = np.concatenate([self.counts[:, ::-1].cumsum(axis=1)[:, ::-1],
+                                 np.zeros((2, 1), dtype=np.int64)], axis=1)
+        above = suffix[:, np.searchsorted(self.values, thresholds, side="left")]
+        total = self.counts.sum(axis=1, keepdims=True)
+        below = total - above
+        return above[1], above[0], below[0], below[1]
+
+    def sweep(self, thresholds):
+        """Unrounded threshold metrics (metrics_from_counts) for every threshold."""
+        return metrics_from_counts(*self.confusion(thresholds))
+
+    def brier(self):
+        """Brier score, mean of (p - y)^2."""
+        if self.n == 0:
+            return 0.0
+        sq = self.counts[0] * self.values ** 2 + self.counts[1] * (1 - self.values) ** 2
+        return float(sq.sum() / self.n)
+
+    def auc(self):
+        """ROC AUC with ties counted half (equal to sklearn's); 0.5 if one class is absent."""
+        neg, pos = self.counts
+        n_pos, n_neg = int(pos.sum()), int(neg.sum())
+        if n_pos == 0 or n_neg == 0:
+            return 0.5
+        neg_below = np.cumsum(neg) - neg
+        # Twice the Mann-Whitney U, exact in integers
+        u2 = int((pos * (2 * neg_below + neg)).sum())
+        return u2 / (2 * n_pos * n_neg)
+
+    def roc_curve(self):
+        """(fpr, tpr, thresholds) at every distinct value, highest threshold first."""
+        neg, pos = self.counts[:, ::-1]
+        tpr = np.r_[0, np.cumsum(pos)] / max(int(pos.sum()), 1)
+        fpr = np.r_[0, np.cumsum(neg)] / max(int(neg.sum()), 1)
+        return fpr, tpr, np.r_[np.inf, self.values[::-1]]
+
+    def reliability(self, edges):
+        """Per-bin "count", "mean_forecast" and "observed_freq" (NaN for empty bins)."""
+        from calibration import bin_index
+        n_bins = len(edges) - 1
+        b = bin_index(self.values, edges)
+        per_value = self.counts.sum(axis=0)
+        count = np.bincount(b, weights=per_value, minlength=n_bins).astype(np.int64)
+        sum_p = np.bincount(b, weights=per_value * self.values, minlength=n_bins)
+        sum_y = np.bincount(b, weights=self.counts[1], minlength=n_bins)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {"count": count, "mean_forecast": sum_p / count, "observed_freq": sum_y / count}
+
+    def metrics(self, theta=0.5):
+        """The 11 table metrics, rounded to 2 decimals as in metrics.compute_all_metrics."""
+        m = {name: float(v[0]) for name, v in self.sweep([theta]).items()}
+        m["Brier"] = self.brier()
+        m["AUC"] = self.auc()
+        order = ["Accuracy", "Precision", "Recall", "F1", "Brier", "AUC", "CSI", "POD", "FAR", "TSS", "HSS"]
+        return {name: round(m[name], 2) for name in order}
+
+    def best_threshold(self, thresholds=np.arange(1, 101) / 100):
+        """(theta, TSS) maximizing TSS; the first maximum wins, as in run_all.find_optimal_threshold."""
+        tss = self.sweep(thresholds)["TSS"]
+        i = int(np.argmax(tss))
+        if tss[i] <= -1:
+            return 0.5, -1
+        return float(thresholds[i]), float(tss[i])
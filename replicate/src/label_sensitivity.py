@@ -0,0 +1,200 @@
+"""
+Label-source sensitivity: the same forecasts scored against every flare
+label source.
+
+The processed labels come from the NOAA event lists through 2001 and the ASR
+catalog after (parse_data.build_flare_labels). parse_data.parse_label_sources
+parses every source once, so the processed CSVs also carry m/x_label_<source>
+columns: each source on its own (NaN outside its coverage) and the
+combinations of parse_data.LABEL_COMBINATIONS. The forecasts do not depend on
+the verification labels, so they are computed once and re-scored against
+every source; each forecast series is reduced to one histogram per source
+with a single bincount (histogram.ForecastHistogram.from_label_matrix).
+Days a source does not cover are left out of that source's row.
+
+"default" is the processed m/x_label, so its rows reproduce the daily tables.
+To refit the models on another source as well, use sweep.py (labels=...).
+
+A class ladder scores the same forecasts against "peak flux >= threshold"
+labels for several thresholds at once (>=C, >=M, >=M5, >=X, >=X5 by
+default), from the daily peak flux the catalogs keep (peak_flux, or
+peak_flux_<source>; features.ladder_labels), to see how skill changes with
+event rarity. Unlike m_label (a day with an M-class flare), >=M also counts
+days whose only flares are X-class.
+
+Usage: bash tools/run.sh replicate/src/label_sensitivity.py [--sources noaa,dsd]
+           [--theta 0.5] [--out results/label_sensitivity.csv]
+       bash tools/run.sh replicate/src/label_sensitivity.py --ladder [C,M,M5,X,X5]
+           [--flux-source noaa] [--out results/class_ladder.csv]
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from features import as_days, lookup_dates, ladder_labels
+from histogram import ForecastHistogram
+from parse_data import goes_class_flux
+from perf import PERF
+
+DEFAULT_LABELS = "default"
+
+# Class ladder: GOES classes (or fluxes in W/m^2) scored as "peak flux >= rung"
+LADDER = ("C", "M", "M5", "X", "X5")
+
+
+def stored_label_sources(merged_df):
+    """Every <source> with m_label_<source> and x_label_<source> columns in merged_df."""
+    sources = [c[len("m_label_"):] for c in merged_df.columns if c.startswith("m_label_")]
+    return sorted(s for s in sources if f"x_label_{s}" in merged_df.columns)
+
+
+def ladder_thresholds(ladder=LADDER):
+    """Flux thresholds (W/m^2) of ladder rungs given as GOES classes ("M5") or fluxes ("3e-5")."""
+    thresholds = []
+    for rung in ladder:
+        try:
+            flux = float(rung)
+        except ValueError:
+            flux = goes_class_flux([rung])[0]
+        if not flux > 0:
+            raise ValueError(f"ladder rungs are GOES classes (C, M5, X) or fluxes in W/m^2: {rung!r}")
+        thresholds.append(flux)
+    return np.array(thresholds)
+
+
+def _merged_values(frame, merged_df, column):
+    """merged_df[column] (merged_df sorted by date) at the dates of a forecast series, NaN where absent."""
+    pos, found = lookup_dates(as_days(merged_df["date"]), as_days(frame["date"]))
+    return np.where(found, merged_df[column].to_numpy(dtype=float)[pos], np.nan)
+
+
+def _score(forecasts, labels_of, names, theta, stage):
+    """
+    Rows (Model, Key, Labels, N, Events, metrics) of every forecast series
+    against each row of labels_of(frame, key) -> (labels, valid).
+    """
+    rows = []
+    for model, by_key in forecasts.items():
+        for key, frame in by_key.items():
+            with PERF.span(stage, model=model, key=key) as span:
+                labels, valid = labels_of(frame, key)
+                hists = ForecastHistogram.from_label_matrix(labels, valid, frame["y_prob"].to_numpy(dtype=float))
+                for hist, name in zip(hists, names):
+                    rows.append({"Model": model, "Key": key, "Labels": name,
+                                 "N": hist.n, "Events": hist.events, **hist.metrics(theta)})
+                span.count("labels", len(names))
+    return pd.DataFrame(rows)
+
+
+def source_labels(frame, merged_df, flare_class, sources):
+    """
+    (labels, valid) matrices, one row per source, for the dates of a forecast
+    series; "default" uses the frame's own y_true. merged_df is sorted by date.
+    """
+    labels = np.zeros((len(sources), len(frame)))
+    for i, source in enumerate(sources):
+        if source == DEFAULT_LABELS:
+            labels[i] = frame["y_true"].to_numpy(dtype=float)
+        else:
+            labels[i] = _merged_values(frame, merged_df, f"{flare_class.lower()}_label_{source}")
+    valid = ~np.isnan(labels)
+    return np.where(valid, labels, 0).astype(int), valid
+
+
+def label_sensitivity(forecasts, merged_df, sources=None, theta=0.5):
+    """
+    Metrics of every model and class/lead against every label source.
+
+    Parameters:
+    -----------
+    forecasts : dict
+        {model: {"M_24h": DataFrame(date, y_true, y_prob), ...}} (run_all.compute_forecasts)
+    merged_df : DataFrame
+        Merged dataset with m/x_label_<source> columns (parse_data.py labels)
+    sources : list of str
+        Label sources to score against (default: "default" and every stored source)
+    theta : float
+        Decision threshold
+
+    Returns:
+    --------
+    DataFrame with one row per model, key and source: Model, Key, Labels, N,
+    Events and the 11 table metrics
+    """
+    available = stored_label_sources(merged_df)
+    if sources is None:
+        sources = [DEFAULT_LABELS] + available
+    unknown = [s for s in sources if s != DEFAULT_LABELS and s not in available]
+    if unknown:
+        raise ValueError(f"unknown label source(s) {', '.join(unknown)}; available: {', '.join(available)}")
+
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    return _score(forecasts, lambda frame, key: source_labels(frame, merged_df, key[0], sources),
+                  sources, theta, "labels.evaluate")
+
+
+def class_ladder(forecasts, merged_df, ladder=LADDER, flux_source=None, theta=0.5):
+    """
+    Metrics of every model and class/lead against every rung of a class
+    ladder ("peak flux >= rung" labels).
+
+    Parameters:
+    -----------
+    forecasts : dict
+        {model: {"M_24h": DataFrame(date, y_true, y_prob), ...}} (run_all.compute_forecasts)
+    merged_df : DataFrame
+        Merged dataset with the peak_flux column(s) (parse_data.py labels)
+    ladder : list of str
+        Rungs as GOES classes ("C", "M5") or fluxes in W/m^2 ("3e-5")
+    flux_source : str
+        Score against peak_flux_<flux_source> instead of the paper's split
+    theta : float
+        Decision threshold
+
+    Returns:
+    --------
+    DataFrame with one row per model, key and rung: Model, Key, Labels
+    (">=M5"), Threshold (W/m^2), N, Events and the 11 table metrics. Days
+    without a known peak flux are left out.
+    """
+    thresholds = ladder_thresholds(ladder)
+    column = "peak_flux" if flux_source is None else f"peak_flux_{flux_source}"
+    if column not in merged_df:
+        raise ValueError(f"no {column} column; run parse_data.py labels")
+    names = [f">={rung}" for rung in ladder]
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    table = _score(forecasts, lambda frame, key: ladder_labels(_merged_values(frame, merged_df, column), thresholds),
+                   names, theta, "labels.ladder")
+    table.insert(3, "Threshold", table["Labels"].map(dict(zip(names, thresholds))))
+    return table
+
+
+if __name__ == "__main__":
+    import argparse
+    from run_all import load_data, compute_forecasts, RESULTS
+
+    parser = argparse.ArgumentParser(description="Score every model's forecasts against every flare label source")
+    parser.add_argument("--sources", help='comma-separated label sources (default: "default" and every stored source)')
+    parser.add_argument("--ladder", nargs="?", const=",".join(LADDER),
+                        help=f"score against a class ladder instead (default rungs {','.join(LADDER)})")
+    parser.add_argument("--flux-source", help="peak flux of one catalog (e.g. noaa) instead of the paper's split")
+    parser.add_argument("--theta", type=float, default=0.5)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    eval_df, merged_df, _ = load_data()
+    forecasts = compute_forecasts(eval_df, merged_df)
+    if args.ladder:
+        table = class_ladder(forecasts, merged_df, args.ladder.split(","), args.flux_source, args.theta)
+        out = args.out or os.path.join(RESULTS, "class_ladder.csv")
+    else:
+        table = label_sensitivity(forecasts, merged_df, args.sources.split(",") if args.sources else None, args.theta)
+        out = args.out or os.path.join(RESULTS, "label_sensitivity.csv")
+    table.to_csv(out, index=False)
+    print(f"Saved {out} ({len(table)} rows)")
+
+    print(f"\nTSS at theta={args.theta} by {'rung' if args.ladder else 'label source'}:")
+    print(table.pivot_table(index=["Model", "Key"], columns="Labels", values="TSS", sort=False).to_string())
@@ -13,6 +13,8 @@ Confusion matrix convention:
 import numpy as np
 from sklearn.metrics import roc_auc_score
 
+from perf import PERF
+
 
 def confusion_matrix_counts(y_true, y_pred):
     """Compute TP, FP, TN, FN from binary arrays."""
@@ -107,6 +109,7 @@ def auc_score(y_true, y_prob):
     return float(roc_auc_score(y_true, y_prob))
 
 
+@PERF.timed("metrics.compute_all")
 def compute_all_metrics(y_true, y_pred, y_prob=None):
     """
     Compute all 11 metrics at once.
@@ -149,3 +152,42 @@ def threshold_predictions(y_prob, theta=0.5):
     Note: uses >= (greater than or equal) following standard convention.
     """
     return (np.asarray(y_prob) >= theta).astype(int)
+
+
+@PERF.timed("metrics.evaluate_forecasts")
+def evaluate_forecasts(frame, theta=0.5):
+    """
+    All metrics for a per-day forecast table with y_true and y_prob columns.
+
+    Same values as compute_all_metrics(), computed from the table's
+    forecast/observation histogram (histogram.ForecastHistogram).
+    """
+    from histogram import ForecastHistogram
+    return ForecastHistogram.from_frame(frame).metrics(theta)
+
+
+def metrics_from_counts(TP, FP, TN, FN):
+    """
+    Threshold metrics from confusion counts; works elementwise on arrays.
+
+    Same definitions (and the same 0.0 for empty denominators) as the
+    per-metric functions above, unrounded. Brier and AUC need the
+    probabilities and are not included.
+    """
+    TP, FP, TN, FN = (np.asarray(v, dtype=float) for v in (TP, FP, TN, FN))
+
+    def ratio(num, den):
+        return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+    recall_ = ratio(TP, TP + FN)
+    return {
+        "Accuracy": ratio(TP + TN, TP + FP + TN + FN),
+        "Precision": ratio(TP, TP + FP),
+        "Recall": recall_,
+        "F1": ratio(2 * TP, 2 * TP + FP + FN),
+        "CSI": ratio(TP, TP + FP + FN),
+        "POD": recall_,
+        "FAR": ratio(FP, TP + FP),
+        "TSS": recall_ - ratio(FP, FP + TN),
+        "HSS": ratio(2 * (TP * TN - FN * FP), (TP + FN) * (FN + TN) + (TP + FP) * (FP + TN)),
+    }
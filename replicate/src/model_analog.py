@@ -0,0 +1,250 @@
+"""
+Analog-ensemble (nearest-neighbour) baseline.
+
+P(flare on day D) = fraction of the K historical days most similar to the
+issue day (D - lead) that were followed by a flare `lead` days later.
+
+Features (fixed scales, so distances do not change as the window grows):
+  x1 = log(1 + consecutive flare-free days)
+  x2 = sunspot number / SUNSPOT_SCALE
+  x3 = flare days of the class in the last RECENT_DAYS days / RECENT_SCALE
+plus a tie-break coordinate (the day itself, TIE_SCALE per day), so that of
+equally similar days the most recent are the analogs.
+
+Monthly expanding window: the analogs of a month's forecasts are days whose
+outcome was known before the month started. They sit in a nearest-neighbour
+index (AnalogIndex) that grows by each month's new days, and all forecasts
+of a month (every day, every horizon) are one batched query, instead of a
+scan of the whole history per forecast.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from metrics import evaluate_forecasts
+from perf import PERF
+from features import leads, as_days, issue_day_matrix, lagged_features, shifted_labels, forecast_frame
+
+K_NEIGHBOURS = 50
+RECENT_DAYS = 7
+SUNSPOT_SCALE = 50.0
+RECENT_SCALE = 2.0
+TIE_SCALE = 1e-6
+
+
+class AnalogIndex:
+    """
+    k-nearest-neighbour index that grows by batches of points.
+
+    A KD-tree cannot take new points, so the index keeps a few static trees
+    (the logarithmic method): every batch becomes a tree, and the newest
+    trees are rebuilt as one while the older is at most twice the size of
+    the newer. There are O(log n) trees and every point is rebuilt O(log n)
+    times; a query searches each tree and merges the candidates.
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.blocks = []            # [(cKDTree, ids)], largest (oldest) first
+
+    def __len__(self):
+        return sum(len(ids) for _, ids in self.blocks)
+
+    def add(self, points, ids):
+        """Add points (n, dim) with integer ids (n,)."""
+        points = np.asarray(points, dtype=float).reshape(-1, self.dim)
+        if len(points) == 0:
+            return
+        self.blocks.append((cKDTree(points), np.asarray(ids)))
+        while len(self.blocks) > 1 and len(self.blocks[-2][1]) <= 2 * len(self.blocks[-1][1]):
+            (older, older_ids), (newer, newer_ids) = self.blocks.pop(-2), self.blocks.pop()
+            self.blocks.append((cKDTree(np.vstack([older.data, newer.data])),
+                                np.concatenate([older_ids, newer_ids])))
+
+    def query(self, X, k):
+        """
+        (dist, ids) of the min(k, len(self)) nearest points to each row of X,
+        nearest first: arrays (len(X), min(k, len(self))).
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, self.dim)
+        k = min(k, len(self))
+        dist, ids = [np.zeros((len(X), 0))], [np.zeros((len(X), 0), dtype=int)]
+        for tree, block_ids in self.blocks:
+            kb = min(k, len(block_ids))
+            d, i = tree.query(X, k=kb)
+            dist.append(d.reshape(len(X), kb))
+            ids.append(block_ids[i.reshape(len(X), kb)])
+        dist, ids = np.concatenate(dist, axis=1), np.concatenate(ids, axis=1)
+        order = np.argsort(dist, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(dist, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+def recent_flare_days(sorted_days, labels, window=RECENT_DAYS):
+    """Flare days among the `window` calendar days ending on each day (missing days count as flare-free)."""
+    series = pd.Series(np.asarray(labels, dtype=float), index=pd.DatetimeIndex(sorted_days))
+    return series.rolling(f"{window}D").sum().to_numpy()
+
+
+def analog_features(merged_df, flare_class):
+    """
+    Scaled features (x1, x2, x3, tie-break) of every row of merged_df
+    (sorted by date): array (n, 4), NaN where a feature is missing.
+    """
+    days = as_days(merged_df["date"])
+    recent = recent_flare_days(days, merged_df[f"{flare_class}_label"])
+    return np.column_stack([
+        np.log1p(merged_df[f"{flare_class}_consec_free"].to_numpy(dtype=float)),
+        merged_df["sunspot_number"].to_numpy(dtype=float) / SUNSPOT_SCALE,
+        recent / RECENT_SCALE,
+        (days - days[0]).astype(float) * TIE_SCALE,
+    ])
+
+
+def analog_rates(index, X, rows, lags, start, sorted_days, outcome, k):
+    """
+    Outcome rate of the k nearest analogs of each query.
+
+    Parameters:
+    -----------
+    index : AnalogIndex
+        Rows of sorted_days, by position
+    X : ndarray (n, dim)
+        Query features
+    rows : ndarray (n,)
+        Horizon row of each query (into lags and outcome)
+    lags : ndarray
+        Lead times (days)
+    start : datetime64[D]
+        First day of the forecast month
+    sorted_days : ndarray of datetime64[D]
+    outcome : ndarray (len(lags), len(sorted_days))
+        shifted_labels of sorted_days
+    k : int
+
+    Returns:
+    --------
+    ndarray (n,): NaN where the index holds fewer than k analogs
+
+    An analog of a query with lead h is a day whose outcome (h days later)
+    is present and falls before `start`. The index also holds the last days
+    before the month, whose outcome is not known yet for longer leads, so
+    max(lags) extra neighbours are fetched, and queries still short of k
+    analogs are asked again for twice as many.
+    """
+    rates = np.full(len(X), np.nan)
+    todo = np.arange(len(X))
+    n_fetch = k + int(lags.max())
+    while len(todo):
+        _, ids = index.query(X[todo], n_fetch)
+        r = rows[todo, None]
+        ok = ((sorted_days[ids] + lags[r].astype("timedelta64[D]") < start)
+              & ~np.isnan(outcome[r, ids]))
+        enough = ok.sum(axis=1) >= k
+        take = ok & (np.cumsum(ok, axis=1) <= k)
+        rates[todo[enough]] = np.where(take, outcome[r, ids], 0).sum(axis=1)[enough] / k
+        if n_fetch >= len(index):
+            break
+        todo = todo[~enough]
+        n_fetch *= 2
+    return rates
+
+
+def analog_probabilities(eval_df, merged_df, horizons=None, k=K_NEIGHBOURS):
+    """
+    Per-day analog forecasts for every class and lead time (horizons in
+    days, default features.HORIZONS).
+
+    The index holds every day before the current month with all features
+    present; each month's forecasts are one batched query. Days whose issue
+    day is missing, or that have fewer than k analogs, are skipped.
+
+    Returns:
+    --------
+    dict : {"M_24h": DataFrame(date, y_true, y_prob), ...}
+    """
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    eval_df = eval_df.sort_values("date").reset_index(drop=True)
+    merged_days = as_days(merged_df["date"])
+    eval_days = as_days(eval_df["date"])
+
+    months, month_of_day = np.unique(eval_days.astype("datetime64[M]"), return_inverse=True)
+    month_start = months.astype("datetime64[D]")
+    n_before = np.searchsorted(merged_days, month_start, side="left")
+    month_bounds = np.searchsorted(month_of_day, np.arange(len(months) + 1))
+    pos, found = issue_day_matrix(merged_days, eval_days, horizons)
+    lags = np.array([h for h, _ in leads(horizons)])
+    probs = {}
+
+    for flare_class in ["m", "x"]:
+        label_col = f"{flare_class}_label"
+
+        with PERF.span("model.analog", flare_class=flare_class) as span:
+            features = analog_features(merged_df, flare_class)
+            usable = ~np.isnan(features).any(axis=1)
+            outcome = shifted_labels(merged_days, merged_df[label_col], horizons)
+            X = lagged_features(features, pos, found)               # (horizons, days, 4)
+            queryable = ~np.isnan(X).any(axis=2)
+            y_prob = np.full(pos.shape, np.nan)
+
+            index = AnalogIndex(features.shape[1])
+            added = 0
+            for m in range(len(months)):
+                new = np.arange(added, n_before[m])
+                index.add(features[new[usable[new]]], new[usable[new]])
+                added = n_before[m]
+
+                rows, cols = np.nonzero(queryable[:, month_bounds[m]:month_bounds[m + 1]])
+                cols += month_bounds[m]
+                if len(rows) and len(index) >= k:
+                    y_prob[rows, cols] = analog_rates(index, X[rows, cols], rows, lags, month_start[m],
+                                                      merged_days, outcome, k)
+                    span.count("queries", len(rows))
+
+            y_true = eval_df[label_col].to_numpy()
+            for h, (_, lead_name) in enumerate(leads(horizons)):
+                ok = ~np.isnan(y_prob[h])
+                probs[f"{flare_class.upper()}_{lead_name}"] = forecast_frame(
+                    eval_days[ok], y_true[ok], y_prob[h][ok])
+                span.count("days", int(ok.sum()))
+
+    return probs
+
+
+def run_analog(eval_df, merged_df, use_cache=True, probs=None):
+    """
+    Run the analog ensemble with monthly expanding windows.
+
+    Per-day forecasts come from analog_probabilities(); pass `probs` to
+    score forecasts that were already computed. Nothing is fitted, so
+    use_cache is unused (kept for the run_* signature).
+    """
+    if probs is None:
+        probs = analog_probabilities(eval_df, merged_df)
+    results = {}
+
+    for key, frame in probs.items():
+        metrics = evaluate_forecasts(frame)
+        results[key] = metrics
+        print(f"  Analog {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
+              f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
+              f"Brier={metrics['Brier']}, AUC={metrics['AUC']}, TSS={metrics['TSS']}")
+
+    return results
+
+
+if __name__ == "__main__":
+    PROC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "data", "processed")
+
+    eval_df = pd.read_csv(os.path.join(PROC, "evaluation_dataset.csv"))
+    eval_df["date"] = pd.to_datetime(eval_df["date"])
+
+    merged_df = pd.read_csv(os.path.join(PROC, "merged_dataset.csv"))
+    merged_df["date"] = pd.to_datetime(merged_df["date"])
+
+    print(f"Running analog ensemble (K={K_NEIGHBOURS})...")
+    run_analog(eval_df, merged_df)
@@ -10,55 +10,62 @@ This model depends on the other models' probability outputs.
 
 import os
 import sys
-import json
 import numpy as np
-import pandas as pd
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from metrics import compute_all_metrics, threshold_predictions
+from metrics import evaluate_forecasts
+from features import as_days, forecast_frame
 
+COMPONENTS = {
+    "M": ["Climatology", "Persistence", "Naive_Bayes", "Logistic_Reg"],
+    "X": ["Climatology", "Persistence", "Naive_Bayes"],
+}
 
-def run_baseline_average(eval_df, merged_df, clim_probs, persist_probs, nb_probs, lr_probs):
+
+def baseline_average_probabilities(forecasts):
     """
-    Compute Baseline Average from component model probabilities.
+    Per-day Baseline Average forecasts from the component models' forecasts.
 
     Parameters:
     -----------
-    eval_df : DataFrame
-    merged_df : DataFrame
-    clim_probs : dict of {key: array} — probabilities from climatology
-    persist_probs : dict of {key: array} — probabilities from persistence
-    nb_probs : dict of {key: array} — probabilities from naive bayes
-    lr_probs : dict of {key: array} — probabilities from logistic regression
-    """
-    results = {}
-
-    for flare_class in ["m", "x"]:
-        label_col = f"{flare_class}_label"
+    forecasts : dict
+        {model: {"M_24h": DataFrame(date, y_true, y_prob), ...}} containing the
+        COMPONENTS models (run_all.compute_forecasts)
 
-        for lead_name in ["24h", "48h", "72h"]:
-            key = f"{flare_class.upper()}_{lead_name}"
+    Returns:
+    --------
+    dict : {"M_24h": DataFrame(date, y_true, y_prob), ...}; days missing from
+    any component are skipped
+    """
+    probs = {}
+    for key in forecasts[COMPONENTS["X"][0]]:
+        frames = [forecasts[model][key] for model in COMPONENTS[key[0]]]
+        days = [as_days(frame["date"]) for frame in frames]
+        common = days[0]
+        for d in days[1:]:
+            common = np.intersect1d(common, d)
+        rows = [np.searchsorted(d, common) for d in days]
+        y_prob = np.mean([frame["y_prob"].to_numpy()[r] for frame, r in zip(frames, rows)], axis=0)
+        probs[key] = forecast_frame(common, frames[0]["y_true"].to_numpy()[rows[0]], y_prob)
+    return probs
 
-            # Get component probabilities (matching indices)
-            c = clim_probs[key]
-            p = persist_probs[key]
-            n = nb_probs[key]
 
-            if flare_class == "m":
-                # M-class: include LR (Assumption A2)
-                l = lr_probs[key]
-                avg_prob = (c + p + n + l) / 4.0
-            else:
-                # X-class: exclude LR
-                avg_prob = (c + p + n) / 3.0
+def run_baseline_average(forecasts, probs=None):
+    """
+    Evaluate the Baseline Average at theta=0.5.
 
-            y_true = eval_df[label_col].values[:len(avg_prob)].astype(int)
-            y_pred = threshold_predictions(avg_prob, theta=0.5)
+    Per-day forecasts come from baseline_average_probabilities(forecasts);
+    pass `probs` to score forecasts that were already computed.
+    """
+    if probs is None:
+        probs = baseline_average_probabilities(forecasts)
+    results = {}
 
-            metrics = compute_all_metrics(y_true, y_pred, avg_prob)
-            results[key] = metrics
-            print(f"  BA {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
-                  f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
-                  f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
+    for key, frame in probs.items():
+        metrics = evaluate_forecasts(frame)
+        results[key] = metrics
+        print(f"  BA {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
+              f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
+              f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
 
     return results
@@ -0,0 +1,129 @@
+"""
+Persistent cache of fitted baseline-model parameters.
+
+The expanding-window runners (Climatology, Naive Bayes, Logistic Regression)
+refit one model per flare class per month. The fitted parameters are small, so
+they are cached on disk and reused by later runs and ablations; only months
+whose training window changed are fitted again.
+
+Cache key: (model, class, training-end month, feature-set hash, code version)
+  - training-end month: the forecast month; training uses all data before it
+  - feature-set hash: digest of the feature/label column names and the values
+    of every training row, so any change to the processed data invalidates it
+  - code version: CACHE_VERSION of the model module plus the scikit-learn
+    version, so changes to the fitting code invalidate old entries
+
+Storage: one compressed array file per model in replicate/data/cache/
+(<model>.npz) holding a `keys` string array and a 2-D `params` float array,
+one row of flattened parameters per fit.
+"""
+
+import os
+import hashlib
+import numpy as np
+import sklearn
+
+from perf import PERF
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE, "data", "cache")
+
+
+def feature_hash(train_data, columns):
+    """Digest of the training window: column names, dates and column values."""
+    h = hashlib.sha1()
+    h.update(",".join(columns).encode())
+    if "date" in train_data.columns:
+        h.update(train_data["date"].values.astype("datetime64[D]").astype(np.int64).tobytes())
+    h.update(np.ascontiguousarray(train_data[columns].to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()[:16]
+
+
+class FitCache:
+    """
+    Fitted-parameter store for one model.
+
+    Parameters:
+    -----------
+    model : str
+        Model name, used as the file name (e.g. "climatology")
+    code_version : int
+        CACHE_VERSION of the model module
+    cache_dir : str
+        Directory holding the <model>.npz files
+    enabled : bool
+        If False, get() always misses and save() is a no-op
+    """
+
+    def __init__(self, model, code_version, cache_dir=CACHE_DIR, enabled=True):
+        self.model = model
+        self.version = f"v{code_version}-sk{sklearn.__version__}"
+        self.path = os.path.join(cache_dir, f"{model}.npz")
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._dirty = False
+        if enabled and os.path.exists(self.path):
+            with np.load(self.path, allow_pickle=False) as data:
+                for key, row in zip(data["keys"], data["params"]):
+                    self._entries[str(key)] = row
+
+    def key(self, flare_class, month, fhash):
+        """Build the cache key for one fit; `month` is the training-end month."""
+        return f"{self.model}|{flare_class}|{month}|{fhash}|{self.version}"
+
+    def get(self, key):
+        """Return the cached parameter vector for `key`, or None on a miss."""
+        params = self._entries.get(key) if self.enabled else None
+        if params is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return params
+
+    def put(self, key, params):
+        """Store a parameter vector (any shape; flattened to one row)."""
+        if not self.enabled:
+            return
+        self._entries[key] = np.asarray(params, dtype=float).ravel()
+        self._dirty = True
+
+    def fetch(self, flare_class, month, train_data, columns, fit):
+        """
+        Return cached parameters for this training window, calling `fit()` on a miss.
+
+        `columns` are the feature and label columns the fit depends on; they
+        feed the feature-set hash (skipped when the cache is disabled).
+        """
+        if not self.enabled:
+            self.misses += 1
+            PERF.count("fits")
+            return np.asarray(fit(), dtype=float).ravel()
+        key = self.key(flare_class, month, feature_hash(train_data, columns))
+        params = self.get(key)
+        if params is None:
+            params = np.asarray(fit(), dtype=float).ravel()
+            self.put(key, params)
+            PERF.count("fits")
+        else:
+            PERF.count("cache_hits")
+        return params
+
+    def save(self):
+        """Write the cache file if anything new was stored."""
+        if not (self.enabled and self._dirty):
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        keys = list(self._entries)
+        width = max(len(v) for v in self._entries.values())
+        params = np.full((len(keys), width), np.nan)
+        for i, k in enumerate(keys):
+            row = self._entries[k]
+            params[i, :len(row)] = row
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"      # workers of a sweep may save concurrently
+        np.savez_compressed(tmp_path, keys=np.array(keys), params=params)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        print(f"  Fit cache {self.model}: {self.hits} hits, {self.misses} fits, "
+              f"{len(keys)} entries saved")
@@ -18,177 +18,213 @@ import numpy as np
 import pandas as pd
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from metrics import compute_all_metrics, threshold_predictions
+from metrics import evaluate_forecasts
+from perf import PERF
+from model_cache import FitCache
+from features import leads, as_days, feature_rows, lagged_features, forecast_frame
+
+# Bump when the table-fitting logic changes (invalidates the fit cache)
+CACHE_VERSION = 1
+N_BINS = 22  # x1 bins {0..20, >20}; x2 bins {0, 10, ..., 200, >200}
+# (x1 cap, x2 bin width, x2 cap) of the bins above; other binnings are sweep options (sweep.py)
+BINS = (20, 10, 200)
+
+
+def bin_labels(bins=BINS):
+    """Labels of the x1 and x2 bins, in bin order ({0..20, ">20"} and {0, 10, ..., 200, ">200"})."""
+    x1_max, x2_width, x2_max = bins
+    return {
+        "x1_consecutive_flare_free_days": list(range(x1_max + 1)) + [f">{x1_max}"],
+        "x2_sunspot_number": list(range(0, x2_max + 1, x2_width)) + [f">{x2_max}"],
+    }
+
+
+def parse_bins(spec):
+    """BINS from "x1_cap/x2_width/x2_cap", e.g. "20/10/200" (or a BINS-like tuple)."""
+    parts = spec if isinstance(spec, (tuple, list)) else str(spec).split("/")
+    bins = tuple(int(v) for v in parts)
+    if len(bins) != 3 or min(bins) <= 0 or bins[2] % bins[1]:
+        raise ValueError(f"bins must be x1_cap/x2_width/x2_cap with x2_cap a multiple of x2_width: {spec!r}")
+    return bins
+
 
+def n_cells(bins=BINS):
+    """Number of (x1_bin, x2_bin) cells of a binning (N_BINS * N_BINS for BINS)."""
+    x1_max, x2_width, x2_max = bins
+    return (x1_max + 2) * (x2_max // x2_width + 2)
 
-def bin_consec_free(x1):
-    """Bin consecutive flare-free days: {0, 1, ..., 20, >20}"""
-    if x1 > 20:
-        return 21  # represents ">20"
-    return int(x1)
 
+def climatology_cells(x1, x2, bins=BINS):
+    """Flattened (x1_bin, x2_bin // 10) cell index for arrays of x1 and x2."""
+    x1_max, x2_width, x2_max = bins
+    n2 = x2_max // x2_width + 2
+    x1 = np.asarray(x1, dtype=float)
+    x2 = np.asarray(x2, dtype=float)
+    x1_bin = np.where(x1 > x1_max, x1_max + 1, x1.astype(int))
+    x2_bin = np.where(x2 > x2_max, n2 - 1, (x2 // x2_width).astype(int))
+    return x1_bin * n2 + x2_bin
 
-def bin_sunspot(x2):
-    """Bin sunspot number: {0, 10, 20, ..., 200, >200}
-    Each bin is a multiple of 10 (floor division).
-    >200 maps to 210 (or any value > 200).
+
+def fit_climatology_counts(train_data, label_col, consec_col, bins=BINS):
+    """
+    Count flare days and total days per (x1_bin, x2_bin) cell.
+
+    Returns:
+    --------
+    ndarray of shape (2, n_cells(bins)): [flare counts, total counts], indexed
+    by climatology_cells(x1, x2, bins)
     """
-    if x2 > 200:
-        return 210  # represents ">200"
-    return int(x2 // 10) * 10
+    cell = climatology_cells(train_data[consec_col], train_data["sunspot_number"], bins)
+    flare = (train_data[label_col].to_numpy() == 1)
+    size = n_cells(bins)
+    return np.stack([np.bincount(cell[flare], minlength=size),
+                     np.bincount(cell, minlength=size)]).astype(float)
+
 
+def probabilities_from_counts(counts, cells):
+    """Vectorized table lookup: P(flare) per cell, 0.0 for cells unseen in training."""
+    counts = np.asarray(counts).reshape(2, -1)
+    flare = counts[0, cells]
+    total = counts[1, cells]
+    return np.divide(flare, total, out=np.zeros(len(cells)), where=total > 0)
 
-def train_climatology_table(train_data, label_col, consec_col):
+
+def monthly_counts(merged_df, months, flare_class, cache, bins=BINS, totals=None):
     """
-    Build the climatology lookup table from training data.
+    Climatology cell counts for each forecast month (expanding window: every
+    day of merged_df before the month), through the fit cache.
+
+    The counts are accumulated month by month, so each month only bins the
+    days added since the previous one. `totals`, the (2, n_cells) counts of
+    every day of merged_df (the append state's running counts), gives the
+    months from the last day's month on: their counts are the totals minus
+    the stored days since the month began, without a cache lookup (which
+    hashes the whole training window).
 
     Returns:
     --------
-    dict: (x1_bin, x2_bin) -> probability
+    ndarray (len(months), 2, n_cells(bins)) of [flare counts, total counts];
+    zeros for months with no earlier data
     """
-    # Count flares and total occurrences per bin
-    flare_counts = {}
-    total_counts = {}
+    label_col = f"{flare_class}_label"
+    consec_col = f"{flare_class}_consec_free"
+    columns = [consec_col, "sunspot_number", label_col]
+    days = as_days(merged_df["date"])
+    n_train = np.searchsorted(days, np.asarray(months).astype("datetime64[D]"), side="left")
+    size = n_cells(bins)
+    cells = climatology_cells(merged_df[consec_col], merged_df["sunspot_number"], bins)
+    flare = merged_df[label_col].to_numpy() == 1
+
+    out = np.zeros((len(months), 2, size))
+    running = np.zeros((2, size))
+    counted = 0
+    for k, month in enumerate(months):
+        n = n_train[k]
+        if n == 0:
+            continue
+
+        def fit():
+            new = slice(counted, n)
+            return running + np.stack([
+                np.bincount(cells[new][flare[new]], minlength=size),
+                np.bincount(cells[new], minlength=size),
+            ])
+
+        if totals is not None and np.datetime64(month, "M") >= days[-1].astype("datetime64[M]"):
+            tail = slice(n, len(merged_df))
+            running = np.asarray(totals, dtype=float).reshape(2, size) - np.stack([
+                np.bincount(cells[tail][flare[tail]], minlength=size),
+                np.bincount(cells[tail], minlength=size),
+            ])
+        else:
+            running = cache.fetch(flare_class, str(month), merged_df.iloc[:n], columns, fit).reshape(2, size)
+        counted = n
+        out[k] = running
+    return out
+
+
+def climatology_probabilities(eval_df, merged_df, use_cache=True, horizons=None, timing="issue", bins=BINS):
+    """
+    Per-day climatology forecasts for every class and lead time (horizons
+    in days, default features.HORIZONS).
+
+    Monthly expanding window: the table used for month m counts every day
+    before m. The counts are accumulated month by month (each month adds only
+    the days since the previous one) and kept in the fit cache (model_cache.py).
+    The tables do not depend on the lead time, so every horizon is a lookup
+    in the same counts.
+
+    Features come from the issue day (target - lead_days), since x1 on the
+    target day is not known when the forecast is made; if the issue day is
+    missing from merged_df the target day's own features are used instead.
+    timing="target" uses the target day's features throughout (the other
+    reading of the paper, features.FEATURE_TIMINGS). `bins` (x1 cap, x2 bin
+    width, x2 cap) replaces the paper's binning; other binnings bypass the
+    fit cache.
 
-    for _, row in train_data.iterrows():
-        x1_bin = bin_consec_free(row[consec_col])
-        x2_bin = bin_sunspot(row["sunspot_number"])
-        key = (x1_bin, x2_bin)
+    Returns:
+    --------
+    dict : {"M_24h": DataFrame(date, y_true, y_prob), ...}
+    """
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    eval_df = eval_df.sort_values("date").reset_index(drop=True)
+    merged_days = as_days(merged_df["date"])
+    eval_days = as_days(eval_df["date"])
+
+    # Month of each evaluation day; training rows for month k are merged_df.iloc[:n_train[k]]
+    months, month_of_day = np.unique(eval_days.astype("datetime64[M]"), return_inverse=True)
+    n_train = np.searchsorted(merged_days, months.astype("datetime64[D]"), side="left")
+    trained = n_train[month_of_day] > 0
+    pos, found = feature_rows(merged_days, eval_days, horizons, timing)
 
-        total_counts[key] = total_counts.get(key, 0) + 1
-        if row[label_col] == 1:
-            flare_counts[key] = flare_counts.get(key, 0) + 1
+    cache = FitCache("climatology", CACHE_VERSION, enabled=use_cache and tuple(bins) == BINS)
+    probs = {}
+
+    for flare_class in ["m", "x"]:
+        label_col = f"{flare_class}_label"
+        consec_col = f"{flare_class}_consec_free"
 
-    # Compute probabilities
-    table = {}
-    for key in total_counts:
-        n_flare = flare_counts.get(key, 0)
-        n_total = total_counts[key]
-        table[key] = n_flare / n_total
+        with PERF.span("model.climatology", flare_class=flare_class) as span:
+            cells = climatology_cells(merged_df[consec_col], merged_df["sunspot_number"], bins)
+            own_cells = climatology_cells(eval_df[consec_col], eval_df["sunspot_number"], bins)
+            lead_cells = np.where(found, lagged_features(cells, pos, found, fill=0), own_cells)
 
-    return table
+            counts = monthly_counts(merged_df, months, flare_class, cache, bins)
+            flare = counts[month_of_day, 0, lead_cells]
+            total = counts[month_of_day, 1, lead_cells]
+            y_prob = np.divide(flare, total, out=np.zeros(lead_cells.shape), where=total > 0)
 
+            y_true = eval_df[label_col].to_numpy()
+            for h, (_, lead_name) in enumerate(leads(horizons)):
+                probs[f"{flare_class.upper()}_{lead_name}"] = forecast_frame(
+                    eval_days[trained], y_true[trained], y_prob[h][trained])
+                span.count("days", int(trained.sum()))
 
-def predict_climatology(row, table, consec_col):
-    """Look up climatology probability for a single day."""
-    x1_bin = bin_consec_free(row[consec_col])
-    x2_bin = bin_sunspot(row["sunspot_number"])
-    key = (x1_bin, x2_bin)
-    return table.get(key, 0.0)  # Default to 0 if bin not seen in training
+    cache.save()
+    return probs
 
 
-def run_climatology(eval_df, merged_df):
+def run_climatology(eval_df, merged_df, use_cache=True, probs=None):
     """
     Run climatology model with monthly expanding-window retraining.
 
     For each month in the evaluation period:
     1. Train on all data before this month
     2. Issue predictions for each day in this month
-    """
-    merged_df = merged_df.sort_values("date").reset_index(drop=True)
-    merged_df["date"] = pd.to_datetime(merged_df["date"])
-    eval_df = eval_df.copy()
-    eval_df["date"] = pd.to_datetime(eval_df["date"])
 
+    Per-day forecasts come from climatology_probabilities(); pass `probs` to
+    score forecasts that were already computed.
+    """
+    if probs is None:
+        probs = climatology_probabilities(eval_df, merged_df, use_cache=use_cache)
     results = {}
 
-    for flare_class in ["m", "x"]:
-        label_col = f"{flare_class}_label"
-        consec_col = f"{flare_class}_consec_free"
-
-        # For each lead time (24h, 48h, 72h), climatology gives the same
-        # probability since it doesn't use the forecast lead time.
-        # However, we evaluate against different ground truth alignment.
-        # Actually, climatology predicts P(flare on day D), which is the
-        # same regardless of when we made the prediction.
-        # The paper evaluates all models at each lead time using the
-        # forecast issued at that lead time. For climatology, the prediction
-        # for day D is the same whether issued 1, 2, or 3 days ahead.
-        # But the consecutive flare-free days (x1) should be computed
-        # as of the forecast issue date, not the target date.
-
-        # Actually, re-reading the paper: for climatology, x1 and x2 are
-        # computed for the target day itself. The "monthly retraining" means
-        # the lookup table is retrained monthly, but x1/x2 features are for
-        # the day being predicted.
-
-        # For lead times: the same prediction is used since climatology
-        # doesn't have a lead-time component. The evaluation metric
-        # differences come only from the different ground truth alignment
-        # in the SWPC forecasts (not applicable to climatology).
-
-        # Wait, actually for climatology, the prediction for each lead time
-        # should use features as known at forecast time:
-        # - 24h ahead: features from D-1
-        # - 48h ahead: features from D-2
-        # - 72h ahead: features from D-3
-        # But this would mean using different x1 values for different lead times.
-
-        # The paper doesn't specify this clearly. Since persistence uses the
-        # same binary label for all lead times, and climatology uses (x1, x2)
-        # for the current day, let me use target-day features and see if it matches.
-
-        for lead_days, lead_name in [(1, "24h"), (2, "48h"), (3, "72h")]:
-            y_true_list = []
-            y_prob_list = []
-
-            # Get unique months in evaluation period
-            eval_months = sorted(eval_df["date"].dt.to_period("M").unique())
-
-            for month in eval_months:
-                month_start = month.start_time
-                month_end = month.end_time
-
-                # Training data: all data before this month
-                train_mask = merged_df["date"] < month_start
-                train_data = merged_df[train_mask]
-
-                if len(train_data) == 0:
-                    continue
-
-                # Build lookup table
-                table = train_climatology_table(train_data, label_col, consec_col)
-
-                # Predict for each day in this month that's in eval period
-                month_eval = eval_df[
-                    (eval_df["date"] >= month_start) &
-                    (eval_df["date"] <= month_end)
-                ]
-
-                for _, row in month_eval.iterrows():
-                    # Use target day's features for the lookup.
-                    # The lead time variation in results comes from the fact
-                    # that the training table is the same but x1 for the
-                    # target day naturally differs from x1 on the issue day.
-                    # However, the paper likely uses issue-day features since
-                    # you can't know the target day's x1 in advance.
-                    #
-                    # For the forecast issued lead_days ahead:
-                    # x1 on the issue day (D - lead_days) is used as the feature.
-                    target_date = pd.Timestamp(row["date"])
-                    feature_date = target_date - pd.Timedelta(days=lead_days)
-
-                    # Look up the feature row from the issue date
-                    feature_row = merged_df[merged_df["date"] == feature_date]
-                    if len(feature_row) == 0:
-                        feature_row = pd.DataFrame([row])
-
-                    feature_row = feature_row.iloc[0]
-                    prob = predict_climatology(feature_row, table, consec_col)
-
-                    y_true_list.append(int(row[label_col]))
-                    y_prob_list.append(prob)
-
-            y_true = np.array(y_true_list)
-            y_prob = np.array(y_prob_list)
-            y_pred = threshold_predictions(y_prob, theta=0.5)
-
-            metrics = compute_all_metrics(y_true, y_pred, y_prob)
-            key = f"{flare_class.upper()}_{lead_name}"
-            results[key] = metrics
-            print(f"  Climatology {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
-                  f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
-                  f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
+    for key, frame in probs.items():
+        metrics = evaluate_forecasts(frame)
+        results[key] = metrics
+        print(f"  Climatology {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
+              f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
+              f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
 
     return results
 
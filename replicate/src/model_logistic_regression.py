@@ -9,6 +9,13 @@ Features:
 
 Monthly retraining with expanding window.
 Uses scikit-learn LogisticRegression (Assumption A8).
+
+path_params() is a second engine for the same objective: damped Newton on
+standardized features, warm-started from the previous month (one or two
+steps per month), fitting a whole grid of C values per solve. It backs
+solver="newton" and logistic_regression_path(), and the --path option
+(python model_logistic_regression.py --path 0.01,0.1,1,10,100) that scores
+the LR against the paper for every C of the grid.
 """
 
 import os
@@ -16,76 +23,322 @@ import sys
 import json
 import numpy as np
 import pandas as pd
+from scipy.special import expit
 from sklearn.linear_model import LogisticRegression
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from metrics import compute_all_metrics, threshold_predictions
-
-
-def run_logistic_regression(eval_df, merged_df):
-    """Run LR with monthly expanding-window retraining."""
+from metrics import evaluate_forecasts
+from perf import PERF
+from model_cache import FitCache
+from features import leads, as_days, feature_rows, lagged_features, forecast_frame
+
+# Bump when the fitting logic changes (invalidates the fit cache)
+CACHE_VERSION = 1
+# logistic_regression_probabilities(solver=...): sklearn's lbfgs (the published runs) or path_params()
+LR_SOLVERS = ("lbfgs", "newton")
+
+
+def lr_params(lr):
+    """Flatten a fitted LogisticRegression into [intercept, coef_x1, coef_x2]."""
+    return np.concatenate([lr.intercept_, lr.coef_.ravel()])
+
+
+def lr_from_params(params):
+    """Rebuild a fitted LogisticRegression from the vector produced by lr_params."""
+    lr = LogisticRegression(max_iter=1000)
+    lr.classes_ = np.array([0, 1])
+    lr.n_features_in_ = 2
+    lr.intercept_ = params[0:1]
+    lr.coef_ = params[1:3].reshape(1, 2)
+    return lr
+
+
+def lr_predict_proba(params, X):
+    """
+    P(y=1 | x) for rows of X, each with its own [intercept, coef_x1, coef_x2]
+    (params broadcast against X); the LogisticRegression decision function
+    computed directly in numpy (logistic_regression_probabilities,
+    forecast_service.py).
+    """
+    params = np.asarray(params, dtype=float)
+    X = np.asarray(X, dtype=float)
+    z = params[..., 0] + (params[..., 1:3] * X).sum(axis=-1)
+    return expit(z)
+
+
+def fit_logistic_newton(design, y_train, C=1.0, start=None, tol=1e-8, max_iter=50):
+    """
+    Same objective as fit_logistic_regression() (log-loss plus an L2 penalty
+    of 1/(2C) on the coefficients, intercept unpenalized), minimized with
+    Newton's method from `start` (a previous parameter vector).
+
+    `design` is the feature matrix with a leading column of ones
+    (np.column_stack([np.ones(n), X_train])), so that callers refitting on
+    growing prefixes of the same rows build it once. Started from the
+    previous day's or week's fit, a single Newton step usually reaches the
+    optimum; lbfgs (tol 1e-4) approximates it to about 1e-5 in probability.
+
+    Returns:
+    --------
+    (params, n_iter): [intercept, coef_x1, coef_x2] and the number of steps
+    """
+    start = None if start is None else np.asarray(start, dtype=float)[None, :]
+    beta, it = fit_logistic_path(design, y_train, [C], start=start, tol=tol, max_iter=max_iter)
+    return beta[0], it
+
+
+def fit_logistic_path(design, y_train, Cs, scale=None, start=None, tol=1e-8, max_iter=50):
+    """
+    fit_logistic_newton() for several C at once: every Newton step scores
+    all of them with one pass over the rows (a matrix product with the
+    (n, len(Cs)) probabilities).
+
+    `scale` (one value per feature column of design, default 1) divides the
+    coefficients inside the penalty, 1/(2C) sum (beta_j / scale_j)^2: with
+    design columns standardized by their standard deviations, passing those
+    deviations gives the optimum of the penalty on the raw coefficients.
+
+    Returns:
+    --------
+    (params, n_iter): (len(Cs), 3) parameters and the number of steps
+    """
+    y = np.asarray(y_train, dtype=float)
+    Cs = np.asarray(Cs, dtype=float)
+    scale = np.ones(design.shape[1] - 1) if scale is None else np.asarray(scale, dtype=float)
+    reg = np.concatenate([np.zeros((len(Cs), 1)), 1.0 / (Cs[:, None] * scale ** 2)], axis=1)
+    beta = np.zeros((len(Cs), 3)) if start is None else np.array(start, dtype=float)
+    outer = (design[:, :, None] * design[:, None, :]).reshape(len(design), 9)
+    for it in range(1, max_iter + 1):
+        p = expit(design @ beta.T)                                  # (n, len(Cs))
+        grad = (p - y[:, None]).T @ design + reg * beta
+        hess = ((p * (1 - p)).T @ outer).reshape(-1, 3, 3) + reg[:, :, None] * np.eye(3)
+        try:
+            step = np.linalg.solve(hess, grad[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            step = np.stack([np.linalg.lstsq(h, g, rcond=None)[0] for h, g in zip(hess, grad)])
+        # Damped Newton: full steps near the optimum (Newton decrement below
+        # 1/4), shortened ones far from it, where a full step can overshoot
+        # (e.g. a cold start on unscaled features)
+        decrement = np.sqrt(np.maximum((grad * step).sum(axis=1), 0.0))
+        step = np.where(decrement[:, None] > 0.25, step / (1 + decrement[:, None]), step)
+        beta -= step
+        # Quadratic convergence: after a step of size s the remaining error is O(s^2)
+        if (np.abs(step).max(axis=1) ** 2 <= tol * (1 + np.abs(beta).max(axis=1))).all():
+            break
+    return beta, it
+
+
+def fit_logistic_regression(X_train, y_train, C=1.0):
+    """Fit LogisticRegression (inverse regularization strength C) and return its flattened parameters."""
+    lr = LogisticRegression(C=C, max_iter=1000)
+    lr.fit(X_train, y_train)
+    return lr_params(lr)
+
+
+def monthly_params(merged_df, months, flare_class, cache, C=1.0):
+    """
+    Fitted parameters for each forecast month (expanding window: every day
+    of merged_df before the month), through the fit cache.
+
+    Parameters:
+    -----------
+    merged_df : DataFrame
+        Full merged dataset, sorted by date
+    months : array of datetime64[M]
+        Forecast months
+    flare_class : str
+        "m" or "x"
+    cache : FitCache
+    C : float
+        Inverse L2 regularization strength
+
+    Returns:
+    --------
+    ndarray (len(months), 3); rows of NaN where the window has no data or
+    only one class
+    """
+    label_col = f"{flare_class}_label"
+    consec_col = f"{flare_class}_consec_free"
+    n_train = np.searchsorted(as_days(merged_df["date"]), np.asarray(months).astype("datetime64[D]"), side="left")
+    params = np.full((len(months), 3), np.nan)
+
+    for k, month in enumerate(months):
+        train_data = merged_df.iloc[:n_train[k]].dropna(subset=[consec_col, "sunspot_number"])
+        if len(train_data) == 0 or train_data[label_col].nunique() < 2:
+            continue
+
+        X_train = train_data[[consec_col, "sunspot_number"]].values
+        y_train = train_data[label_col].values.astype(int)
+        params[k] = cache.fetch(
+            flare_class, str(month), train_data,
+            [consec_col, "sunspot_number", label_col],
+            lambda: fit_logistic_regression(X_train, y_train, C),
+        )
+    return params
+
+
+def path_params(merged_df, months, flare_class, Cs=(1.0,)):
+    """
+    Fitted parameters for each C and forecast month (expanding window: every
+    day of merged_df before the month), without sklearn.
+
+    Each month standardizes the features with the mean and standard
+    deviation of its window, from running sums of x and x^2, fits every C
+    in one fit_logistic_path() solve on the standardized rows (the penalty
+    still on the raw coefficients, so each C has the optimum
+    fit_logistic_regression() approximates) and starts from the previous
+    month's coefficients; one or two Newton steps per month.
+
+    Returns:
+    --------
+    (params, n_steps): params (len(Cs), len(months), 3), rows of NaN where
+    the window has no data or only one class
+    """
+    X = merged_df[[f"{flare_class}_consec_free", "sunspot_number"]].to_numpy(dtype=float)
+    y = merged_df[f"{flare_class}_label"].to_numpy().astype(float)
+    valid = ~np.isnan(X).any(axis=1)
+    X, y = X[valid], y[valid]
+    n_train = np.searchsorted(as_days(merged_df["date"]), np.asarray(months).astype("datetime64[D]"), side="left")
+    n_fit = np.concatenate([[0], np.cumsum(valid)])[n_train]
+    # Running moments of the valid rows: prefix sums of x, x^2 and y
+    sum_x = np.vstack([np.zeros(2), np.cumsum(X, axis=0)])
+    sum_x2 = np.vstack([np.zeros(2), np.cumsum(X * X, axis=0)])
+    n_pos = np.concatenate([[0], np.cumsum(y)])
+
+    params = np.full((len(Cs), len(months), 3), np.nan)
+    beta, steps = None, 0
+    for k, n in enumerate(n_fit):
+        if n_pos[n] == 0 or n_pos[n] == n:
+            continue                                # fewer than two classes so far
+        if k > 0 and n == n_fit[k - 1] and beta is not None:
+            params[:, k] = beta
+            continue
+        mean = sum_x[n] / n
+        std = np.sqrt(np.maximum(sum_x2[n] / n - mean ** 2, 0.0))
+        std[std == 0] = 1.0
+        design = np.column_stack([np.ones(n), (X[:n] - mean) / std])
+        # Previous month's raw coefficients in this month's standardized units
+        start = None if beta is None else np.column_stack([beta[:, 0] + beta[:, 1:] @ mean, beta[:, 1:] * std])
+        b, it = fit_logistic_path(design, y[:n], Cs, scale=std, start=start, tol=1e-10)
+        beta = np.column_stack([b[:, 0] - (b[:, 1:] / std) @ mean, b[:, 1:] / std])
+        params[:, k] = beta
+        steps += it
+    return params, steps
+
+
+def logistic_regression_path(eval_df, merged_df, Cs, horizons=None, timing="issue"):
+    """
+    Per-day LR forecasts for several inverse regularization strengths at
+    once: {C: {"M_24h": DataFrame(date, y_true, y_prob), ...}}, from one
+    path_params() run per class (about the cost of a single C).
+    """
     merged_df = merged_df.sort_values("date").reset_index(drop=True)
-    merged_df["date"] = pd.to_datetime(merged_df["date"])
-    eval_df = eval_df.copy()
-    eval_df["date"] = pd.to_datetime(eval_df["date"])
+    eval_df = eval_df.sort_values("date").reset_index(drop=True)
+    merged_days = as_days(merged_df["date"])
+    eval_days = as_days(eval_df["date"])
 
-    results = {}
+    months, month_of_day = np.unique(eval_days.astype("datetime64[M]"), return_inverse=True)
+    pos, found = feature_rows(merged_days, eval_days, horizons, timing)
+    Cs = [float(C) for C in Cs]
+    probs = {C: {} for C in Cs}
 
     for flare_class in ["m", "x"]:
         label_col = f"{flare_class}_label"
-        consec_col = f"{flare_class}_consec_free"
-
-        for lead_days, lead_name in [(1, "24h"), (2, "48h"), (3, "72h")]:
-            y_true_list = []
-            y_prob_list = []
-
-            eval_months = sorted(eval_df["date"].dt.to_period("M").unique())
+        with PERF.span("model.logistic_regression_path", flare_class=flare_class, n_C=len(Cs)) as span:
+            X_all = merged_df[[f"{flare_class}_consec_free", "sunspot_number"]].to_numpy(dtype=float)
+            X = lagged_features(X_all, pos, found)
+            params, steps = path_params(merged_df, months, flare_class, Cs)
+            span.count("newton_steps", steps)
+            y_true = eval_df[label_col].to_numpy()
+            for C, by_month in zip(Cs, params):
+                with np.errstate(invalid="ignore"):
+                    y_prob = lr_predict_proba(by_month[month_of_day], X)
+                y_prob[:, np.isnan(by_month[month_of_day]).any(axis=1)] = np.nan
+                for h, (_, lead_name) in enumerate(leads(horizons)):
+                    ok = ~np.isnan(y_prob[h])
+                    probs[C][f"{flare_class.upper()}_{lead_name}"] = forecast_frame(
+                        eval_days[ok], y_true[ok], y_prob[h][ok])
+                    span.count("days", int(ok.sum()))
+    return probs
+
+
+def logistic_regression_probabilities(eval_df, merged_df, use_cache=True, horizons=None, timing="issue", C=1.0,
+                                      solver="lbfgs"):
+    """
+    Per-day LR forecasts for every class and lead time (horizons in
+    days, default features.HORIZONS).
+
+    One model is fitted per class per month on all days before that month
+    (fitted coefficients are kept in the fit cache, model_cache.py); every
+    day of every horizon is then scored in one batch with its month's
+    parameters. Features come from the issue day (target - lead_days); days
+    whose issue day is missing are skipped. timing="target" uses the target
+    day's own features instead (features.FEATURE_TIMINGS). C is the inverse
+    L2 regularization strength (sklearn's default 1.0, Assumption A8);
+    other values bypass the fit cache. solver="newton" fits the same
+    objective to convergence with path_params() instead of sklearn's lbfgs
+    (no fit cache; probabilities differ from lbfgs by ~1e-5).
+
+    Returns:
+    --------
+    dict : {"M_24h": DataFrame(date, y_true, y_prob), ...}
+    """
+    if solver not in LR_SOLVERS:
+        raise ValueError(f"solver must be one of {LR_SOLVERS}: {solver!r}")
+    if solver == "newton":
+        return logistic_regression_path(eval_df, merged_df, [C], horizons, timing)[float(C)]
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    eval_df = eval_df.sort_values("date").reset_index(drop=True)
+    merged_days = as_days(merged_df["date"])
+    eval_days = as_days(eval_df["date"])
 
-            for month in eval_months:
-                month_start = month.start_time
-                month_end = month.end_time
+    months, month_of_day = np.unique(eval_days.astype("datetime64[M]"), return_inverse=True)
+    pos, found = feature_rows(merged_days, eval_days, horizons, timing)
 
-                train_mask = merged_df["date"] < month_start
-                train_data = merged_df[train_mask].dropna(subset=[consec_col, "sunspot_number"])
+    cache = FitCache("logistic_regression", CACHE_VERSION, enabled=use_cache and C == 1.0)
+    probs = {}
 
-                if len(train_data) == 0 or train_data[label_col].nunique() < 2:
-                    continue
+    for flare_class in ["m", "x"]:
+        label_col = f"{flare_class}_label"
+        consec_col = f"{flare_class}_consec_free"
 
-                X_train = train_data[[consec_col, "sunspot_number"]].values
-                y_train = train_data[label_col].values.astype(int)
+        with PERF.span("model.logistic_regression", flare_class=flare_class) as span:
+            X_all = merged_df[[consec_col, "sunspot_number"]].to_numpy(dtype=float)
+            params = monthly_params(merged_df, months, flare_class, cache, C)[month_of_day]
 
-                lr = LogisticRegression(max_iter=1000)
-                lr.fit(X_train, y_train)
+            # Every day of every horizon in one batch: (horizons, days)
+            with np.errstate(invalid="ignore"):
+                y_prob = lr_predict_proba(params, lagged_features(X_all, pos, found))
+            y_prob[:, np.isnan(params).any(axis=1)] = np.nan
 
-                month_eval = eval_df[
-                    (eval_df["date"] >= month_start) &
-                    (eval_df["date"] <= month_end)
-                ]
+            y_true = eval_df[label_col].to_numpy()
+            for h, (_, lead_name) in enumerate(leads(horizons)):
+                ok = ~np.isnan(y_prob[h])
+                probs[f"{flare_class.upper()}_{lead_name}"] = forecast_frame(
+                    eval_days[ok], y_true[ok], y_prob[h][ok])
+                span.count("days", int(ok.sum()))
 
-                for _, row in month_eval.iterrows():
-                    target_date = pd.Timestamp(row["date"])
-                    feature_date = target_date - pd.Timedelta(days=lead_days)
-                    fr = merged_df[merged_df["date"] == feature_date]
-                    if len(fr) == 0:
-                        continue
-                    feature_row = fr.iloc[0]
+    cache.save()
+    return probs
 
-                    X = np.array([[feature_row[consec_col], feature_row["sunspot_number"]]])
-                    prob = lr.predict_proba(X)[0, 1]
 
-                    y_true_list.append(int(row[label_col]))
-                    y_prob_list.append(prob)
+def run_logistic_regression(eval_df, merged_df, use_cache=True, probs=None):
+    """
+    Run LR with monthly expanding-window retraining.
 
-            y_true = np.array(y_true_list)
-            y_prob = np.array(y_prob_list)
-            y_pred = threshold_predictions(y_prob, theta=0.5)
+    Per-day forecasts come from logistic_regression_probabilities(); pass `probs` to
+    score forecasts that were already computed.
+    """
+    if probs is None:
+        probs = logistic_regression_probabilities(eval_df, merged_df, use_cache=use_cache)
+    results = {}
 
-            metrics = compute_all_metrics(y_true, y_pred, y_prob)
-            key = f"{flare_class.upper()}_{lead_name}"
-            results[key] = metrics
-            print(f"  LR {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
-                  f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
-                  f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
+    for key, frame in probs.items():
+        metrics = evaluate_forecasts(frame)
+        results[key] = metrics
+        print(f"  LR {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
+              f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
+              f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
 
     return results
 
@@ -100,37 +353,54 @@ if __name__ == "__main__":
     merged_df = pd.read_csv(os.path.join(PROC, "merged_dataset.csv"))
     merged_df["date"] = pd.to_datetime(merged_df["date"])
 
-    print("Running Logistic Regression model...")
-    results = run_logistic_regression(eval_df, merged_df)
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the LR baseline and compare it with the paper")
+    parser.add_argument("--path", help="comma-separated C values: score each with the warm-started path engine")
+    args = parser.parse_args()
+
+    if args.path:
+        Cs = [float(C) for C in args.path.split(",")]
+        print(f"Running Logistic Regression path over C = {Cs}...")
+        path = logistic_regression_path(eval_df, merged_df, Cs)
+        runs = {C: run_logistic_regression(eval_df, merged_df, probs=probs) for C, probs in path.items()}
+    else:
+        print("Running Logistic Regression model...")
+        runs = {1.0: run_logistic_regression(eval_df, merged_df)}
 
     targets_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
             os.path.abspath(__file__)))), "understand", "targets.json")
     with open(targets_path) as f:
         targets = json.load(f)
 
-    print("\n" + "=" * 80)
-    print("LOGISTIC REGRESSION: Paper vs Ours comparison")
-    print("=" * 80)
-
     table_map = {
         "M_24h": "table_2", "M_48h": "table_3", "M_72h": "table_4",
     }
 
-    for key, table_name in table_map.items():
-        paper = targets["tables"][table_name]["data"]["Logistic_Reg"]
-        ours = results[key]
-        print(f"\n{key} ({targets['tables'][table_name]['caption']}):")
-        print(f"  {'Metric':<12} {'Paper':>8} {'Ours':>8} {'Diff':>8} {'Status':>12}")
-        for metric in ["Accuracy", "Precision", "Recall", "F1", "Brier", "AUC",
-                        "CSI", "POD", "FAR", "TSS", "HSS"]:
-            p = paper[metric]
-            o = ours[metric]
-            diff = o - p
-            pct = abs(diff / p * 100) if p != 0 else (0 if o == 0 else 100)
-            if pct <= 1:
-                status = "MATCH"
-            elif pct <= 10:
-                status = f"CLOSE ({pct:.1f}%)"
-            else:
-                status = f"DISCREPANT ({pct:.1f}%)"
-            print(f"  {metric:<12} {p:>8.2f} {o:>8.2f} {diff:>+8.2f} {status:>12}")
+    for C, results in runs.items():
+        print("\n" + "=" * 80)
+        print(f"LOGISTIC REGRESSION (C={C:g}): Paper vs Ours comparison")
+        print("=" * 80)
+        n_match = n_cells = 0
+
+        for key, table_name in table_map.items():
+            paper = targets["tables"][table_name]["data"]["Logistic_Reg"]
+            ours = results[key]
+            print(f"\n{key} ({targets['tables'][table_name]['caption']}):")
+            print(f"  {'Metric':<12} {'Paper':>8} {'Ours':>8} {'Diff':>8} {'Status':>12}")
+            for metric in ["Accuracy", "Precision", "Recall", "F1", "Brier", "AUC",
+                            "CSI", "POD", "FAR", "TSS", "HSS"]:
+                p = paper[metric]
+                o = ours[metric]
+                diff = o - p
+                pct = abs(diff / p * 100) if p != 0 else (0 if o == 0 else 100)
+                if pct <= 1:
+                    status = "MATCH"
+                    n_match += 1
+                elif pct <= 10:
+                    status = f"CLOSE ({pct:.1f}%)"
+                else:
+                    status = f"DISCREPANT ({pct:.1f}%)"
+                n_cells += 1
+                print(f"  {metric:<12} {p:>8.2f} {o:>8.2f} {diff:>+8.2f} {status:>12}")
+
+        print(f"\nC={C:g}: {n_match}/{n_cells} cells MATCH")
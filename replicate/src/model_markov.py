@@ -0,0 +1,199 @@
+"""
+Markov-chain flare-state baseline.
+
+Each day is in one of three flare states (STATES): no M/X flare, an M-class
+flare but no X, or an X-class flare. A k-th order chain (ORDER) gives the
+probability of tomorrow's state from the states of the last k days:
+
+  P(s_t+1 = s | s_t-k+1..s_t = c) = (n(c -> s) + ALPHA) / (n(c) + 3 ALPHA)
+
+Forecasts for lead h come from the h-th power of the chain's transition
+matrix over the 3^k contexts, and are turned into class probabilities by
+the fraction of days in each state with the class label (an X day does not
+always carry an M label).
+
+Monthly retraining with expanding window, like the other models: the
+transition counts of every month are one bincount of all transitions by
+the month they enter the window, accumulated over months, so the 324
+retrains cost one pass over the data plus a few 3^k x 3^k matrix products
+per month. One chain serves both classes.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from metrics import evaluate_forecasts
+from perf import PERF
+from features import leads, as_days, issue_day_matrix, forecast_frame
+
+STATES = ("none", "M", "X")
+ORDER = 2
+ALPHA = 1.0
+
+
+def flare_states(merged_df):
+    """Daily state index into STATES: 2 on X-flare days, 1 on other M-flare days, else 0."""
+    m = merged_df["m_label"].to_numpy() == 1
+    x = merged_df["x_label"].to_numpy() == 1
+    return np.where(x, 2, np.where(m, 1, 0))
+
+
+def context_codes(sorted_days, states, length):
+    """
+    Code of the `length` days ending on each day: the base-3 number of their
+    states, today's state the last digit.
+
+    Returns:
+    --------
+    (codes, complete): complete[i] is False where one of those calendar days
+    is missing from sorted_days
+    """
+    slot = (np.asarray(sorted_days, dtype="datetime64[D]") - np.datetime64(0, "D")).astype(np.int64)
+    states = np.asarray(states)
+    codes = np.zeros(len(states), dtype=np.int64)
+    complete = np.ones(len(states), dtype=bool)
+    rows = np.arange(len(states))
+    for back in range(length):
+        src = rows - back
+        ok = src >= 0
+        src = np.maximum(src, 0)
+        complete &= ok & (slot[src] == slot - back)
+        codes += states[src] * 3 ** back
+    return codes, complete
+
+
+def window_counts(entry_month, codes, n_months, n_codes):
+    """
+    Counts of each code in every month's expanding window: (n_months, n_codes).
+
+    entry_month[i] is the first month whose window holds item i (n_months if
+    none); the counts are one bincount by entry month, accumulated.
+    """
+    counts = np.bincount(np.asarray(entry_month) * n_codes + codes, minlength=(n_months + 1) * n_codes)
+    return counts.reshape(n_months + 1, n_codes)[:n_months].cumsum(axis=0)
+
+
+def transition_matrices(counts, alpha=ALPHA):
+    """
+    Transition matrices over contexts from (..., 3^k, 3) transition counts:
+    (..., 3^k, 3^k), row c moving to context (c * 3) mod 3^k + s with
+    probability (n(c -> s) + alpha) / (n(c) + 3 alpha).
+    """
+    counts = np.asarray(counts, dtype=float)
+    n_ctx = counts.shape[-2]
+    p = (counts + alpha) / (counts.sum(axis=-1, keepdims=True) + 3 * alpha)
+    T = np.zeros(counts.shape[:-1] + (n_ctx,))
+    to = (np.arange(n_ctx)[:, None] * 3) % n_ctx + np.arange(3)
+    T[..., np.arange(n_ctx)[:, None], to] = p
+    return T
+
+
+def matrix_powers(T, powers):
+    """T^p for each p in `powers` (ascending), stacked on a new axis after T's leading axes."""
+    out = []
+    current = np.broadcast_to(np.eye(T.shape[-1]), T.shape)
+    done = 0
+    for p in powers:
+        for _ in range(p - done):
+            current = current @ T
+        done = p
+        out.append(current)
+    return np.stack(out, axis=-3)
+
+
+def markov_probabilities(eval_df, merged_df, horizons=None, order=ORDER, alpha=ALPHA):
+    """
+    Per-day Markov-chain forecasts for every class and lead time (horizons
+    in days, default features.HORIZONS).
+
+    One chain per month, from the transitions of all days before that
+    month; the forecast for target day D is read from the context of the
+    `order` days ending on the issue day (D - lead_days). Days whose context
+    is incomplete are skipped.
+
+    Returns:
+    --------
+    dict : {"M_24h": DataFrame(date, y_true, y_prob), ...}
+    """
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    eval_df = eval_df.sort_values("date").reset_index(drop=True)
+    merged_days = as_days(merged_df["date"])
+    eval_days = as_days(eval_df["date"])
+
+    months, month_of_day = np.unique(eval_days.astype("datetime64[M]"), return_inverse=True)
+    entry_month = np.searchsorted(months.astype("datetime64[D]"), merged_days, side="right")
+    lags = [h for h, _ in leads(horizons)]
+    pos, found = issue_day_matrix(merged_days, eval_days, horizons)
+    states = flare_states(merged_df)
+    n_ctx = 3 ** order
+    probs = {}
+
+    with PERF.span("model.markov", order=order) as span:
+        # Transition counts and chain powers of every month at once: (months, lags, 3^k, 3^k)
+        windows, complete = context_codes(merged_days, states, order + 1)
+        counts = window_counts(entry_month[complete], windows[complete], len(months), n_ctx * 3)
+        trained = counts.sum(axis=1) > 0
+        steps = sorted(set(lags))
+        powers = matrix_powers(transition_matrices(counts.reshape(-1, n_ctx, 3), alpha), steps)
+        powers = powers[:, [steps.index(h) for h in lags]]
+        context, context_ok = context_codes(merged_days, states, order)
+        span.count("months", int(trained.sum()))
+
+        for flare_class in ["m", "x"]:
+            label_col = f"{flare_class}_label"
+            labels = merged_df[label_col].to_numpy() == 1
+            # Fraction of each state's days with the class label, per month: (months, 3)
+            days_in = window_counts(entry_month, states * 2 + labels, len(months), 6).reshape(-1, 3, 2)
+            rate = np.divide(days_in[..., 1], days_in.sum(axis=-1),
+                             out=np.zeros(days_in.shape[:-1]), where=days_in.sum(axis=-1) > 0)
+            # P(class label on the day `lag` days after each context): (months, lags, 3^k)
+            q = powers @ rate[:, None, np.arange(n_ctx) % 3, None]
+            q = q[..., 0]
+
+            y_true = eval_df[label_col].to_numpy()
+            for h, (_, lead_name) in enumerate(leads(horizons)):
+                ok = found[h] & context_ok[pos[h]] & trained[month_of_day]
+                y_prob = q[month_of_day[ok], h, context[pos[h][ok]]]
+                probs[f"{flare_class.upper()}_{lead_name}"] = forecast_frame(
+                    eval_days[ok], y_true[ok], y_prob)
+                span.count("days", int(ok.sum()))
+
+    return probs
+
+
+def run_markov(eval_df, merged_df, probs=None):
+    """
+    Run the Markov-chain baseline with monthly expanding-window retraining.
+
+    Per-day forecasts come from markov_probabilities(); pass `probs` to
+    score forecasts that were already computed.
+    """
+    if probs is None:
+        probs = markov_probabilities(eval_df, merged_df)
+    results = {}
+
+    for key, frame in probs.items():
+        metrics = evaluate_forecasts(frame)
+        results[key] = metrics
+        print(f"  Markov {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
+              f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
+              f"Brier={metrics['Brier']}, AUC={metrics['AUC']}, TSS={metrics['TSS']}")
+
+    return results
+
+
+if __name__ == "__main__":
+    PROC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "data", "processed")
+
+    eval_df = pd.read_csv(os.path.join(PROC, "evaluation_dataset.csv"))
+    eval_df["date"] = pd.to_datetime(eval_df["date"])
+
+    merged_df = pd.read_csv(os.path.join(PROC, "merged_dataset.csv"))
+    merged_df["date"] = pd.to_datetime(merged_df["date"])
+
+    print(f"Running Markov-chain baseline (order {ORDER})...")
+    run_markov(eval_df, merged_df)
@@ -7,6 +7,14 @@ Uses GaussianNB (continuous features) since the paper doesn't specify discretiza
 for NB and the paper's results (high recall, high Brier ~0.36) are consistent with
 continuous Gaussian NB rather than discrete binned NB.
 
+variant="binned" is the other reading: categorical NB on the climatology bins
+(model_climatology.climatology_cells; x1 in {0..20, >20}, x2 in tens), with
+Laplace smoothing (BINNED_ALPHA), i.e. sklearn's CategoricalNB. Its fit is a
+per-class count vector over the x1 bins and the x2 bins; every month's
+vectors come from one bincount by the month each day enters the window,
+accumulated, and all days of all horizons are scored with one gather from
+the monthly log-odds tables.
+
 Features:
   x1 = consecutive flare-free days
   x2 = sunspot number
@@ -19,76 +27,323 @@ import sys
 import json
 import numpy as np
 import pandas as pd
+from scipy.special import expit
 from sklearn.naive_bayes import GaussianNB
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from metrics import compute_all_metrics, threshold_predictions
-
-
-def run_naive_bayes(eval_df, merged_df):
-    """Run Gaussian Naive Bayes with monthly expanding-window retraining."""
+from metrics import evaluate_forecasts
+from perf import PERF
+from model_cache import FitCache
+from features import leads, as_days, feature_rows, lagged_features, forecast_frame
+from model_climatology import BINS, climatology_cells
+
+# Bump when the fitting logic changes (invalidates the fit cache)
+CACHE_VERSION = 1
+# Readings of the paper's NB (naive_bayes_probabilities(variant=...))
+NB_VARIANTS = ("gaussian", "binned")
+BINNED_ALPHA = 1.0      # Laplace smoothing of the binned variant's category counts
+
+
+def nb_params(gnb):
+    """Flatten a fitted GaussianNB into [theta (2x2), var (2x2), class_prior (2)]."""
+    return np.concatenate([gnb.theta_.ravel(), gnb.var_.ravel(), gnb.class_prior_])
+
+
+def nb_from_params(params):
+    """Rebuild a fitted GaussianNB from the vector produced by nb_params."""
+    gnb = GaussianNB()
+    gnb.classes_ = np.array([0, 1])
+    gnb.n_features_in_ = 2
+    gnb.theta_ = params[0:4].reshape(2, 2)
+    gnb.var_ = params[4:8].reshape(2, 2)
+    gnb.class_prior_ = params[8:10]
+    return gnb
+
+
+def nb_predict_proba(params, X):
+    """
+    P(y=1 | x) for rows of X, each with its own parameter vector (params
+    broadcast against X: (n, 10) with (n, 2), or (10,) with (n, 2)).
+
+    The GaussianNB joint log-likelihood computed directly in numpy, so that
+    many parameter vectors score in one call (naive_bayes_probabilities,
+    forecast_service.py).
+    """
+    params = np.asarray(params, dtype=float)
+    X = np.asarray(X, dtype=float)
+    theta = params[..., 0:4].reshape(params.shape[:-1] + (2, 2))
+    var = params[..., 4:8].reshape(params.shape[:-1] + (2, 2))
+    prior = params[..., 8:10]
+    jll = (np.log(prior) - 0.5 * np.log(2 * np.pi * var).sum(axis=-1)
+           - 0.5 * ((X[..., None, :] - theta) ** 2 / var).sum(axis=-1))
+    return expit(jll[..., 1] - jll[..., 0])
+
+
+def fit_naive_bayes(X_train, y_train):
+    """Fit GaussianNB and return its flattened parameters."""
+    gnb = GaussianNB()
+    gnb.fit(X_train, y_train)
+    return nb_params(gnb)
+
+
+def feature_moments(X):
+    """Running-moment vector [n, mean (2), M2 (2)] of the rows of X (sum of squared deviations in M2)."""
+    X = np.asarray(X, dtype=float).reshape(-1, 2)
+    if len(X) == 0:
+        return np.zeros(5)
+    mean = X.mean(axis=0)
+    return np.concatenate([[len(X)], mean, ((X - mean) ** 2).sum(axis=0)])
+
+
+def update_moments(moments, x):
+    """Add one feature row x to a moment vector (Welford's update, O(1))."""
+    moments = np.array(moments, dtype=float)
+    x = np.asarray(x, dtype=float)
+    n = moments[0] + 1
+    delta = x - moments[1:3]
+    moments[0] = n
+    moments[1:3] += delta / n
+    moments[3:5] += delta * (x - moments[1:3])
+    return moments
+
+
+def remove_moments(moments, X):
+    """Moment vector of the rows a moment vector summarizes, less the rows X (one of them each)."""
+    moments = np.asarray(moments, dtype=float)
+    part = feature_moments(X)
+    n = moments[0] - part[0]
+    if n <= 0:
+        return np.zeros(5)
+    mean = (moments[0] * moments[1:3] - part[0] * part[1:3]) / n
+    delta = part[1:3] - mean
+    m2 = moments[3:5] - part[3:5] - delta ** 2 * n * part[0] / moments[0]
+    return np.concatenate([[n], mean, m2])
+
+
+def nb_params_from_moments(class_moments, all_moments, var_smoothing=1e-9):
+    """
+    GaussianNB parameters (as nb_params) from per-class and pooled feature moments.
+
+    Same model fit_naive_bayes() produces on the rows the moments summarize:
+    per-class means and population variances plus var_smoothing times the
+    largest pooled feature variance, and empirical class priors. Works on
+    stacks of moments too: class_moments (..., 2, 5) and all_moments (..., 5)
+    give parameters (..., 10).
+    """
+    class_moments = np.asarray(class_moments, dtype=float)
+    all_moments = np.asarray(all_moments, dtype=float)
+    n = class_moments[..., 0]
+    theta = class_moments[..., 1:3]
+    epsilon = var_smoothing * (all_moments[..., 3:5] / all_moments[..., 0:1]).max(axis=-1)
+    var = class_moments[..., 3:5] / n[..., None] + epsilon[..., None, None]
+    prior = n / n.sum(axis=-1, keepdims=True)
+    lead = class_moments.shape[:-2]
+    return np.concatenate([theta.reshape(lead + (4,)), var.reshape(lead + (4,)), prior], axis=-1)
+
+
+def monthly_params(merged_df, months, flare_class, cache, moments=None):
+    """
+    Fitted parameters for each forecast month (expanding window: every day
+    of merged_df before the month), through the fit cache.
+
+    Parameters:
+    -----------
+    merged_df : DataFrame
+        Full merged dataset, sorted by date
+    months : array of datetime64[M]
+        Forecast months
+    flare_class : str
+        "m" or "x"
+    cache : FitCache
+    moments : (class_moments, all_moments), optional
+        Feature moments of every day of merged_df (the append state's running
+        moments); the months from the last day's month on are fitted from
+        them, less the stored days since the month began (remove_moments,
+        nb_params_from_moments), instead of through the cache
+
+    Returns:
+    --------
+    ndarray (len(months), 10); rows of NaN where the window has no data or
+    only one class
+    """
+    label_col = f"{flare_class}_label"
+    consec_col = f"{flare_class}_consec_free"
+    days = as_days(merged_df["date"])
+    n_train = np.searchsorted(days, np.asarray(months).astype("datetime64[D]"), side="left")
+    params = np.full((len(months), 10), np.nan)
+
+    for k, month in enumerate(months):
+        if moments is not None and np.datetime64(month, "M") >= days[-1].astype("datetime64[M]"):
+            tail = merged_df.iloc[n_train[k]:].dropna(subset=[consec_col, "sunspot_number"])
+            X_tail = tail[[consec_col, "sunspot_number"]].to_numpy(dtype=float)
+            y_tail = tail[label_col].to_numpy().astype(int)
+            class_moments = [remove_moments(moments[0][c], X_tail[y_tail == c]) for c in (0, 1)]
+            if min(m[0] for m in class_moments) > 0:
+                params[k] = nb_params_from_moments(class_moments, remove_moments(moments[1], X_tail))
+            continue
+        train_data = merged_df.iloc[:n_train[k]].dropna(subset=[consec_col, "sunspot_number"])
+        if len(train_data) == 0 or train_data[label_col].nunique() < 2:
+            continue
+
+        X_train = train_data[[consec_col, "sunspot_number"]].values
+        y_train = train_data[label_col].values.astype(int)
+        params[k] = cache.fetch(
+            flare_class, str(month), train_data,
+            [consec_col, "sunspot_number", label_col],
+            lambda: fit_naive_bayes(X_train, y_train),
+        )
+    return params
+
+
+def feature_bins(X, bins=BINS):
+    """
+    Climatology bins of feature rows X (n, 2): (x1_bin, x2_bin) ints, both
+    -1 where a feature is missing. Returns (bin_index (n, 2), n_bins (2,)).
+    """
+    X = np.asarray(X, dtype=float).reshape(-1, 2)
+    x1_max, x2_width, x2_max = bins
+    n2 = x2_max // x2_width + 2
+    ok = ~np.isnan(X).any(axis=1)
+    cell = np.full(len(X), -1)
+    cell[ok] = climatology_cells(X[ok, 0], X[ok, 1], bins)
+    index = np.where(ok[:, None], np.column_stack([cell // n2, cell % n2]), -1)
+    return index, np.array([x1_max + 2, n2])
+
+
+def binned_counts(merged_df, months, flare_class, bins=BINS):
+    """
+    Per-class category counts of each forecast month's expanding window
+    (every day of merged_df before the month with both features present).
+
+    Returns:
+    --------
+    ndarray (len(months), 2, n1 + n2): counts[m, y] holds the x1-bin counts
+    of class y followed by its x2-bin counts
+    """
+    X = merged_df[[f"{flare_class}_consec_free", "sunspot_number"]].to_numpy(dtype=float)
+    y = merged_df[f"{flare_class}_label"].to_numpy()
+    index, n_bins = feature_bins(X, bins)
+    ok = index[:, 0] >= 0
+    n_codes = 2 * n_bins.sum()
+    entry = np.searchsorted(np.asarray(months).astype("datetime64[D]"), as_days(merged_df["date"]), side="right")
+    code = (y[ok] == 1)[:, None] * n_bins.sum() + index[ok] + [0, n_bins[0]]
+    counts = np.bincount((entry[ok, None] * n_codes + code).ravel(), minlength=(len(months) + 1) * n_codes)
+    return counts.reshape(len(months) + 1, 2, n_bins.sum())[:len(months)].cumsum(axis=0)
+
+
+def binned_log_odds(counts, n_bins, alpha=BINNED_ALPHA):
+    """
+    Log-odds tables of binned NB from category counts (..., 2, n1 + n2):
+    (prior (...), table (..., n1 + n2)), so that the log-odds of a day with
+    bins (b1, b2) is prior + table[b1] + table[n1 + b2]. NaN where the
+    counts hold only one class.
+    """
+    counts = np.asarray(counts, dtype=float)
+    n_class = counts[..., :n_bins[0]].sum(axis=-1)                 # (..., 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prior = np.log(n_class[..., 1]) - np.log(n_class[..., 0])
+        n_cat = np.repeat(n_bins, n_bins)
+        loglik = np.log(counts + alpha) - np.log(n_class[..., None] + alpha * n_cat)
+    prior[(n_class == 0).any(axis=-1)] = np.nan
+    return prior, loglik[..., 1, :] - loglik[..., 0, :]
+
+
+def binned_predict_proba(counts, month, X, bins=BINS):
+    """
+    P(y=1 | x) of binned NB for feature rows X (..., 2), row i scored with
+    the counts of month[i] (counts from binned_counts()); NaN where a
+    feature is missing or the month has no fit.
+    """
+    X = np.asarray(X, dtype=float)
+    month = np.broadcast_to(month, X.shape[:-1])
+    index, n_bins = feature_bins(X.reshape(-1, 2), bins)
+    prior, table = binned_log_odds(counts, n_bins)
+    m = month.ravel()
+    log_odds = prior[m] + table[m, index[:, 0]] + table[m, n_bins[0] + index[:, 1]]
+    log_odds[index[:, 0] < 0] = np.nan
+    return expit(log_odds).reshape(X.shape[:-1])
+
+
+def naive_bayes_probabilities(eval_df, merged_df, use_cache=True, horizons=None, timing="issue",
+                              variant="gaussian", bins=BINS):
+    """
+    Per-day NB forecasts for every class and lead time (horizons in
+    days, default features.HORIZONS).
+
+    One model is fitted per class per month on all days before that month
+    (fitted means/variances/priors are kept in the fit cache, model_cache.py); every
+    day of every horizon is then scored in one batch with its month's
+    parameters. Features come from the issue day (target - lead_days); days
+    whose issue day is missing are skipped. timing="target" uses the target
+    day's own features instead (features.FEATURE_TIMINGS).
+
+    variant="binned" scores categorical NB on the climatology `bins`
+    (binned_counts(); counted afresh, without the fit cache).
+
+    Returns:
+    --------
+    dict : {"M_24h": DataFrame(date, y_true, y_prob), ...}
+    """
+    if variant not in NB_VARIANTS:
+        raise ValueError(f"variant must be one of {NB_VARIANTS}: {variant!r}")
     merged_df = merged_df.sort_values("date").reset_index(drop=True)
-    merged_df["date"] = pd.to_datetime(merged_df["date"])
-    eval_df = eval_df.copy()
-    eval_df["date"] = pd.to_datetime(eval_df["date"])
+    eval_df = eval_df.sort_values("date").reset_index(drop=True)
+    merged_days = as_days(merged_df["date"])
+    eval_days = as_days(eval_df["date"])
 
-    results = {}
+    months, month_of_day = np.unique(eval_days.astype("datetime64[M]"), return_inverse=True)
+    pos, found = feature_rows(merged_days, eval_days, horizons, timing)
+
+    cache = FitCache("naive_bayes", CACHE_VERSION, enabled=use_cache)
+    probs = {}
 
     for flare_class in ["m", "x"]:
         label_col = f"{flare_class}_label"
         consec_col = f"{flare_class}_consec_free"
 
-        for lead_days, lead_name in [(1, "24h"), (2, "48h"), (3, "72h")]:
-            y_true_list = []
-            y_prob_list = []
-
-            eval_months = sorted(eval_df["date"].dt.to_period("M").unique())
-
-            for month in eval_months:
-                month_start = month.start_time
-                month_end = month.end_time
-
-                train_mask = merged_df["date"] < month_start
-                train_data = merged_df[train_mask].dropna(subset=[consec_col, "sunspot_number"])
+        with PERF.span("model.naive_bayes", flare_class=flare_class, variant=variant) as span:
+            X_all = merged_df[[consec_col, "sunspot_number"]].to_numpy(dtype=float)
+            X = lagged_features(X_all, pos, found)
 
-                if len(train_data) == 0 or train_data[label_col].nunique() < 2:
-                    continue
-
-                X_train = train_data[[consec_col, "sunspot_number"]].values
-                y_train = train_data[label_col].values.astype(int)
-
-                gnb = GaussianNB()
-                gnb.fit(X_train, y_train)
-
-                month_eval = eval_df[
-                    (eval_df["date"] >= month_start) &
-                    (eval_df["date"] <= month_end)
-                ]
-
-                for _, row in month_eval.iterrows():
-                    target_date = pd.Timestamp(row["date"])
-                    feature_date = target_date - pd.Timedelta(days=lead_days)
-                    fr = merged_df[merged_df["date"] == feature_date]
-                    if len(fr) == 0:
-                        continue
-                    feature_row = fr.iloc[0]
-
-                    X = np.array([[feature_row[consec_col], feature_row["sunspot_number"]]])
-                    prob = gnb.predict_proba(X)[0, 1]
-
-                    y_true_list.append(int(row[label_col]))
-                    y_prob_list.append(prob)
-
-            y_true = np.array(y_true_list)
-            y_prob = np.array(y_prob_list)
-            y_pred = threshold_predictions(y_prob, theta=0.5)
+            # Every day of every horizon in one batch: (horizons, days)
+            if variant == "binned":
+                counts = binned_counts(merged_df, months, flare_class, bins)
+                y_prob = binned_predict_proba(counts, month_of_day, X, bins)
+            else:
+                params = monthly_params(merged_df, months, flare_class, cache)[month_of_day]
+                with np.errstate(invalid="ignore"):
+                    y_prob = nb_predict_proba(params, X)
+                y_prob[:, np.isnan(params).any(axis=1)] = np.nan
+
+            y_true = eval_df[label_col].to_numpy()
+            for h, (_, lead_name) in enumerate(leads(horizons)):
+                ok = ~np.isnan(y_prob[h])
+                probs[f"{flare_class.upper()}_{lead_name}"] = forecast_frame(
+                    eval_days[ok], y_true[ok], y_prob[h][ok])
+                span.count("days", int(ok.sum()))
+
+    cache.save()
+    return probs
+
+
+def run_naive_bayes(eval_df, merged_df, use_cache=True, probs=None, variant="gaussian"):
+    """
+    Run Naive Bayes (Gaussian or binned, NB_VARIANTS) with monthly
+    expanding-window retraining.
+
+    Per-day forecasts come from naive_bayes_probabilities(); pass `probs` to
+    score forecasts that were already computed.
+    """
+    if probs is None:
+        probs = naive_bayes_probabilities(eval_df, merged_df, use_cache=use_cache, variant=variant)
+    results = {}
 
-            metrics = compute_all_metrics(y_true, y_pred, y_prob)
-            key = f"{flare_class.upper()}_{lead_name}"
-            results[key] = metrics
-            print(f"  NB {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
-                  f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
-                  f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
+    for key, frame in probs.items():
+        metrics = evaluate_forecasts(frame)
+        results[key] = metrics
+        print(f"  NB {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
+              f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
+              f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
 
     return results
 
@@ -103,8 +358,13 @@ if __name__ == "__main__":
     merged_df = pd.read_csv(os.path.join(PROC, "merged_dataset.csv"))
     merged_df["date"] = pd.to_datetime(merged_df["date"])
 
-    print("Running Naive Bayes model...")
-    results = run_naive_bayes(eval_df, merged_df)
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the NB baseline and compare it with the paper")
+    parser.add_argument("--variant", choices=NB_VARIANTS, default="gaussian")
+    args = parser.parse_args()
+
+    print(f"Running Naive Bayes model ({args.variant})...")
+    results = run_naive_bayes(eval_df, merged_df, variant=args.variant)
 
     targets_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
             os.path.abspath(__file__)))), "understand", "targets.json")
@@ -112,7 +372,7 @@ if __name__ == "__main__":
         targets = json.load(f)
 
     print("\n" + "=" * 80)
-    print("NAIVE BAYES: Paper vs Ours comparison")
+    print(f"NAIVE BAYES ({args.variant}): Paper vs Ours comparison")
     print("=" * 80)
 
     table_map = {
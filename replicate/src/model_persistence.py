@@ -11,14 +11,50 @@ as the "probability" (following Assumption A4).
 
 import os
 import sys
-import numpy as np
 import pandas as pd
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from metrics import compute_all_metrics, threshold_predictions
+from metrics import evaluate_forecasts
+from perf import PERF
+from features import leads, as_days, issue_day_matrix, forecast_frame
 
 
-def run_persistence(eval_df, merged_df):
+def persistence_probabilities(eval_df, merged_df, horizons=None):
+    """
+    Per-day persistence forecasts for every class and lead time (horizons
+    in days, default features.HORIZONS).
+
+    The forecast for target day D is the observed label on D - lead_days;
+    days whose source day is not in merged_df are skipped.
+
+    Returns:
+    --------
+    dict : {"M_24h": DataFrame(date, y_true, y_prob), ...}
+    """
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    merged_days = as_days(merged_df["date"])
+    eval_days = as_days(eval_df["date"])
+
+    pos, found = issue_day_matrix(merged_days, eval_days, horizons)
+    probs = {}
+
+    for flare_class in ["m", "x"]:
+        label_col = f"{flare_class}_label"
+        labels = merged_df[label_col].to_numpy().astype(int)
+        y_true = eval_df[label_col].to_numpy()
+
+        with PERF.span("model.persistence", flare_class=flare_class) as span:
+            for h, (_, lead_name) in enumerate(leads(horizons)):
+                ok = found[h]
+                # Persistence is deterministic: probability = binary prediction
+                probs[f"{flare_class.upper()}_{lead_name}"] = forecast_frame(
+                    eval_days[ok], y_true[ok], labels[pos[h][ok]])
+                span.count("days", int(ok.sum()))
+
+    return probs
+
+
+def run_persistence(eval_df, merged_df, probs=None):
     """
     Run persistence model on evaluation dataset.
 
@@ -28,54 +64,22 @@ def run_persistence(eval_df, merged_df):
         Evaluation period dataset (1998-2024)
     merged_df : DataFrame
         Full merged dataset including buffer (1996-2024)
+    probs : dict, optional
+        Output of persistence_probabilities(), if already computed
 
     Returns:
     --------
     dict : results for M and X class at 24h, 48h, 72h
     """
-    merged_df = merged_df.sort_values("date").reset_index(drop=True)
-    merged_df["date"] = pd.to_datetime(merged_df["date"])
-
-    # Create date-indexed lookup for labels
-    date_to_idx = {d: i for i, d in enumerate(merged_df["date"])}
-
+    if probs is None:
+        probs = persistence_probabilities(eval_df, merged_df)
     results = {}
 
-    for flare_class in ["m", "x"]:
-        label_col = f"{flare_class}_label"
-
-        for lead_days, lead_name in [(1, "24h"), (2, "48h"), (3, "72h")]:
-            # For each evaluation day, the persistence prediction is the
-            # observed label from `lead_days` days before
-            y_true_list = []
-            y_pred_list = []
-
-            for _, row in eval_df.iterrows():
-                target_date = pd.Timestamp(row["date"])
-
-                # The prediction for target_date comes from observing
-                # the label on (target_date - lead_days) days
-                source_date = target_date - pd.Timedelta(days=lead_days)
-
-                if source_date in date_to_idx:
-                    source_idx = date_to_idx[source_date]
-                    pred = int(merged_df.iloc[source_idx][label_col])
-                else:
-                    continue  # Skip if source date not available
-
-                y_true_list.append(int(row[label_col]))
-                y_pred_list.append(pred)
-
-            y_true = np.array(y_true_list)
-            y_pred = np.array(y_pred_list)
-            # Persistence is deterministic: probability = binary prediction
-            y_prob = y_pred.astype(float)
-
-            metrics = compute_all_metrics(y_true, y_pred, y_prob)
-            key = f"{flare_class.upper()}_{lead_name}"
-            results[key] = metrics
-            print(f"  Persistence {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
-                  f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
+    for key, frame in probs.items():
+        metrics = evaluate_forecasts(frame)
+        results[key] = metrics
+        print(f"  Persistence {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
+              f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
 
     return results
 
@@ -13,38 +13,63 @@ import numpy as np
 import pandas as pd
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from metrics import compute_all_metrics, threshold_predictions
+from metrics import evaluate_forecasts
+from perf import PERF
+from features import leads, as_days, forecast_frame
 
 
-def run_swpc(eval_df):
+def swpc_probabilities(eval_df, horizons=None):
     """
-    Evaluate SWPC forecasts at theta=0.5.
+    Per-day SWPC forecasts for every class and lead time.
 
     The evaluation dataset has columns:
       m_24h, m_48h, m_72h, x_24h, x_48h, x_72h (integer percentages)
       m_label, x_label (binary ground truth)
+    Days without a forecast for a lead time are dropped. SWPC issues 1-3 day
+    forecasts only; other horizons are left out of the result.
+
+    Returns:
+    --------
+    dict : {"M_24h": DataFrame(date, y_true, y_prob), ...}
     """
-    results = {}
+    days = as_days(eval_df["date"])
+    probs = {}
 
     for flare_class in ["m", "x"]:
         label_col = f"{flare_class}_label"
+        y_true = eval_df[label_col].to_numpy()
 
-        for lead_name in ["24h", "48h", "72h"]:
+        for _, lead_name in leads(horizons):
             prob_col = f"{flare_class}_{lead_name}"
+            if prob_col not in eval_df:
+                continue
+            pct = eval_df[prob_col].to_numpy(dtype=float)
+            valid = ~np.isnan(pct)
+            probs[f"{flare_class.upper()}_{lead_name}"] = forecast_frame(
+                days[valid], y_true[valid], pct[valid] / 100.0)  # Convert percentage to [0,1]
 
-            # Filter to days with valid forecasts
-            valid = eval_df[eval_df[prob_col].notna()].copy()
+    return probs
 
-            y_true = valid[label_col].values.astype(int)
-            y_prob = valid[prob_col].values / 100.0  # Convert percentage to [0,1]
-            y_pred = threshold_predictions(y_prob, theta=0.5)
 
-            metrics = compute_all_metrics(y_true, y_pred, y_prob)
-            key = f"{flare_class.upper()}_{lead_name}"
-            results[key] = metrics
-            print(f"  SWPC {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
-                  f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
-                  f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
+def run_swpc(eval_df, probs=None):
+    """
+    Evaluate SWPC forecasts at theta=0.5.
+
+    Per-day forecasts come from swpc_probabilities(); pass `probs` to score
+    forecasts that were already extracted.
+    """
+    if probs is None:
+        probs = swpc_probabilities(eval_df)
+    results = {}
+
+    for key, frame in probs.items():
+        with PERF.span("model.swpc", key=key) as span:
+            span.count("days", len(frame))
+            metrics = evaluate_forecasts(frame)
+        results[key] = metrics
+        print(f"  SWPC {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
+              f"Prec={metrics['Precision']}, Rec={metrics['Recall']}, "
+              f"Brier={metrics['Brier']}, AUC={metrics['AUC']}")
 
     return results
 
@@ -4,21 +4,41 @@ Parses all raw data sources and constructs the evaluation dataset.
 
 Steps:
 1. Parse RSGA files -> daily forecast probabilities
-2. Parse ASR catalog + NOAA events -> binary flare labels
-3. Parse DSD files -> cross-check flare counts
+2. Parse ASR catalog + NOAA events -> binary flare labels and daily peak flux
+3. Parse DSD files -> cross-check flare counts (and a label source of their own)
 4. Parse SILSO -> daily sunspot numbers
 5. Merge into evaluation dataset
 6. Compute derived features (consecutive flare-free days)
 7. Save processed data
+
+Labels mode adds every label source found in the raw data (NOAA events,
+ASR v1.0 / v1.1, DSD counts and their combinations) to an existing processed
+store as m/x_label_<source> columns (and the daily peak X-ray flux as
+peak_flux / peak_flux_<source>), without rebuilding it.
+
+Append mode adds a single new day (one RSGA issue, one event report and
+optionally the DSD file holding the day) to the processed datasets in O(1),
+without re-reading history; see section 5.
+
+Usage: bash tools/run.sh replicate/src/parse_data.py [build]
+       bash tools/run.sh replicate/src/parse_data.py labels
+       bash tools/run.sh replicate/src/parse_data.py append --date YYYY-MM-DD
+           --events YYYYMMDDevents.txt [--rsga YYYYMMDDRSGA.txt] [--sunspot N]
+           [--dsd YYYY_daypre.txt]
 """
 
 import os
 import re
+import sys
+import json
 import tarfile
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from perf import PERF
+
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW = os.path.join(BASE, "data", "raw")
 PROC = os.path.join(BASE, "data", "processed")
@@ -29,16 +49,40 @@ os.makedirs(PROC, exist_ok=True)
 # 1. Parse RSGA files -> forecast probabilities
 # ==========================================================================
 
-def parse_rsga_files():
+def parse_rsga_text(content):
+    """
+    M and X event probabilities (day 1, day 2, day 3) from one RSGA text.
+    Either list is None if its line is missing.
+    """
+    m_probs = None
+    x_probs = None
+
+    for line in content.split("\n"):
+        line_upper = line.upper().strip()
+
+        # Match "CLASS M    15/10/05" or "Class M    01/01/01"
+        m_match = re.match(r"CLASS\s+M\s+(\d+)\s*/\s*(\d+)\s*/\s*(\d+)", line_upper)
+        if m_match:
+            m_probs = [int(m_match.group(i)) for i in range(1, 4)]
+
+        x_match = re.match(r"CLASS\s+X\s+(\d+)\s*/\s*(\d+)\s*/\s*(\d+)", line_upper)
+        if x_match:
+            x_probs = [int(x_match.group(i)) for i in range(1, 4)]
+
+    return m_probs, x_probs
+
+
+@PERF.timed("parse.rsga")
+def parse_rsga_files(raw_dir=RAW, years=range(1996, 2025)):
     """
     Parse all RSGA tar.gz files to extract daily M/X class forecast probabilities.
     Returns DataFrame with columns:
       issue_date, m_day1, m_day2, m_day3, x_day1, x_day2, x_day3
     """
-    rsga_dir = os.path.join(RAW, "swpc_rsga")
+    rsga_dir = os.path.join(raw_dir, "swpc_rsga")
     records = []
 
-    for year in range(1996, 2025):
+    for year in years:
         archive = os.path.join(rsga_dir, f"{year}_RSGA.tar.gz")
         if not os.path.exists(archive):
             print(f"  WARNING: Missing {archive}")
@@ -61,21 +105,7 @@ def parse_rsga_files():
                 except:
                     continue
 
-                m_probs = None
-                x_probs = None
-
-                for line in content.split("\n"):
-                    line_upper = line.upper().strip()
-
-                    # Match "CLASS M    15/10/05" or "Class M    01/01/01"
-                    m_match = re.match(r"CLASS\s+M\s+(\d+)\s*/\s*(\d+)\s*/\s*(\d+)", line_upper)
-                    if m_match:
-                        m_probs = [int(m_match.group(i)) for i in range(1, 4)]
-
-                    x_match = re.match(r"CLASS\s+X\s+(\d+)\s*/\s*(\d+)\s*/\s*(\d+)", line_upper)
-                    if x_match:
-                        x_probs = [int(x_match.group(i)) for i in range(1, 4)]
-
+                m_probs, x_probs = parse_rsga_text(content)
                 if m_probs and x_probs:
                     records.append({
                         "issue_date": issue_date,
@@ -92,10 +122,12 @@ def parse_rsga_files():
     df = pd.DataFrame(records)
     df["issue_date"] = pd.to_datetime(df["issue_date"])
     df = df.sort_values("issue_date").reset_index(drop=True)
+    PERF.count("rows", len(df))
     print(f"  Total RSGA records: {len(df)}")
     return df
 
 
+@PERF.timed("parse.forecast_dataset")
 def build_forecast_dataset(rsga_df):
     """
     Convert issue-date-based forecasts to target-date-based forecasts.
@@ -165,7 +197,82 @@ def build_forecast_dataset(rsga_df):
 # 2. Parse flare catalogs -> binary labels
 # ==========================================================================
 
-def parse_asr_catalog():
+# Label sources stored as m/x_label_<source> columns of the processed store
+# (NaN on days a source does not cover): NOAA event reports through
+# SPLIT_YEAR, both ASR catalog versions, the DSD daily flare counts and
+# flares detected in the GOES XRS flux (xrs_labels.py)
+SPLIT_YEAR = 2001
+ASR_CATALOGS = {"asr_v1_0": "asr_flare_catalog_v1.csv", "asr_v1_1": "asr_flare_catalog.csv"}
+LABEL_SOURCES = ("noaa", "asr_v1_0", "asr_v1_1", "dsd", "xrs")
+
+# Combined sources: ("first", sources) takes each day from the first source
+# covering it; ("any", sources) flags a day if any covering source does.
+# "paper" is the paper's split and equals m/x_label.
+LABEL_COMBINATIONS = {
+    "paper": ("first", ("noaa", "asr_v1_0")),
+    "noaa_asr_v1_1": ("first", ("noaa", "asr_v1_1")),
+    "noaa_dsd": ("first", ("noaa", "dsd")),
+    "any": ("any", LABEL_SOURCES),
+}
+
+# Columns of the processed store beyond the paper's dataset: per-source
+# labels and the daily peak 1-8A flux (W/m^2) of the flare catalogs
+SOURCE_PREFIXES = ("m_label_", "x_label_", "peak_flux")
+
+# Peak flux of each GOES class letter; "M2.3" is 2.3 x 1e-5 W/m^2
+GOES_CLASS_FLUX = {"A": 1e-8, "B": 1e-7, "C": 1e-6, "M": 1e-5, "X": 1e-4}
+
+
+def goes_class_flux(classes):
+    """
+    Peak flux (W/m^2) of GOES class strings ("M2.3", "X1", "C"); a bare
+    letter is the lower bound of its class, anything else is NaN.
+    """
+    parts = pd.Series(list(classes), dtype=object).astype(str).str.strip().str.extract(
+        r"^([ABCMX])(\d+\.?\d*)?$")
+    scale = parts[0].map(GOES_CLASS_FLUX).to_numpy(dtype=float)
+    return scale * pd.to_numeric(parts[1]).fillna(1.0).to_numpy(dtype=float)
+
+
+def daily_peak_flux(days, flux):
+    """
+    Daily maximum of per-event peak fluxes, from one sort and group-by: a
+    Series indexed by day. Events without a flux are ignored.
+    """
+    days = np.asarray(days, dtype="datetime64[D]")
+    flux = np.asarray(flux, dtype=float)
+    keep = ~np.isnan(flux)
+    order = np.argsort(days[keep], kind="stable")
+    days, flux = days[keep][order], flux[keep][order]
+    if len(days) == 0:
+        return pd.Series([], index=pd.DatetimeIndex([]), dtype=float)
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    return pd.Series(np.maximum.reduceat(flux, starts), index=pd.DatetimeIndex(days[starts].astype("datetime64[ns]")))
+
+
+def asr_flare_days(path):
+    """
+    (m_days, x_days, covered_years, peak_flux) of one ASR catalog file: days
+    with an M- or X-class flare by abs_class_simple (absolute GOES class from
+    peak flux), dated by tpeak (UTC), the years the catalog spans and the
+    daily maximum peak flux (daily_peak_flux). The flux comes from the full
+    class (abs_class, e.g. "M2.3") when the catalog has it, else from the
+    class letter (its lower bound).
+    """
+    df = pd.read_csv(path)
+    print(f"  ASR catalog ({os.path.basename(path)}): {len(df)} total events")
+    day = pd.to_datetime(df["tpeak"], format="mixed").dt.date
+    cls = df["abs_class_simple"].str.strip()
+    print(f"  ASR M-class events: {(cls == 'M').sum()}")
+    print(f"  ASR X-class events: {(cls == 'X').sum()}")
+    years = range(min(day).year, max(day).year + 1)
+    flux = goes_class_flux(df["abs_class" if "abs_class" in df else "abs_class_simple"])
+    peak_flux = daily_peak_flux(np.array(day, dtype="datetime64[D]"), flux)
+    return set(day[cls == "M"].unique()), set(day[cls == "X"].unique()), years, peak_flux
+
+
+@PERF.timed("parse.asr_catalog")
+def parse_asr_catalog(raw_dir=RAW):
     """
     Parse ASR flare catalog to get daily binary M/X labels.
     Uses abs_class_simple (absolute GOES class from peak flux).
@@ -173,39 +280,54 @@ def parse_asr_catalog():
     Combined with NOAA events for 1996-2001, this matches the paper's counts.
     """
     # Prefer v1.0 if available, fall back to v1.1
-    v1_path = os.path.join(RAW, "asr_flare_catalog_v1.csv")
-    v11_path = os.path.join(RAW, "asr_flare_catalog.csv")
+    v1_path = os.path.join(raw_dir, ASR_CATALOGS["asr_v1_0"])
+    v11_path = os.path.join(raw_dir, ASR_CATALOGS["asr_v1_1"])
     path = v1_path if os.path.exists(v1_path) else v11_path
-    df = pd.read_csv(path)
-    print(f"  ASR catalog ({os.path.basename(path)}): {len(df)} total events")
-
-    # Use abs_class_simple (absolute peak-flux GOES class).
-    # This matches paper counts when combined with NOAA events for 1996-2001.
-    df["class"] = df["abs_class_simple"].str.strip()
-    m_flares = df[df["class"] == "M"].copy()
-    x_flares = df[df["class"] == "X"].copy()
-    print(f"  ASR M-class events: {len(m_flares)}")
-    print(f"  ASR X-class events: {len(x_flares)}")
-
-    # Extract date (UTC) from tpeak (or tstart)
-    m_flares["date"] = pd.to_datetime(m_flares["tpeak"], format="mixed").dt.date
-    x_flares["date"] = pd.to_datetime(x_flares["tpeak"], format="mixed").dt.date
-
-    # Get unique M/X days
-    m_days = set(m_flares["date"].unique())
-    x_days = set(x_flares["date"].unique())
-
+    m_days, x_days, _, _ = asr_flare_days(path)
     return m_days, x_days
 
 
-def parse_noaa_events(start_year=1996, end_year=2001):
+def xra_flare_classes(content):
+    """Set of flare classes ("M", "X") among the 1-8A XRA events of one event report."""
+    classes = set()
+    # Look for XRA events with M or X class
+    for line in content.split("\n"):
+        # XRA events have format like:  "GO9  5   XRA  1-8A      M1.1    3.3E-03"
+        if "XRA" in line and "1-8A" in line:
+            # Look for M or X class designation
+            # Pattern: class letter followed by number like M1.1, X2.3
+            class_match = re.search(r"\b(M|X)\d+\.?\d*\b", line)
+            if class_match:
+                classes.add(class_match.group(1))
+    return classes
+
+
+def xra_goes_classes(content):
+    """GOES class strings ("C3.4", "M1.1", ...) of the 1-8A XRA events of one event report."""
+    classes = []
+    for line in content.split("\n"):
+        if "XRA" in line and "1-8A" in line:
+            # The class follows the 1-8A location; times may carry B/C qualifiers ("B1800")
+            class_match = re.search(r"1-8A\s+([ABCMX]\d+\.?\d*)\b", line)
+            if class_match:
+                classes.append(class_match.group(1))
+    return classes
+
+
+@PERF.timed("parse.noaa_events")
+def parse_noaa_events(start_year=1996, end_year=2001, raw_dir=RAW):
     """
     Parse NOAA SWPC event reports (1996-2001) to extract M/X class flare days.
     Event files are daily text files with XRA (X-ray) event records.
+
+    Returns (m_days, x_days, peak_flux): the M and X flare days and the daily
+    maximum peak flux of the XRA events (daily_peak_flux), from one pass over
+    the reports.
     """
-    events_dir = os.path.join(RAW, "noaa_events")
+    events_dir = os.path.join(raw_dir, "noaa_events")
     m_days = set()
     x_days = set()
+    event_days, event_classes = [], []
     total_files = 0
 
     for year in range(start_year, end_year + 1):
@@ -240,74 +362,194 @@ def parse_noaa_events(start_year=1996, end_year=2001):
             except:
                 continue
 
-            # Look for XRA events with M or X class
-            for line in content.split("\n"):
-                # XRA events have format like:  "GO9  5   XRA  1-8A      M1.1    3.3E-03"
-                if "XRA" in line and "1-8A" in line:
-                    # Look for M or X class designation
-                    # Pattern: class letter followed by number like M1.1, X2.3
-                    class_match = re.search(r"\b(M|X)\d+\.?\d*\b", line)
-                    if class_match:
-                        flare_class = class_match.group(1)
-                        if flare_class == "M":
-                            m_days.add(file_date)
-                        elif flare_class == "X":
-                            x_days.add(file_date)
+            classes = xra_flare_classes(content)
+            if "M" in classes:
+                m_days.add(file_date)
+            if "X" in classes:
+                x_days.add(file_date)
+            goes_classes = xra_goes_classes(content)
+            event_days.extend([file_date] * len(goes_classes))
+            event_classes.extend(goes_classes)
 
+    PERF.count("files", total_files)
     print(f"  NOAA events: {total_files} files parsed, {len(m_days)} M-days, {len(x_days)} X-days ({start_year}-{end_year})")
-    return m_days, x_days
+    peak_flux = daily_peak_flux(np.array(event_days, dtype="datetime64[D]"), goes_class_flux(event_classes))
+    return m_days, x_days, peak_flux
 
 
-def parse_dsd_flare_counts():
+def parse_dsd_line(line):
+    """
+    Record (date, m_count_dsd, x_count_dsd, sunspot_dsd) of one DSD data
+    line, or None if the line holds no day.
+    """
+    # Data lines start with a year: "1998 01 01  102 ..."
+    match = re.match(r"(\d{4})\s+(\d{2})\s+(\d{2})\s+(.*)", line.strip())
+    if not match:
+        return None
+
+    yr, mo, dy = int(match.group(1)), int(match.group(2)), int(match.group(3))
+    rest = match.group(4)
+
+    # Parse the remaining columns
+    # Format: Radio Sunspot Area NewReg Field Flux C M X S 1 2 3
+    parts = rest.split()
+    if len(parts) < 10:
+        return None
+    try:
+        return {
+            "date": datetime(yr, mo, dy).date(),
+            "m_count_dsd": int(parts[7]),  # M column
+            "x_count_dsd": int(parts[8]),  # X column
+            "sunspot_dsd": int(parts[1]),  # SESC Sunspot Number
+        }
+    except (ValueError, IndexError):
+        return None
+
+
+@PERF.timed("parse.dsd")
+def parse_dsd_flare_counts(raw_dir=RAW, years=range(1996, 2025)):
     """
     Parse DSD (Daily Solar Data) files to extract daily M/X flare counts.
     This serves as a cross-check/supplement for flare occurrence.
     The DSD files have columns including M and X flare counts per day.
     """
-    dsd_dir = os.path.join(RAW, "swpc_forecasts")  # DSD files were saved here
+    dsd_dir = os.path.join(raw_dir, "swpc_forecasts")  # DSD files were saved here
     records = []
 
-    for year in range(1996, 2025):
+    for year in years:
         filepath = os.path.join(dsd_dir, f"{year}_daypre.txt")
         if not os.path.exists(filepath):
             continue
 
         with open(filepath, "r", errors="replace") as f:
-            for line in f:
-                line = line.strip()
-                # Data lines start with a year: "1998 01 01  102 ..."
-                match = re.match(r"(\d{4})\s+(\d{2})\s+(\d{2})\s+(.*)", line)
-                if not match:
-                    continue
-
-                yr, mo, dy = int(match.group(1)), int(match.group(2)), int(match.group(3))
-                rest = match.group(4)
-
-                # Parse the remaining columns
-                # Format: Radio Sunspot Area NewReg Field Flux C M X S 1 2 3
-                parts = rest.split()
-                if len(parts) >= 10:
-                    try:
-                        m_count = int(parts[7])  # M column
-                        x_count = int(parts[8])  # X column
-                        sunspot = int(parts[1])   # SESC Sunspot Number
-                        records.append({
-                            "date": datetime(yr, mo, dy).date(),
-                            "m_count_dsd": m_count,
-                            "x_count_dsd": x_count,
-                            "sunspot_dsd": sunspot,
-                        })
-                    except (ValueError, IndexError):
-                        pass
+            records.extend(rec for rec in map(parse_dsd_line, f) if rec is not None)
 
     df = pd.DataFrame(records)
     if len(df) > 0:
         df["date"] = pd.to_datetime(df["date"])
+    PERF.count("rows", len(df))
     print(f"  DSD records: {len(df)} days parsed")
     return df
 
 
-def build_flare_labels():
+def _day_flags(dates, days):
+    """1.0 where a date is in the set of datetime.date `days`, else 0.0."""
+    wanted = np.array(sorted(days), dtype="datetime64[D]")
+    return np.isin(dates.values.astype("datetime64[D]"), wanted).astype(float)
+
+
+@PERF.timed("parse.label_sources")
+def parse_label_sources(dates, raw_dir=RAW, dsd_df=None):
+    """
+    Daily M/X labels of every label source with raw data in raw_dir, each
+    source parsed once.
+
+    Parameters:
+    -----------
+    dates : DatetimeIndex
+        Days to label
+    raw_dir : str
+        Raw data directory
+    dsd_df : DataFrame, optional
+        parse_dsd_flare_counts() output, if already parsed
+
+    Returns:
+    --------
+    DataFrame with date and m/x_label_<source> (LABEL_SOURCES) columns: 1/0,
+    NaN on days outside a source's coverage; sources without raw data are
+    left out. The flare catalogs (NOAA, ASR, XRS) also give peak_flux_<source>,
+    the daily maximum peak flux in W/m^2 (0 on covered days without events).
+    """
+    dates = pd.DatetimeIndex(dates)
+    out = pd.DataFrame({"date": dates})
+
+    def add(name, m_days, x_days, covered, peak_flux):
+        for c, days in (("m", m_days), ("x", x_days)):
+            out[f"{c}_label_{name}"] = np.where(covered, _day_flags(dates, days), np.nan)
+        out[f"peak_flux_{name}"] = np.where(covered, peak_flux.reindex(dates).fillna(0.0).to_numpy(), np.nan)
+
+    print("\n--- Parsing NOAA event reports (1996-2001) ---")
+    noaa_m, noaa_x, noaa_flux = parse_noaa_events(1996, SPLIT_YEAR, raw_dir=raw_dir)
+    add("noaa", noaa_m, noaa_x, dates.year <= SPLIT_YEAR, noaa_flux)
+
+    for name, fname in ASR_CATALOGS.items():
+        path = os.path.join(raw_dir, fname)
+        if not os.path.exists(path):
+            print(f"  {fname} not found; no {name} labels")
+            continue
+        print(f"\n--- Parsing ASR catalog ({name}) ---")
+        m_days, x_days, years, peak_flux = asr_flare_days(path)
+        add(name, m_days, x_days, (dates.year >= years[0]) & (dates.year <= years[-1]), peak_flux)
+
+    from xrs_labels import xrs_files, xrs_flare_days
+    if xrs_files(raw_dir):
+        print("\n--- Detecting flares in GOES XRS flux ---")
+        m_days, x_days, covered, peak_flux = xrs_flare_days(raw_dir)
+        add("xrs", m_days, x_days, dates.isin(covered), peak_flux)
+
+    print("\n--- Parsing DSD files ---")
+    if dsd_df is None:
+        dsd_df = parse_dsd_flare_counts(raw_dir)
+    if len(dsd_df) > 0:
+        dsd = dsd_df.set_index("date").reindex(dates)
+        for c in ("m", "x"):
+            counts = dsd[f"{c}_count_dsd"].to_numpy(dtype=float)
+            out[f"{c}_label_dsd"] = np.where(np.isnan(counts), np.nan, counts > 0)
+    return out
+
+
+def source_column(flare_class, source):
+    """Column of a label source: m/x_label_<source>, or peak_flux_<source> for flare_class "peak_flux"."""
+    return f"peak_flux_{source}" if flare_class == "peak_flux" else f"{flare_class}_label_{source}"
+
+
+def combine_label_sources(labels_df, how, sources, flare_class):
+    """
+    One class's labels from several source columns of labels_df: "first"
+    takes each day from the first source covering it, "any" is 1 if any
+    covering source has a flare. NaN where no source covers the day.
+    flare_class "peak_flux" combines the peak-flux columns the same way
+    ("any" is the largest flux).
+    """
+    columns = np.column_stack([labels_df[source_column(flare_class, s)].to_numpy(dtype=float) for s in sources])
+    covered = ~np.isnan(columns)
+    if how == "first":
+        first = np.argmax(covered, axis=1)
+        out = columns[np.arange(len(columns)), first]
+    elif how == "any":
+        out = np.nanmax(np.where(covered, columns, -np.inf), axis=1)
+    else:
+        raise ValueError(f"how must be 'first' or 'any': {how!r}")
+    return np.where(covered.any(axis=1), out, np.nan)
+
+
+def add_label_combinations(labels_df, combinations=LABEL_COMBINATIONS):
+    """
+    Add the m/x_label_<name> columns of every combination whose sources are
+    all present, and peak_flux_<name> when every source has a peak flux.
+    """
+    for name, (how, sources) in combinations.items():
+        for c in ("m", "x", "peak_flux"):
+            if all(source_column(c, s) in labels_df for s in sources):
+                labels_df[source_column(c, name)] = combine_label_sources(labels_df, how, sources, c)
+    return labels_df
+
+
+def paper_sources(labels_df):
+    """Sources of the paper's split: NOAA, then ASR v1.0 if parsed, else v1.1."""
+    return ("noaa", "asr_v1_0" if "m_label_asr_v1_0" in labels_df else "asr_v1_1")
+
+
+def paper_peak_flux(labels_df):
+    """Daily peak flux of the paper's split (NaN where neither catalog covers the day)."""
+    sources = [s for s in paper_sources(labels_df) if f"peak_flux_{s}" in labels_df]
+    if not sources:
+        return np.full(len(labels_df), np.nan)
+    return combine_label_sources(labels_df, "first", sources, "peak_flux")
+
+
+@PERF.timed("parse.flare_labels")
+def build_flare_labels(dsd_df=None):
     """
     Build unified binary flare labels following the paper's data source split:
     - NOAA SWPC event reports for 1996-2001
@@ -315,49 +557,32 @@ def build_flare_labels():
 
     This combination gives M=2018/X=254 for the eval period (paper: 2021/254).
     The small M discrepancy (~3 days) likely stems from NOAA event report parsing.
-    """
-    # Parse both sources
-    print("\n--- Parsing ASR catalog ---")
-    asr_m, asr_x = parse_asr_catalog()
-
-    print("\n--- Parsing NOAA event reports (1996-2001) ---")
-    noaa_m, noaa_x = parse_noaa_events(1996, 2001)
-
-    print("\n--- Parsing DSD files ---")
-    dsd_df = parse_dsd_flare_counts()
 
+    Every source (and LABEL_COMBINATIONS) is kept as well, as the
+    m/x_label_<source> columns, for label-sensitivity runs
+    (label_sensitivity.py); `dsd_df` is the already parsed DSD table, if any.
+    peak_flux is the daily peak flux of the same split, for class ladders.
+    """
     # Build date range: Aug 1996 - Dec 2024
     all_dates = pd.date_range("1996-08-01", "2024-12-31", freq="D")
+    if dsd_df is None:
+        dsd_df = parse_dsd_flare_counts()
+    labels_df = add_label_combinations(parse_label_sources(all_dates, dsd_df=dsd_df))
 
-    records = []
-    for date in all_dates:
-        d = date.date()
-        if d.year <= 2001:
-            # Use NOAA events for 1996-2001
-            m_label = 1 if d in noaa_m else 0
-            x_label = 1 if d in noaa_x else 0
-        else:
-            # Use ASR catalog for 2002-2024
-            m_label = 1 if d in asr_m else 0
-            x_label = 1 if d in asr_x else 0
-
-        records.append({"date": date, "m_label": m_label, "x_label": x_label})
-
-    labels_df = pd.DataFrame(records)
+    # NOAA events for 1996-2001, ASR (v1.0, else v1.1) for 2002-2024
+    for c in ("m", "x"):
+        primary = combine_label_sources(labels_df, "first", paper_sources(labels_df), c)
+        labels_df.insert(1 + ("m", "x").index(c), f"{c}_label", np.nan_to_num(primary).astype(int))
+    labels_df["peak_flux"] = paper_peak_flux(labels_df)
 
     # Cross-check with DSD
-    if len(dsd_df) > 0:
-        merged = labels_df.merge(dsd_df, on="date", how="left")
-        dsd_m = (merged["m_count_dsd"].fillna(0) > 0).astype(int)
-        dsd_x = (merged["x_count_dsd"].fillna(0) > 0).astype(int)
-        m_agree = (labels_df["m_label"] == dsd_m).mean()
-        x_agree = (labels_df["x_label"] == dsd_x).mean()
-        print(f"\n  DSD cross-check agreement: M={m_agree:.4f}, X={x_agree:.4f}")
-
-        # Where primary source says no flare but DSD says yes (or vice versa)
-        m_disagree = ((labels_df["m_label"] != dsd_m) & dsd_df["m_count_dsd"].notna().reindex(labels_df.index, fill_value=False)).sum()
-        x_disagree = ((labels_df["x_label"] != dsd_x) & dsd_df["x_count_dsd"].notna().reindex(labels_df.index, fill_value=False)).sum()
-        print(f"  Disagreements: M={m_disagree}, X={x_disagree}")
+    if "m_label_dsd" in labels_df:
+        for c in ("m", "x"):
+            dsd = labels_df[f"{c}_label_dsd"]
+            known = dsd.notna()
+            agree = (labels_df.loc[known, f"{c}_label"] == dsd[known]).mean()
+            print(f"\n  DSD cross-check ({c.upper()}): agreement {agree:.4f} on {known.sum()} days, "
+                  f"{(~known).sum()} days without DSD")
 
     # Count positive days in evaluation period
     eval_mask = labels_df["date"] >= "1998-01-01"
@@ -366,17 +591,47 @@ def build_flare_labels():
     print(f"  Evaluation period: {len(eval_df)} days")
     print(f"  M-class positive (eval): {eval_df['m_label'].sum()}")
     print(f"  X-class positive (eval): {eval_df['x_label'].sum()}")
+    print(f"  Label sources: {', '.join(c[len('m_label_'):] for c in labels_df if c.startswith('m_label_'))}")
 
     return labels_df
 
 
+def add_label_sources(proc_dir=PROC, raw_dir=RAW):
+    """
+    Add (or refresh) the m/x_label_<source> and peak-flux columns of an
+    existing processed store from whatever label sources raw_dir holds,
+    without rebuilding it; m/x_label and everything derived from them are
+    left unchanged.
+    """
+    paths = [os.path.join(proc_dir, f) for f in ("merged_dataset.csv", "evaluation_dataset.csv")]
+    merged = pd.read_csv(paths[0], parse_dates=["date"])
+    labels_df = add_label_combinations(parse_label_sources(merged["date"], raw_dir))
+    labels_df.insert(1, "peak_flux", paper_peak_flux(labels_df))
+    new = [c for c in labels_df.columns if c != "date"]
+    for path in paths:
+        df = pd.read_csv(path, parse_dates=["date"])
+        df = df.drop(columns=[c for c in df.columns if c.startswith(SOURCE_PREFIXES)])
+        df = df.merge(labels_df, on="date", how="left")
+        df.to_csv(path, index=False, date_format="%Y-%m-%d")
+        print(f"  {os.path.basename(path)}: {sum(c.startswith('m_label_') for c in new)} label sources")
+
+    state_path = os.path.join(proc_dir, APPEND_STATE)
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+        state["columns"] = [c for c in state["columns"] if not c.startswith(SOURCE_PREFIXES)] + new
+        write_append_state(state, proc_dir)
+    return new
+
+
 # ==========================================================================
 # 3. Parse sunspot numbers
 # ==========================================================================
 
-def parse_sunspot_numbers():
+@PERF.timed("parse.sunspot")
+def parse_sunspot_numbers(raw_dir=RAW, start="1996-01-01", end="2024-12-31"):
     """Parse SILSO daily sunspot numbers."""
-    path = os.path.join(RAW, "silso_daily_sunspot.csv")
+    path = os.path.join(raw_dir, "silso_daily_sunspot.csv")
 
     records = []
     with open(path, "r") as f:
@@ -401,7 +656,7 @@ def parse_sunspot_numbers():
     df["date"] = pd.to_datetime(df["date"])
 
     # Filter to relevant period
-    df = df[(df["date"] >= "1996-01-01") & (df["date"] <= "2024-12-31")]
+    df = df[(df["date"] >= start) & (df["date"] <= end)]
     print(f"  Sunspot numbers: {len(df)} days, {df['sunspot_number'].isna().sum()} missing")
 
     return df
@@ -411,6 +666,33 @@ def parse_sunspot_numbers():
 # 4. Merge everything and compute derived features
 # ==========================================================================
 
+def consecutive_free_days(labels):
+    """
+    Number of consecutive flare-free days immediately before each day.
+
+    Day i gets the count of 0-labels since the last flare day before i (the
+    day's own label is not included); before the first flare it is simply i.
+    Vectorized equivalent of the running counter used originally.
+    """
+    labels = np.asarray(labels)
+    idx = np.arange(len(labels))
+    last_flare = np.maximum.accumulate(np.where(labels == 1, idx, -1))
+    prev_flare = np.concatenate([[-1], last_flare[:-1]])
+    return np.where(prev_flare >= 0, idx - prev_flare - 1, idx)
+
+
+@PERF.timed("parse.features")
+def add_derived_features(merged):
+    """Sort by date and add x1 (m/x_consec_free) for each flare class."""
+    merged = merged.sort_values("date").reset_index(drop=True)
+
+    # x1: consecutive flare-free days (computed separately for M and X)
+    merged["m_consec_free"] = consecutive_free_days(merged["m_label"].values)
+    merged["x_consec_free"] = consecutive_free_days(merged["x_label"].values)
+    PERF.count("rows", len(merged))
+    return merged
+
+
 def merge_all():
     """Merge forecasts, labels, and sunspot numbers into the evaluation dataset."""
 
@@ -423,8 +705,9 @@ def merge_all():
     rsga_df = parse_rsga_files()
     forecasts_df = build_forecast_dataset(rsga_df)
 
-    # Build flare labels
-    labels_df = build_flare_labels()
+    # Build flare labels (DSD is parsed once, for labels and sunspot numbers)
+    dsd_df = parse_dsd_flare_counts()
+    labels_df = build_flare_labels(dsd_df)
 
     # Parse sunspot numbers
     print("\n--- Parsing sunspot numbers ---")
@@ -432,13 +715,14 @@ def merge_all():
 
     # Merge
     print("\n--- Merging datasets ---")
-    merged = forecasts_df.merge(labels_df, on="date", how="inner")
-    merged = merged.merge(sunspot_df, on="date", how="left")
+    with PERF.span("parse.merge") as span:
+        merged = forecasts_df.merge(labels_df, on="date", how="inner")
+        merged = merged.merge(sunspot_df, on="date", how="left")
+        span.count("rows", len(merged))
 
     print(f"  Merged dataset: {len(merged)} days")
 
-    # Also parse DSD for supplementary sunspot/flare info
-    dsd_df = parse_dsd_flare_counts()
+    # DSD sunspot numbers fill gaps in SILSO
     if len(dsd_df) > 0:
         merged = merged.merge(dsd_df[["date", "sunspot_dsd"]], on="date", how="left")
         # Fill SILSO missing sunspots with DSD values where available
@@ -460,27 +744,7 @@ def merge_all():
 
     # Compute derived features for the full dataset
     print("\n--- Computing derived features ---")
-    merged = merged.sort_values("date").reset_index(drop=True)
-
-    # x1: consecutive flare-free days (computed separately for M and X)
-    m_consec = []
-    x_consec = []
-    m_count = 0
-    x_count = 0
-    for _, row in merged.iterrows():
-        m_consec.append(m_count)
-        x_consec.append(x_count)
-        if row["m_label"] == 1:
-            m_count = 0
-        else:
-            m_count += 1
-        if row["x_label"] == 1:
-            x_count = 0
-        else:
-            x_count += 1
-
-    merged["m_consec_free"] = m_consec
-    merged["x_consec_free"] = x_consec
+    merged = add_derived_features(merged)
 
     # x2: sunspot number (already in sunspot_number column)
     # Fill remaining NaN sunspot values with 0
@@ -489,16 +753,23 @@ def merge_all():
         print(f"  WARNING: {remaining_nan} days still have NaN sunspot numbers, filling with 0")
         merged["sunspot_number"] = merged["sunspot_number"].fillna(0)
 
+    # Label-source and peak-flux columns go last, as add_label_sources() writes them
+    extra = [c for c in merged.columns if c.startswith(SOURCE_PREFIXES)]
+    merged = merged[[c for c in merged.columns if c not in extra] + extra]
+
     # Save full merged dataset
-    save_path = os.path.join(PROC, "merged_dataset.csv")
-    merged.to_csv(save_path, index=False)
-    print(f"\n  Saved merged dataset: {save_path}")
+    with PERF.span("parse.save"):
+        save_path = os.path.join(PROC, "merged_dataset.csv")
+        merged.to_csv(save_path, index=False)
+        print(f"\n  Saved merged dataset: {save_path}")
+
+        # Save evaluation-only dataset
+        eval_full = merged[merged["date"] >= "1998-01-01"].copy()
+        eval_path = os.path.join(PROC, "evaluation_dataset.csv")
+        eval_full.to_csv(eval_path, index=False)
+        print(f"  Saved evaluation dataset: {eval_path}")
 
-    # Save evaluation-only dataset
-    eval_full = merged[merged["date"] >= "1998-01-01"].copy()
-    eval_path = os.path.join(PROC, "evaluation_dataset.csv")
-    eval_full.to_csv(eval_path, index=False)
-    print(f"  Saved evaluation dataset: {eval_path}")
+        write_append_store(merged, eval_full, rsga_df)
 
     # Print summary statistics
     print("\n" + "=" * 60)
@@ -516,5 +787,349 @@ def merge_all():
     return merged, eval_full
 
 
+# ==========================================================================
+# 5. Incremental daily append
+# ==========================================================================
+#
+# append_day() adds one new day to the processed store without re-reading
+# history. Everything it needs about the past is kept in a small state file
+# next to the processed CSVs (written by merge_all(), or rebuilt once from
+# the processed data by load_append_state()):
+#
+#   last_date         last day in the store; the next append must be the day after
+#   pending           forecasts already issued for the next three target days
+#                     (RSGA issued on D fills D+1 24h, D+2 48h, D+3 72h)
+#   m / x             last label and consec_free (next consec_free is 0 after
+#                     a flare day, else +1), climatology cell counts and
+#                     naive Bayes feature moments per label and pooled, over
+#                     every stored day; forecast_service.py builds the models
+#                     of the last day's month and later from these
+#   evaluation        the thresholds and the last row of EVAL_INDEX
+#
+# EVAL_INDEX holds the SWPC prefix sums of the evaluation days, one row per
+# day with a forecast (range_index.prefix_frame: N, events, squared error,
+# TP/FP/TN/FN per threshold per class/lead), so range_index can answer any
+# date range of the store, appended days included.
+#
+# Each append is O(1): one parsed RSGA text, one event report, one row
+# appended to each CSV and one state update.
+
+APPEND_STATE = "append_state.json"
+EVAL_INDEX = "evaluation_index.csv"
+APPEND_FILES = ("merged_dataset.csv", "evaluation_dataset.csv", EVAL_INDEX)
+EVAL_START = "1998-01-01"
+LEAD_COLUMNS = [(1, "24h", "day1"), (2, "48h", "day2"), (3, "72h", "day3")]
+# (prediction, label) -> confusion count
+COUNT_SLOT = {(1, 1): "TP", (1, 0): "FP", (0, 0): "TN", (0, 1): "FN"}
+
+
+def pending_forecasts(rsga_df, last_date):
+    """Forecasts for the three target days after last_date from the RSGAs already issued."""
+    by_issue = rsga_df.set_index("issue_date")
+    pending = {}
+    for ahead in (1, 2, 3):
+        target = pd.Timestamp(last_date) + timedelta(days=ahead)
+        rec = {}
+        for lead_days, lead_name, day_col in LEAD_COLUMNS:
+            issue = target - timedelta(days=lead_days)
+            if issue <= pd.Timestamp(last_date) and issue in by_issue.index:
+                row = by_issue.loc[issue]
+                rec[f"m_{lead_name}"] = float(row[f"m_{day_col}"])
+                rec[f"x_{lead_name}"] = float(row[f"x_{day_col}"])
+        pending[target.strftime("%Y-%m-%d")] = rec
+    return pending
+
+
+def evaluation_prefix_rows(eval_df, thresholds=(0.5,)):
+    """EVAL_INDEX table of an evaluation dataset (SWPC prefix rows, range_index.prefix_frame)."""
+    from model_swpc import swpc_probabilities
+    from range_index import build_range_index, prefix_frame
+
+    return prefix_frame(build_range_index({"SWPC": swpc_probabilities(eval_df)}, thresholds), "SWPC")
+
+
+def build_append_state(merged, eval_rows, rsga_df, thresholds=(0.5,)):
+    """
+    Append state for a processed store (see the section comment above);
+    eval_rows is its EVAL_INDEX table (evaluation_prefix_rows).
+    """
+    from model_climatology import fit_climatology_counts
+    from model_naive_bayes import feature_moments
+
+    merged = merged.sort_values("date").reset_index(drop=True)
+    last = merged.iloc[-1]
+    last_date = pd.Timestamp(last["date"])
+    state = {
+        "last_date": last_date.strftime("%Y-%m-%d"),
+        "columns": list(merged.columns),
+        "pending": pending_forecasts(rsga_df, last_date),
+    }
+
+    for flare_class in ["m", "x"]:
+        label_col = f"{flare_class}_label"
+        consec_col = f"{flare_class}_consec_free"
+        X = merged[[consec_col, "sunspot_number"]].to_numpy(dtype=float)
+        y = merged[label_col].to_numpy().astype(int)
+        # Naive Bayes is fitted on the rows with both features, as in model_naive_bayes.monthly_params
+        keep = ~np.isnan(X).any(axis=1)
+        X, y = X[keep], y[keep]
+        state[flare_class] = {
+            "label": int(last[label_col]),
+            "consec_free": int(last[consec_col]),
+            "climatology": fit_climatology_counts(merged, label_col, consec_col).astype(int).tolist(),
+            "nb_moments": [feature_moments(X[y == c]).tolist() for c in (0, 1)],
+            "nb_moments_all": feature_moments(X).tolist(),
+        }
+
+    columns = [c for c in eval_rows.columns if c != "date"]
+    last_row = eval_rows.iloc[-1] if len(eval_rows) else pd.Series(0, index=columns)
+    state["evaluation"] = {
+        "thresholds": [float(t) for t in thresholds],
+        "last": {c: float(last_row[c]) if c.endswith("_sq_err") else int(last_row[c]) for c in columns},
+    }
+    return state
+
+
+def write_append_state(state, proc_dir=PROC):
+    """Write the append state atomically."""
+    path = os.path.join(proc_dir, APPEND_STATE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def write_append_store(merged, eval_df, rsga_df, proc_dir=PROC, thresholds=(0.5,)):
+    """Write EVAL_INDEX and the append state of a processed store; returns the state."""
+    eval_rows = evaluation_prefix_rows(eval_df, thresholds)
+    eval_rows.to_csv(os.path.join(proc_dir, EVAL_INDEX), index=False)
+    state = build_append_state(merged, eval_rows, rsga_df, thresholds)
+    write_append_state(state, proc_dir)
+    return state
+
+
+def recover_append(state, proc_dir=PROC):
+    """
+    Undo an append that stopped before committing its state.
+
+    append_day() records the day and the sizes of APPEND_FILES in the state
+    ("in_flight") before writing any row; if that record is still there, the
+    rows written since (whole or partial) are cut off, so that the day can
+    be appended again without duplicating it.
+    """
+    in_flight = state.pop("in_flight", None)
+    if in_flight is None:
+        return state
+    for name, size in in_flight["sizes"].items():
+        path = os.path.join(proc_dir, name)
+        if os.path.getsize(path) > size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+    print(f"  Rolled back the unfinished append of {in_flight['date']}")
+    write_append_state(state, proc_dir)
+    return state
+
+
+def load_append_state(proc_dir=PROC, raw_dir=RAW):
+    """
+    Read the append state, building it and EVAL_INDEX from the processed data
+    the first time (this reads the processed CSVs and the last year's RSGA
+    archive once).
+    """
+    path = os.path.join(proc_dir, APPEND_STATE)
+    if os.path.exists(path) and os.path.exists(os.path.join(proc_dir, EVAL_INDEX)):
+        with open(path) as f:
+            return json.load(f)
+
+    print(f"  No {APPEND_STATE} / {EVAL_INDEX} yet; building them from the processed store")
+    merged = pd.read_csv(os.path.join(proc_dir, "merged_dataset.csv"), parse_dates=["date"])
+    eval_df = pd.read_csv(os.path.join(proc_dir, "evaluation_dataset.csv"), parse_dates=["date"])
+    last_year = merged["date"].max().year
+    rsga_df = parse_rsga_files(raw_dir, years=range(last_year - 1, last_year + 1))
+    return write_append_store(merged, eval_df, rsga_df, proc_dir)
+
+
+@PERF.timed("parse.append")
+def append_day(date, rsga_text, events_text, sunspot_number=None, dsd=None, proc_dir=PROC, raw_dir=RAW):
+    """
+    Append one day to the processed store.
+
+    Parameters:
+    -----------
+    date : date-like
+        The new day; must be the day after the store's last day
+    rsga_text : str or None
+        RSGA issued on `date` (forecasts for the next three days); None if no
+        report was issued
+    events_text : str
+        NOAA event report for `date`: the day's M/X labels and peak flux, as
+        m/x_label, peak_flux and the NOAA label-source columns
+    sunspot_number : float, optional
+        Daily sunspot number; a missing value falls back to the DSD sunspot
+        number, then to 0, as in merge_all()
+    dsd : dict-like, optional
+        The day's DSD record (parse_dsd_line: m/x_count_dsd, sunspot_dsd),
+        for sunspot_dsd and the DSD label-source columns
+
+    Returns:
+    --------
+    dict : the row appended to merged_dataset.csv
+
+    Label-source columns of sources without a record for the day (ASR, XRS,
+    and DSD when `dsd` is None) are NaN, i.e. not covered; the combinations
+    (LABEL_COMBINATIONS) are recomputed from the sources that are.
+
+    A call that fails after writing rows but before committing the state is
+    rolled back by the next call (recover_append), so the day can be retried.
+    """
+    from model_climatology import climatology_cells
+    from model_naive_bayes import update_moments
+    from range_index import prefix_column
+
+    state = recover_append(load_append_state(proc_dir, raw_dir), proc_dir)
+    date = pd.Timestamp(date).normalize()
+    expected = pd.Timestamp(state["last_date"]) + timedelta(days=1)
+    if date != expected:
+        raise ValueError(f"append_day: expected {expected.date()}, got {date.date()} "
+                         f"(days must be appended in order, without gaps)")
+    day = date.strftime("%Y-%m-%d")
+
+    # Record the day and the store's sizes before touching it (recover_append)
+    state["in_flight"] = {"date": day, "sizes": {
+        name: os.path.getsize(os.path.join(proc_dir, name)) for name in APPEND_FILES}}
+    write_append_state(state, proc_dir)
+    del state["in_flight"]
+
+    classes = xra_flare_classes(events_text)
+    goes_classes = xra_goes_classes(events_text)
+    peak_flux = float(goes_class_flux(goes_classes).max()) if goes_classes else 0.0
+    sunspot_dsd = float(dsd["sunspot_dsd"]) if dsd is not None else np.nan
+    if sunspot_number is None or np.isnan(sunspot_number):
+        sunspot_number = sunspot_dsd
+    if np.isnan(sunspot_number):
+        print(f"  WARNING: no sunspot number for {day}, filling with 0")
+        sunspot_number = 0.0
+
+    row = {"date": day, "sunspot_number": float(sunspot_number), "sunspot_dsd": sunspot_dsd,
+           "peak_flux": peak_flux}
+    forecasts = state["pending"].pop(day, {})
+    for _, lead_name, _ in LEAD_COLUMNS:
+        for flare_class in ["m", "x"]:
+            row[f"{flare_class}_{lead_name}"] = forecasts.get(f"{flare_class}_{lead_name}", np.nan)
+
+    # Label sources: the store's source columns, from the event report and the DSD record
+    columns = state["columns"]
+    sources = {"m_label_noaa": float("M" in classes), "x_label_noaa": float("X" in classes),
+               "peak_flux_noaa": peak_flux}
+    if dsd is not None:
+        sources["m_label_dsd"] = float(dsd["m_count_dsd"] > 0)
+        sources["x_label_dsd"] = float(dsd["x_count_dsd"] > 0)
+    source_cols = [source_column(c, s) for s in LABEL_SOURCES for c in ("m", "x", "peak_flux")]
+    labels_df = pd.DataFrame([{c: sources.get(c, np.nan) for c in source_cols if c in columns}], dtype=float)
+    row.update(add_label_combinations(labels_df).iloc[0].to_dict())
+
+    for flare_class in ["m", "x"]:
+        cls = state[flare_class]
+        label = int(flare_class.upper() in classes)
+        consec = 0 if cls["label"] == 1 else cls["consec_free"] + 1
+        row[f"{flare_class}_label"] = label
+        row[f"{flare_class}_consec_free"] = consec
+
+        # Sufficient statistics of the climatology and naive Bayes fits
+        cell = int(climatology_cells([consec], [row["sunspot_number"]])[0])
+        counts = np.asarray(cls["climatology"]).reshape(2, -1)
+        counts[0, cell] += label
+        counts[1, cell] += 1
+        x = [consec, row["sunspot_number"]]
+        cls["climatology"] = counts.reshape(np.shape(cls["climatology"])).tolist()
+        cls["nb_moments"][label] = update_moments(cls["nb_moments"][label], x).tolist()
+        cls["nb_moments_all"] = update_moments(cls["nb_moments_all"], x).tolist()
+        cls["label"] = label
+        cls["consec_free"] = consec
+
+    # SWPC prefix sums: a new EVAL_INDEX row if the day has any forecast
+    eval_row = None
+    if day >= EVAL_START:
+        ev = state["evaluation"]
+        acc = ev["last"]
+        forecast_day = False
+        for flare_class in ["m", "x"]:
+            y = row[f"{flare_class}_label"]
+            for _, lead_name, _ in LEAD_COLUMNS:
+                pct = row[f"{flare_class}_{lead_name}"]
+                if np.isnan(pct):
+                    continue
+                p = pct / 100.0
+                key = f"{flare_class.upper()}_{lead_name}"
+                acc[prefix_column(key, "n")] += 1
+                acc[prefix_column(key, "events")] += y
+                acc[prefix_column(key, "sq_err")] += (p - y) ** 2
+                for theta in ev["thresholds"]:
+                    acc[prefix_column(key, COUNT_SLOT[(int(p >= theta), y)], theta)] += 1
+                forecast_day = True
+        if forecast_day:
+            eval_row = {"date": day, **acc}
+
+    # The RSGA issued today covers the next three target days
+    if rsga_text is not None:
+        m_probs, x_probs = parse_rsga_text(rsga_text)
+        if m_probs and x_probs:
+            for lead_days, lead_name, _ in LEAD_COLUMNS:
+                target = (date + timedelta(days=lead_days)).strftime("%Y-%m-%d")
+                slot = state["pending"].setdefault(target, {})
+                slot[f"m_{lead_name}"] = float(m_probs[lead_days - 1])
+                slot[f"x_{lead_name}"] = float(x_probs[lead_days - 1])
+        else:
+            print(f"  WARNING: RSGA for {day} has no M/X probability lines")
+
+    # Extend the datasets and EVAL_INDEX in place (one row each) and then
+    # commit the state, which clears the in-flight record
+    frame = pd.DataFrame([{c: row.get(c, np.nan) for c in columns}], columns=columns)
+    frame.to_csv(os.path.join(proc_dir, "merged_dataset.csv"), mode="a", header=False, index=False)
+    if day >= EVAL_START:
+        frame.to_csv(os.path.join(proc_dir, "evaluation_dataset.csv"), mode="a", header=False, index=False)
+    if eval_row is not None:
+        pd.DataFrame([eval_row]).to_csv(os.path.join(proc_dir, EVAL_INDEX), mode="a", header=False, index=False)
+    state["last_date"] = day
+    write_append_state(state, proc_dir)
+    print(f"  Appended {day}: M={row['m_label']} X={row['x_label']} "
+          f"m_consec_free={row['m_consec_free']} x_consec_free={row['x_consec_free']}")
+    return row
+
+
 if __name__ == "__main__":
-    merged, eval_df = merge_all()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the processed datasets, or append one day to them")
+    sub = parser.add_subparsers(dest="mode")
+    sub.add_parser("build", help="parse all raw data from scratch (default)")
+    sub.add_parser("labels", help="add every available label source to the processed store")
+    append = sub.add_parser("append", help="append one day: its RSGA issue and event report")
+    append.add_argument("--date", required=True, help="YYYY-MM-DD, the day after the last stored day")
+    append.add_argument("--rsga", help="RSGA text issued on --date (omit if none was issued)")
+    append.add_argument("--events", required=True, help="NOAA event report for --date")
+    append.add_argument("--sunspot", type=float, help="daily sunspot number")
+    append.add_argument("--dsd", help="DSD file (<year>_daypre.txt) holding --date")
+    args = parser.parse_args()
+
+    if args.mode == "labels":
+        add_label_sources()
+    elif args.mode == "append":
+        rsga_text = None
+        if args.rsga:
+            with open(args.rsga, errors="replace") as f:
+                rsga_text = f.read()
+        with open(args.events, errors="replace") as f:
+            events_text = f.read()
+        dsd = None
+        if args.dsd:
+            with open(args.dsd, errors="replace") as f:
+                day = pd.Timestamp(args.date).date()
+                dsd = next((rec for rec in map(parse_dsd_line, f) if rec is not None and rec["date"] == day), None)
+            if dsd is None:
+                print(f"  WARNING: {args.dsd} has no record for {args.date}")
+        append_day(args.date, rsga_text, events_text, args.sunspot, dsd)
+        PERF.write_json(os.path.join(BASE, "perf_append.json"))
+    else:
+        merged, eval_df = merge_all()
+        PERF.write_json(os.path.join(BASE, "perf_parse.json"))
@@ -0,0 +1,215 @@
+"""
+Lightweight instrumentation for the replication pipeline.
+
+Timers and counters are recorded as nested spans. Each span costs two
+perf_counter_ns() calls and one list append, so the recorder stays enabled
+in normal runs. Peak memory per span (tracemalloc) is opt-in because
+tracemalloc itself slows allocation-heavy code.
+
+Usage:
+    from perf import PERF
+
+    with PERF.span("model.climatology", flare_class="m", lead="24h") as span:
+        ...
+        span.count("days", len(y_true))
+
+    @PERF.timed("parse.rsga")
+    def parse_rsga_files(): ...
+
+    PERF.write_json("perf.json")            # summary per span name + raw spans
+    PERF.write_chrome_trace("trace.json")   # chrome://tracing / Perfetto format
+"""
+
+import os
+import json
+import time
+import platform
+import functools
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Span:
+    """One timed region: name, tags, counters and (optionally) peak memory."""
+
+    __slots__ = ("name", "tags", "counters", "start_ns", "duration_ns",
+                 "depth", "peak_bytes", "_child_peak")
+
+    def __init__(self, name, tags, depth):
+        self.name = name
+        self.tags = tags
+        self.counters = {}
+        self.start_ns = 0
+        self.duration_ns = 0
+        self.depth = depth
+        self.peak_bytes = None
+        self._child_peak = 0
+
+    def count(self, key, n=1):
+        """Add `n` to counter `key` (e.g. rows processed, fits performed)."""
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def to_dict(self, origin_ns):
+        rec = {
+            "name": self.name,
+            "start_s": round((self.start_ns - origin_ns) / 1e9, 6),
+            "duration_s": round(self.duration_ns / 1e9, 6),
+            "depth": self.depth,
+        }
+        if self.tags:
+            rec["tags"] = self.tags
+        if self.counters:
+            rec["counters"] = self.counters
+        if self.peak_bytes is not None:
+            rec["peak_bytes"] = self.peak_bytes
+        return rec
+
+
+class PerfRecorder:
+    """
+    Collects spans for one process.
+
+    Parameters:
+    -----------
+    enabled : bool
+        If False, span() yields a throwaway Span and records nothing
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.track_memory = False
+        self.spans = []
+        self._stack = []
+        self._origin_ns = time.perf_counter_ns()
+        self._wall_start = time.time()
+
+    def reset(self):
+        self.spans = []
+        self._stack = []
+        self._origin_ns = time.perf_counter_ns()
+        self._wall_start = time.time()
+
+    def start_memory_tracking(self):
+        """Record tracemalloc peak bytes for every span from now on."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.track_memory = True
+
+    @contextmanager
+    def span(self, name, **tags):
+        """Time the enclosed block; yields the Span so callers can add counters."""
+        span = Span(name, tags, len(self._stack))
+        if not self.enabled:
+            yield span
+            return
+
+        if self.track_memory:
+            # Fold the peak reached so far into the parent, then measure ours
+            if self._stack:
+                parent = self._stack[-1]
+                parent._child_peak = max(parent._child_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+        self._stack.append(span)
+        span.start_ns = time.perf_counter_ns()
+        try:
+            yield span
+        finally:
+            span.duration_ns = time.perf_counter_ns() - span.start_ns
+            self._stack.pop()
+            if self.track_memory:
+                span.peak_bytes = max(span._child_peak, tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent._child_peak = max(parent._child_peak, span.peak_bytes)
+                tracemalloc.reset_peak()
+            self.spans.append(span)
+
+    def count(self, key, n=1):
+        """Add to a counter on the innermost open span (no-op outside spans)."""
+        if self._stack:
+            self._stack[-1].count(key, n)
+
+    def timed(self, name=None):
+        """Decorator form of span(); defaults to the function's qualified name."""
+        def decorator(func):
+            span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """Aggregate spans by name: calls, total/mean/max seconds, counters, peak memory."""
+        agg = {}
+        for s in self.spans:
+            a = agg.setdefault(s.name, {"calls": 0, "total_s": 0.0, "max_s": 0.0, "counters": {}})
+            dur = s.duration_ns / 1e9
+            a["calls"] += 1
+            a["total_s"] += dur
+            a["max_s"] = max(a["max_s"], dur)
+            for k, v in s.counters.items():
+                a["counters"][k] = a["counters"].get(k, 0) + v
+            if s.peak_bytes is not None:
+                a["peak_bytes"] = max(a.get("peak_bytes", 0), s.peak_bytes)
+        for a in agg.values():
+            a["mean_s"] = round(a["total_s"] / a["calls"], 6)
+            a["total_s"] = round(a["total_s"], 6)
+            a["max_s"] = round(a["max_s"], 6)
+            if not a["counters"]:
+                del a["counters"]
+        return agg
+
+    def to_dict(self):
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._wall_start)),
+            "elapsed_s": round((time.perf_counter_ns() - self._origin_ns) / 1e9, 6),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "memory_tracked": self.track_memory,
+            "summary": self.summary(),
+            "spans": [s.to_dict(self._origin_ns)
+                      for s in sorted(self.spans, key=lambda s: s.start_ns)],
+        }
+
+    def write_json(self, path):
+        """Write the perf report (summary + spans) as JSON."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        print(f"Saved {path}")
+
+    def write_chrome_trace(self, path):
+        """Write spans in Chrome trace-event format (complete 'X' events, microseconds)."""
+        pid = os.getpid()
+        events = []
+        for s in sorted(self.spans, key=lambda s: s.start_ns):
+            args = dict(s.tags)
+            args.update(s.counters)
+            if s.peak_bytes is not None:
+                args["peak_bytes"] = s.peak_bytes
+            events.append({
+                "name": s.name,
+                "ph": "X",
+                "ts": (s.start_ns - self._origin_ns) / 1e3,
+                "dur": s.duration_ns / 1e3,
+                "pid": pid,
+                "tid": 0,
+                "args": args,
+            })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"Saved {path}")
+
+    def print_summary(self, top=15):
+        """Print the slowest span names by total time."""
+        rows = sorted(self.summary().items(), key=lambda kv: -kv[1]["total_s"])[:top]
+        print(f"  {'Span':<40} {'Calls':>6} {'Total s':>9} {'Max s':>8}")
+        for name, a in rows:
+            print(f"  {name:<40} {a['calls']:>6} {a['total_s']:>9.3f} {a['max_s']:>8.3f}")
+
+
+# Process-wide recorder used by all pipeline modules
+PERF = PerfRecorder()
@@ -0,0 +1,265 @@
+"""
+Date-range metric index: prefix sums of confusion counts over the
+evaluation days, so metrics over any contiguous date range cost O(1).
+
+For each model x class/lead x threshold the index stores, at every day of
+the (union) evaluation calendar, the cumulative TP, FP, TN, FN up to that
+day, and per model x class/lead the cumulative number of forecasts, events
+(label totals) and squared error (p - y)^2. A range [start, end] is two
+searchsorted lookups and one subtraction; many ranges (every year, every
+solar cycle) are answered together by fancy-indexing the prefix arrays.
+
+Brier over a range is exact (sum of squared errors / N); AUC needs the
+ranking inside the range and is not available from prefix sums.
+
+The SWPC index of the processed store is also kept on disk, one prefix row
+per day (prefix_frame), and extended by each parse_data.py append; --store
+reads it instead of recomputing the forecasts, so appended days are included.
+
+Usage: bash tools/run.sh replicate/src/range_index.py [--by year|cycle]
+           [--model SWPC] [--key X_24h] [--thresholds 0.05,0.5] [--store]
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from features import as_days, lookup_dates
+from metrics import metrics_from_counts
+
+COUNT_NAMES = ["TP", "FP", "TN", "FN"]
+THRESHOLD_METRICS = ["Accuracy", "Precision", "Recall", "F1", "CSI", "POD", "FAR", "TSS", "HSS"]
+
+# Solar cycle start dates (months of the smoothed sunspot minimum, SIDC)
+SOLAR_CYCLES = {
+    "23": "1996-08-01",
+    "24": "2008-12-01",
+    "25": "2019-12-01",
+}
+
+
+def build_range_index(forecasts, thresholds=(0.5,)):
+    """
+    Prefix sums of confusion counts and Brier terms for every forecast series.
+
+    Parameters:
+    -----------
+    forecasts : dict
+        {model: {"M_24h": DataFrame(date, y_true, y_prob), ...}} (run_all.compute_forecasts)
+    thresholds : iterable of float
+        Decision thresholds to index (forecast is positive if p >= theta)
+
+    Returns:
+    --------
+    dict with "models", "keys", "thresholds", "days" (datetime64[D], the
+    sorted union of forecast days) and prefix arrays with a leading axis of
+    len(days) + 1 (row i covers days[:i]):
+      "counts"  int64 (D+1, models, keys, thresholds, 4) of TP, FP, TN, FN
+      "n"       int64 (D+1, models, keys) forecasts
+      "events"  int64 (D+1, models, keys) observed events
+      "sq_err"  float64 (D+1, models, keys) squared error
+    Days a series has no forecast for contribute nothing.
+    """
+    thresholds = np.asarray(list(thresholds), dtype=float)
+    models = list(forecasts)
+    keys = sorted({key for by_key in forecasts.values() for key in by_key})
+    days = np.unique(np.concatenate(
+        [as_days(frame["date"]) for by_key in forecasts.values() for frame in by_key.values()]))
+
+    n_days = len(days)
+    shape = (n_days + 1, len(models), len(keys))
+    counts = np.zeros(shape + (len(thresholds), 4), dtype=np.int64)
+    n = np.zeros(shape, dtype=np.int64)
+    events = np.zeros(shape, dtype=np.int64)
+    sq_err = np.zeros(shape, dtype=float)
+
+    for i, model in enumerate(models):
+        for key, frame in forecasts[model].items():
+            k = keys.index(key)
+            row, _ = lookup_dates(days, as_days(frame["date"]))
+            row = row + 1
+            y = frame["y_true"].to_numpy().astype(int)
+            p = frame["y_prob"].to_numpy(dtype=float)
+
+            n[row, i, k] = 1
+            events[row, i, k] = y
+            sq_err[row, i, k] = (p - y) ** 2
+            pred = p[:, None] >= thresholds[None, :]
+            yy = y[:, None] == 1
+            counts[row, i, k] = np.stack([pred & yy, pred & ~yy, ~pred & ~yy, ~pred & yy], axis=-1)
+
+    return {
+        "models": models,
+        "keys": keys,
+        "thresholds": thresholds,
+        "days": days,
+        "counts": np.cumsum(counts, axis=0),
+        "n": np.cumsum(n, axis=0),
+        "events": np.cumsum(events, axis=0),
+        "sq_err": np.cumsum(sq_err, axis=0),
+    }
+
+
+def prefix_column(key, field, theta=None):
+    """Column of prefix_frame(): <key>_<field> (n, events, sq_err), or <key>_<TP|FP|TN|FN>_<theta>."""
+    return f"{key}_{field}" if theta is None else f"{key}_{field}_{float(theta)!r}"
+
+
+def prefix_frame(index, model):
+    """
+    One model's prefix rows as a flat table, one row per day of the index:
+    date and, per class/lead, the cumulative n, events, sq_err and the
+    TP/FP/TN/FN per threshold through that day (prefix_column names).
+    parse_data.py keeps this table for the SWPC forecasts of the processed
+    store and appends a row per appended day.
+    """
+    i = index["models"].index(model)
+    data = {"date": np.datetime_as_string(index["days"], unit="D")}
+    for k, key in enumerate(index["keys"]):
+        data[prefix_column(key, "n")] = index["n"][1:, i, k]
+        data[prefix_column(key, "events")] = index["events"][1:, i, k]
+        data[prefix_column(key, "sq_err")] = index["sq_err"][1:, i, k]
+        for t, theta in enumerate(index["thresholds"]):
+            for j, name in enumerate(COUNT_NAMES):
+                data[prefix_column(key, name, theta)] = index["counts"][1:, i, k, t, j]
+    return pd.DataFrame(data)
+
+
+def index_from_prefix_frame(frame, model):
+    """Range index (as build_range_index returns it) of a one-model prefix_frame() table."""
+    keys = [c[:-len("_n")] for c in frame.columns if c.endswith("_n")]
+    count_prefix = prefix_column(keys[0], COUNT_NAMES[0]) + "_"
+    thresholds = np.array([float(c[len(count_prefix):]) for c in frame.columns if c.startswith(count_prefix)])
+
+    def prefix(columns, dtype):
+        values = frame[columns].to_numpy(dtype=dtype)
+        return np.concatenate([np.zeros((1,) + values.shape[1:], dtype=dtype), values])
+
+    counts = prefix([prefix_column(key, name, theta) for key in keys for theta in thresholds
+                     for name in COUNT_NAMES], np.int64)
+    return {
+        "models": [model],
+        "keys": keys,
+        "thresholds": thresholds,
+        "days": as_days(frame["date"]),
+        "counts": counts.reshape(len(counts), 1, len(keys), len(thresholds), len(COUNT_NAMES)),
+        "n": prefix([prefix_column(key, "n") for key in keys], np.int64)[:, None],
+        "events": prefix([prefix_column(key, "events") for key in keys], np.int64)[:, None],
+        "sq_err": prefix([prefix_column(key, "sq_err") for key in keys], float)[:, None],
+    }
+
+
+def range_bounds(index, starts, ends):
+    """Prefix rows (lo, hi) for inclusive date ranges [start, end]."""
+    days = index["days"]
+    lo = np.searchsorted(days, as_days(np.atleast_1d(starts)), side="left")
+    hi = np.searchsorted(days, as_days(np.atleast_1d(ends)), side="right")
+    return lo, np.maximum(hi, lo)
+
+
+def range_metrics(index, starts, ends):
+    """
+    Metrics over one or many inclusive date ranges.
+
+    Parameters:
+    -----------
+    index : dict
+        From build_range_index()
+    starts, ends : date-like or arrays of date-likes
+        Inclusive range bounds, anything pd.to_datetime accepts
+
+    Returns:
+    --------
+    dict of arrays with a leading ranges axis:
+      "N", "Events", "Brier"              (ranges, models, keys)
+      "TP", "FP", "TN", "FN" and the
+      threshold metrics (TSS, HSS, ...)   (ranges, models, keys, thresholds)
+    Brier is 0.0 for ranges without forecasts.
+    """
+    lo, hi = range_bounds(index, starts, ends)
+    counts = index["counts"][hi] - index["counts"][lo]
+    n = index["n"][hi] - index["n"][lo]
+    sq_err = index["sq_err"][hi] - index["sq_err"][lo]
+
+    out = {
+        "N": n,
+        "Events": index["events"][hi] - index["events"][lo],
+        "Brier": np.divide(sq_err, n, out=np.zeros(n.shape), where=n > 0),
+    }
+    for j, name in enumerate(COUNT_NAMES):
+        out[name] = counts[..., j]
+    out.update(metrics_from_counts(*(counts[..., j] for j in range(4))))
+    return out
+
+
+def year_periods(index):
+    """(labels, starts, ends) for each calendar year covered by the index."""
+    years = np.unique(index["days"].astype("datetime64[Y]"))
+    starts = years.astype("datetime64[D]")
+    ends = (years + 1).astype("datetime64[D]") - 1
+    return [str(y) for y in years], starts, ends
+
+
+def solar_cycle_periods(index, cycles=SOLAR_CYCLES):
+    """(labels, starts, ends) for each solar cycle overlapping the index."""
+    names = list(cycles)
+    starts = as_days(list(cycles.values()))
+    ends = np.r_[starts[1:] - 1, max(index["days"][-1], starts[-1])]
+    keep = (ends >= index["days"][0]) & (starts <= index["days"][-1])
+    return [f"cycle_{c}" for c, k in zip(names, keep) if k], starts[keep], ends[keep]
+
+
+def breakdown(index, by="year"):
+    """
+    Long-format table of metrics per period x model x class/lead x threshold.
+
+    by : "year" or "cycle"
+    """
+    periods = {"year": year_periods, "cycle": solar_cycle_periods}[by]
+    labels, starts, ends = periods(index)
+    res = range_metrics(index, starts, ends)
+
+    P, M, K, T = res["TP"].shape
+    p, m, k, t = (a.ravel() for a in np.indices((P, M, K, T)))
+    table = pd.DataFrame({
+        "period": np.asarray(labels)[p],
+        "start": starts[p],
+        "end": ends[p],
+        "model": np.asarray(index["models"])[m],
+        "key": np.asarray(index["keys"])[k],
+        "theta": index["thresholds"][t],
+        "N": res["N"][p, m, k],
+        "Events": res["Events"][p, m, k],
+    })
+    for name in COUNT_NAMES + THRESHOLD_METRICS:
+        table[name] = res[name].ravel()
+    table["Brier"] = res["Brier"][p, m, k]
+    return table[table["N"] > 0].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    from run_all import load_data, compute_forecasts
+
+    parser = argparse.ArgumentParser(description="Per-year / per-solar-cycle metric breakdown")
+    parser.add_argument("--by", choices=["year", "cycle"], default="cycle")
+    parser.add_argument("--model", default="SWPC")
+    parser.add_argument("--key", default="X_24h")
+    parser.add_argument("--thresholds", default="0.05,0.5")
+    parser.add_argument("--store", action="store_true",
+                        help="read the SWPC prefix rows of the processed store (its thresholds) instead")
+    args = parser.parse_args()
+
+    if args.store:
+        from parse_data import PROC, EVAL_INDEX
+        index = index_from_prefix_frame(pd.read_csv(os.path.join(PROC, EVAL_INDEX)), "SWPC")
+    else:
+        eval_df, merged_df, _ = load_data()
+        index = build_range_index(compute_forecasts(eval_df, merged_df),
+                                  thresholds=[float(t) for t in args.thresholds.split(",")])
+    table = breakdown(index, by=args.by)
+    table = table[(table["model"] == args.model) & (table["key"] == args.key)]
+    columns = ["period", "theta", "N", "Events", "TP", "FP", "TN", "FN", "TSS", "HSS", "Brier"]
+    print(table[columns].to_string(index=False, float_format=lambda v: f"{v:.2f}"))
@@ -0,0 +1,217 @@
+"""
+Online recalibration of probability forecasts.
+
+SWPC's X-class forecasts are badly calibrated (the TSS-optimal threshold is
+~0.05, Table 8). A recalibration map fitted on a model's own past forecasts
+and outcomes turns its probability stream into a calibrated one:
+
+  isotonic   the non-decreasing step function closest (least squares) to the
+             observed event rates, by pool-adjacent-violators (pav)
+  platt      P = sigmoid(a * logit(p) + b), fitted by maximum likelihood
+
+Monthly expanding window, like the models: each month's map is fitted on
+every forecast of the series whose target day is before the month, and
+applied to the month's forecasts; days before the first month with both
+outcomes are dropped. Both fits run on the forecast histogram, not on days:
+forecasts are rounded to N_BUCKETS + 1 buckets (SWPC's whole percentages
+exactly), and every month's bucket counts come from one bincount by the
+month each day enters the window, accumulated. SWPC uses ~20 distinct
+values, so a month's fit costs ~20 buckets whatever the history length;
+the isotonic fits of all months run as one segmented PAV and the Platt
+fits as one batch of Newton steps.
+
+Recalibrated series are named <model>_Isotonic and <model>_Platt and are
+added to the forecasts by run_all.compute_forecasts, so they appear as
+extra rows in every table.
+"""
+
+import os
+import sys
+import numpy as np
+from scipy.special import expit, logit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from perf import PERF
+from features import as_days, forecast_frame
+
+METHODS = ("isotonic", "platt")
+# Models recalibrated by run_all.compute_forecasts (Persistence issues 0/1 forecasts)
+RECALIBRATED = ("SWPC", "Climatology", "Naive_Bayes", "Logistic_Reg", "Baseline_Avg")
+N_BUCKETS = 100
+PLATT_EPS = 1e-3        # forecasts clipped to [eps, 1 - eps] before the logit
+PLATT_RIDGE = 1e-3      # L2 penalty on (a, b): keeps separable windows finite
+PLATT_STEPS = 50        # Newton steps at most (stops once the step is below 1e-10)
+
+
+def recalibrated_name(model, method):
+    """Model name of a recalibrated series: ("SWPC", "isotonic") -> "SWPC_Isotonic"."""
+    return f"{model}_{method.capitalize()}"
+
+
+def window_histograms(days, y_true, y_prob):
+    """
+    Bucket histograms of the expanding window of every month of a forecast
+    series.
+
+    Returns:
+    --------
+    (months, month_of_day, counts): counts (len(months), 2, N_BUCKETS + 1)
+    holds, per month, the days before it by label and forecast bucket
+    """
+    months, month_of_day = np.unique(days.astype("datetime64[M]"), return_inverse=True)
+    entry = np.searchsorted(months.astype("datetime64[D]"), days, side="right")
+    bucket = np.rint(np.asarray(y_prob, dtype=float) * N_BUCKETS).astype(np.int64)
+    n_codes = 2 * (N_BUCKETS + 1)
+    flat = entry * n_codes + np.asarray(y_true).astype(np.int64) * (N_BUCKETS + 1) + bucket
+    counts = np.bincount(flat, minlength=(len(months) + 1) * n_codes).reshape(-1, 2, N_BUCKETS + 1)
+    return months, month_of_day, counts[:len(months)].cumsum(axis=0)
+
+
+def pav(events, totals, segments=None):
+    """
+    Weighted isotonic regression of the rates events / totals: the
+    non-decreasing sequence minimizing sum totals * (fit - rate)^2, by
+    pool-adjacent-violators. totals must be positive.
+
+    `segments` (non-decreasing ids) splits the input into independent
+    sequences fitted in the same call. Every violating pair of adjacent
+    blocks is pooled at once in each round (the fit does not depend on the
+    pooling order), so a round is a few array operations over all segments.
+    """
+    events = np.asarray(events, dtype=float)
+    totals = np.asarray(totals, dtype=float)
+    segments = np.zeros(len(events), dtype=np.int64) if segments is None else np.asarray(segments)
+    if len(events) == 0:
+        return np.zeros(0)
+    start = np.ones(len(events), dtype=bool)
+    while True:
+        first = np.flatnonzero(start)
+        block = np.cumsum(start) - 1
+        level = np.bincount(block, weights=events) / np.bincount(block, weights=totals)
+        violate = (level[:-1] > level[1:]) & (segments[first[:-1]] == segments[first[1:]])
+        if not violate.any():
+            return level[block]
+        start[first[1:][violate]] = False
+
+
+def isotonic_maps(counts, months, y_prob):
+    """
+    Isotonic recalibration of forecasts y_prob, each with the map fitted on
+    the bucket histogram counts[months[i]] (counts (n, 2, N_BUCKETS + 1));
+    linear between fitted buckets, constant beyond the first and last.
+    """
+    totals = counts.sum(axis=1)
+    seg, bucket = np.nonzero(totals)
+    fit = pav(counts[seg, 1, bucket], totals[seg, bucket], seg)
+    # Interpolate on one sorted axis, month m's buckets at m * (N_BUCKETS + 1) + bucket
+    x = seg * (N_BUCKETS + 1) + bucket.astype(float)
+    q = months * (N_BUCKETS + 1) + np.asarray(y_prob, dtype=float) * N_BUCKETS
+    first = np.searchsorted(seg, months, side="left")
+    last = np.searchsorted(seg, months, side="right") - 1
+    right = np.clip(np.searchsorted(x, q, side="right"), first, last)
+    left = np.clip(right - 1, first, last)
+    span = x[right] - x[left]
+    w = np.divide(q - x[left], span, out=np.zeros(len(q)), where=span > 0).clip(0, 1)
+    return fit[left] + w * (fit[right] - fit[left])
+
+
+def platt_params(counts):
+    """
+    Platt parameters (a, b) of many bucket histograms (..., 2, N_BUCKETS + 1)
+    at once: (..., 2), by Newton's method (IRLS) on the log-likelihood with
+    a small ridge penalty, started from (a, b) = (0, 0).
+    """
+    counts = np.asarray(counts, dtype=float)
+    x = logit(np.clip(np.arange(N_BUCKETS + 1) / N_BUCKETS, PLATT_EPS, 1 - PLATT_EPS))
+    n, events = counts.sum(axis=-2), counts[..., 1, :]
+    a = np.zeros(counts.shape[:-2])
+    b = np.zeros(counts.shape[:-2])
+    for _ in range(PLATT_STEPS):
+        p = expit(a[..., None] * x + b[..., None])
+        r, w = events - n * p, n * p * (1 - p)
+        # Gradient and (negated) Hessian of the penalized log-likelihood, solved as 2 x 2 systems
+        ga, gb = r @ x - PLATT_RIDGE * a, r.sum(axis=-1) - PLATT_RIDGE * b
+        haa, hab, hbb = w @ (x * x) + PLATT_RIDGE, w @ x, w.sum(axis=-1) + PLATT_RIDGE
+        det = haa * hbb - hab * hab
+        da, db = (hbb * ga - hab * gb) / det, (haa * gb - hab * ga) / det
+        a, b = a + da, b + db
+        if max(np.abs(da).max(initial=0), np.abs(db).max(initial=0)) < 1e-10:
+            break
+    return np.stack([a, b], axis=-1)
+
+
+def platt_map(params, y_prob):
+    """Platt recalibration sigmoid(a * logit(p) + b) of forecasts y_prob with params (..., 2)."""
+    x = logit(np.clip(y_prob, PLATT_EPS, 1 - PLATT_EPS))
+    return expit(params[..., 0] * x + params[..., 1])
+
+
+def recalibrate(frame, method="isotonic"):
+    """
+    Expanding-window recalibration of one forecast series.
+
+    Parameters:
+    -----------
+    frame : DataFrame(date, y_true, y_prob)
+    method : str
+        "isotonic" or "platt" (METHODS)
+
+    Returns:
+    --------
+    DataFrame(date, y_true, y_prob) of the days whose window holds both
+    outcomes, with recalibrated probabilities
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}: {method!r}")
+    frame = frame.sort_values("date")
+    days = as_days(frame["date"])
+    y_true = frame["y_true"].to_numpy()
+    y_prob = frame["y_prob"].to_numpy(dtype=float)
+    months, month_of_day, counts = window_histograms(days, y_true, y_prob)
+    fitted = (counts.sum(axis=2) > 0).all(axis=1)
+    ok = fitted[month_of_day]
+
+    row = (np.cumsum(fitted) - 1)[month_of_day[ok]]
+    if method == "platt":
+        y_new = platt_map(platt_params(counts[fitted])[row], y_prob[ok])
+    else:
+        y_new = isotonic_maps(counts[fitted], row, y_prob[ok])
+    return forecast_frame(days[ok], y_true[ok], y_new)
+
+
+def recalibrated_forecasts(forecasts, models=RECALIBRATED, methods=METHODS):
+    """
+    Recalibrated copies of model forecasts:
+    {recalibrated_name(model, method): {key: DataFrame(date, y_true, y_prob)}}
+    for every model of `models` present in `forecasts` and every method.
+    """
+    out = {}
+    for model in models:
+        if model not in forecasts:
+            continue
+        for method in methods:
+            with PERF.span("recalibration", model=model, method=method) as span:
+                out[recalibrated_name(model, method)] = {
+                    key: recalibrate(frame, method) for key, frame in forecasts[model].items()}
+                span.count("days", sum(len(f) for f in forecasts[model].values()))
+    return out
+
+
+def run_recalibrated(forecasts):
+    """
+    Metrics at theta=0.5 of every recalibrated series in `forecasts`
+    (compute_forecasts output): {name: {key: metrics}}.
+    """
+    from metrics import evaluate_forecasts
+
+    results = {}
+    for name, by_key in forecasts.items():
+        if not name.endswith(tuple(recalibrated_name("", m) for m in METHODS)):
+            continue
+        results[name] = {}
+        for key, frame in by_key.items():
+            metrics = evaluate_forecasts(frame)
+            results[name][key] = metrics
+            print(f"  {name} {key}: Acc={metrics['Accuracy']}, F1={metrics['F1']}, "
+                  f"Brier={metrics['Brier']}, AUC={metrics['AUC']}, TSS={metrics['TSS']}")
+    return results
@@ -1,17 +1,33 @@
 """
 Master runner: runs all models, generates results tables, auto-compares against targets.json.
 
-Usage: bash tools/run.sh replicate/src/run_all.py
+Usage: bash tools/run.sh replicate/src/run_all.py [--no-cache] [--trace-memory] [--chrome-trace]
+           [--horizons 1-27] [--tolerance relative] [--nb-variant gaussian]
+
+  --no-cache       refit every monthly model instead of reusing replicate/data/cache/
+  --trace-memory   record tracemalloc peak memory per span in perf.json
+  --chrome-trace   also write perf_trace.json (chrome://tracing / Perfetto)
+  --horizons       also forecast these lead times (days) in the same batched run and
+                   write results/skill_by_horizon.csv; the paper tables use 1-3
+  --tolerance      comparison scheme: relative (default), absolute or rounding
+  --nb-variant     Naive Bayes reading: gaussian (default, the published tables) or binned
+
+Every run writes perf.json (timings, row counts, fit counts) next to results.json.
 """
 
 import os
 import sys
 import json
+import argparse
 import numpy as np
 import pandas as pd
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from metrics import compute_all_metrics, threshold_predictions, brier_score, auc_score
+from perf import PERF
+from calibration import calibration_summary
+from histogram import ForecastHistogram
+from features import HORIZONS, LEADS, leads, parse_horizons
+from comparison import TOLERANCES, TargetSet
 
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PROC = os.path.join(BASE, "data", "processed")
@@ -23,6 +39,7 @@ os.makedirs(TABLES, exist_ok=True)
 os.makedirs(os.path.join(RESULTS, "figures"), exist_ok=True)
 
 
+@PERF.timed("stage.load_data")
 def load_data():
     eval_df = pd.read_csv(os.path.join(PROC, "evaluation_dataset.csv"))
     eval_df["date"] = pd.to_datetime(eval_df["date"])
@@ -33,32 +50,131 @@ def load_data():
     return eval_df, merged_df, targets
 
 
-def run_all_models(eval_df, merged_df):
-    """Run all 6 models and return results dict with probabilities."""
+# Modelling choices the paper leaves ambiguous; compute_forecasts(options=...) overrides them
+# and sweep.py runs grids of them
+MODEL_OPTIONS = {
+    "timing": "issue",          # features from the issue day or the target day (features.FEATURE_TIMINGS)
+    "bins": "20/10/200",        # climatology bins: x1 cap / x2 width / x2 cap (model_climatology.parse_bins)
+    "nb_variant": "gaussian",   # model_naive_bayes.NB_VARIANTS ("binned" shares the climatology bins)
+    "lr_C": 1.0,                # inverse L2 regularization strength of the LR
+    "lr_solver": "lbfgs",       # LR fitting engine (model_logistic_regression.LR_SOLVERS)
+}
+
+
+def compute_forecasts(eval_df, merged_df, use_cache=True, horizons=None, options=None):
+    """
+    Per-day forecasts of every model: {model: {"M_24h": DataFrame(date, y_true, y_prob), ...}}.
+
+    `horizons` are lead times in days (default features.HORIZONS); every
+    model forecasts all of them from one set of monthly fits. `options`
+    override MODEL_OPTIONS. Expanding-window recalibrated copies of the
+    recalibration.RECALIBRATED models are added as <model>_Isotonic and
+    <model>_Platt.
+    """
+    from model_swpc import swpc_probabilities
+    from model_persistence import persistence_probabilities
+    from model_climatology import climatology_probabilities, parse_bins
+    from model_naive_bayes import naive_bayes_probabilities
+    from model_logistic_regression import logistic_regression_probabilities
+    from model_analog import analog_probabilities
+    from model_markov import markov_probabilities
+    from model_baseline_avg import baseline_average_probabilities
+    from recalibration import recalibrated_forecasts
+
+    o = {**MODEL_OPTIONS, **(options or {})}
+    unknown = set(o) - set(MODEL_OPTIONS)
+    if unknown:
+        raise ValueError(f"unknown model options: {', '.join(sorted(unknown))}")
+
+    forecasts = {
+        "SWPC": swpc_probabilities(eval_df, horizons),
+        "Persistence": persistence_probabilities(eval_df, merged_df, horizons),
+        "Climatology": climatology_probabilities(eval_df, merged_df, use_cache, horizons,
+                                                 o["timing"], parse_bins(o["bins"])),
+        "Naive_Bayes": naive_bayes_probabilities(eval_df, merged_df, use_cache, horizons,
+                                                 o["timing"], o["nb_variant"], parse_bins(o["bins"])),
+        "Logistic_Reg": logistic_regression_probabilities(eval_df, merged_df, use_cache, horizons,
+                                                          o["timing"], float(o["lr_C"]), o["lr_solver"]),
+        "Analog": analog_probabilities(eval_df, merged_df, horizons),
+        "Markov": markov_probabilities(eval_df, merged_df, horizons),
+    }
+    forecasts["Baseline_Avg"] = baseline_average_probabilities(forecasts)
+    forecasts.update(recalibrated_forecasts(forecasts))
+    return forecasts
+
+
+def select_horizons(forecasts, horizons=None):
+    """The part of compute_forecasts() output for the given horizons (default features.HORIZONS)."""
+    keys = {f"{c}_{lead_name}" for c in ("M", "X") for _, lead_name in leads(horizons)}
+    return {model: {k: v for k, v in by_key.items() if k in keys} for model, by_key in forecasts.items()}
+
+
+def skill_by_horizon(forecasts, theta=0.5):
+    """
+    Skill against lead time: one row per model, class and horizon with N,
+    TSS, HSS, Brier and AUC at threshold theta.
+    """
+    rows = []
+    for model, by_key in forecasts.items():
+        for key, frame in by_key.items():
+            flare_class, lead_name = key.split("_")
+            m = ForecastHistogram.from_frame(frame).metrics(theta)
+            rows.append({"Model": model, "Class": flare_class, "Lead_days": int(lead_name[:-1]) // 24,
+                         "N": len(frame), **{k: m[k] for k in ("TSS", "HSS", "Brier", "AUC")}})
+    return pd.DataFrame(rows).sort_values(["Model", "Class", "Lead_days"]).reset_index(drop=True)
+
+
+def run_all_models(eval_df, merged_df, use_cache=True, forecasts=None, options=None):
+    """
+    Run all models and return their metrics at theta=0.5.
+
+    `forecasts` is the output of compute_forecasts(); it is computed here
+    (with `options`, e.g. {"nb_variant": "binned"}) if not given.
+    """
     from model_swpc import run_swpc
     from model_persistence import run_persistence
     from model_climatology import run_climatology
     from model_naive_bayes import run_naive_bayes
     from model_logistic_regression import run_logistic_regression
+    from model_analog import run_analog
+    from model_markov import run_markov
+    from model_baseline_avg import run_baseline_average
+    from recalibration import run_recalibrated
+
+    if forecasts is None:
+        forecasts = compute_forecasts(eval_df, merged_df, use_cache=use_cache, options=options)
+    o = {**MODEL_OPTIONS, **(options or {})}
 
     print("=" * 60)
     print("RUNNING ALL MODELS (theta=0.5)")
     print("=" * 60)
 
     print("\n--- SWPC ---")
-    swpc = run_swpc(eval_df)
+    swpc = run_swpc(eval_df, probs=forecasts["SWPC"])
 
     print("\n--- Persistence ---")
-    persist = run_persistence(eval_df, merged_df)
+    persist = run_persistence(eval_df, merged_df, probs=forecasts["Persistence"])
 
     print("\n--- Climatology ---")
-    clim = run_climatology(eval_df, merged_df)
+    clim = run_climatology(eval_df, merged_df, probs=forecasts["Climatology"])
 
-    print("\n--- Naive Bayes ---")
-    nb = run_naive_bayes(eval_df, merged_df)
+    print(f"\n--- Naive Bayes ({o['nb_variant']}) ---")
+    nb = run_naive_bayes(eval_df, merged_df, probs=forecasts["Naive_Bayes"])
 
     print("\n--- Logistic Regression ---")
-    lr = run_logistic_regression(eval_df, merged_df)
+    lr = run_logistic_regression(eval_df, merged_df, probs=forecasts["Logistic_Reg"])
+
+    print("\n--- Analog Ensemble ---")
+    an = run_analog(eval_df, merged_df, probs=forecasts["Analog"])
+
+    print("\n--- Markov Chain ---")
+    mk = run_markov(eval_df, merged_df, probs=forecasts["Markov"])
+
+    print("\n--- Baseline Average ---")
+    ba = run_baseline_average(forecasts, probs=forecasts.get("Baseline_Avg"))
+
+    print("\n--- Recalibrated (expanding-window isotonic / Platt) ---")
+    recalibrated = run_recalibrated(forecasts)
 
     return {
         "SWPC": swpc,
@@ -66,87 +182,80 @@ def run_all_models(eval_df, merged_df):
         "Climatology": clim,
         "Naive_Bayes": nb,
         "Logistic_Reg": lr,
+        "Analog": an,
+        "Markov": mk,
+        "Baseline_Avg": ba,
+        **recalibrated,
     }
 
 
 def find_optimal_threshold(y_true, y_prob):
-    """Find threshold that maximizes TSS."""
-    from metrics import true_skill_statistic
-    best_tss = -1
-    best_theta = 0.5
-    # Test thresholds from 0.01 to 1.0
-    for theta_int in range(1, 101):
-        theta = theta_int / 100.0
-        y_pred = threshold_predictions(y_prob, theta)
-        tss = true_skill_statistic(y_true, y_pred)
-        if tss > best_tss:
-            best_tss = tss
-            best_theta = theta
-    return best_theta, best_tss
-
-
-def run_optimized_threshold(eval_df, merged_df):
+    """Find threshold (0.01 ... 1.00) that maximizes TSS."""
+    return ForecastHistogram.from_arrays(y_true, y_prob).best_threshold()
+
+
+def run_optimized_threshold(forecasts):
     """
     Compute optimal thresholds (Table 8) and results at optimal thresholds (Tables 9-14).
 
-    For SWPC: use forecast probabilities directly.
-    For other models: need to collect probability predictions first.
-    This is a simplified version that re-runs SWPC and Persistence.
+    Every model's threshold maximizes TSS over 0.01 ... 1.00 on its own
+    forecast histogram; Persistence issues 0/1 forecasts, so its threshold is
+    1.00 by definition. `forecasts` is the output of compute_forecasts().
+
+    Returns:
+    --------
+    (optimal_thresholds, optimized_results) : {model: {key: theta}} and
+    {model: {key: metrics}}
     """
     print("\n" + "=" * 60)
     print("OPTIMIZED THRESHOLD ANALYSIS")
     print("=" * 60)
 
-    # SWPC: optimal thresholds from forecast probabilities
     optimal_thresholds = {}
     optimized_results = {}
 
-    for flare_class in ["m", "x"]:
-        label_col = f"{flare_class}_label"
-        for lead_name in ["24h", "48h", "72h"]:
-            prob_col = f"{flare_class}_{lead_name}"
-            valid = eval_df[eval_df[prob_col].notna()].copy()
-            y_true = valid[label_col].values.astype(int)
-            y_prob = valid[prob_col].values / 100.0
-
-            key = f"{flare_class.upper()}_{lead_name}"
-            theta, tss = find_optimal_threshold(y_true, y_prob)
-            optimal_thresholds[f"SWPC_{key}"] = theta
-
-            y_pred = threshold_predictions(y_prob, theta)
-            metrics = compute_all_metrics(y_true, y_pred, y_prob)
-            optimized_results[f"SWPC_{key}"] = metrics
-            print(f"  SWPC {key}: optimal theta={theta:.2f}, TSS={tss:.2f}")
-
-    # Persistence: threshold is always 1.0 (binary output)
-    for flare_class in ["m", "x"]:
-        for lead_name in ["24h", "48h", "72h"]:
-            key = f"{flare_class.upper()}_{lead_name}"
-            optimal_thresholds[f"Persistence_{key}"] = 1.00
+    for model, by_key in forecasts.items():
+        optimal_thresholds[model] = {}
+        optimized_results[model] = {}
+        for key, frame in by_key.items():
+            hist = ForecastHistogram.from_frame(frame)
+            if model == "Persistence":
+                theta = 1.00
+            else:
+                theta, _ = hist.best_threshold()
+            metrics = hist.metrics(theta)
+            optimal_thresholds[model][key] = theta
+            optimized_results[model][key] = metrics
+            print(f"  {model} {key}: optimal theta={theta:.2f}, TSS={metrics['TSS']:.2f}")
 
     return optimal_thresholds, optimized_results
 
 
-def run_special_analyses(eval_df, merged_df):
-    """Run storm-after-the-calm and all-clear analyses."""
+def run_special_analyses(eval_df, merged_df, forecasts=None):
+    """
+    Run storm-after-the-calm and all-clear analyses.
+
+    Both are cells of the conditioning cube (conditioning.py) for SWPC X_24h
+    at theta=0.05: quiet_30 (>30 flare-free days) and after_flare_3 (an X
+    flare on one of the 3 previous days). `forecasts` is the output of
+    compute_forecasts(); only the SWPC entry is used.
+    """
+    from model_swpc import swpc_probabilities
+    from conditioning import condition_cube, cube_counts
+
     print("\n" + "=" * 60)
     print("SPECIAL ANALYSES")
     print("=" * 60)
 
+    swpc = forecasts["SWPC"] if forecasts is not None else swpc_probabilities(eval_df)
+    cube = condition_cube({"SWPC": {"X_24h": swpc["X_24h"]}}, merged_df,
+                          quiet=[30], windows=[3], thresholds=[0.05])
     results = {}
 
     # Storm after the calm: X-class, >30 flare-free days, SWPC 24h, theta=0.05
     print("\n--- Storm After the Calm ---")
-    valid = eval_df[eval_df["x_24h"].notna()].copy()
-    calm_mask = valid["x_consec_free"] > 30
-    calm_data = valid[calm_mask]
-
-    y_true = calm_data["x_label"].values.astype(int)
-    y_prob = calm_data["x_24h"].values / 100.0
-    y_pred = threshold_predictions(y_prob, theta=0.05)
-
-    from metrics import confusion_matrix_counts
-    TP, FP, TN, FN = confusion_matrix_counts(y_true, y_pred)
+    c = cube_counts(cube, "SWPC", "X_24h", "quiet_30", 0.05)
+    TP, FP, TN, FN = c["TP"], c["FP"], c["TN"], c["FN"]
     results["storm_after_calm"] = {
         "TP": TP, "FN": FN, "FP": FP, "TN": TN,
         "positive_cases": TP + FN,
@@ -161,23 +270,8 @@ def run_special_analyses(eval_df, merged_df):
 
     # All-clear: days +1/+2/+3 after X-class flare, SWPC 24h, theta=0.05
     print("\n--- All-Clear ---")
-    merged_sorted = merged_df.sort_values("date").reset_index(drop=True)
-    x_flare_dates = set(merged_sorted[merged_sorted["x_label"] == 1]["date"])
-
-    # Find all days that are +1, +2, or +3 after an X-class flare
-    all_clear_dates = set()
-    for d in x_flare_dates:
-        for offset in [1, 2, 3]:
-            all_clear_dates.add(d + pd.Timedelta(days=offset))
-
-    ac_mask = eval_df["date"].isin(all_clear_dates) & eval_df["x_24h"].notna()
-    ac_data = eval_df[ac_mask]
-
-    y_true = ac_data["x_label"].values.astype(int)
-    y_prob = ac_data["x_24h"].values / 100.0
-    y_pred = threshold_predictions(y_prob, theta=0.05)
-
-    TP, FP, TN, FN = confusion_matrix_counts(y_true, y_pred)
+    c = cube_counts(cube, "SWPC", "X_24h", "after_flare_3", 0.05)
+    TP, FP, TN, FN = c["TP"], c["FP"], c["TN"], c["FN"]
     results["all_clear"] = {
         "TP": TP, "FN": FN, "FP": FP, "TN": TN,
         "total_non_flaring": FP + TN,
@@ -193,112 +287,211 @@ def run_special_analyses(eval_df, merged_df):
     return results
 
 
-def build_results_json(all_results, special):
-    """Build results.json in the same structure as targets.json."""
-    results = {
-        "tables": {},
-        "special_analyses": special,
+def print_calibration(calibration):
+    """Print the Brier decomposition (REL - RES + UNC) for every model and key."""
+    print("\n" + "=" * 60)
+    print("BRIER DECOMPOSITION (reliability - resolution + uncertainty)")
+    print("=" * 60)
+    print(f"  {'Model':<14} {'Key':<6} {'Brier':>8} {'REL':>8} {'RES':>8} {'UNC':>8}")
+    for model, by_key in calibration["models"].items():
+        for key, c in by_key.items():
+            print(f"  {model:<14} {key:<6} {c['brier']:>8.4f} {c['reliability']:>8.4f} "
+                  f"{c['resolution']:>8.4f} {c['uncertainty']:>8.4f}")
+
+
+# Table 8 uses the paper's model and key names; tables 2-7 and 9-14 use the model keys
+TABLE_8_NAMES = {"Logistic_Reg": "Logistic_Regression", "Baseline_Avg": "Baseline_Average"}
+
+DEFAULT_TABLES = {
+    "table_2": ("M_24h", "M-class, 24hr ahead, threshold=0.5"),
+    "table_3": ("M_48h", "M-class, 48hr ahead, threshold=0.5"),
+    "table_4": ("M_72h", "M-class, 72hr ahead, threshold=0.5"),
+    "table_5": ("X_24h", "X-class, 24hr ahead, threshold=0.5"),
+    "table_6": ("X_48h", "X-class, 48hr ahead, threshold=0.5"),
+    "table_7": ("X_72h", "X-class, 72hr ahead, threshold=0.5"),
+}
+
+OPTIMIZED_TABLES = {
+    "table_9": ("M_24h", "M-class, 24hr ahead, optimized threshold"),
+    "table_10": ("M_48h", "M-class, 48hr ahead, optimized threshold"),
+    "table_11": ("M_72h", "M-class, 72hr ahead, optimized threshold"),
+    "table_12": ("X_24h", "X-class, 24hr ahead, optimized threshold"),
+    "table_13": ("X_48h", "X-class, 48hr ahead, optimized threshold"),
+    "table_14": ("X_72h", "X-class, 72hr ahead, optimized threshold"),
+}
+
+
+def paper_values(eval_df, merged_df, forecasts, calibration, optimal, optimized, options=None):
+    """
+    The scalar results quoted in the paper text and figures, in the sections
+    of targets.json: descriptive_statistics, key_numbers, figure_key_values,
+    forecast_probability_discrete_values and climatology_bins, plus table_1.
+
+    `optimal` / `optimized` are the outputs of run_optimized_threshold();
+    `options` are the compute_forecasts() options the forecasts were made with.
+    """
+    from model_climatology import bin_labels, parse_bins
+
+    start, end = eval_df["date"].min(), eval_df["date"].max()
+    first = merged_df["date"].min()
+    buffer_months = (start.year - first.year) * 12 + start.month - first.month
+    last_buffer = start - pd.DateOffset(months=1)
+
+    counts = {}
+    for c in ("m", "x"):
+        positive = int(eval_df[f"{c}_label"].sum())
+        counts[c] = (positive, len(eval_df) - positive)
+
+    def fraction(c):
+        return round(counts[c][0] / len(eval_df), 3)
+
+    def ratio(c):
+        return round(counts[c][1] / counts[c][0], 2)
+
+    def after_flare(c):
+        # P(flare | a flare on the previous day): x = 0 in Figure 3
+        return round(float(eval_df.loc[eval_df[f"{c}_consec_free"] == 0, f"{c}_label"].mean()), 2)
+
+    # Observed frequency of the 0.80-0.85 reliability bin of SWPC M_72h (Figure 4)
+    edges = np.round(calibration["bin_edges"], 2)
+    at_80 = calibration["models"]["SWPC"]["M_72h"]["observed_freq"][int(np.flatnonzero(edges == 0.8)[0])]
+    at_80 = round(at_80, 2) if at_80 is not None else None
+
+    discrete = {}
+    for c in ("m", "x"):
+        for _, lead_name in LEADS:
+            values = np.unique(eval_df[f"{c}_{lead_name}"].dropna())
+            discrete[f"{c}_class_{lead_name}"] = {"values": [int(v) if float(v).is_integer() else float(v)
+                                                             for v in values],
+                                                  "count": len(values)}
+
+    x24 = optimized["SWPC"]["X_24h"]
+    key_numbers = {
+        "class_imbalance_ratio_m": ratio("m"),
+        "class_imbalance_ratio_x": ratio("x"),
+        "m_class_event_rate": fraction("m"),
+        "x_class_event_rate": fraction("x"),
+        **{f"optimal_threshold_swpc_{key.lower()}": theta for key, theta in optimal["SWPC"].items()},
+        "swpc_x24h_optimized_recall": x24["Recall"],
+        "swpc_x24h_optimized_far": x24["FAR"],
+        "conditional_prob_m_after_flare_day": after_flare("m"),
+        "conditional_prob_x_after_flare_day": after_flare("x"),
+        "m_class_reliability_72h_at_80pct_predicted": at_80,
     }
 
-    table_map = {
-        "table_2": ("M_24h", "M-class, 24hr ahead, threshold=0.5"),
-        "table_3": ("M_48h", "M-class, 48hr ahead, threshold=0.5"),
-        "table_4": ("M_72h", "M-class, 72hr ahead, threshold=0.5"),
-        "table_5": ("X_24h", "X-class, 24hr ahead, threshold=0.5"),
-        "table_6": ("X_48h", "X-class, 48hr ahead, threshold=0.5"),
-        "table_7": ("X_72h", "X-class, 72hr ahead, threshold=0.5"),
+    return {
+        "table_1": {
+            "caption": f"Total counts of positive and negative days for M-class and X-class flares "
+                       f"({len(eval_df):,} days)",
+            "data": {f"{c.upper()}_class": {"positive_days": counts[c][0], "negative_days": counts[c][1],
+                                           "class_imbalance_ratio": ratio(c)} for c in ("m", "x")},
+        },
+        "descriptive_statistics": {
+            "total_unique_days_merged": int(merged_df["date"].nunique()),
+            "evaluation_period_days": len(eval_df),
+            "evaluation_period_start": start.strftime("%Y-%m-%d"),
+            "evaluation_period_end": end.strftime("%Y-%m-%d"),
+            "evaluation_period_years": end.year - start.year,
+            "training_buffer_months": buffer_months,
+            "training_buffer_start": first.strftime("%Y-%m"),
+            "training_buffer_end": last_buffer.strftime("%Y-%m"),
+            "m_class_positive_days": counts["m"][0],
+            "m_class_negative_days": counts["m"][1],
+            "m_class_positive_fraction": fraction("m"),
+            "x_class_positive_days": counts["x"][0],
+            "x_class_negative_days": counts["x"][1],
+            "x_class_positive_fraction": fraction("x"),
+            "class_imbalance_ratio_m": ratio("m"),
+            "class_imbalance_ratio_x": ratio("x"),
+            # Always forecasting "no flare": accuracy is the negative fraction,
+            # Brier (all-zero forecasts) the positive fraction
+            "no_flare_accuracy_m": round(1 - fraction("m"), 3),
+            "no_flare_accuracy_x": round(1 - fraction("x"), 3),
+            "no_flare_brier_x": fraction("x"),
+            "m_class_discrete_probability_values_count": discrete["m_class_24h"]["count"],
+        },
+        "key_numbers": key_numbers,
+        "figure_key_values": {
+            "figure_3_conditional_probability": {
+                "m_class_n0_prob": key_numbers["conditional_prob_m_after_flare_day"],
+                "x_class_n0_prob": key_numbers["conditional_prob_x_after_flare_day"],
+            },
+            "figure_4_reliability": {"m_72h_observed_at_80pct_predicted": at_80},
+        },
+        "forecast_probability_discrete_values": discrete,
+        "climatology_bins": bin_labels(parse_bins({**MODEL_OPTIONS, **(options or {})}["bins"])),
     }
 
-    for table_name, (key, caption) in table_map.items():
-        table_data = {}
-        for model_name, model_results in all_results.items():
-            if key in model_results:
-                table_data[model_name] = model_results[key]
 
-        results["tables"][table_name] = {
-            "caption": caption,
-            "data": table_data,
-        }
+def collect_results(eval_df, merged_df, forecasts, options=None):
+    """
+    results.json for one set of compute_forecasts() output (made with
+    `options`): every model at theta=0.5, calibration, special analyses,
+    optimized thresholds and the paper values, as in main().
+    """
+    all_results = run_all_models(eval_df, merged_df, forecasts=forecasts)
+    calibration = calibration_summary(forecasts)
+    special = run_special_analyses(eval_df, merged_df, forecasts)
+    optimal, optimized = run_optimized_threshold(forecasts)
+    values = paper_values(eval_df, merged_df, forecasts, calibration, optimal, optimized, options)
+    return build_results_json(all_results, special, calibration, optimal, optimized, values)
 
-    return results
 
+def build_results_json(all_results, special, calibration=None, optimal=None, optimized=None, values=None):
+    """
+    Build results.json in the same structure as targets.json.
 
-def auto_compare(results, targets):
-    """Compare results against targets.json, produce comparison.json."""
-    comparison = {
-        "summary": {"total_values": 0, "match": 0, "close": 0, "discrepant": 0},
+    `calibration` (calibration.calibration_summary) is added as an extra
+    top-level section with no targets. `optimal` / `optimized`
+    (run_optimized_threshold) become Tables 8-14, and `values`
+    (paper_values) Table 1 and the remaining targets.json sections.
+    """
+    results = {
         "tables": {},
-        "special_analyses": {},
+        "special_analyses": special,
     }
-
-    for table_name in results["tables"]:
-        if table_name not in targets["tables"]:
-            continue
-
-        comparison["tables"][table_name] = {}
-        for model_name in results["tables"][table_name]["data"]:
-            target_model = targets["tables"][table_name]["data"].get(model_name)
-            if not target_model:
-                continue
-
-            comparison["tables"][table_name][model_name] = {}
-            for metric, our_val in results["tables"][table_name]["data"][model_name].items():
-                paper_val = target_model.get(metric)
-                if paper_val is None:
-                    continue
-
-                diff = our_val - paper_val
-                pct = abs(diff / paper_val * 100) if paper_val != 0 else (0 if our_val == 0 else 100)
-
-                if pct <= 1:
-                    status = "MATCH"
-                elif pct <= 10:
-                    status = "CLOSE"
-                else:
-                    status = "DISCREPANT"
-
-                comparison["tables"][table_name][model_name][metric] = {
-                    "paper": paper_val,
-                    "ours": our_val,
-                    "diff": round(diff, 4),
-                    "pct": round(pct, 1),
-                    "status": status,
-                }
-
-                comparison["summary"]["total_values"] += 1
-                comparison["summary"][status.lower()] += 1
-
-    # Special analyses comparison
-    if "storm_after_the_calm" in targets.get("special_analyses", {}):
-        paper_sa = targets["special_analyses"]["storm_after_the_calm"]
-        our_sa = results.get("special_analyses", {}).get("storm_after_calm", {})
-        if our_sa:
-            comparison["special_analyses"]["storm_after_calm"] = {
-                "TP": {"paper": paper_sa["TP"], "ours": our_sa["TP"]},
-                "FN": {"paper": paper_sa["FN"], "ours": our_sa["FN"]},
-                "FP": {"paper": paper_sa["FP"], "ours": our_sa["FP"]},
-                "TN": {"paper": paper_sa["TN"], "ours": our_sa["TN"]},
+    if values is not None:
+        results["tables"]["table_1"] = values["table_1"]
+
+    def add_tables(table_map, by_model):
+        for table_name, (key, caption) in table_map.items():
+            table_data = {}
+            for model_name, model_results in by_model.items():
+                if key in model_results:
+                    table_data[model_name] = model_results[key]
+
+            results["tables"][table_name] = {
+                "caption": caption,
+                "data": table_data,
             }
 
-    if "all_clear" in targets.get("special_analyses", {}):
-        paper_ac = targets["special_analyses"]["all_clear"]
-        our_ac = results.get("special_analyses", {}).get("all_clear", {})
-        if our_ac:
-            comparison["special_analyses"]["all_clear"] = {
-                "TP": {"paper": paper_ac["TP"], "ours": our_ac["TP"]},
-                "FN": {"paper": paper_ac["FN"], "ours": our_ac["FN"]},
-                "FP": {"paper": paper_ac["FP"], "ours": our_ac["FP"]},
-                "TN": {"paper": paper_ac["TN"], "ours": our_ac["TN"]},
-            }
+    add_tables(DEFAULT_TABLES, all_results)
+    if optimal is not None:
+        results["tables"]["table_8"] = {
+            "caption": "Optimal probability thresholds (maximize TSS)",
+            "data": {TABLE_8_NAMES.get(model, model): {f"{key}r": theta for key, theta in by_key.items()}
+                     for model, by_key in optimal.items()},
+        }
+    if optimized is not None:
+        add_tables(OPTIMIZED_TABLES, optimized)
+
+    if values is not None:
+        results.update({k: v for k, v in values.items() if k != "table_1"})
+    if calibration is not None:
+        results["calibration"] = calibration
+
+    return results
+
 
-    total = comparison["summary"]["total_values"]
-    if total > 0:
-        comparison["summary"]["match_rate"] = round(comparison["summary"]["match"] / total, 3)
-        comparison["summary"]["match_or_close_rate"] = round(
-            (comparison["summary"]["match"] + comparison["summary"]["close"]) / total, 3
-        )
+def auto_compare(results, targets, scheme="relative", match=None, close=None):
+    """
+    Compare results against targets.json, produce comparison.json.
 
-    return comparison
+    Every target is compared (comparison.TargetSet) under the tolerance
+    `scheme` ("relative", "absolute" or "rounding"); `match` / `close`
+    override its thresholds.
+    """
+    return TargetSet(targets).compare(results, scheme, match, close)
 
 
 def save_tables_csv(results):
@@ -316,37 +509,81 @@ def save_tables_csv(results):
 
 
 def main():
+    from model_naive_bayes import NB_VARIANTS
+
+    parser = argparse.ArgumentParser(description="Run all models and compare to targets.json")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="refit all monthly models, ignoring the fit cache")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record tracemalloc peak memory per span")
+    parser.add_argument("--chrome-trace", action="store_true",
+                        help="also write perf_trace.json in Chrome trace-event format")
+    parser.add_argument("--horizons", type=parse_horizons,
+                        help="extra lead times in days (e.g. 1-27) for results/skill_by_horizon.csv")
+    parser.add_argument("--tolerance", choices=sorted(TOLERANCES), default="relative",
+                        help="comparison tolerance scheme (see comparison.py)")
+    parser.add_argument("--nb-variant", choices=NB_VARIANTS, default=MODEL_OPTIONS["nb_variant"],
+                        help="Naive Bayes reading (model_naive_bayes.NB_VARIANTS)")
+    args = parser.parse_args()
+    options = {"nb_variant": args.nb_variant}
+
+    if args.trace_memory:
+        PERF.start_memory_tracking()
+
     eval_df, merged_df, targets = load_data()
 
     # Run all models at theta=0.5
-    all_results = run_all_models(eval_df, merged_df)
+    with PERF.span("stage.models"):
+        horizons = sorted(set(HORIZONS) | set(args.horizons or []))
+        all_forecasts = compute_forecasts(eval_df, merged_df, use_cache=not args.no_cache, horizons=horizons,
+                                          options=options)
+        forecasts = select_horizons(all_forecasts)
+        all_results = run_all_models(eval_df, merged_df, forecasts=forecasts, options=options)
+
+    # Reliability bins and Brier decomposition for every model/class/lead
+    with PERF.span("stage.calibration"):
+        calibration = calibration_summary(forecasts)
+        print_calibration(calibration)
 
     # Special analyses
-    special = run_special_analyses(eval_df, merged_df)
+    with PERF.span("stage.special_analyses"):
+        special = run_special_analyses(eval_df, merged_df, forecasts)
+
+    # Optimal thresholds (Table 8) and skill at them (Tables 9-14)
+    with PERF.span("stage.optimized_threshold"):
+        optimal, optimized = run_optimized_threshold(forecasts)
 
     # Build results.json
-    results = build_results_json(all_results, special)
+    with PERF.span("stage.results_json"):
+        values = paper_values(eval_df, merged_df, forecasts, calibration, optimal, optimized, options)
+        results = build_results_json(all_results, special, calibration, optimal, optimized, values)
 
-    # Save results.json
-    results_path = os.path.join(BASE, "results.json")
-    with open(results_path, "w") as f:
-        json.dump(results, f, indent=2)
-    print(f"\nSaved {results_path}")
+        # Save results.json
+        results_path = os.path.join(BASE, "results.json")
+        with open(results_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved {results_path}")
 
     # Save CSV tables
     print("\nSaving CSV tables...")
-    save_tables_csv(results)
+    with PERF.span("stage.tables_csv"):
+        save_tables_csv(results)
+        if args.horizons:
+            path = os.path.join(RESULTS, "skill_by_horizon.csv")
+            skill_by_horizon(all_forecasts).to_csv(path, index=False)
+            print(f"  Saved {path}")
 
     # Auto-compare
     print("\n" + "=" * 60)
     print("AUTO-COMPARISON")
     print("=" * 60)
-    comparison = auto_compare(results, targets)
+    with PERF.span("stage.auto_compare"):
+        comparison = auto_compare(results, targets, scheme=args.tolerance)
 
-    comp_path = os.path.join(BASE, "comparison.json")
-    with open(comp_path, "w") as f:
-        json.dump(comparison, f, indent=2)
-    print(f"Saved {comp_path}")
+        comp_path = os.path.join(BASE, "comparison.json")
+        with open(comp_path, "w") as f:
+            json.dump(comparison, f, indent=2)
+        print(f"Saved {comp_path}")
 
     s = comparison["summary"]
     print(f"\nTotal values compared: {s['total_values']}")
@@ -354,15 +591,19 @@ def main():
     print(f"  CLOSE:     {s['close']}")
     print(f"  DISCREPANT: {s['discrepant']}")
     print(f"  Match+Close rate: {s.get('match_or_close_rate', 0)*100:.1f}%")
+    print(f"  Not produced: {s['not_produced']} (of {s['total_values'] + s['not_produced']} targets)")
+
+    print(f"\n  {'Section':<38} {'MATCH':>6} {'CLOSE':>6} {'DISCR':>6} {'n/a':>5}")
+    for section, c in comparison["sections"].items():
+        print(f"  {section:<38} {c['match']:>6} {c['close']:>6} {c['discrepant']:>6} {c['not_produced']:>5}")
 
     # Print special analysis comparison
-    if comparison["special_analyses"]:
+    if comparison.get("special_analyses"):
         print("\nSpecial Analyses:")
         for name, data in comparison["special_analyses"].items():
             print(f"  {name}:")
             for metric, vals in data.items():
-                status = "MATCH" if vals["paper"] == vals["ours"] else "DIFF"
-                print(f"    {metric}: paper={vals['paper']}, ours={vals['ours']} [{status}]")
+                print(f"    {metric}: paper={vals['paper']}, ours={vals['ours']} [{vals['status']}]")
 
     # Print conclusions
     print("\n" + "=" * 60)
@@ -387,6 +628,15 @@ def main():
         print(f"     Evidence: {evidence}")
         print(f"     Supported: YES")
 
+    # Performance report
+    print("\n" + "=" * 60)
+    print("PERFORMANCE")
+    print("=" * 60)
+    PERF.print_summary()
+    PERF.write_json(os.path.join(BASE, "perf.json"))
+    if args.chrome_trace:
+        PERF.write_chrome_trace(os.path.join(BASE, "perf_trace.json"))
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,228 @@
+"""
+Configuration sweep over the modelling choices the paper leaves ambiguous.
+
+Climatology, NB and LR miss some targets because the paper's specification
+can be read several ways. A sweep runs the whole pipeline (every model,
+Tables 1-14, special analyses, paper values) for each combination of
+
+  timing       features from the issue day or the target day (features.FEATURE_TIMINGS)
+  labels       flare label source: "default" (the processed m/x_label) or any
+               alternative stored as m_label_<source> / x_label_<source> that
+               covers every day (parse_data.py labels)
+  nb_variant   Naive Bayes reading (model_naive_bayes.NB_VARIANTS): Gaussian or
+               categorical on the climatology bins (follows `bins`)
+  lr_C         LR inverse regularization strength
+  lr_solver    LR fitting engine (model_logistic_regression.LR_SOLVERS); "newton"
+               fits a C grid several times faster than sklearn without the cache
+  bins         climatology bins, x1 cap / x2 width / x2 cap ("20/10/200")
+
+and ranks the configurations by their match rate against targets.json.
+
+The processed data is loaded once; worker processes receive it (and the
+flattened targets) through the pool initializer, so with the default fork
+start method every worker shares the parent's copy, and each label source's
+frames are built once per worker. Configurations with the default bins and
+C reuse the fit cache. Each worker returns the aligned target values of its
+configuration (comparison.TargetSet.align); all configurations are then
+classified against all targets in one matrix pass.
+
+The output is one CSV with a row per configuration: the choices, rank,
+wall time, MATCH / CLOSE / DISCREPANT / not-produced counts and rates,
+then one column per target path holding our value.
+
+Usage: bash tools/run.sh replicate/src/sweep.py [--grid "timing=issue,target lr_C=1e-5,1e-3,1"]
+           [--workers N] [--tolerance relative] [--out results/sweep.csv]
+"""
+
+import os
+import io
+import sys
+import time
+import itertools
+import contextlib
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from comparison import TargetSet, summarize
+from features import FEATURE_TIMINGS, as_days, lookup_dates
+from label_sensitivity import DEFAULT_LABELS, stored_label_sources
+from model_naive_bayes import NB_VARIANTS
+from parse_data import consecutive_free_days
+from run_all import MODEL_OPTIONS, compute_forecasts, collect_results
+
+# Default grid: both feature timings, both NB readings, two sunspot bin widths, and the
+# published LR C plus two strong regularizations (on these unscaled features the LR only
+# moves below C ~ 1e-3; 0.1 and 10 gave the same tables as 1)
+GRID = {
+    "timing": list(FEATURE_TIMINGS),
+    "labels": [DEFAULT_LABELS],
+    "nb_variant": list(NB_VARIANTS),
+    "lr_C": [1e-5, 1e-3, 1.0],
+    "lr_solver": ["lbfgs"],
+    "bins": ["20/10/200", "20/20/200"],
+}
+
+# Worker state, set once per process by _init_worker
+_SHARED = {}
+
+
+def configurations(grid):
+    """Every combination of a {choice: [values]} grid, as a list of dicts (in grid order)."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def parse_grid(text):
+    """GRID with the choices given as "name=v1,v2 name=v3" replaced."""
+    grid = {name: list(values) for name, values in GRID.items()}
+    for part in str(text).split():
+        name, _, values = part.partition("=")
+        if name not in grid or not values:
+            raise ValueError(f"grid entries are name=v1,v2 with name in {', '.join(GRID)}: {part!r}")
+        grid[name] = [float(v) if name == "lr_C" else v for v in values.split(",")]
+    return grid
+
+
+def label_sources(merged_df):
+    """
+    Label sources the models can be refit on: "default" plus every stored
+    <source> (m_label_<source> / x_label_<source>) that covers every day of
+    merged_df. Partial sources can still be scored with label_sensitivity.py.
+    """
+    full = [s for s in stored_label_sources(merged_df)
+            if merged_df[[f"m_label_{s}", f"x_label_{s}"]].notna().all(axis=None)]
+    return [DEFAULT_LABELS] + full
+
+
+def with_labels(eval_df, merged_df, source):
+    """
+    (eval_df, merged_df) with m/x_label taken from the given label source and
+    m/x_consec_free recomputed from them; unchanged for "default".
+    """
+    if source == DEFAULT_LABELS:
+        return eval_df, merged_df
+    if source not in label_sources(merged_df):
+        raise ValueError(f"unknown label source {source!r}; available: {', '.join(label_sources(merged_df))}")
+    merged_df = merged_df.sort_values("date").reset_index(drop=True)
+    eval_df = eval_df.copy()
+    pos, found = lookup_dates(as_days(merged_df["date"]), as_days(eval_df["date"]))
+    merged_df = merged_df.copy()
+    for c in ("m", "x"):
+        merged_df[f"{c}_label"] = merged_df[f"{c}_label_{source}"].to_numpy()
+        merged_df[f"{c}_consec_free"] = consecutive_free_days(merged_df[f"{c}_label"].to_numpy())
+        for col in (f"{c}_label", f"{c}_consec_free"):
+            eval_df[col] = np.where(found, merged_df[col].to_numpy()[pos], eval_df[col].to_numpy())
+    return eval_df, merged_df
+
+
+def _init_worker(eval_df, merged_df, targets, use_cache):
+    _SHARED.clear()
+    _SHARED.update(eval_df=eval_df, merged_df=merged_df, targets=targets, use_cache=use_cache, labelled={})
+
+
+def run_configuration(config):
+    """
+    Run one configuration in this worker: (seconds, ours, ours_text) with our
+    value of every target (TargetSet.align order).
+    """
+    t0 = time.perf_counter()
+    labelled = _SHARED["labelled"]
+    if config["labels"] not in labelled:
+        labelled[config["labels"]] = with_labels(_SHARED["eval_df"], _SHARED["merged_df"], config["labels"])
+    eval_df, merged_df = labelled[config["labels"]]
+
+    options = {name: config[name] for name in MODEL_OPTIONS if name in config}
+    with contextlib.redirect_stdout(io.StringIO()):
+        forecasts = compute_forecasts(eval_df, merged_df, _SHARED["use_cache"], options=options)
+        results = collect_results(eval_df, merged_df, forecasts, options)
+    ours, ours_text = _SHARED["targets"].align(results)
+    return time.perf_counter() - t0, ours, ours_text
+
+
+def run_sweep(eval_df, merged_df, targets, grid=None, workers=None, scheme="relative", use_cache=True):
+    """
+    Run every configuration of `grid` (default GRID) and rank them.
+
+    Parameters:
+    -----------
+    eval_df, merged_df : DataFrame
+        Evaluation and merged datasets (run_all.load_data)
+    targets : dict
+        targets.json
+    grid : dict
+        {choice: [values]}; choices missing from it keep MODEL_OPTIONS / "default" labels
+    workers : int
+        Worker processes (default os.cpu_count()); 1 runs in this process
+    scheme : str
+        Tolerance scheme of the comparison (comparison.TOLERANCES)
+    use_cache : bool
+        Use the fit cache for configurations with the default bins and C
+
+    Returns:
+    --------
+    DataFrame, one row per configuration sorted by rank (match rate, then
+    match-or-close rate): the choices, Rank, Seconds, match / close /
+    discrepant / not_produced counts, match_rate, match_or_close_rate and one
+    column per target path with our value
+    """
+    grid = {**{"labels": [DEFAULT_LABELS]}, **{k: [v] for k, v in MODEL_OPTIONS.items()}, **(grid or GRID)}
+    configs = configurations(grid)
+    target_set = TargetSet(targets)
+    workers = min(workers or os.cpu_count() or 1, len(configs))
+
+    if workers == 1:
+        _init_worker(eval_df, merged_df, target_set, use_cache)
+        runs = [run_configuration(config) for config in configs]
+    else:
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        with multiprocessing.get_context(method).Pool(
+                workers, _init_worker, (eval_df, merged_df, target_set, use_cache)) as pool:
+            runs = pool.map(run_configuration, configs, chunksize=1)
+
+    seconds = np.array([r[0] for r in runs])
+    ours = np.stack([r[1] for r in runs])
+    ours_text = np.stack([r[2] for r in runs])
+    counts = summarize(target_set.classify(ours, scheme, ours_text=ours_text))
+    compared = counts[:, :3].sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        match_rate = np.round(counts[:, 0] / compared, 3)
+        match_or_close_rate = np.round(counts[:, :2].sum(axis=1) / compared, 3)
+
+    table = pd.DataFrame(configs)
+    table["Seconds"] = seconds.round(2)
+    for i, name in enumerate(["match", "close", "discrepant", "not_produced"]):
+        table[name] = counts[:, i]
+    table["match_rate"] = match_rate
+    table["match_or_close_rate"] = match_or_close_rate
+    values = pd.DataFrame(np.where(np.isnan(ours), ours_text, ours), columns=[str(p) for p in target_set.paths])
+    table = pd.concat([table, values], axis=1)
+
+    table = table.sort_values(["match_rate", "match_or_close_rate"], ascending=False, kind="stable")
+    table.insert(len(grid), "Rank", np.arange(1, len(table) + 1))
+    return table.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    from run_all import load_data, RESULTS
+    from comparison import TOLERANCES
+
+    parser = argparse.ArgumentParser(description="Run and rank a grid of modelling choices against targets.json")
+    parser.add_argument("--grid", type=parse_grid, default=GRID,
+                        help='choices to sweep, e.g. "timing=issue,target lr_C=1e-5,1e-3,1 bins=20/10/200"')
+    parser.add_argument("--workers", type=int, help="worker processes (default: all CPUs)")
+    parser.add_argument("--tolerance", choices=sorted(TOLERANCES), default="relative")
+    parser.add_argument("--out", default=os.path.join(RESULTS, "sweep.csv"))
+    args = parser.parse_args()
+
+    eval_df, merged_df, targets = load_data()
+    t0 = time.perf_counter()
+    table = run_sweep(eval_df, merged_df, targets, args.grid, args.workers, args.tolerance)
+    table.to_csv(args.out, index=False)
+    print(f"Saved {args.out} ({len(table)} configurations, {time.perf_counter() - t0:.1f}s)")
+
+    choices = list(table.columns[:table.columns.get_loc("Rank")])
+    print(table[choices + ["Rank", "Seconds", "match", "close", "discrepant",
+                           "match_rate", "match_or_close_rate"]].to_string(index=False))
@@ -0,0 +1,177 @@
+"""
+Unit tests for the incremental append mode of parse_data.
+Appends the last days of a synthetic dataset one at a time and compares the
+store, the running state and the SWPC prefix rows with a rebuild from scratch.
+"""
+
+import sys
+import os
+import tarfile
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+import parse_data
+from synthetic import generate_merged_dataset, split_eval, write_raw_files
+from model_climatology import fit_climatology_counts
+from model_naive_bayes import fit_naive_bayes, nb_params_from_moments
+from model_swpc import swpc_probabilities
+from range_index import build_range_index, index_from_prefix_frame
+from features import as_days
+
+N_DAYS = 800
+N_APPEND = 6
+
+
+def _read(path):
+    return pd.read_csv(path, parse_dates=["date"])
+
+
+def _raw_texts(raw_dir, day):
+    """RSGA issued on `day` (None if there is none) and the event report for `day`."""
+    stamp = day.strftime("%Y%m%d")
+    rsga = None
+    with tarfile.open(os.path.join(raw_dir, "swpc_rsga", f"{day.year}_RSGA.tar.gz")) as tf:
+        name = f"{day.year}_RSGA/{stamp}RSGA.txt"
+        if name in tf.getnames():
+            rsga = tf.extractfile(name).read().decode()
+    with open(os.path.join(raw_dir, "noaa_events", f"{day.year}_events", f"{stamp}events.txt")) as f:
+        events = f.read()
+    return rsga, events
+
+
+def _rebuild(full, raw_dir, rsga_df, dsd_df):
+    """The store merge_all() builds from the raw files: RSGA forecasts, generated labels and x1, label sources."""
+    store = full.drop(columns=["m_24h", "x_24h", "m_48h", "x_48h", "m_72h", "x_72h"])
+    store = parse_data.build_forecast_dataset(rsga_df).merge(store, on="date", how="right")
+    labels = parse_data.add_label_combinations(parse_data.parse_label_sources(full["date"], raw_dir, dsd_df))
+    labels.insert(1, "peak_flux", parse_data.paper_peak_flux(labels))
+    return store.merge(labels, on="date", how="left")
+
+
+def test_append_matches_rebuild():
+    """Appended rows, model statistics and SWPC prefix rows equal a full rebuild."""
+    full = generate_merged_dataset(N_DAYS, seed=31)
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir, proc_dir = os.path.join(tmp, "raw"), os.path.join(tmp, "processed")
+        os.makedirs(proc_dir)
+        years = write_raw_files(full, raw_dir)
+        rsga_df = parse_data.parse_rsga_files(raw_dir, years)
+        dsd_df = parse_data.parse_dsd_flare_counts(raw_dir, years)
+        rebuilt = _rebuild(full, raw_dir, rsga_df, dsd_df)
+        assert {"m_label_noaa", "peak_flux_noaa", "x_label_dsd", "m_label_noaa_dsd"} <= set(rebuilt.columns)
+
+        # Store holding all but the last N_APPEND days
+        history = rebuilt.iloc[:-N_APPEND].copy()
+        history.to_csv(os.path.join(proc_dir, "merged_dataset.csv"), index=False)
+        split_eval(history).to_csv(os.path.join(proc_dir, "evaluation_dataset.csv"), index=False)
+        last = history["date"].iloc[-1]
+        parse_data.write_append_store(history, split_eval(history), rsga_df[rsga_df["issue_date"] <= last], proc_dir)
+
+        for i in range(len(full) - N_APPEND, len(full)):
+            day = full["date"].iloc[i]
+            rsga, events = _raw_texts(raw_dir, day)
+            # No SILSO value on the first day: the DSD sunspot number fills it, as in merge_all()
+            sunspot = np.nan if i == len(full) - N_APPEND else full["sunspot_number"].iloc[i]
+            dsd = dsd_df[dsd_df["date"] == day].iloc[0]
+            parse_data.append_day(day, rsga, events, sunspot, dsd, proc_dir=proc_dir, raw_dir=raw_dir)
+        rebuilt.loc[len(rebuilt) - N_APPEND, "sunspot_number"] = rebuilt["sunspot_dsd"].iloc[-N_APPEND]
+
+        merged = _read(os.path.join(proc_dir, "merged_dataset.csv"))
+        eval_df = _read(os.path.join(proc_dir, "evaluation_dataset.csv"))
+        state = parse_data.load_append_state(proc_dir, raw_dir)
+
+        # Every column of both datasets
+        for got, want in ((merged, rebuilt), (eval_df, split_eval(rebuilt))):
+            assert list(got.columns) == list(want.columns)
+            assert np.array_equal(got["date"].to_numpy(), want["date"].to_numpy())
+            for col in got.columns.drop("date"):
+                assert np.array_equal(got[col].to_numpy(dtype=float), want[col].to_numpy(dtype=float),
+                                      equal_nan=True), col
+
+        for flare_class in ["m", "x"]:
+            label_col, consec_col = f"{flare_class}_label", f"{flare_class}_consec_free"
+            cls = state[flare_class]
+            assert np.array_equal(np.asarray(cls["climatology"]),
+                                  fit_climatology_counts(merged, label_col, consec_col))
+            params = nb_params_from_moments(cls["nb_moments"], cls["nb_moments_all"])
+            ref = fit_naive_bayes(merged[[consec_col, "sunspot_number"]].values, merged[label_col].values)
+            assert np.allclose(params, ref, rtol=1e-9, atol=0)
+
+        # One prefix row per evaluation day with a forecast, appended days included
+        stored = index_from_prefix_frame(pd.read_csv(os.path.join(proc_dir, parse_data.EVAL_INDEX)), "SWPC")
+        index = build_range_index({"SWPC": swpc_probabilities(eval_df)}, state["evaluation"]["thresholds"])
+        assert stored["keys"] == index["keys"] and np.array_equal(stored["thresholds"], index["thresholds"])
+        assert np.array_equal(stored["days"], index["days"]) and index["days"][-1] > as_days([last])[0]
+        for name in ("counts", "n", "events"):
+            assert np.array_equal(stored[name], index[name]), name
+        assert np.allclose(stored["sq_err"], index["sq_err"], rtol=0, atol=1e-9)
+    print("  append matches rebuild: PASS")
+
+
+def test_append_rejects_gaps():
+    """Only the day after the last stored day can be appended."""
+    full = generate_merged_dataset(600, seed=32)
+    with tempfile.TemporaryDirectory() as proc_dir:
+        full.to_csv(os.path.join(proc_dir, "merged_dataset.csv"), index=False)
+        split_eval(full).to_csv(os.path.join(proc_dir, "evaluation_dataset.csv"), index=False)
+        rsga_df = pd.DataFrame(columns=["issue_date", "m_day1", "m_day2", "m_day3", "x_day1", "x_day2", "x_day3"])
+        parse_data.write_append_store(full, split_eval(full), rsga_df, proc_dir)
+        skipped = full["date"].iloc[-1] + pd.Timedelta(days=2)
+        try:
+            parse_data.append_day(skipped, None, "", 50.0, proc_dir=proc_dir)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("appending with a gap should fail")
+        assert len(_read(os.path.join(proc_dir, "merged_dataset.csv"))) == len(full)
+    print("  append rejects gaps: PASS")
+
+
+def test_append_retry_after_crash():
+    """A day whose state commit never happened is rolled back and appended once on retry."""
+    full = generate_merged_dataset(600, seed=33)
+    history = full.iloc[:-1]
+    rsga_df = pd.DataFrame(columns=["issue_date", "m_day1", "m_day2", "m_day3", "x_day1", "x_day2", "x_day3"])
+    day = full["date"].iloc[-1]
+    stores = []
+    for crash in (False, True):
+        with tempfile.TemporaryDirectory() as proc_dir:
+            history.to_csv(os.path.join(proc_dir, "merged_dataset.csv"), index=False)
+            split_eval(history).to_csv(os.path.join(proc_dir, "evaluation_dataset.csv"), index=False)
+            parse_data.write_append_store(history, split_eval(history), rsga_df, proc_dir)
+            if crash:
+                write_state = parse_data.write_append_state
+
+                def fail_on_commit(state, proc_dir=parse_data.PROC):
+                    if "in_flight" not in state:
+                        # Rows written, and half of a second one, but the state not committed
+                        with open(os.path.join(proc_dir, "merged_dataset.csv"), "a") as f:
+                            f.write(day.strftime("%Y-%m-%d") + ",12")
+                        raise OSError("simulated crash")
+                    write_state(state, proc_dir)
+
+                parse_data.write_append_state = fail_on_commit
+                try:
+                    parse_data.append_day(day, None, "", 50.0, proc_dir=proc_dir)
+                except OSError:
+                    pass
+                finally:
+                    parse_data.write_append_state = write_state
+                assert len(_read(os.path.join(proc_dir, "evaluation_dataset.csv"))) == len(split_eval(history)) + 1
+            parse_data.append_day(day, None, "", 50.0, proc_dir=proc_dir)
+            stores.append([open(os.path.join(proc_dir, name)).read() for name in parse_data.APPEND_FILES]
+                          + [parse_data.load_append_state(proc_dir)])
+    assert stores[0] == stores[1]
+    assert "in_flight" not in stores[1][2]
+    print("  append retry after crash: PASS")
+
+
+if __name__ == "__main__":
+    print("Running append unit tests...")
+    test_append_matches_rebuild()
+    test_append_rejects_gaps()
+    test_append_retry_after_crash()
+    print("\nAll tests passed!")
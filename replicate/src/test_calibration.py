@@ -0,0 +1,64 @@
+"""
+Unit tests for calibration module.
+Checks binning, per-bin frequencies and the Brier decomposition identity.
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from calibration import bin_index, reliability_stats, RELIABILITY_EDGES
+from metrics import brier_score
+
+
+def _frame(y_true, y_prob):
+    return pd.DataFrame({"y_true": y_true, "y_prob": y_prob})
+
+
+def test_bin_index():
+    """Whole-percentage forecasts land in the bin they start; 1.0 is in the last bin."""
+    idx = bin_index(np.array([0.0, 0.04, 0.05, 0.15, 0.35, 0.95, 1.0]))
+    assert list(idx) == [0, 0, 1, 3, 7, 19, 19]
+    print("  bin_index: PASS")
+
+
+def test_bins_hand_calculated():
+    """Two bins: 0.1 (obs 1/4) and 0.9 (obs 2/2)."""
+    stats = reliability_stats({"A": {"M_24h": _frame([0, 0, 0, 1, 1, 1], [0.1] * 4 + [0.9] * 2)}})
+    s = stats["A"]["M_24h"]
+    assert s["count"][2] == 4 and s["count"][18] == 2 and s["n"] == 6
+    assert s["observed_freq"][2] == 0.25 and s["observed_freq"][18] == 1.0
+    assert s["observed_freq"][0] is None
+    # REL = (4*(0.1-0.25)^2 + 2*(0.9-1)^2) / 6
+    assert abs(s["reliability"] - (4 * 0.15 ** 2 + 2 * 0.1 ** 2) / 6) < 1e-6
+    assert abs(s["uncertainty"] - 0.25) < 1e-6
+    assert abs(s["residual"]) < 1e-6
+    print("  hand-calculated bins: PASS")
+
+
+def test_decomposition_identity():
+    """Brier matches metrics.brier_score and REL - RES + UNC for discrete forecasts."""
+    rng = np.random.default_rng(0)
+    y_prob = rng.choice(np.array([1, 5, 10, 25, 50, 75, 95]) / 100, 5000)
+    y_true = (rng.random(5000) < y_prob).astype(int)
+    cont = rng.random(3000)
+    stats = reliability_stats({
+        "A": {"M_24h": _frame(y_true, y_prob)},
+        "B": {"X_24h": _frame((rng.random(3000) < cont).astype(int), cont)},
+    })
+    s = stats["A"]["M_24h"]
+    assert abs(s["brier"] - brier_score(y_true, y_prob)) < 1e-6
+    assert abs(s["brier"] - (s["reliability"] - s["resolution"] + s["uncertainty"])) < 1e-5
+    assert stats["B"]["X_24h"]["n"] == 3000
+    assert len(stats["B"]["X_24h"]["count"]) == len(RELIABILITY_EDGES) - 1
+    print("  decomposition identity: PASS")
+
+
+if __name__ == "__main__":
+    print("Running calibration unit tests...")
+    test_bin_index()
+    test_bins_hand_calculated()
+    test_decomposition_identity()
+    print("\nAll tests passed!")
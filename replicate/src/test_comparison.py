@@ -0,0 +1,119 @@
+"""
+Unit tests for the vectorized target comparison (comparison.py).
+"""
+
+import sys
+import os
+import json
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from comparison import TargetSet, parse_value, summarize, MISSING
+from run_all import TARGETS_PATH, BASE
+
+TARGETS = {
+    "tables": {"table_2": {"caption": "M-class", "data": {"SWPC": {"TSS": 0.58, "Brier": 0.1, "HSS": 0}}}},
+    "key_numbers": {"prob": ">0.5", "approx": "~0.60", "time": "22:00", "count": 56, "rate": 0.206, "missing": 3},
+    "climatology_bins": {"x1": [0, 1, ">20"]},
+}
+
+RESULTS = {
+    "tables": {"table_2": {"data": {"SWPC": {"TSS": 0.583, "Brier": 0.104, "HSS": 0}}}},
+    "key_numbers": {"prob": 0.48, "approx": 0.6, "time": "22:00", "count": 57, "rate": 0.2066},
+    "climatology_bins": {"x1": [0, 1, ">20"]},
+}
+
+
+def test_parse_value():
+    """Numbers, inequalities, approximations and text."""
+    assert parse_value(0.58) == ("=", 0.58, 2)
+    assert parse_value(56) == ("=", 56.0, 0)
+    assert parse_value(0.1) == ("=", 0.1, 2)                 # printed 0.10
+    assert parse_value(0.206) == ("=", 0.206, 3)
+    assert parse_value(">0.5") == (">", 0.5, 1)
+    assert parse_value("~0.60") == ("~", 0.6, 2)
+    assert parse_value("22:00")[0] == "text"
+    assert parse_value(">20") == (">", 20.0, 0)
+    print("  parse value: PASS")
+
+
+def test_schemes():
+    """Statuses under the relative, absolute and rounding schemes."""
+    targets = TargetSet(TARGETS)
+    assert "tables/table_2/caption" not in set(targets.paths)
+    get = lambda comparison, *path: _leaf(comparison, path)["status"]
+
+    rel = targets.compare(RESULTS, "relative")
+    assert get(rel, "tables", "table_2", "SWPC", "TSS") == "MATCH"          # 0.5%
+    assert get(rel, "tables", "table_2", "SWPC", "Brier") == "CLOSE"        # 4%
+    assert get(rel, "tables", "table_2", "SWPC", "HSS") == "MATCH"          # 0 vs 0
+    assert get(rel, "key_numbers", "prob") == "CLOSE"                       # 0.48 < 0.5, within 10%
+    assert get(rel, "key_numbers", "approx") == "MATCH"
+    assert get(rel, "key_numbers", "time") == "MATCH"
+    assert get(rel, "key_numbers", "count") == "CLOSE"
+    assert rel["not_produced"] == ["key_numbers/missing"]
+    assert rel["summary"]["total_values"] == len(targets) - 1
+    assert rel["sections"]["climatology_bins"]["match"] == 3
+
+    absolute = targets.compare(RESULTS, "absolute")
+    assert get(absolute, "tables", "table_2", "SWPC", "TSS") == "MATCH"     # |d| = 0.003
+    assert get(absolute, "key_numbers", "count") == "DISCREPANT"            # |d| = 1
+
+    rounding = targets.compare(RESULTS, "rounding")
+    assert get(rounding, "tables", "table_2", "SWPC", "TSS") == "MATCH"     # 0.583 rounds to 0.58
+    assert get(rounding, "tables", "table_2", "SWPC", "Brier") == "MATCH"   # 0.104 rounds to 0.10
+    assert get(rounding, "key_numbers", "count") == "CLOSE"
+    assert get(rounding, "key_numbers", "rate") == "CLOSE"                  # 0.2066 rounds to 0.207
+
+    loose = targets.compare(RESULTS, "relative", match=5)
+    assert get(loose, "tables", "table_2", "SWPC", "Brier") == "MATCH"
+    print("  tolerance schemes: PASS")
+
+
+def test_matrix_classify():
+    """Classifying a (configs, T) matrix equals classifying each row."""
+    targets = TargetSet(TARGETS)
+    ours, ours_text = targets.align(RESULTS)
+    rng = np.random.default_rng(0)
+    sweep = ours[None, :] * (1 + rng.normal(0, 0.05, size=(50, len(targets))))
+    codes = targets.classify(sweep, "rounding", ours_text=ours_text)
+    assert codes.shape == (50, len(targets))
+    for row, values in zip(codes, sweep):
+        assert (row == targets.classify(values, "rounding", ours_text=ours_text)).all()
+    counts = summarize(codes)
+    assert counts.shape == (50, 4) and (counts.sum(axis=1) == len(targets)).all()
+    assert (counts[:, 3] == (codes == MISSING).sum(axis=1)).all()
+    print("  matrix classify: PASS")
+
+
+def test_published_tables():
+    """The published comparison.json statuses are reproduced from results.json."""
+    with open(TARGETS_PATH) as f:
+        targets = json.load(f)
+    with open(os.path.join(BASE, "results.json")) as f:
+        results = json.load(f)
+    with open(os.path.join(BASE, "comparison.json")) as f:
+        published = json.load(f)
+
+    comparison = TargetSet(targets).compare(results)
+    assert comparison["summary"] == published["summary"]
+    for table, by_model in published["tables"].items():
+        for model, by_metric in by_model.items():
+            for metric, entry in by_metric.items():
+                assert comparison["tables"][table][model][metric]["status"] == entry["status"]
+    print("  published tables: PASS")
+
+
+def _leaf(tree, path):
+    for key in path:
+        tree = tree[key]
+    return tree
+
+
+if __name__ == "__main__":
+    print("Running comparison unit tests...")
+    test_parse_value()
+    test_schemes()
+    test_matrix_classify()
+    test_published_tables()
+    print("\nAll tests passed!")
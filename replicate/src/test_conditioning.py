@@ -0,0 +1,77 @@
+"""
+Unit tests for conditioning module.
+Compares cube cells against direct filtering of the per-day forecasts.
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from conditioning import condition_cube, cube_counts, cube_metrics, THRESHOLDS
+from metrics import confusion_matrix_counts, true_skill_statistic, threshold_predictions
+from synthetic import generate_merged_dataset, split_eval
+from model_swpc import swpc_probabilities
+from model_persistence import persistence_probabilities
+
+
+def _brute_force(frame, merged_df, flare_class, condition, theta):
+    """Filter the forecast days the slow way and count."""
+    merged = merged_df.set_index("date")
+    dates = pd.to_datetime(frame["date"])
+    if condition.startswith("quiet_"):
+        q = int(condition.split("_")[1])
+        mask = merged.loc[dates, f"{flare_class}_consec_free"].to_numpy() > q
+    elif condition.startswith("after_flare_"):
+        w = int(condition.split("_")[2])
+        flare_dates = set(merged.index[merged[f"{flare_class}_label"] == 1])
+        after = {d + pd.Timedelta(days=k) for d in flare_dates for k in range(1, w + 1)}
+        mask = dates.isin(after).to_numpy()
+    else:
+        mask = np.ones(len(frame), dtype=bool)
+    sub = frame[mask]
+    y_pred = threshold_predictions(sub["y_prob"].to_numpy(), theta)
+    TP, FP, TN, FN = confusion_matrix_counts(sub["y_true"].to_numpy(), y_pred)
+    return {"TP": TP, "FP": FP, "TN": TN, "FN": FN}
+
+
+def test_cube_matches_filtering():
+    """Random cells of the cube equal direct filtering for two models."""
+    merged_df = generate_merged_dataset(3000, seed=11)
+    eval_df = split_eval(merged_df)
+    forecasts = {"SWPC": swpc_probabilities(eval_df),
+                 "Persistence": persistence_probabilities(eval_df, merged_df)}
+    cube = condition_cube(forecasts, merged_df, quiet=range(0, 21), windows=range(1, 6))
+
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        model = str(rng.choice(cube["models"]))
+        key = str(rng.choice(cube["keys"]))
+        condition = str(rng.choice(cube["conditions"]))
+        theta = float(rng.choice(THRESHOLDS))
+        expected = _brute_force(forecasts[model][key], merged_df, key[0].lower(), condition, theta)
+        assert cube_counts(cube, model, key, condition, theta) == expected, (model, key, condition, theta)
+    print("  cube matches filtering: PASS")
+
+
+def test_cube_metrics():
+    """TSS from the cube equals true_skill_statistic on the 'all' condition."""
+    merged_df = generate_merged_dataset(2000, seed=12)
+    eval_df = split_eval(merged_df)
+    forecasts = {"SWPC": swpc_probabilities(eval_df)}
+    cube = condition_cube(forecasts, merged_df, quiet=[5], windows=[2])
+    tss = cube_metrics(cube)["TSS"]
+    frame = forecasts["SWPC"]["M_48h"]
+    t = int(np.flatnonzero(THRESHOLDS == 0.25)[0])
+    expected = true_skill_statistic(frame["y_true"], threshold_predictions(frame["y_prob"], 0.25))
+    assert abs(tss[0, cube["keys"].index("M_48h"), 0, t] - expected) < 1e-12
+    print("  cube metrics: PASS")
+
+
+if __name__ == "__main__":
+    print("Running conditioning unit tests...")
+    test_cube_matches_filtering()
+    test_cube_metrics()
+    print("\nAll tests passed!")
@@ -0,0 +1,59 @@
+"""
+Unit tests for downsample module.
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from downsample import minmax_downsample
+
+
+def test_short_series_unchanged():
+    """Series already below 2 points per bucket are returned as-is."""
+    x = np.arange(10)
+    y = np.sin(x)
+    xs, ys = minmax_downsample(x, y, 100)
+    assert np.array_equal(xs, x) and np.array_equal(ys, y)
+    print("  short series: PASS")
+
+
+def test_extremes_preserved():
+    """Output is bounded by 2*buckets+2 and keeps every bucket's min and max."""
+    rng = np.random.default_rng(0)
+    x = np.arange(100_001)  # edges fall exactly on multiples of 200
+    y = np.cumsum(rng.normal(size=len(x)))
+    xs, ys = minmax_downsample(x, y, 500)
+    assert len(xs) <= 2 * 500 + 2
+    assert np.all(np.diff(xs) > 0)
+    assert ys.max() == y.max() and ys.min() == y.min()
+    assert xs[0] == x[0] and xs[-1] == x[-1]
+    # Each original bucket's extremes survive
+    bucket = x // 200
+    for b in [0, 137, 499]:
+        sel = bucket == b
+        kept = ys[(xs // 200) == b]
+        assert kept.max() == y[sel].max() and kept.min() == y[sel].min()
+    print("  extremes preserved: PASS")
+
+
+def test_datetime_and_nan():
+    """Datetime x values work and NaNs are dropped."""
+    x = pd.date_range("1996-01-01", periods=5000, freq="D").values
+    y = np.arange(5000, dtype=float)
+    y[100] = np.nan
+    xs, ys = minmax_downsample(x, y, 50)
+    assert xs.dtype == x.dtype
+    assert not np.isnan(ys).any()
+    assert len(xs) <= 102
+    print("  datetime and NaN: PASS")
+
+
+if __name__ == "__main__":
+    print("Running downsample unit tests...")
+    test_short_series_unchanged()
+    test_extremes_preserved()
+    test_datetime_and_nan()
+    print("\nAll tests passed!")
@@ -0,0 +1,68 @@
+"""
+Unit tests for sliding-window labels (features.window_labels) and the
+event-window evaluation (event_windows.py).
+"""
+
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from synthetic import generate_merged_dataset, split_eval
+from features import as_days, window_labels
+from metrics import evaluate_forecasts
+from event_windows import window_evaluation
+from model_swpc import swpc_probabilities
+from model_persistence import persistence_probabilities
+
+
+def test_window_labels_brute_force():
+    """Prefix-sum window labels equal a loop over the days of each window, with gaps."""
+    rng = np.random.default_rng(2)
+    days = np.arange(np.datetime64("2020-01-01"), np.datetime64("2020-04-01"))
+    keep = rng.random(len(days)) > 0.1
+    days, labels = days[keep], (rng.random(keep.sum()) < 0.2).astype(int)
+    observed = dict(zip(days, labels))
+    targets = np.arange(np.datetime64("2019-12-25"), np.datetime64("2020-04-05"))
+    lengths, offsets = np.array([1, 3, 7, 3]), np.array([0, 0, 0, 2])
+
+    y, complete = window_labels(days, labels, targets, lengths, offsets)
+    for w, (length, offset) in enumerate(zip(lengths, offsets)):
+        for i, t in enumerate(targets):
+            window = [t + offset + j for j in range(length)]
+            assert complete[w, i] == all(d in observed for d in window), (length, offset, t)
+            if complete[w, i]:
+                assert y[w, i] == max(observed[d] for d in window), (length, offset, t)
+    print("  window labels brute force: PASS")
+
+
+def test_window_evaluation():
+    """Length-1 windows reproduce the daily tables; longer windows have more events."""
+    merged = generate_merged_dataset(700, seed=9)
+    eval_df = split_eval(merged)
+    forecasts = {"SWPC": swpc_probabilities(eval_df),
+                 "Persistence": persistence_probabilities(eval_df, merged)}
+    table = window_evaluation(forecasts, merged, lengths=[1, 3], offsets=[0, 1])
+    assert len(table) == 2 * 6 * 4
+
+    last = as_days(merged["date"]).max()
+    for model, by_key in forecasts.items():
+        for key, frame in by_key.items():
+            rows = table[(table["Model"] == model) & (table["Key"] == key)].set_index(["Length", "Offset"])
+            daily = rows.loc[(1, 0)]
+            assert daily["N"] == len(frame)
+            expected = evaluate_forecasts(frame)
+            assert all(daily[m] == v for m, v in expected.items()), (model, key)
+            # 3-day windows: the last two target days have incomplete windows
+            three = rows.loc[(3, 0)]
+            assert three["N"] == (as_days(frame["date"]) + 2 <= last).sum()
+            assert three["Events"] >= daily["Events"] - 2
+    print("  window evaluation: PASS")
+
+
+if __name__ == "__main__":
+    print("Running event-window unit tests...")
+    test_window_labels_brute_force()
+    test_window_evaluation()
+    print("\nAll tests passed!")
@@ -0,0 +1,87 @@
+"""
+Unit tests for the horizon configuration and the batched lag / label-shift
+helpers in features.py, and for models run on extra horizons.
+"""
+
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from synthetic import generate_merged_dataset, split_eval
+from features import (LEADS, leads, parse_horizons, as_days, issue_day_rows, issue_day_matrix,
+                      lagged_features, shifted_labels)
+from run_all import compute_forecasts, select_horizons
+
+
+def test_horizon_config():
+    """Lead names, the default LEADS and horizon parsing."""
+    assert LEADS == [(1, "24h"), (2, "48h"), (3, "72h")]
+    assert leads([7, 27]) == [(7, "168h"), (27, "648h")]
+    assert parse_horizons("1-3") == [1, 2, 3]
+    assert parse_horizons("1-4,27, 2") == [1, 2, 3, 4, 27]
+    for bad in ["0-3", ""]:
+        try:
+            parse_horizons(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"parse_horizons({bad!r}) should fail")
+    print("  horizon config: PASS")
+
+
+def test_lag_and_shift():
+    """issue_day_matrix matches issue_day_rows per horizon; shifted_labels is its mirror."""
+    days = np.array(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-05", "2024-01-06"], dtype="datetime64[D]")
+    labels = np.array([1, 0, 1, 1, 0])
+    horizons = [1, 2, 4]
+
+    pos, found = issue_day_matrix(days, days, horizons)
+    assert pos.shape == found.shape == (3, 5)
+    for h, lead in enumerate(horizons):
+        p, f = issue_day_rows(days, days, lead)
+        assert (found[h] == f).all() and (pos[h][f] == p[f]).all()
+
+    lagged = lagged_features(labels, pos, found)
+    assert np.array_equal(lagged[0], [np.nan, 1, 0, np.nan, 1], equal_nan=True)
+    assert np.array_equal(lagged[2], [np.nan, np.nan, np.nan, 1, 0], equal_nan=True)
+    X = np.column_stack([labels, labels * 10.0])
+    assert lagged_features(X, pos, found).shape == (3, 5, 2)
+
+    # Label of day i + h, issued on day i
+    shifted = shifted_labels(days, labels, horizons)
+    assert np.array_equal(shifted[0], [0, 1, np.nan, 0, np.nan], equal_nan=True)
+    assert np.array_equal(shifted[2], [1, 0, np.nan, np.nan, np.nan], equal_nan=True)
+    print("  lag and shift: PASS")
+
+
+def test_models_extra_horizons():
+    """One batched run over extra horizons reproduces the default 1-3 day forecasts."""
+    merged = generate_merged_dataset(900, seed=3)
+    eval_df = split_eval(merged)
+    base = compute_forecasts(eval_df, merged, use_cache=False)
+    wide = compute_forecasts(eval_df, merged, use_cache=False, horizons=[1, 2, 3, 7, 27])
+
+    assert set(wide["SWPC"]) == set(base["SWPC"])             # SWPC only issues 1-3 day forecasts
+    assert "X_648h" in wide["Naive_Bayes"] and "M_168h" in wide["Persistence"]
+    narrowed = select_horizons(wide)
+    for model, by_key in base.items():
+        assert set(narrowed[model]) == set(by_key), model
+        for key, frame in by_key.items():
+            assert frame.equals(narrowed[model][key]), (model, key)
+
+    # Persistence at 27 days is the label 27 days earlier
+    frame = wide["Persistence"]["M_648h"]
+    days = as_days(merged["date"])
+    source = np.searchsorted(days, as_days(frame["date"]) - 27)
+    assert (frame["y_prob"].to_numpy() == merged["m_label"].to_numpy()[source]).all()
+    print("  models on extra horizons: PASS")
+
+
+if __name__ == "__main__":
+    print("Running features unit tests...")
+    test_horizon_config()
+    test_lag_and_shift()
+    test_models_extra_horizons()
+    print("\nAll tests passed!")
@@ -0,0 +1,170 @@
+"""
+Unit tests for forecast_service module.
+Checks served forecasts against the backtest per-day forecasts and against
+models taken from the append state, the HTTP endpoints on localhost (bad
+states included), and hot reload after an appended day.
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+import http.client
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from forecast_service import ForecastService, ForecastTables, serve
+from parse_data import write_append_store
+from synthetic import generate_merged_dataset, split_eval
+from model_persistence import persistence_probabilities
+from model_climatology import climatology_probabilities
+from model_naive_bayes import naive_bayes_probabilities
+from model_logistic_regression import logistic_regression_probabilities
+
+
+def _store(tmp, n_days=1100, seed=41):
+    merged = generate_merged_dataset(n_days, seed=seed)
+    proc = os.path.join(tmp, "processed")
+    os.makedirs(proc)
+    merged.to_csv(os.path.join(proc, "merged_dataset.csv"), index=False)
+    return merged, proc, os.path.join(tmp, "cache")
+
+
+def test_matches_backtest():
+    """Date queries reproduce the backtest forecasts of every model."""
+    with tempfile.TemporaryDirectory() as tmp:
+        merged, proc, cache = _store(tmp)
+        eval_df = split_eval(merged)
+        service = ForecastService(proc, cache)
+        served = service.tables.forecast_dates(eval_df["date"].to_numpy().astype("datetime64[D]"))
+        backtest = {
+            "Persistence": persistence_probabilities(eval_df, merged),
+            "Climatology": climatology_probabilities(eval_df, merged, use_cache=False),
+            "Naive_Bayes": naive_bayes_probabilities(eval_df, merged, use_cache=False),
+            "Logistic_Reg": logistic_regression_probabilities(eval_df, merged, use_cache=False),
+        }
+        for model, by_key in backtest.items():
+            for key, frame in by_key.items():
+                s = pd.Series(served[model][key], index=eval_df["date"])
+                assert s.notna().sum() == len(frame), (model, key)
+                assert np.allclose(s.reindex(frame["date"]).to_numpy(), frame["y_prob"].to_numpy(),
+                                   rtol=0, atol=1e-12), (model, key)
+    print("  matches backtest: PASS")
+
+
+def test_append_state_models():
+    """Tables built from the append state's running statistics equal the ones fitted from the store."""
+    with tempfile.TemporaryDirectory() as tmp:
+        merged, proc, cache = _store(tmp, 900, seed=43)
+        rsga_df = pd.DataFrame(columns=["issue_date", "m_day1", "m_day2", "m_day3", "x_day1", "x_day2", "x_day3"])
+        write_append_store(merged, split_eval(merged), rsga_df, proc)
+        service = ForecastService(proc, cache)
+        assert service.append_state(merged) is not None
+        fitted = ForecastTables(merged, cache, use_cache=False)
+        assert np.allclose(service.tables.dense, fitted.dense, rtol=0, atol=1e-12, equal_nan=True)
+
+        # The latest month's climatology comes from the state, not from a refit
+        state = service.append_state(merged)
+        counts = np.asarray(state["m"]["climatology"])
+        state["m"]["climatology"] = np.stack([counts[0] + counts[1], counts[1]]).tolist()
+        altered = ForecastTables(merged, cache, append_state=state)
+        assert not np.allclose(altered.classes["m"]["clim"][-1], fitted.classes["m"]["clim"][-1])
+        assert np.array_equal(altered.classes["m"]["clim"][:-1], fitted.classes["m"]["clim"][:-1])
+
+        # A store the state does not describe (a day added without parse_data) is fitted as before
+        extra = generate_merged_dataset(len(merged) + 1, seed=43).iloc[[-1]]
+        extra.to_csv(os.path.join(proc, "merged_dataset.csv"), mode="a", header=False, index=False)
+        assert service.append_state(pd.concat([merged, extra])) is None
+    print("  append state models: PASS")
+
+
+def test_bad_states():
+    """State queries with out-of-range values are rejected (400) instead of scored."""
+    with tempfile.TemporaryDirectory() as tmp:
+        merged, proc, cache = _store(tmp, 900, seed=44)
+        service = ForecastService(proc, cache)
+        server = serve(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        good = {"m_consec_free": 3, "x_consec_free": 40, "sunspot_number": 120, "m_label": 0, "x_label": 1}
+        bad = [("x_consec_free", "NaN"), ("x_consec_free", -1), ("m_consec_free", "Infinity"),
+               ("sunspot_number", -50), ("sunspot_number", "abc"), ("m_label", 5), ("x_label", 0.5)]
+        try:
+            for field, value in bad:
+                # NaN / Infinity are sent as the JSON extensions Python's json module reads back
+                body = json.dumps({"states": [good, {**good, field: value}]})
+                if value in ("NaN", "Infinity"):
+                    body = body.replace(f'"{value}"', value)
+                conn.request("POST", "/forecast", body=body)
+                resp = conn.getresponse()
+                error = json.loads(resp.read())
+                assert resp.status == 400 and "state 1" in error["error"], (field, value, error)
+            conn.request("POST", "/forecast", body=json.dumps({"states": [good]}))
+            resp = conn.getresponse()
+            assert resp.status == 200 and json.loads(resp.read())[0]["forecasts"]["Persistence"]["X_24h"] == 1
+        finally:
+            conn.close()
+            server.shutdown()
+            server.server_close()
+    print("  bad states: PASS")
+
+
+def test_http_and_reload():
+    """GET/POST endpoints on localhost, and a reload after a day is appended."""
+    with tempfile.TemporaryDirectory() as tmp:
+        merged, proc, cache = _store(tmp, 900, seed=42)
+        service = ForecastService(proc, cache)
+        server = serve(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+
+        def request(method, path, body=None):
+            conn.request(method, path, body=json.dumps(body) if body is not None else None)
+            resp = conn.getresponse()
+            return resp.status, json.loads(resp.read())
+
+        try:
+            last = merged["date"].iloc[-1]
+            status, health = request("GET", "/health")
+            assert status == 200 and health["last_day"] == str(last.date())
+
+            day = str((last - pd.Timedelta(days=10)).date())
+            status, got = request("GET", f"/forecast?date={day}")
+            assert status == 200 and got[0]["query"] == day
+            expected = service.tables.forecast_dates(np.array([day], dtype="datetime64[D]"))
+            assert got[0]["forecasts"]["Naive_Bayes"]["M_24h"] == round(float(expected["Naive_Bayes"]["M_24h"][0]), 6)
+
+            future = str((last + pd.Timedelta(days=2)).date())
+            status, got = request("POST", "/forecast", {"dates": [day, future]})
+            assert status == 200 and len(got) == 2
+            assert got[1]["forecasts"]["Persistence"]["M_24h"] is None        # issue day not stored yet
+            assert got[1]["forecasts"]["Persistence"]["M_48h"] is not None
+
+            state = {"m_consec_free": 3, "x_consec_free": 40, "sunspot_number": 120, "m_label": 0, "x_label": 0}
+            status, got = request("POST", "/forecast", {"states": [state, state]})
+            assert status == 200 and got[0]["forecasts"] == got[1]["forecasts"]
+            assert request("POST", "/forecast", {"states": [{"m_label": 1}]})[0] == 400
+
+            # Append a day: the next reload check picks it up
+            extra = generate_merged_dataset(len(merged) + 1, seed=42).iloc[[-1]]
+            extra.to_csv(os.path.join(proc, "merged_dataset.csv"), mode="a", header=False, index=False)
+            assert service.maybe_reload() and not service.maybe_reload()
+            status, health = request("GET", "/health")
+            assert health["last_day"] == str(extra["date"].iloc[0].date()) and health["reloads"] == 2
+        finally:
+            conn.close()
+            server.shutdown()
+            server.server_close()
+    print("  http and reload: PASS")
+
+
+if __name__ == "__main__":
+    print("Running forecast_service unit tests...")
+    test_matches_backtest()
+    test_append_state_models()
+    test_bad_states()
+    test_http_and_reload()
+    print("\nAll tests passed!")
@@ -0,0 +1,82 @@
+"""
+Unit tests for histogram module.
+Compares histogram metrics against the per-day implementations in metrics.py.
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score, roc_curve
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from histogram import ForecastHistogram
+from metrics import compute_all_metrics, threshold_predictions, confusion_matrix_counts
+from calibration import reliability_stats, RELIABILITY_EDGES
+
+
+def _series(n, seed, continuous=False):
+    rng = np.random.default_rng(seed)
+    p = rng.random(n) if continuous else rng.integers(0, 100, n) / 100
+    y = (rng.random(n) < p * 0.6).astype(int)
+    return y, p
+
+
+def test_metrics_match():
+    """All 11 metrics equal compute_all_metrics for discrete and continuous forecasts."""
+    for seed, continuous in [(0, False), (1, True), (2, False)]:
+        y, p = _series(5000, seed, continuous)
+        hist = ForecastHistogram.from_arrays(y, p)
+        for theta in [0.05, 0.3, 0.5, 0.95]:
+            assert hist.metrics(theta) == compute_all_metrics(y, threshold_predictions(p, theta), p)
+        assert abs(hist.auc() - roc_auc_score(y, p)) < 1e-12
+    print("  metrics match: PASS")
+
+
+def test_sweep_and_roc():
+    """Confusion counts at every threshold and the ROC curve match brute force / sklearn."""
+    y, p = _series(3000, 3)
+    hist = ForecastHistogram.from_arrays(y, p)
+    thresholds = np.arange(1, 101) / 100
+    TP, FP, TN, FN = hist.confusion(thresholds)
+    for i in [0, 4, 49, 99]:
+        assert (TP[i], FP[i], TN[i], FN[i]) == confusion_matrix_counts(y, threshold_predictions(p, thresholds[i]))
+    fpr, tpr, thr = hist.roc_curve()
+    ref_fpr, ref_tpr, ref_thr = roc_curve(y, p, drop_intermediate=False)
+    assert np.allclose(fpr, ref_fpr) and np.allclose(tpr, ref_tpr) and np.array_equal(thr[1:], ref_thr[1:])
+    print("  sweep and roc: PASS")
+
+
+def test_merge_by_addition():
+    """Histograms of shards add up to the histogram of the whole series."""
+    y, p = _series(4000, 4)
+    whole = ForecastHistogram.from_arrays(y, p)
+    parts = [ForecastHistogram.from_arrays(y[i:i + 700], p[i:i + 700]) for i in range(0, 4000, 700)]
+    assert ForecastHistogram.merge(parts) == whole
+    total = parts[0]
+    for part in parts[1:]:
+        total = total + part
+    assert total == whole
+    assert ForecastHistogram.merge([]).n == 0
+    print("  merge by addition: PASS")
+
+
+def test_reliability_matches_calibration():
+    """Reliability bins equal calibration.reliability_stats."""
+    y, p = _series(3000, 5)
+    frame = pd.DataFrame({"date": pd.date_range("2000-01-01", periods=3000), "y_true": y, "y_prob": p})
+    ref = reliability_stats({"m": {"k": frame}})["m"]["k"]
+    rel = ForecastHistogram.from_frame(frame).reliability(RELIABILITY_EDGES)
+    assert rel["count"].tolist() == ref["count"]
+    for got, want in zip(rel["mean_forecast"], ref["mean_forecast"]):
+        assert (want is None and np.isnan(got)) or round(float(got), 4) == want
+    print("  reliability matches calibration: PASS")
+
+
+if __name__ == "__main__":
+    print("Running histogram unit tests...")
+    test_metrics_match()
+    test_sweep_and_roc()
+    test_merge_by_addition()
+    test_reliability_matches_calibration()
+    print("\nAll tests passed!")
@@ -0,0 +1,180 @@
+"""
+Unit tests for the per-source flare labels and peak fluxes
+(parse_data.parse_label_sources) and the label-sensitivity and class-ladder
+evaluations (label_sensitivity.py).
+"""
+
+import sys
+import os
+import io
+import shutil
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from synthetic import generate_merged_dataset, split_eval, write_raw_files
+from parse_data import (parse_label_sources, combine_label_sources, add_label_combinations,
+                        goes_class_flux, daily_peak_flux, xra_goes_classes)
+from features import ladder_labels
+from histogram import ForecastHistogram
+from metrics import evaluate_forecasts
+from label_sensitivity import label_sensitivity, class_ladder, ladder_thresholds
+from model_swpc import swpc_probabilities
+from model_persistence import persistence_probabilities
+
+
+def test_label_sources():
+    """Every raw source is parsed to its own columns, NaN outside its coverage."""
+    merged = generate_merged_dataset(800, seed=2)
+    dates = pd.DatetimeIndex(merged["date"])
+    quiet = dates[(dates.year == 1998) & (merged["m_label"] == 0).to_numpy()][:2]
+    raw_dir = tempfile.mkdtemp()
+    try:
+        write_raw_files(merged, raw_dir)
+        # ASR v1.1 with two extra M flares, spanning 1998 only
+        pd.DataFrame({"tpeak": [f"{d:%Y-%m-%d} 12:00:00" for d in quiet] + ["1998-12-31 23:00:00"],
+                      "abs_class_simple": ["M", "M", "C"]}).to_csv(
+            os.path.join(raw_dir, "asr_flare_catalog.csv"), index=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            labels = add_label_combinations(parse_label_sources(dates, raw_dir))
+    finally:
+        shutil.rmtree(raw_dir)
+
+    for source in ("noaa", "dsd", "noaa_dsd", "noaa_asr_v1_1"):
+        for c in ("m", "x"):
+            assert (labels[f"{c}_label_{source}"] == merged[f"{c}_label"]).all(), (source, c)
+    asr = labels["m_label_asr_v1_1"]
+    assert asr.isna().to_numpy().tolist() == (dates.year != 1998).tolist()
+    assert asr.sum() == 2 and labels["x_label_asr_v1_1"].sum() == 0
+    assert "m_label_asr_v1_0" not in labels and "m_label_any" not in labels
+
+    either = combine_label_sources(labels, "any", ("noaa", "asr_v1_1"), "m")
+    assert either.sum() == merged["m_label"].sum() + 2
+    later = combine_label_sources(labels, "first", ("asr_v1_1", "noaa"), "m")
+    assert (later == np.where(dates.year == 1998, asr, merged["m_label"])).all()
+
+    # Peak fluxes: the synthetic reports hold X1.2 / M2.3 events; the ASR file only class letters
+    noaa_flux = np.where(merged["x_label"], 1.2e-4, np.where(merged["m_label"], 2.3e-5, 0.0))
+    assert np.allclose(labels["peak_flux_noaa"], noaa_flux)
+    asr_flux = labels["peak_flux_asr_v1_1"].set_axis(dates)
+    assert asr_flux.isna().to_numpy().tolist() == (dates.year != 1998).tolist()
+    assert (asr_flux[quiet] == 1e-5).all()
+    assert (asr_flux[(dates.year == 1998) & ~dates.isin(quiet)] == 0).all()
+    assert np.allclose(labels["peak_flux_noaa_asr_v1_1"], noaa_flux)
+    assert "peak_flux_dsd" not in labels and "peak_flux_noaa_dsd" not in labels
+    print("  label sources: PASS")
+
+
+def test_peak_flux():
+    """GOES class strings to flux, and the daily maximum equals a pandas group-by."""
+    flux = goes_class_flux(["M2.3", "X", " C1.0", "B9.1", "m1", "XRA"])
+    assert np.allclose(flux[:4], [2.3e-5, 1e-4, 1e-6, 9.1e-7]) and np.isnan(flux[4:]).all()
+    report = ("9160 +    B1800  C1810     B1835  GO8  5   XRA  1-8A      C1.0\n"
+              "1640 +     0449   0455      0500  GO8  5   XRA  1-8A      M2.3    7.7E-03\n"
+              "1650 +     0617   0620      0624  G10  5   XFL  S18W35    1.2E+02\n")
+    assert xra_goes_classes(report) == ["C1.0", "M2.3"]
+
+    rng = np.random.default_rng(5)
+    days = np.datetime64("2001-01-01") + rng.integers(0, 40, size=500)
+    values = np.where(rng.random(500) < 0.1, np.nan, 10 ** rng.uniform(-7, -3.5, size=500))
+    peak = daily_peak_flux(days, values)
+    expected = pd.Series(values).groupby(days.astype("datetime64[ns]")).max().dropna()
+    assert (peak.index == expected.index).all() and np.allclose(peak.to_numpy(), expected.to_numpy())
+    assert len(daily_peak_flux([], [])) == 0
+    print("  peak flux: PASS")
+
+
+def test_from_label_matrix():
+    """The batched histograms equal one from_arrays histogram per row."""
+    rng = np.random.default_rng(3)
+    y_prob = rng.choice([0.01, 0.05, 0.2, 0.5, 0.8], size=300)
+    labels = (rng.random((4, 300)) < 0.3).astype(int)
+    valid = rng.random((4, 300)) > 0.2
+    valid[0] = True
+    for row, hist in enumerate(ForecastHistogram.from_label_matrix(labels, valid, y_prob)):
+        single = ForecastHistogram.from_arrays(labels[row, valid[row]], y_prob[valid[row]])
+        assert hist.n == valid[row].sum() and hist.events == labels[row, valid[row]].sum()
+        assert hist.metrics() == single.metrics()
+    print("  from label matrix: PASS")
+
+
+def test_label_sensitivity():
+    """The default labels reproduce the daily tables; partial sources score only the days they cover."""
+    merged = generate_merged_dataset(700, seed=9)
+    eval_df = split_eval(merged)
+    forecasts = {"SWPC": swpc_probabilities(eval_df),
+                 "Persistence": persistence_probabilities(eval_df, merged)}
+    late = pd.to_datetime(merged["date"]).dt.year >= 1998
+    for c in ("m", "x"):
+        merged[f"{c}_label_late"] = np.where(late, merged[f"{c}_label"], np.nan)
+        merged[f"{c}_label_flipped"] = 1 - merged[f"{c}_label"]
+
+    table = label_sensitivity(forecasts, merged)
+    assert len(table) == 2 * 6 * 3
+    for model, by_key in forecasts.items():
+        for key, frame in by_key.items():
+            rows = table[(table["Model"] == model) & (table["Key"] == key)].set_index("Labels")
+            expected = evaluate_forecasts(frame)
+            for metric, value in expected.items():
+                assert rows.loc["default", metric] == value, (model, key, metric)
+            covered = (pd.to_datetime(frame["date"]).dt.year >= 1998).sum()
+            assert rows.loc["late", "N"] == covered
+            assert rows.loc["flipped", "Events"] == len(frame) - frame["y_true"].sum()
+
+    try:
+        label_sensitivity(forecasts, merged, ["default", "asr_v1_0"])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown source should fail")
+    print("  label sensitivity: PASS")
+
+
+def test_class_ladder():
+    """Each rung labels the days with peak flux above it; days without a flux are left out."""
+    merged = generate_merged_dataset(700, seed=9)
+    eval_df = split_eval(merged)
+    forecasts = {"SWPC": swpc_probabilities(eval_df)}
+    flux = np.where(merged["x_label"], 6e-4, np.where(merged["m_label"], 2e-5, 3e-6))
+    merged["peak_flux"] = np.where(np.arange(len(merged)) % 10 == 0, np.nan, flux)
+
+    assert np.allclose(ladder_thresholds(["C", "M5", "2.5e-4"]), [1e-6, 5e-5, 2.5e-4])
+    y, known = ladder_labels([np.nan, 2e-5, 1e-4], [1e-5, 1e-4])
+    assert y.tolist() == [[0, 1, 1], [0, 0, 1]] and known[:, 0].tolist() == [False, False] and known[:, 1:].all()
+
+    table = class_ladder(forecasts, merged, ["C", "M", "M5", "X"])
+    assert len(table) == 6 * 4 and list(table.columns[:6]) == ["Model", "Key", "Labels", "Threshold", "N", "Events"]
+    known = merged.set_index("date")["peak_flux"].notna()
+    for key, frame in forecasts["SWPC"].items():
+        rows = table[table["Key"] == key].set_index("Labels")
+        keep = known.reindex(frame["date"]).to_numpy()
+        days = merged.set_index("date").loc[frame["date"][keep]]
+        assert (rows["N"] == keep.sum()).all()
+        assert rows.loc[">=C", "Events"] == keep.sum()
+        assert rows.loc[">=M", "Events"] == (days["m_label"] | days["x_label"]).sum()
+        assert rows.loc[">=M5", "Events"] == rows.loc[">=X", "Events"] == days["x_label"].sum()
+        if key[0] == "X":
+            x = frame[keep].assign(y_true=days["x_label"].to_numpy())
+            assert rows.loc[">=X", "TSS"] == evaluate_forecasts(x)["TSS"]
+
+    for bad in (["Q"], ["-1e-5"]):
+        try:
+            ladder_thresholds(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"rung {bad} should fail")
+    print("  class ladder: PASS")
+
+
+if __name__ == "__main__":
+    print("Running label-sensitivity unit tests...")
+    test_label_sources()
+    test_peak_flux()
+    test_from_label_matrix()
+    test_label_sensitivity()
+    test_class_ladder()
+    print("\nAll tests passed!")
@@ -0,0 +1,87 @@
+"""
+Unit tests for the warm-started LR path engine (model_logistic_regression.path_params).
+"""
+
+import sys
+import os
+import numpy as np
+from scipy.optimize import minimize
+from scipy.special import expit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from synthetic import generate_merged_dataset, split_eval
+from features import as_days
+from model_logistic_regression import (path_params, fit_logistic_path, logistic_regression_path,
+                                       logistic_regression_probabilities)
+
+CS = (0.01, 1.0, 100.0)
+
+
+def _objective(beta, design, y, C):
+    """sklearn's L2 objective: 0.5 * |coef|^2 + C * log loss (intercept not penalized)."""
+    z = design @ beta
+    return 0.5 * beta[1:] @ beta[1:] + C * np.sum(np.logaddexp(0, z) - y * z)
+
+
+def test_matches_cold_fits():
+    """Every month and C reaches the raw-feature optimum of a cold fit on that month's window."""
+    merged = generate_merged_dataset(900, seed=11)
+    days = as_days(merged["date"])
+    months = np.unique(as_days(split_eval(merged)["date"]).astype("datetime64[M]"))
+    params, steps = path_params(merged, months, "m", CS)
+    assert params.shape == (len(CS), len(months), 3)
+    assert steps < 3 * len(CS) * len(months)
+    for k in (0, len(months) // 2, len(months) - 1):
+        train = merged[days < months[k].astype("datetime64[D]")]
+        design = np.column_stack([np.ones(len(train)), train[["m_consec_free", "sunspot_number"]].to_numpy(float)])
+        y = train["m_label"].to_numpy(float)
+        for c, C in enumerate(CS):
+            ref = minimize(_objective, np.zeros(3), args=(design, y, C), method="BFGS",
+                           options={"gtol": 1e-10}).x
+            assert _objective(params[c, k], design, y, C) <= _objective(ref, design, y, C) + 1e-7, (k, C)
+            assert np.abs(expit(design @ params[c, k]) - expit(design @ ref)).max() < 1e-5, (k, C)
+    print("  matches cold fits: PASS")
+
+
+def test_path_matches_single_C():
+    """One solve over a grid of C gives each C's single-C fit; the warm start does not change it."""
+    rng = np.random.default_rng(4)
+    design = np.column_stack([np.ones(400), rng.normal(size=(400, 2))])
+    y = (rng.random(400) < expit(design @ [-1.0, 2.0, -0.5])).astype(float)
+    scale = np.array([3.0, 0.5])
+    grid, _ = fit_logistic_path(design, y, CS, scale=scale)
+    for c, C in enumerate(CS):
+        single, _ = fit_logistic_path(design, y, [C], scale=scale)
+        warm, it = fit_logistic_path(design, y, [C], scale=scale, start=grid[c:c + 1] + 0.01)
+        assert np.allclose(grid[c], single[0], atol=1e-9) and np.allclose(warm, single, atol=1e-9)
+        assert it <= 4
+    print("  path matches single C: PASS")
+
+
+def test_newton_solver():
+    """solver="newton" matches sklearn's lbfgs fits and the path's forecasts for the same C."""
+    merged = generate_merged_dataset(900, seed=17)
+    eval_df = split_eval(merged)
+    lbfgs = logistic_regression_probabilities(eval_df, merged, use_cache=False, C=0.1)
+    newton = logistic_regression_probabilities(eval_df, merged, C=0.1, solver="newton")
+    path = logistic_regression_path(eval_df, merged, [0.1, 10.0])
+    for key, frame in lbfgs.items():
+        assert (newton[key]["date"].values == frame["date"].values).all(), key
+        assert np.abs(newton[key]["y_prob"].values - frame["y_prob"].values).max() < 2e-4, key
+        assert np.allclose(path[0.1][key]["y_prob"].values, newton[key]["y_prob"].values, atol=1e-9), key
+    try:
+        logistic_regression_probabilities(eval_df, merged, solver="sag")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown solver accepted")
+    print("  newton solver: PASS")
+
+
+if __name__ == "__main__":
+    print("Running LR path engine unit tests...")
+    test_matches_cold_fits()
+    test_path_matches_single_C()
+    test_newton_solver()
+    print("\nAll tests passed!")
@@ -0,0 +1,73 @@
+"""
+Unit tests for the analog-ensemble baseline (model_analog.py).
+"""
+
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from synthetic import generate_merged_dataset, split_eval
+from features import as_days, shifted_labels
+from model_analog import AnalogIndex, analog_features, analog_probabilities, recent_flare_days
+
+
+def test_index_matches_brute_force():
+    """The growing index returns the same neighbours as a full scan, with O(log n) trees."""
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(2000, 3))
+    index = AnalogIndex(3)
+    start = 0
+    for size in rng.integers(1, 60, size=60):
+        index.add(points[start:start + size], np.arange(start, start + size))
+        start += size
+        assert len(index) == start and len(index.blocks) <= np.log2(start) + 1
+        X = rng.normal(size=(5, 3))
+        dist, ids = index.query(X, 7)
+        full = np.linalg.norm(points[None, :start] - X[:, None], axis=2)
+        expected = np.argsort(full, axis=1, kind="stable")[:, :7]
+        assert (ids == expected).all()
+        assert np.allclose(dist, np.take_along_axis(full, expected, axis=1))
+    assert index.query(X, 10**6)[1].shape == (5, start)
+    print("  index matches brute force: PASS")
+
+
+def test_recent_flare_days():
+    """Flare days in the trailing calendar window; missing days count as flare-free."""
+    days = np.array(["2001-01-01", "2001-01-02", "2001-01-05", "2001-01-09"], dtype="datetime64[D]")
+    assert recent_flare_days(days, [1, 1, 1, 1], window=7).tolist() == [1, 2, 3, 2]
+    print("  recent flare days: PASS")
+
+
+def test_matches_scan():
+    """Every forecast equals the outcome rate of the k nearest days found by scanning the history."""
+    merged = generate_merged_dataset(900, seed=7)
+    eval_df = split_eval(merged)
+    k = 15
+    probs = analog_probabilities(eval_df, merged, horizons=(1, 3), k=k)
+
+    days = as_days(merged["date"])
+    for flare_class in ("m", "x"):
+        features = analog_features(merged, flare_class)
+        outcome = shifted_labels(days, merged[f"{flare_class}_label"], (1, 3))
+        for h, lead in enumerate((1, 3)):
+            frame = probs[f"{flare_class.upper()}_{24 * lead}h"]
+            assert len(frame) > 0.9 * len(eval_df)
+            for day, y_prob in zip(as_days(frame["date"]), frame["y_prob"]):
+                issue = np.searchsorted(days, day - lead)
+                start = day.astype("datetime64[M]").astype("datetime64[D]")
+                known = (days + lead < start) & ~np.isnan(outcome[h])
+                candidates = np.flatnonzero(known & ~np.isnan(features).any(axis=1))
+                dist = np.linalg.norm(features[candidates] - features[issue], axis=1)
+                nearest = candidates[np.argsort(dist, kind="stable")[:k]]
+                assert y_prob == outcome[h, nearest].mean(), (flare_class, lead, day)
+    print("  matches scan: PASS")
+
+
+if __name__ == "__main__":
+    print("Running analog-ensemble unit tests...")
+    test_index_matches_brute_force()
+    test_recent_flare_days()
+    test_matches_scan()
+    print("\nAll tests passed!")
@@ -0,0 +1,76 @@
+"""
+Unit tests for the Markov-chain flare-state baseline (model_markov.py).
+"""
+
+import sys
+import os
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from synthetic import generate_merged_dataset, split_eval
+from features import as_days
+from model_markov import context_codes, flare_states, markov_probabilities
+
+
+def test_context_codes():
+    """Base-3 codes of the last days' states; incomplete across missing days."""
+    days = np.array(["2001-01-01", "2001-01-02", "2001-01-03", "2001-01-05", "2001-01-06"], dtype="datetime64[D]")
+    codes, complete = context_codes(days, [1, 2, 0, 2, 1], 2)
+    assert codes[1:].tolist() == [5, 6, 2, 7]
+    assert complete.tolist() == [False, True, True, False, True]
+    print("  context codes: PASS")
+
+
+def _recount(days, states, labels, start, order, alpha, lag, context):
+    """P(label `lag` days after `context`) from a chain counted day by day over the days before `start`."""
+    n_ctx = 3 ** order
+    counts = np.zeros((n_ctx, 3))
+    in_state = np.zeros((3, 2))
+    for i, day in enumerate(days):
+        if day >= start:
+            break
+        in_state[states[i], labels[i]] += 1
+        if i >= order and days[i - order] == day - order:
+            c = sum(states[i - 1 - j] * 3 ** j for j in range(order))
+            counts[c, states[i]] += 1
+    T = np.zeros((n_ctx, n_ctx))
+    for c in range(n_ctx):
+        for s in range(3):
+            T[c, (c * 3) % n_ctx + s] = (counts[c, s] + alpha) / (counts[c].sum() + 3 * alpha)
+    rate = in_state[:, 1] / np.maximum(in_state.sum(axis=1), 1)
+    return np.linalg.matrix_power(T, lag)[context] @ rate[np.arange(n_ctx) % 3]
+
+
+def test_matches_recount():
+    """Every month's forecasts equal a chain re-counted from scratch for that month."""
+    merged = generate_merged_dataset(1200, seed=8)
+    merged = merged.drop(index=[400, 401, 777]).reset_index(drop=True)
+    eval_df = split_eval(merged)
+    days = as_days(merged["date"])
+    states = flare_states(merged)
+    rng = np.random.default_rng(0)
+
+    for order, alpha in ((1, 0.5), (2, 1.0), (3, 1.0)):
+        probs = markov_probabilities(eval_df, merged, horizons=(1, 3, 5), order=order, alpha=alpha)
+        context, _ = context_codes(days, states, order)
+        for key, frame in probs.items():
+            lag = int(key.split("_")[1][:-1]) // 24
+            labels = merged[f"{key[0].lower()}_label"].to_numpy()
+            assert len(frame) > 0.95 * len(eval_df)
+            for i in rng.choice(len(frame), size=8, replace=False):
+                day = as_days(frame["date"])[i]
+                issue = np.searchsorted(days, day - lag)
+                start = day.astype("datetime64[M]").astype("datetime64[D]")
+                expected = _recount(days, states, labels, start, order, alpha, lag, context[issue])
+                assert np.isclose(frame["y_prob"].iloc[i], expected, rtol=1e-12), (order, key, day)
+        # The day after a gap has no complete context
+        assert np.datetime64(merged["date"].iloc[400].date(), "D") not in as_days(probs["M_24h"]["date"])
+    print("  matches recount: PASS")
+
+
+if __name__ == "__main__":
+    print("Running Markov-chain unit tests...")
+    test_context_codes()
+    test_matches_recount()
+    print("\nAll tests passed!")
@@ -0,0 +1,78 @@
+"""
+Unit tests for the binned Naive Bayes variant (model_naive_bayes.py, variant="binned").
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+from sklearn.naive_bayes import CategoricalNB
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from synthetic import generate_merged_dataset, split_eval
+from features import as_days
+from model_naive_bayes import feature_bins, binned_counts, naive_bayes_probabilities
+
+
+def test_feature_bins():
+    """Bins follow the climatology cells; missing features get -1."""
+    X = np.array([[0, 0], [20, 199], [21, 200], [400, 201], [np.nan, 5], [3, 35.5]])
+    index, n_bins = feature_bins(X)
+    assert index.tolist() == [[0, 0], [20, 19], [21, 20], [21, 21], [-1, -1], [3, 3]]
+    assert n_bins.tolist() == [22, 22]
+    assert feature_bins(X, (10, 20, 200))[0][3].tolist() == [11, 11]
+    print("  feature bins: PASS")
+
+
+def test_counts_accumulate():
+    """Each month's counts are the category counts of the days before it."""
+    merged = generate_merged_dataset(700, seed=2)
+    merged.loc[[10, 300], "sunspot_number"] = np.nan
+    days = as_days(merged["date"])
+    months = np.unique(as_days(split_eval(merged)["date"]).astype("datetime64[M]"))
+    counts = binned_counts(merged, months, "x")
+    for k in (0, len(months) // 2, len(months) - 1):
+        train = merged[days < months[k].astype("datetime64[D]")].dropna(subset=["x_consec_free", "sunspot_number"])
+        index, n_bins = feature_bins(train[["x_consec_free", "sunspot_number"]].to_numpy(float))
+        for y in (0, 1):
+            rows = index[train["x_label"].to_numpy() == y]
+            expected = np.concatenate([np.bincount(rows[:, 0], minlength=n_bins[0]),
+                                       np.bincount(rows[:, 1], minlength=n_bins[1])])
+            assert (counts[k, y] == expected).all(), (k, y)
+    print("  counts accumulate: PASS")
+
+
+def test_matches_categorical_nb():
+    """Binned forecasts equal sklearn's CategoricalNB refitted on the days before each month."""
+    merged = generate_merged_dataset(900, seed=9)
+    eval_df = split_eval(merged)
+    probs = naive_bayes_probabilities(eval_df, merged, use_cache=False, variant="binned")
+    rng = np.random.default_rng(1)
+    for fc in ("m", "x"):
+        cols = [f"{fc}_consec_free", "sunspot_number"]
+        frame = probs[f"{fc.upper()}_48h"]
+        for day in rng.choice(frame["date"].values, 8, replace=False):
+            day = pd.Timestamp(day)
+            train = merged[merged["date"] < day.to_period("M").to_timestamp()].dropna(subset=cols)
+            issue = merged[merged["date"] == day - pd.Timedelta(days=2)]
+            index, n_bins = feature_bins(train[cols].to_numpy(float))
+            cnb = CategoricalNB(alpha=1.0, min_categories=n_bins).fit(index, train[f"{fc}_label"].astype(int))
+            expected = cnb.predict_proba(feature_bins(issue[cols].to_numpy(float))[0])[0, 1]
+            got = frame.loc[frame["date"] == day, "y_prob"].iloc[0]
+            assert abs(got - expected) < 1e-12, (fc, day, got, expected)
+    try:
+        naive_bayes_probabilities(eval_df, merged, variant="multinomial")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown variant accepted")
+    print("  matches CategoricalNB: PASS")
+
+
+if __name__ == "__main__":
+    print("Running binned Naive Bayes unit tests...")
+    test_feature_bins()
+    test_counts_accumulate()
+    test_matches_categorical_nb()
+    print("\nAll tests passed!")
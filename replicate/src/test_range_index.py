@@ -0,0 +1,73 @@
+"""
+Unit tests for range_index module.
+Compares range queries against filtering the per-day forecasts directly.
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from range_index import build_range_index, range_metrics, breakdown
+from metrics import confusion_matrix_counts, brier_score, true_skill_statistic, threshold_predictions
+from synthetic import generate_merged_dataset, split_eval
+from model_swpc import swpc_probabilities
+from model_persistence import persistence_probabilities
+
+
+def _forecasts(n_days=3000, seed=21):
+    merged_df = generate_merged_dataset(n_days, seed=seed)
+    eval_df = split_eval(merged_df)
+    return {"SWPC": swpc_probabilities(eval_df),
+            "Persistence": persistence_probabilities(eval_df, merged_df)}
+
+
+def test_ranges_match_filtering():
+    """Random date ranges give the same counts, TSS and Brier as filtering."""
+    forecasts = _forecasts()
+    thresholds = [0.05, 0.25, 0.5]
+    index = build_range_index(forecasts, thresholds)
+    days = index["days"]
+
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        a, b = np.sort(rng.integers(0, len(days), 2))
+        start, end = days[a], days[b]
+        res = range_metrics(index, start, end)
+        for i, model in enumerate(index["models"]):
+            for k, key in enumerate(index["keys"]):
+                frame = forecasts[model][key]
+                sub = frame[(frame["date"] >= pd.Timestamp(start)) & (frame["date"] <= pd.Timestamp(end))]
+                y, p = sub["y_true"].to_numpy(), sub["y_prob"].to_numpy()
+                assert res["N"][0, i, k] == len(sub)
+                assert res["Events"][0, i, k] == y.sum()
+                if len(sub):
+                    assert abs(res["Brier"][0, i, k] - brier_score(y, p)) < 1e-12
+                for t, theta in enumerate(thresholds):
+                    pred = threshold_predictions(p, theta)
+                    TP, FP, TN, FN = confusion_matrix_counts(y, pred)
+                    assert (res["TP"][0, i, k, t], res["FP"][0, i, k, t],
+                            res["TN"][0, i, k, t], res["FN"][0, i, k, t]) == (TP, FP, TN, FN)
+                    assert abs(res["TSS"][0, i, k, t] - true_skill_statistic(y, pred)) < 1e-12
+    print("  ranges match filtering: PASS")
+
+
+def test_breakdown_partitions_days():
+    """Per-year counts add up to the whole evaluation period."""
+    forecasts = _forecasts(2000, seed=22)
+    index = build_range_index(forecasts)
+    table = breakdown(index, by="year")
+    total = table.groupby(["model", "key"])["N"].sum()
+    for (model, key), n in total.items():
+        assert n == len(forecasts[model][key])
+    assert breakdown(index, by="cycle")["N"].sum() == table["N"].sum()
+    print("  breakdown partitions days: PASS")
+
+
+if __name__ == "__main__":
+    print("Running range_index unit tests...")
+    test_ranges_match_filtering()
+    test_breakdown_partitions_days()
+    print("\nAll tests passed!")
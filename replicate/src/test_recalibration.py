@@ -0,0 +1,101 @@
+"""
+Unit tests for the expanding-window recalibration (recalibration.py).
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+from scipy.special import expit, logit
+from sklearn.isotonic import IsotonicRegression
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from features import forecast_frame
+from recalibration import pav, platt_params, recalibrate, recalibrated_forecasts, N_BUCKETS, PLATT_EPS, PLATT_RIDGE
+
+
+def _series(n=1500, seed=0):
+    """A miscalibrated forecast series over ~4 years: whole percentages, events at p ** 2."""
+    rng = np.random.default_rng(seed)
+    days = np.datetime64("2001-01-01") + np.arange(n)
+    y_prob = rng.integers(0, 101, size=n) / 100
+    y_true = (rng.random(n) < y_prob ** 2).astype(int)
+    return forecast_frame(days, y_true, y_prob)
+
+
+def test_pav():
+    """Histogram PAV (one or many segments) equals sklearn's isotonic regression."""
+    rng = np.random.default_rng(1)
+    events, totals, segments, expected = [], [], [], []
+    for s in range(30):
+        n = rng.integers(1, 40)
+        tot = rng.integers(1, 20, size=n).astype(float)
+        ev = rng.binomial(tot.astype(int), np.clip(np.linspace(0, 1, n) + rng.normal(0, 0.3, n), 0, 1))
+        fit = IsotonicRegression().fit(np.arange(n), ev / tot, sample_weight=tot).predict(np.arange(n))
+        assert np.allclose(pav(ev, tot), fit)
+        events.append(ev), totals.append(tot), segments.append(np.full(n, s)), expected.append(fit)
+    together = pav(np.concatenate(events), np.concatenate(totals), np.concatenate(segments))
+    assert np.allclose(together, np.concatenate(expected))
+    print("  pav: PASS")
+
+
+def test_isotonic_expanding_window():
+    """Each month is mapped by an isotonic fit on every earlier day, interpolated between buckets."""
+    frame = _series()
+    out = recalibrate(frame, "isotonic")
+    days = frame["date"].to_numpy()
+    assert out["date"].min() == pd.Timestamp("2001-02-01") and len(out) == len(frame) - 31
+    for month in pd.date_range("2001-02-01", "2005-01-01", freq="MS")[::7]:
+        past = days < month.to_datetime64()
+        now = (days >= month.to_datetime64()) & (days < (month + pd.offsets.MonthBegin()).to_datetime64())
+        iso = IsotonicRegression(out_of_bounds="clip").fit(
+            np.rint(frame["y_prob"][past] * N_BUCKETS) / N_BUCKETS, frame["y_true"][past])
+        got = out.set_index("date").loc[frame["date"][now], "y_prob"].to_numpy()
+        assert np.allclose(got, iso.predict(frame["y_prob"][now])), month
+    assert out["y_prob"].diff().abs().max() > 0
+    print("  isotonic expanding window: PASS")
+
+
+def test_platt():
+    """Platt parameters are a stationary point of the penalized likelihood and undo a known distortion."""
+    frame = _series(20000, seed=2)
+    y_prob = np.clip(frame["y_prob"].to_numpy(), 0.01, 0.99)
+    y_true = (np.random.default_rng(3).random(len(frame)) < expit(2 * logit(y_prob) - 1)).astype(int)
+    bucket = np.rint(y_prob * N_BUCKETS).astype(int)
+    counts = np.stack([np.bincount(bucket[y_true == y], minlength=N_BUCKETS + 1) for y in (0, 1)])
+    a, b = platt_params(counts)
+    assert abs(a - 2) < 0.1 and abs(b + 1) < 0.1
+    x = logit(np.clip(np.arange(N_BUCKETS + 1) / N_BUCKETS, PLATT_EPS, 1 - PLATT_EPS))
+    r = counts[1] - counts.sum(axis=0) * expit(a * x + b)
+    assert abs(r @ x - PLATT_RIDGE * a) < 1e-8 and abs(r.sum() - PLATT_RIDGE * b) < 1e-8
+
+    # A batch of windows gives the single-window fits; the month's map is applied to its days
+    batch = platt_params(np.stack([counts, counts // 2 + 1]))
+    assert np.allclose(batch[0], [a, b]) and np.allclose(batch[1], platt_params(counts // 2 + 1))
+    out = recalibrate(forecast_frame(frame["date"], y_true, y_prob), "platt")
+    assert out["y_prob"].between(0, 1).all() and len(out) == len(frame) - 31
+    print("  platt: PASS")
+
+
+def test_recalibrated_forecasts():
+    """Named copies for the listed models present, every key; unknown methods fail."""
+    frame = _series(400)
+    forecasts = {"SWPC": {"X_24h": frame, "M_24h": frame}, "Persistence": {"X_24h": frame}}
+    out = recalibrated_forecasts(forecasts)
+    assert sorted(out) == ["SWPC_Isotonic", "SWPC_Platt"] and sorted(out["SWPC_Platt"]) == ["M_24h", "X_24h"]
+    try:
+        recalibrate(frame, "beta")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown method should fail")
+    print("  recalibrated forecasts: PASS")
+
+
+if __name__ == "__main__":
+    print("Running recalibration unit tests...")
+    test_pav()
+    test_isotonic_expanding_window()
+    test_platt()
+    test_recalibrated_forecasts()
+    print("\nAll tests passed!")
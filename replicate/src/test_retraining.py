@@ -0,0 +1,89 @@
+"""
+Unit tests for the retraining cadences (retraining.py).
+Monthly cadence is compared with the model modules, daily and weekly with
+models refitted from scratch on the rows before each period.
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from synthetic import generate_merged_dataset, split_eval
+from retraining import period_starts, cadence_forecasts
+from model_climatology import climatology_probabilities, fit_climatology_counts, probabilities_from_counts, climatology_cells
+from model_naive_bayes import naive_bayes_probabilities, fit_naive_bayes, nb_predict_proba
+from model_logistic_regression import logistic_regression_probabilities, fit_logistic_regression, lr_predict_proba
+
+TOLERANCE = {"Climatology": 0.0, "Naive_Bayes": 1e-9, "Logistic_Reg": 2e-4}
+
+
+def test_period_starts():
+    """Weekly periods start on Mondays, monthly and yearly on the first day."""
+    days = np.array(["2024-01-01", "2024-01-07", "2024-01-08", "2024-02-29", "2023-12-31"], dtype="datetime64[D]")
+    assert list(period_starts(days, "daily")) == list(days)
+    assert list(period_starts(days, "weekly").astype(str)) == [
+        "2024-01-01", "2024-01-01", "2024-01-08", "2024-02-26", "2023-12-25"]
+    assert list(period_starts(days, "monthly").astype(str)) == [
+        "2024-01-01", "2024-01-01", "2024-01-01", "2024-02-01", "2023-12-01"]
+    assert list(period_starts(days, "yearly").astype(str)) == [
+        "2024-01-01", "2024-01-01", "2024-01-01", "2024-01-01", "2023-01-01"]
+    print("  period starts: PASS")
+
+
+def test_monthly_matches_models():
+    """Monthly cadence reproduces the forecasts of the model modules."""
+    merged = generate_merged_dataset(900, seed=17)
+    eval_df = split_eval(merged)
+    ours = cadence_forecasts(eval_df, merged, "monthly")
+    ref = {
+        "Climatology": climatology_probabilities(eval_df, merged, use_cache=False),
+        "Naive_Bayes": naive_bayes_probabilities(eval_df, merged, use_cache=False),
+        "Logistic_Reg": logistic_regression_probabilities(eval_df, merged, use_cache=False),
+    }
+    for model, by_key in ref.items():
+        for key, frame in by_key.items():
+            got = ours[model][key]
+            assert (got["date"].values == frame["date"].values).all(), (model, key)
+            assert (got["y_true"].values == frame["y_true"].values).all(), (model, key)
+            assert np.abs(got["y_prob"].values - frame["y_prob"].values).max() <= TOLERANCE[model], (model, key)
+    print("  monthly matches models: PASS")
+
+
+def test_daily_weekly_match_refit():
+    """Daily and weekly forecasts equal models refitted on every row before the period."""
+    merged = generate_merged_dataset(700, seed=5)
+    eval_df = split_eval(merged)
+    rng = np.random.default_rng(0)
+    for cadence in ["daily", "weekly"]:
+        ours = cadence_forecasts(eval_df, merged, cadence)
+        for day in rng.choice(eval_df["date"].values[1:], 6, replace=False):
+            day = pd.Timestamp(day)
+            start = pd.Timestamp(period_starts(np.array([day], dtype="datetime64[D]"), cadence)[0])
+            train = merged[merged["date"] < start]
+            issue = merged[merged["date"] == day - pd.Timedelta(days=1)]
+            for fc in ["m", "x"]:
+                cols = [f"{fc}_consec_free", "sunspot_number"]
+                X, y = train[cols].values, train[f"{fc}_label"].values.astype(int)
+                x = issue[cols].values
+                expected = {
+                    "Climatology": probabilities_from_counts(
+                        fit_climatology_counts(train, f"{fc}_label", cols[0]), climatology_cells(x[:, 0], x[:, 1]))[0],
+                    "Naive_Bayes": nb_predict_proba(fit_naive_bayes(X, y), x)[0],
+                    "Logistic_Reg": lr_predict_proba(fit_logistic_regression(X, y), x)[0],
+                }
+                for model, p in expected.items():
+                    frame = ours[model][f"{fc.upper()}_24h"]
+                    got = frame.loc[frame["date"] == day, "y_prob"].iloc[0]
+                    assert abs(got - p) <= max(TOLERANCE[model], 1e-12), (cadence, day, model, fc, got, p)
+    print("  daily and weekly match refit: PASS")
+
+
+if __name__ == "__main__":
+    print("Running retraining unit tests...")
+    test_period_starts()
+    test_monthly_matches_models()
+    test_daily_weekly_match_refit()
+    print("\nAll tests passed!")
@@ -0,0 +1,100 @@
+"""
+Unit tests for the modelling-choice sweep (sweep.py) and the model options
+it varies.
+"""
+
+import sys
+import os
+import io
+import contextlib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from synthetic import generate_merged_dataset, split_eval
+from sweep import configurations, parse_grid, label_sources, with_labels, run_sweep
+from run_all import compute_forecasts, collect_results
+from model_climatology import climatology_cells, n_cells, parse_bins, N_BINS
+
+
+def test_grid():
+    """Grid parsing and expansion."""
+    grid = parse_grid("timing=target lr_C=0.5,2 lr_solver=newton")
+    assert grid["timing"] == ["target"] and grid["lr_C"] == [0.5, 2.0] and grid["lr_solver"] == ["newton"]
+    configs = configurations({"a": [1, 2], "b": ["x", "y", "z"]})
+    assert len(configs) == 6 and configs[1] == {"a": 1, "b": "y"}
+    try:
+        parse_grid("solver=lbfgs")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown choice should fail")
+    print("  grid: PASS")
+
+
+def test_bins():
+    """Default bins reproduce the N_BINS x N_BINS cells; coarser bins merge them."""
+    x1 = np.array([0, 5, 20, 21, 300])
+    x2 = np.array([0, 15, 200, 201, 55])
+    assert n_cells() == N_BINS * N_BINS
+    assert (climatology_cells(x1, x2) == np.array([0, 5, 20, 21, 21]) * N_BINS + [0, 1, 20, 21, 5]).all()
+    coarse = parse_bins("10/20/100")
+    assert n_cells(coarse) == 12 * 7
+    assert (climatology_cells(x1, x2, coarse) == np.array([0, 5, 11, 11, 11]) * 7 + [0, 0, 6, 6, 2]).all()
+    print("  bins: PASS")
+
+
+def test_label_sources():
+    """A full-coverage label column replaces the labels and the flare-free runs."""
+    merged = generate_merged_dataset(800, seed=4)
+    eval_df = split_eval(merged)
+    assert label_sources(merged) == ["default"]
+    merged["m_label_shifted"] = np.roll(merged["m_label"].to_numpy(), 1)
+    merged["x_label_shifted"] = merged["x_label"].to_numpy()
+    assert label_sources(merged) == ["default", "shifted"]
+    merged["m_label_partial"] = np.where(np.arange(len(merged)) < 100, np.nan, merged["m_label"])
+    merged["x_label_partial"] = merged["x_label"].to_numpy()
+    assert label_sources(merged) == ["default", "shifted"]      # models need labels on every day
+    merged = merged.drop(columns=["m_label_partial", "x_label_partial"])
+
+    e, m = with_labels(eval_df, merged, "shifted")
+    assert (m["m_label"] == merged["m_label_shifted"]).all()
+    assert (m["x_consec_free"] == merged["x_consec_free"]).all()
+    assert (e["m_label"].to_numpy() == m["m_label"].to_numpy()[-len(e):]).all()
+    assert (e["m_consec_free"].to_numpy() == m["m_consec_free"].to_numpy()[-len(e):]).all()
+    assert with_labels(eval_df, merged, "default")[0] is eval_df
+    print("  label sources: PASS")
+
+
+def test_sweep_ranks_configurations():
+    """Against targets made from one configuration, that configuration ranks first with every value matching."""
+    merged = generate_merged_dataset(900, seed=6)
+    eval_df = split_eval(merged)
+    options = {"timing": "target", "lr_C": 0.1}
+    with contextlib.redirect_stdout(io.StringIO()):
+        forecasts = compute_forecasts(eval_df, merged, use_cache=False, options=options)
+        targets = collect_results(eval_df, merged, forecasts, options)
+    targets.pop("calibration")
+
+    grid = {"timing": ["issue", "target"], "lr_C": [0.1, 1.0]}
+    table = run_sweep(eval_df, merged, targets, grid, workers=1, use_cache=False)
+    assert len(table) == 4 and list(table["Rank"]) == [1, 2, 3, 4]
+    best = table.iloc[0]
+    assert (best["timing"], best["lr_C"]) == ("target", 0.1)
+    assert best["close"] == best["discrepant"] == 0 and best["match_rate"] == 1.0
+    assert (table["match_rate"].diff().dropna() <= 0).all()
+    assert best["tables/table_2/data/SWPC/TSS"] == targets["tables"]["table_2"]["data"]["SWPC"]["TSS"]
+
+    # Worker processes give the same table
+    parallel = run_sweep(eval_df, merged, targets, grid, workers=2, use_cache=False)
+    assert parallel.drop(columns="Seconds").equals(table.drop(columns="Seconds"))
+    print("  sweep ranks configurations: PASS")
+
+
+if __name__ == "__main__":
+    print("Running sweep unit tests...")
+    test_grid()
+    test_bins()
+    test_label_sources()
+    test_sweep_ranks_configurations()
+    print("\nAll tests passed!")
@@ -0,0 +1,146 @@
+"""
+Unit tests for the GOES XRS flare detector and label source (xrs_labels.py).
+"""
+
+import sys
+import os
+import io
+import shutil
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from synthetic import generate_merged_dataset, write_raw_files, write_xrs_files
+from parse_data import parse_label_sources
+from xrs_labels import (start_candidates, detect_events, detect_flares, xrs_flare_days,
+                        write_xrs_file, convert_csv, open_xrs, XRS_DIR)
+
+
+def _minutes(n, start="2001-01-01"):
+    return np.datetime64(start) + np.arange(n).astype("timedelta64[m]").astype("timedelta64[s]")
+
+
+def test_detector_rules():
+    """Start on four rising minutes (x1.4, no gaps), peak at the maximum, end at half decay."""
+    flux = np.full(60, 1e-6)
+    flux[10:14] = [1e-6, 1.2e-6, 1.5e-6, 2e-6]          # start at 10 (2.0 >= 1.4 x 1.0)
+    flux[14:20] = [4e-6, 8e-6, 1e-5, 9e-6, 6e-6, 5e-6]   # peak at 16; ends below (1e-6 + 1e-5) / 2
+    flux[20:30] = 3e-6
+    flux[40:44] = [1e-6, 1.1e-6, 1.2e-6, 1.3e-6]        # rising but only x1.3: no flare
+    times = _minutes(60)
+    assert start_candidates(flux, times).tolist() == [10, 11, 12, 13]
+    assert detect_events(flux, times, 0, 60).tolist() == [[10, 16, 19]]
+
+    gap = times.copy()
+    gap[12:] += np.timedelta64(60, "s")                 # a missing minute before index 12
+    assert start_candidates(flux, gap).tolist() == [12, 13]
+    flux[11] = np.nan
+    assert start_candidates(flux, times).tolist() == [12, 13]
+    print("  detector rules: PASS")
+
+
+def test_parallel_matches_sequential():
+    """Chunked, parallel detection gives the events of one sequential pass, for any chunk size."""
+    rng = np.random.default_rng(1)
+    n = 30000
+    flux = 2e-7 * np.exp(rng.normal(0, 0.02, n))
+    k = np.arange(n)
+    for onset in np.sort(rng.choice(n - 50, size=400, replace=False)):
+        peak = 10 ** rng.uniform(-6.5, -3.8)
+        decay = rng.uniform(5, 200)
+        t = k - onset
+        flux += np.where(t < 5, peak * np.clip(t / 5, 0, 1) ** 2, peak * np.exp(-np.maximum(t - 5, 0) / decay)) * (t >= 0)
+    flux[rng.random(n) < 0.002] = np.nan
+    raw_dir = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(raw_dir, XRS_DIR))
+        path = os.path.join(raw_dir, XRS_DIR, "2001_xrs.npy")
+        write_xrs_file(path, _minutes(n), flux)
+        sequential, coverage = detect_flares(raw_dir=raw_dir, workers=1, chunk=n)
+        assert len(sequential) > 100 and coverage.sum() == np.isfinite(flux).sum()
+        for workers, chunk in ((1, 97), (2, 1000), (2, 4999)):
+            events, by_day = detect_flares(raw_dir=raw_dir, workers=workers, chunk=chunk)
+            pd.testing.assert_frame_equal(events, sequential)
+            pd.testing.assert_series_equal(by_day, coverage)
+    finally:
+        shutil.rmtree(raw_dir)
+    print("  parallel matches sequential: PASS")
+
+
+def test_stitch_after_cut_flare():
+    """A chunk starting inside a flare cut at MAX_DURATION is re-detected from the cut."""
+    n = 6000
+    flux = np.full(n, 1e-7)
+    flux[100:104] = [1e-7, 5e-7, 2e-6, 5e-6]            # A: starts at 100, stays at 1e-5 past MAX_DURATION
+    flux[104:4000] = 1e-5
+    flux[4000:4004] = [1e-5, 1.3e-5, 1.7e-5, 2e-5]      # B: starts at 4000 inside A, plateau at 2e-5
+    flux[4004:4450] = 2e-5
+    flux[4450:4454] = [2e-5, 2.3e-5, 2.6e-5, 3e-5]      # C: starts at 4450, after A is cut at 4420
+    flux[4454:4600] = 3e-5
+    raw_dir = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(raw_dir, XRS_DIR))
+        write_xrs_file(os.path.join(raw_dir, XRS_DIR, "2001_xrs.npy"), _minutes(n), flux)
+        sequential, _ = detect_flares(raw_dir=raw_dir, workers=1, chunk=n)
+        chunked, _ = detect_flares(raw_dir=raw_dir, workers=1, chunk=3000)
+    finally:
+        shutil.rmtree(raw_dir)
+    starts = ((sequential["start"] - np.datetime64("2001-01-01")) // np.timedelta64(1, "m")).tolist()
+    assert starts == [100, 4450]                         # B falls inside A; C follows A's cut
+    pd.testing.assert_frame_equal(chunked, sequential)
+    print("  stitch after cut flare: PASS")
+
+
+def test_synthetic_labels():
+    """Flares detected in synthetic flux reproduce the frame's labels as the "xrs" source."""
+    merged = generate_merged_dataset(500, seed=3)
+    dates = pd.DatetimeIndex(merged["date"])
+    raw_dir = tempfile.mkdtemp()
+    try:
+        write_raw_files(merged, raw_dir)
+        write_xrs_files(merged, raw_dir, seed=3, missing_days=[20])
+        with contextlib.redirect_stdout(io.StringIO()):
+            labels = parse_label_sources(dates, raw_dir)
+            m_days, x_days, covered, peak_flux = xrs_flare_days(raw_dir, workers=2, chunk=100_000)
+    finally:
+        shutil.rmtree(raw_dir)
+
+    assert len(covered) == len(merged) - 1 and dates[20] not in covered
+    for c in ("m", "x"):
+        column = labels[f"{c}_label_xrs"]
+        assert np.isnan(column[20])
+        assert (column.drop(index=20) == merged[f"{c}_label"].drop(index=20)).all(), c
+    expected = np.where(merged["x_label"], 1.2e-4, np.where(merged["m_label"], 2.3e-5, 0.0))
+    assert np.allclose(labels["peak_flux_xrs"].drop(index=20), np.delete(expected, 20), rtol=0.02)
+    assert len(x_days) == merged["x_label"].drop(index=20).sum()
+    print("  synthetic labels: PASS")
+
+
+def test_convert_csv():
+    """CSV exports are converted chunk by chunk to the memory-mapped format."""
+    work = tempfile.mkdtemp()
+    try:
+        times = pd.date_range("2003-10-28", periods=2500, freq="min")
+        flux = np.linspace(1e-6, 3e-4, 2500)
+        pd.DataFrame({"time_tag": times, "flux": flux, "other": 1}).to_csv(os.path.join(work, "xrs.csv"), index=False)
+        n = convert_csv(os.path.join(work, "xrs.csv"), os.path.join(work, "2003_xrs.npy"), chunksize=600)
+        records = open_xrs(os.path.join(work, "2003_xrs.npy"))
+        assert n == 2500 and isinstance(records, np.memmap)
+        assert (records["time"] == times.values.astype("datetime64[s]")).all()
+        assert np.allclose(records["flux"], flux)
+    finally:
+        shutil.rmtree(work)
+    print("  convert csv: PASS")
+
+
+if __name__ == "__main__":
+    print("Running XRS label unit tests...")
+    test_detector_rules()
+    test_parallel_matches_sequential()
+    test_stitch_after_cut_flare()
+    test_synthetic_labels()
+    test_convert_csv()
+    print("\nAll tests passed!")
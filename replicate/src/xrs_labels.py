@@ -0,0 +1,276 @@
+"""
+Flare labels derived from GOES XRS 1-8 A flux instead of event catalogs.
+
+The input is 1-minute XRS-B (1-8 A) flux, about 15M samples for 1996-2024.
+It is stored as one NumPy file per year under data/raw/goes_xrs/
+(<year>_xrs.npy, records of time (datetime64[s]) and flux (float32, W/m^2);
+`convert` writes them from CSV exports in bounded memory). Files are read as
+memory maps, in chunks of CHUNK samples, so memory stays bounded whatever the
+length of the record, and the chunks of a file are processed in parallel
+worker processes.
+
+Flares are detected with the NOAA event rules:
+  start  first minute of four consecutive 1-minute increases, the last flux
+         at least RISE_FACTOR times the first (samples one minute apart)
+  peak   maximum flux between start and end
+  end    first minute after the start where the flux has fallen below half
+         way between the start flux and the running peak (or MAX_DURATION
+         minutes after the start)
+The next flare can only start at or after the end of the previous one, so
+detection is sequential; each worker starts its chunk fresh and the chunks
+are stitched in order (a chunk whose first flare overlaps the previous
+chunk's last one is re-detected from that flare's end), which gives exactly
+the events of one sequential pass. Events never span two files.
+
+Each flare is dated by its peak and classed by its peak flux, which gives
+the same outputs as the catalogs (parse_data.asr_flare_days): M and X flare
+days, the daily maximum peak flux, and the days covered (at least
+MIN_COVERAGE of the day's minutes with valid flux). parse_data adds them as
+the "xrs" label source (m/x_label_xrs, peak_flux_xrs) when goes_xrs/ exists.
+
+Usage: bash tools/run.sh replicate/src/xrs_labels.py [detect] [--workers N]
+           [--chunk 1000000] [--out results/xrs_flares.csv]
+       bash tools/run.sh replicate/src/xrs_labels.py convert XRS.csv OUT.npy
+           [--time-column time_tag] [--flux-column flux]
+"""
+
+import os
+import sys
+import glob
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from parse_data import BASE, RAW, GOES_CLASS_FLUX, daily_peak_flux
+from perf import PERF
+
+XRS_DIR = "goes_xrs"
+XRS_DTYPE = np.dtype([("time", "<M8[s]"), ("flux", "<f4")])
+CHUNK = 1_000_000               # samples per chunk (~12 MB of records)
+RISE_MINUTES = 4                # NOAA start rule: four increasing minutes ...
+RISE_FACTOR = 1.4               # ... the last at least 1.4 x the first
+MAX_DURATION = 3 * 1440         # minutes; longer events are cut here
+MIN_COVERAGE = 0.5              # fraction of a day's minutes needed to label it
+EVENT_COLUMNS = ["start", "peak", "end", "peak_flux"]
+
+
+def xrs_files(raw_dir=RAW):
+    """Sorted XRS files (<year>_xrs.npy) under raw_dir/goes_xrs."""
+    return sorted(glob.glob(os.path.join(raw_dir, XRS_DIR, "*_xrs.npy")))
+
+
+def open_xrs(path):
+    """Memory-mapped XRS records (time, flux) of one file."""
+    return np.load(path, mmap_mode="r")
+
+
+def write_xrs_file(path, times, flux):
+    """Write XRS records to `path` (times as datetime-like, flux in W/m^2)."""
+    records = np.empty(len(flux), dtype=XRS_DTYPE)
+    records["time"] = np.asarray(pd.to_datetime(times).values).astype("datetime64[s]")
+    records["flux"] = flux
+    np.save(path, records)
+
+
+def convert_csv(csv_path, out_path, time_column="time_tag", flux_column="flux", chunksize=CHUNK):
+    """
+    Convert a CSV export of 1-minute XRS-B flux to an XRS file, reading it in
+    chunks of `chunksize` rows (two passes: count, then fill a memory map).
+    """
+    columns = [time_column, flux_column]
+    n = sum(len(part) for part in pd.read_csv(csv_path, usecols=columns, chunksize=chunksize))
+    out = np.lib.format.open_memmap(out_path, mode="w+", dtype=XRS_DTYPE, shape=(n,))
+    pos = 0
+    for part in pd.read_csv(csv_path, usecols=columns, chunksize=chunksize):
+        out["time"][pos:pos + len(part)] = pd.to_datetime(part[time_column]).values.astype("datetime64[s]")
+        out["flux"][pos:pos + len(part)] = pd.to_numeric(part[flux_column], errors="coerce").to_numpy()
+        pos += len(part)
+    out.flush()
+    return n
+
+
+def start_candidates(flux, times):
+    """
+    Indices i where flux[i : i + RISE_MINUTES] rises every minute, one minute
+    apart, and ends at least RISE_FACTOR x flux[i] (NaN never qualifies).
+    """
+    last = len(flux) - RISE_MINUTES + 1
+    if last <= 0:
+        return np.array([], dtype=np.int64)
+    ok = np.ones(last, dtype=bool)
+    for j in range(1, RISE_MINUTES):
+        ok &= flux[j:j + last] > flux[j - 1:j - 1 + last]
+    span = np.timedelta64(60 * (RISE_MINUTES - 1), "s")
+    ok &= times[RISE_MINUTES - 1:] - times[:last] == span
+    ok &= flux[RISE_MINUTES - 1:] >= RISE_FACTOR * flux[:last]
+    return np.flatnonzero(ok)
+
+
+def _flare_end(flux, start):
+    """(peak, end) indices of the flare starting at `start`, scanning ahead in growing windows."""
+    limit = min(len(flux), start + MAX_DURATION + 1)
+    width = 128
+    while True:
+        stop = min(limit, start + width)
+        seg = flux[start:stop].astype(float)
+        running = np.fmax.accumulate(seg)
+        below = seg[1:] < (seg[0] + running[1:]) / 2
+        if below.any() or stop == limit:
+            end = start + 1 + int(np.argmax(below)) if below.any() else stop - 1
+            return start + int(np.nanargmax(seg[:end - start + 1])), end
+        width *= 4
+
+
+def detect_events(flux, times, begin, stop):
+    """
+    Flares starting in [begin, stop) of one file's records, scanning from
+    `begin` as if no flare were in progress there.
+
+    Returns:
+    --------
+    int64 array (n_events, 3) of start, peak and end indices
+    """
+    tail = min(len(flux), stop + RISE_MINUTES - 1)
+    candidates = begin + start_candidates(np.asarray(flux[begin:tail], dtype=float), times[begin:tail])
+    events = []
+    i = 0
+    while i < len(candidates):
+        start = int(candidates[i])
+        peak, end = _flare_end(flux, start)
+        events.append((start, peak, end))
+        i = int(np.searchsorted(candidates, end))
+    return np.array(events, dtype=np.int64).reshape(-1, 3)
+
+
+def _detect_chunk(task):
+    """Worker: (events, days, valid counts) of one chunk (path, begin, stop)."""
+    path, begin, stop = task
+    records = open_xrs(path)
+    flux, times = records["flux"], records["time"]
+    events = detect_events(flux, times, begin, stop)
+    chunk = records[begin:stop]
+    valid = np.isfinite(chunk["flux"]) & (chunk["flux"] > 0)
+    days, counts = np.unique(chunk["time"][valid].astype("datetime64[D]"), return_counts=True)
+    return events, days, counts
+
+
+def _stitch(path, results, chunks):
+    """Events of a whole file from per-chunk results (chunk order), exactly as one sequential pass."""
+    records = None
+    kept, last_end = [], -1
+    for (events, _, _), (_, begin, stop) in zip(results, chunks):
+        later = events[events[:, 0] >= last_end]
+        if len(later) < len(events):
+            # The chunk's first flare overlapped the previous one: re-detect from its end
+            # unless no flare could start between that end and the next kept flare
+            if records is None:
+                records = open_xrs(path)
+            first = later[0, 0] if len(later) else stop
+            flux = np.asarray(records["flux"][last_end:first + RISE_MINUTES - 1], dtype=float)
+            if len(start_candidates(flux, records["time"][last_end:first + RISE_MINUTES - 1])):
+                later = detect_events(records["flux"], records["time"], last_end, stop)
+        kept.append(later)
+        if len(later):
+            last_end = int(later[-1, 2])
+    return np.concatenate(kept) if kept else np.zeros((0, 3), dtype=np.int64)
+
+
+def detect_flares(paths=None, raw_dir=RAW, workers=None, chunk=CHUNK):
+    """
+    Flares in every XRS file, with the chunks processed in parallel.
+
+    Parameters:
+    -----------
+    paths : list of str
+        XRS files (default: xrs_files(raw_dir))
+    workers : int
+        Worker processes (default os.cpu_count()); 1 runs in this process
+    chunk : int
+        Samples per chunk
+
+    Returns:
+    --------
+    (events, coverage): events is a DataFrame with start, peak, end
+    (timestamps) and peak_flux (W/m^2), one row per flare; coverage is a
+    Series of valid samples per day
+    """
+    paths = xrs_files(raw_dir) if paths is None else list(paths)
+    tasks = []
+    for path in paths:
+        n = len(open_xrs(path))
+        tasks.extend((path, begin, min(n, begin + chunk)) for begin in range(0, n, chunk))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+
+    with PERF.span("xrs.detect", files=len(paths)) as span:
+        if workers == 1:
+            results = [_detect_chunk(task) for task in tasks]
+        else:
+            method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+            with multiprocessing.get_context(method).Pool(workers) as pool:
+                results = pool.map(_detect_chunk, tasks, chunksize=1)
+
+        frames, days, counts = [], [], []
+        for path in paths:
+            mine = [i for i, task in enumerate(tasks) if task[0] == path]
+            events = _stitch(path, [results[i] for i in mine], [tasks[i] for i in mine])
+            records = open_xrs(path)
+            frames.append(pd.DataFrame({
+                "start": records["time"][events[:, 0]], "peak": records["time"][events[:, 1]],
+                "end": records["time"][events[:, 2]],
+                "peak_flux": records["flux"][events[:, 1]].astype(float)}, columns=EVENT_COLUMNS))
+            days.extend(results[i][1] for i in mine)
+            counts.extend(results[i][2] for i in mine)
+        span.count("samples", sum(task[2] - task[1] for task in tasks))
+        span.count("chunks", len(tasks))
+
+    events = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=EVENT_COLUMNS)
+    coverage = pd.Series(np.concatenate(counts) if counts else [], dtype=np.int64,
+                         index=pd.DatetimeIndex(np.concatenate(days) if days else []).astype("datetime64[ns]"))
+    return events, coverage.groupby(level=0).sum()
+
+
+@PERF.timed("parse.xrs")
+def xrs_flare_days(raw_dir=RAW, workers=None, chunk=CHUNK):
+    """
+    (m_days, x_days, covered_days, peak_flux) from the XRS flux, like the
+    catalogs: days with an M- or X-class flare (by peak time and peak flux),
+    the days with at least MIN_COVERAGE of their minutes observed, and the
+    daily maximum peak flux of the flares.
+    """
+    events, coverage = detect_flares(raw_dir=raw_dir, workers=workers, chunk=chunk)
+    day = events["peak"].dt.date
+    m = (events["peak_flux"] >= GOES_CLASS_FLUX["M"]) & (events["peak_flux"] < GOES_CLASS_FLUX["X"])
+    x = events["peak_flux"] >= GOES_CLASS_FLUX["X"]
+    covered = coverage.index[coverage >= MIN_COVERAGE * 1440]
+    peak_flux = daily_peak_flux(events["peak"].to_numpy(dtype="datetime64[D]"), events["peak_flux"])
+    print(f"  XRS: {len(events)} flares ({m.sum()} M, {x.sum()} X) on {len(covered)} covered days")
+    return set(day[m]), set(day[x]), covered, peak_flux
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Detect flares in GOES XRS flux, or convert XRS CSV exports")
+    sub = parser.add_subparsers(dest="mode")
+    detect = sub.add_parser("detect", help="detect flares in data/raw/goes_xrs (default)")
+    convert = sub.add_parser("convert", help="convert a CSV of 1-minute XRS-B flux to an XRS file")
+    convert.add_argument("csv")
+    convert.add_argument("out")
+    convert.add_argument("--time-column", default="time_tag")
+    convert.add_argument("--flux-column", default="flux")
+    for p in (parser, detect):
+        p.add_argument("--workers", type=int, help="worker processes (default: all CPUs)")
+        p.add_argument("--chunk", type=int, default=CHUNK, help="samples per chunk")
+        p.add_argument("--out", default=os.path.join(BASE, "results", "xrs_flares.csv"))
+    args = parser.parse_args()
+
+    if args.mode == "convert":
+        n = convert_csv(args.csv, args.out, args.time_column, args.flux_column)
+        print(f"Saved {args.out} ({n} samples)")
+    else:
+        if not xrs_files():
+            sys.exit(f"No XRS files in {os.path.join(RAW, XRS_DIR)}")
+        events, coverage = detect_flares(workers=args.workers, chunk=args.chunk)
+        events.to_csv(args.out, index=False)
+        print(f"Saved {args.out} ({len(events)} flares, {len(coverage)} days observed)")